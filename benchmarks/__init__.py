@@ -0,0 +1 @@
+"""Scripts de medición de rendimiento (se ejecutan a mano: python -m benchmarks.<script>)"""
@@ -0,0 +1,109 @@
+"""
+GET /notas de punta a punta sobre una base real: lectura y serialización.
+
+Compara, con N notas en una base SQLite temporal (o --url):
+- anterior: crud.get_all_notas (objetos ORM, partidas/pagos/cliente cargados
+  nota por nota) + el serializador campo por campo + json.dumps;
+- orm: crud.get_all_notas + respuesta_lista(NotaSalida, ...);
+- columnas: crud.filas_notas (tres consultas, sin objetos ORM) +
+  respuesta_lista(NotaSalida, ...), que es lo que hace ahora el endpoint.
+
+    python -m benchmarks.bench_esquemas --notas 10000
+    python -m benchmarks.bench_esquemas --url postgresql://... --notas 50000
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from server import crud
+from server.esquemas import NotaSalida, respuesta_lista
+from server.models import Base
+from benchmarks.bench_respuestas import _nota_to_dict_anterior, generar_notas
+
+
+def preparar_base(url: str, cantidad: int):
+    engine = create_engine(url)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    Sesion = sessionmaker(bind=engine)
+    with Sesion() as db:
+        # El cliente de cada nota entra por cascada
+        db.add_all(generar_notas(cantidad))
+        db.commit()
+    return Sesion
+
+
+def ruta_anterior(db):
+    notas = crud.get_all_notas(db)
+    return json.dumps([_nota_to_dict_anterior(n) for n in notas], ensure_ascii=False,
+                      separators=(",", ":")).encode("utf-8")
+
+
+def ruta_orm(db):
+    return respuesta_lista(NotaSalida, crud.get_all_notas(db)).body
+
+
+def ruta_columnas(db):
+    return respuesta_lista(NotaSalida, crud.filas_notas(db)).body
+
+
+def medir(Sesion, ruta, repeticiones: int):
+    """Mejor tiempo (ms) con una sesión nueva por corrida (sin identity map caliente)"""
+    mejor, cuerpo = None, None
+    for _ in range(repeticiones):
+        with Sesion() as db:
+            inicio = time.perf_counter()
+            cuerpo = ruta(db)
+            ms = (time.perf_counter() - inicio) * 1000
+        mejor = ms if mejor is None else min(mejor, ms)
+    return mejor, cuerpo
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=None)
+    parser.add_argument("--notas", type=int, default=10000)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    temporal = None
+    url = args.url
+    if url is None:
+        temporal = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+        temporal.close()
+        url = f"sqlite:///{temporal.name}"
+
+    try:
+        Sesion = preparar_base(url, args.notas)
+        print(f"{args.notas} notas en {url.split(':', 1)[0]}")
+
+        resultados = [(nombre, *medir(Sesion, ruta, args.repeticiones))
+                      for nombre, ruta in (("anterior", ruta_anterior), ("orm", ruta_orm),
+                                           ("columnas", ruta_columnas))]
+
+        base = json.loads(resultados[0][2])
+        for nombre, _, cuerpo in resultados[1:]:
+            if json.loads(cuerpo) != base:
+                print(f"ADVERTENCIA: '{nombre}' produce JSON distinto a 'anterior'")
+
+        ms_anterior = resultados[0][1]
+        print(f"\n{'ruta':<10} {'ms':>10} {'notas/s':>12} {'vs anterior':>12} {'bytes':>12}")
+        for nombre, ms, cuerpo in resultados:
+            print(f"{nombre:<10} {ms:>10.1f} {args.notas / (ms / 1000):>12,.0f} "
+                  f"{ms_anterior / ms:>11.1f}x {len(cuerpo):>12,}")
+    finally:
+        if temporal is not None:
+            os.unlink(temporal.name)
+
+
+if __name__ == "__main__":
+    main()
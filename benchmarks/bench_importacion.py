@@ -0,0 +1,131 @@
+"""
+Throughput de importación: flush por fila (método anterior) contra
+ImportadorMasivo (INSERT ... RETURNING por lotes) leyendo NDJSON.
+
+    python -m benchmarks.bench_importacion --notas 20000
+    python -m benchmarks.bench_importacion --url postgresql://... --notas 50000
+
+Sin --url usa una base SQLite temporal. Cada corrida parte de tablas vacías.
+"""
+
+import argparse
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from server.models import Base, Cliente, NotaVenta, NotaVentaItem
+from server.importacion import ImportadorMasivo, LectorNDJSON
+
+SERVICIOS = ["Cambio de aceite", "Afinación mayor", "Balanceo", "Alineación",
+             "Frenos delanteros", "Cambio de filtro de aire", "Lavado de motor"]
+
+
+def generar_ndjson(clientes: int, notas: int, items_por_nota: int) -> bytes:
+    rnd = random.Random(42)
+    salida = io.StringIO()
+
+    def linea(tabla, datos):
+        salida.write(json.dumps({"tabla": tabla, "datos": datos}, ensure_ascii=False))
+        salida.write("\n")
+
+    for i in range(1, clientes + 1):
+        linea("clientes", {"id_original": i, "nombre": f"Cliente {i}", "tipo": "Particular", "telefono": f"55{i:08d}"})
+    for n in range(1, notas + 1):
+        linea("notas_venta", {"id_original": n, "cliente_id_original": rnd.randint(1, clientes),
+                              "folio": f"NV-{n:06d}", "fecha": "2024-05-01T10:00:00",
+                              "total": 0.0, "estado": "Pagado"})
+    for n in range(1, notas + 1):
+        for _ in range(items_por_nota):
+            precio = rnd.randint(100, 2000)
+            linea("notas_venta_items", {"nota_id_original": n, "cantidad": 1,
+                                        "descripcion": rnd.choice(SERVICIOS),
+                                        "precio_unitario": precio, "importe": precio})
+    return salida.getvalue().encode("utf-8")
+
+
+def preparar_engine(url: str):
+    engine = create_engine(url)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    return engine
+
+
+def importar_por_fila(engine, contenido: bytes) -> int:
+    """Réplica del método anterior: un objeto ORM y un flush por fila"""
+    db = sessionmaker(bind=engine)()
+    modelos = {"clientes": Cliente, "notas_venta": NotaVenta, "notas_venta_items": NotaVentaItem}
+    mapas = {"clientes": {}, "notas_venta": {}}
+    total = 0
+    for linea in contenido.splitlines():
+        obj = json.loads(linea)
+        tabla, datos = obj["tabla"], obj["datos"]
+        id_original = datos.pop("id_original", None)
+        if "cliente_id_original" in datos:
+            datos["cliente_id"] = mapas["clientes"][datos.pop("cliente_id_original")]
+        if "nota_id_original" in datos:
+            datos["nota_id"] = mapas["notas_venta"][datos.pop("nota_id_original")]
+        if "fecha" in datos:
+            from datetime import datetime
+            datos["fecha"] = datetime.fromisoformat(datos["fecha"])
+        fila = modelos[tabla](**datos)
+        db.add(fila)
+        db.flush()
+        if id_original is not None:
+            mapas[tabla][id_original] = fila.id
+        total += 1
+    db.commit()
+    db.close()
+    return total
+
+
+def importar_por_lotes(engine, contenido: bytes, lote: int, fragmento: int = 64 * 1024) -> int:
+    """Mismo camino que /admin/import-ndjson: fragmentos -> LectorNDJSON -> lotes"""
+    lector = LectorNDJSON()
+    importador = ImportadorMasivo(engine, lote=lote)
+    for i in range(0, len(contenido), fragmento):
+        importador.procesar(lector.alimentar(contenido[i:i + fragmento]))
+    importador.procesar(lector.terminar())
+    return importador.finalizar()["total"]
+
+
+def medir(nombre: str, funcion, *args):
+    inicio = time.perf_counter()
+    filas = funcion(*args)
+    segundos = time.perf_counter() - inicio
+    print(f"{nombre:<22} {filas:>9} filas  {segundos:>8.2f} s  {filas / segundos:>10.0f} filas/s")
+    return filas / segundos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="URL de una base de pruebas (se BORRAN sus tablas)")
+    parser.add_argument("--clientes", type=int, default=2000)
+    parser.add_argument("--notas", type=int, default=20000)
+    parser.add_argument("--items", type=int, default=3, help="items por nota")
+    parser.add_argument("--lote", type=int, default=1000)
+    parser.add_argument("--solo-lotes", action="store_true", help="no medir el método por fila")
+    args = parser.parse_args()
+
+    contenido = generar_ndjson(args.clientes, args.notas, args.items)
+    print(f"NDJSON generado: {len(contenido) / 1e6:.1f} MB")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.url or f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+
+        por_lotes = medir(f"lotes de {args.lote}", importar_por_lotes, preparar_engine(url), contenido, args.lote)
+        if not args.solo_lotes:
+            por_fila = medir("flush por fila", importar_por_fila, preparar_engine(url), contenido)
+            print(f"Aceleración: {por_lotes / por_fila:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
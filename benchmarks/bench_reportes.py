@@ -0,0 +1,83 @@
+"""
+Reporte de ventas por periodo: entidades ORM contra filas por columnas.
+
+Sobre N notas en una base SQLite temporal (o --url) mide tiempo y memoria
+pico (tracemalloc) de:
+- anterior: query(NotaVenta).all() + NotaSalida (carga partidas, pagos y
+  cliente nota por nota);
+- columnas: crud.get_reporte_ventas_por_periodo (filas Row) +
+  NotaReporteSalida, que es lo que hace ahora /reportes/ventas.
+
+    python -m benchmarks.bench_reportes --notas 20000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from server import crud
+from server.esquemas import NotaReporteSalida, NotaSalida, respuesta_lista
+from server.models import NotaVenta
+from benchmarks.bench_esquemas import preparar_base
+
+DESDE = datetime(2000, 1, 1)
+HASTA = datetime(2100, 1, 1)
+
+
+def ruta_anterior(db):
+    notas = db.query(NotaVenta).filter(
+        NotaVenta.fecha.between(DESDE, HASTA),
+        NotaVenta.estado != 'Cancelada'
+    ).order_by(NotaVenta.fecha.asc()).all()
+    return respuesta_lista(NotaSalida, notas).body
+
+
+def ruta_columnas(db):
+    filas = crud.get_reporte_ventas_por_periodo(db, DESDE, HASTA)
+    return respuesta_lista(NotaReporteSalida, filas).body
+
+
+def medir(Sesion, ruta):
+    with Sesion() as db:
+        tracemalloc.start()
+        inicio = time.perf_counter()
+        cuerpo = ruta(db)
+        ms = (time.perf_counter() - inicio) * 1000
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return ms, pico, cuerpo
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=None)
+    parser.add_argument("--notas", type=int, default=20000)
+    args = parser.parse_args()
+
+    temporal = None
+    url = args.url
+    if url is None:
+        temporal = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+        temporal.close()
+        url = f"sqlite:///{temporal.name}"
+
+    try:
+        Sesion = preparar_base(url, args.notas)
+        print(f"{args.notas} notas en {url.split(':', 1)[0]}")
+        print(f"\n{'ruta':<10} {'ms':>10} {'MB pico':>10} {'bytes':>12}")
+        for nombre, ruta in (("anterior", ruta_anterior), ("columnas", ruta_columnas)):
+            ms, pico, cuerpo = medir(Sesion, ruta)
+            print(f"{nombre:<10} {ms:>10.1f} {pico / 1e6:>10.1f} {len(cuerpo):>12,}")
+    finally:
+        if temporal is not None:
+            os.unlink(temporal.name)
+
+
+if __name__ == "__main__":
+    main()
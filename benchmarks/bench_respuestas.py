@@ -0,0 +1,164 @@
+"""
+Costo de armar la respuesta de GET /notas: serialización y bytes en la red.
+
+Compara, sobre N notas en memoria (con cliente, partidas y pagos):
+- anterior: _nota_to_dict con isoformat()/float() por campo, jsonable_encoder
+  y json.dumps (lo que hacía FastAPI con la respuesta por default);
+- actual: NotaSalida (server/esquemas.py) validada y convertida a JSON en
+  pydantic-core con respuesta_lista, que es lo que regresa GET /notas;
+y el tamaño del cuerpo sin comprimir, con gzip y con br a varios niveles.
+
+    python -m benchmarks.bench_respuestas --notas 10000
+    python -m benchmarks.bench_respuestas --notas 10000 --repeticiones 10
+"""
+
+import argparse
+import gzip
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder
+
+from server.esquemas import NotaSalida, respuesta_lista
+from server.models import Cliente, NotaVenta, NotaVentaItem, NotaVentaPago
+from server.respuestas import brotli
+
+SERVICIOS = ["Cambio de aceite", "Afinación mayor", "Balanceo", "Alineación",
+             "Frenos delanteros", "Cambio de filtro de aire", "Lavado de motor"]
+
+
+def _nota_to_dict_anterior(n):
+    """El serializador de notas antes de RespuestaJSON: conversión de cada campo en Python"""
+    return {
+        'id': n.id,
+        'folio': n.folio,
+        'version': n.version,
+        'cliente_id': n.cliente_id,
+        'cliente_nombre': n.cliente.nombre if n.cliente else '',
+        'estado': n.estado,
+        'metodo_pago': n.metodo_pago or '',
+        'subtotal': float(n.subtotal or 0),
+        'impuestos': float(n.impuestos or 0),
+        'total': float(n.total or 0),
+        'total_pagado': float(n.total_pagado or 0),
+        'saldo': float(n.saldo or 0),
+        'fecha': n.fecha.isoformat() if n.fecha else '',
+        'observaciones': n.observaciones or '',
+        'cotizacion_folio': n.cotizacion_folio or '',
+        'orden_folio': n.orden_folio or '',
+        'items': [{
+            'id': i.id,
+            'cantidad': i.cantidad,
+            'descripcion': i.descripcion,
+            'precio_unitario': float(i.precio_unitario or 0),
+            'importe': float(i.importe or 0),
+            'impuesto': float(i.impuesto or 0),
+            'servicio_id': i.servicio_id
+        } for i in n.items],
+        'pagos': [{
+            'id': p.id,
+            'monto': float(p.monto),
+            'fecha_pago': p.fecha_pago.isoformat() if p.fecha_pago else '',
+            'metodo_pago': p.metodo_pago,
+            'memo': p.memo or ''
+        } for p in n.pagos]
+    }
+
+
+def generar_notas(cantidad: int, semilla: int = 42):
+    """Notas transitorias (sin sesión) con la forma que carga crud.get_all_notas"""
+    rnd = random.Random(semilla)
+    clientes = [Cliente(id=i, nombre=f"Cliente {i} Pérez", tipo="Particular") for i in range(1, 501)]
+    inicio = datetime(2024, 1, 1, 9, 0)
+    notas, id_item, id_pago = [], 1, 1
+    for n in range(1, cantidad + 1):
+        cliente = rnd.choice(clientes)
+        fecha = inicio + timedelta(minutes=37 * n, microseconds=rnd.randint(0, 999999))
+        items = []
+        for _ in range(rnd.randint(1, 5)):
+            precio = float(rnd.randint(100, 3000))
+            items.append(NotaVentaItem(id=id_item, cantidad=1, descripcion=rnd.choice(SERVICIOS),
+                                       precio_unitario=precio, importe=precio, impuesto=16.0))
+            id_item += 1
+        subtotal = sum(i.importe for i in items)
+        total = round(subtotal * 1.16, 2)
+        pagos = []
+        if rnd.random() < 0.7:
+            pagos.append(NotaVentaPago(id=id_pago, monto=total, fecha_pago=fecha, metodo_pago="Efectivo", memo=""))
+            id_pago += 1
+        pagado = sum(p.monto for p in pagos)
+        notas.append(NotaVenta(
+            id=n, folio=f"NV-{n:06d}", version=1, cliente_id=cliente.id, cliente=cliente,
+            estado="Pagado" if pagos else "Registrado", metodo_pago="Efectivo",
+            subtotal=subtotal, impuestos=round(total - subtotal, 2), total=total,
+            total_pagado=pagado, saldo=round(total - pagado, 2), fecha=fecha,
+            observaciones="", items=items, pagos=pagos))
+    return notas
+
+
+def medir(funcion, repeticiones: int):
+    """Mejor tiempo (ms) de 'repeticiones' corridas y el último resultado"""
+    mejor, resultado = None, None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        ms = (time.perf_counter() - inicio) * 1000
+        mejor = ms if mejor is None else min(mejor, ms)
+    return mejor, resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--notas", type=int, default=10000)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    notas = generar_notas(args.notas)
+    print(f"{args.notas} notas en memoria")
+
+    def render_anterior(contenido):
+        # JSONResponse.render de Starlette
+        return json.dumps(contenido, ensure_ascii=False, allow_nan=False,
+                          separators=(",", ":")).encode("utf-8")
+
+    ms_dict_ant, dicts_ant = medir(lambda: [_nota_to_dict_anterior(n) for n in notas], args.repeticiones)
+    ms_enc_ant, _ = medir(lambda: jsonable_encoder(dicts_ant), args.repeticiones)
+    codificado = jsonable_encoder(dicts_ant)
+    ms_json_ant, cuerpo_ant = medir(lambda: render_anterior(codificado), args.repeticiones)
+
+    # Validación y JSON van juntos en respuesta_lista
+    ms_json, respuesta = medir(lambda: respuesta_lista(NotaSalida, notas), args.repeticiones)
+    cuerpo = respuesta.body
+
+    if json.loads(cuerpo) != json.loads(cuerpo_ant):
+        print("ADVERTENCIA: las dos rutas producen JSON distinto")
+
+    total_ant = ms_dict_ant + ms_enc_ant + ms_json_ant
+    total = ms_json
+    print(f"\n{'ruta':<10} {'to_dict ms':>11} {'encoder ms':>11} {'dumps ms':>10} {'total ms':>10} {'bytes':>12}")
+    print(f"{'anterior':<10} {ms_dict_ant:>11.1f} {ms_enc_ant:>11.1f} {ms_json_ant:>10.1f} {total_ant:>10.1f} {len(cuerpo_ant):>12,}")
+    print(f"{'actual':<10} {'-':>11} {'-':>11} {ms_json:>10.1f} {total:>10.1f} {len(cuerpo):>12,}")
+    print(f"Serialización {total_ant / total:.1f}x más rápida")
+
+    print(f"\n{'codificación':<14} {'bytes':>12} {'% del original':>15} {'ms':>9}")
+    print(f"{'identity':<14} {len(cuerpo):>12,} {100:>14.1f}% {0:>9.1f}")
+    variantes = [(f"gzip-{nivel}", lambda nivel=nivel: gzip.compress(cuerpo, compresslevel=nivel))
+                 for nivel in (1, 5, 6, 9)]
+    if brotli is not None:
+        variantes += [(f"br-{calidad}", lambda calidad=calidad: brotli.compress(cuerpo, quality=calidad))
+                      for calidad in (1, 4, 11)]
+    else:
+        print("(Brotli no está instalado; se omite br)")
+    for nombre, comprimir in variantes:
+        ms, comprimido = medir(comprimir, 1 if nombre.endswith("-11") else args.repeticiones)
+        print(f"{nombre:<14} {len(comprimido):>12,} {100 * len(comprimido) / len(cuerpo):>14.1f}% {ms:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
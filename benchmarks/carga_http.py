@@ -0,0 +1,337 @@
+"""
+Prueba de carga HTTP de la API con líneas base para detectar regresiones.
+
+Levanta uvicorn con server.main:app sobre una base generada con
+benchmarks.datos_sinteticos (SQLite temporal o la URL que se indique),
+corre N usuarios concurrentes con una mezcla de peticiones parecida a la
+de las ventanas de escritorio y reporta, por grupo de endpoints,
+peticiones por segundo y latencias p50/p95/p99.
+
+    python -m benchmarks.carga_http --escala mediana --usuarios 20 --duracion 60
+    python -m benchmarks.carga_http --bd postgresql://.../taller_bench --guardar-base
+    python -m benchmarks.carga_http --servidor http://127.0.0.1:8000 --sin-datos
+
+Con --guardar-base el resultado se guarda en benchmarks/lineas_base/<nombre>.json;
+en las corridas siguientes se compara contra ese archivo y el proceso
+termina con código 1 si algún grupo empeora más de --tolerancia (p95 más
+alto o menos peticiones por segundo).
+"""
+
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+
+from benchmarks.datos_sinteticos import agregar_argumentos, cargar_en_bd, generador_desde_args
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DIR_LINEAS_BASE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "lineas_base")
+
+
+def percentil(valores: List[float], p: float) -> float:
+    if not valores:
+        return 0.0
+    orden = sorted(valores)
+    return orden[min(len(orden) - 1, int(p * len(orden)))]
+
+
+# ==================== SERVIDOR ====================
+
+def puerto_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def levantar_servidor(url_bd: str, puerto: int, workers: int = 1) -> subprocess.Popen:
+    entorno = dict(os.environ, DATABASE_URL=url_bd, LOG_NIVEL="WARNING", PYTHONPATH=RAIZ)
+    proceso = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server.main:app", "--host", "127.0.0.1",
+         "--port", str(puerto), "--workers", str(workers), "--no-access-log"],
+        cwd=RAIZ, env=entorno)
+    base = f"http://127.0.0.1:{puerto}"
+    limite = time.monotonic() + 60
+    while time.monotonic() < limite:
+        if proceso.poll() is not None:
+            raise RuntimeError(f"uvicorn terminó con código {proceso.returncode}")
+        try:
+            if requests.get(f"{base}/", timeout=1).ok:
+                return proceso
+        except requests.RequestException:
+            time.sleep(0.2)
+    proceso.terminate()
+    raise RuntimeError("El servidor no respondió en 60 s")
+
+
+# ==================== ESCENARIO ====================
+
+class Escenario:
+    """
+    Mezcla de peticiones por grupo. Cada operación recibe la sesión y un
+    Random y regresa (grupo, método, ruta plantilla, respuesta).
+    """
+
+    def __init__(self, base: str):
+        self.base = base
+        sesion = requests.Session()
+        # Ids reales para las peticiones de detalle, pago y movimiento
+        self.notas = [n["id"] for n in sesion.get(f"{base}/notas", params={"limit": 2000}).json()]
+        self.cotizaciones = [c["id"] for c in sesion.get(f"{base}/cotizaciones", params={"limit": 500}).json()]
+        self.ordenes = [o["id"] for o in sesion.get(f"{base}/ordenes", params={"limit": 500}).json()]
+        clientes = sesion.get(f"{base}/clientes").json()
+        self.clientes = [c["id"] for c in clientes]
+        self.nombres = [c["nombre"].split()[0] for c in clientes[:200]]
+        self.productos = [p["id"] for p in sesion.get(f"{base}/productos").json()]
+        if not (self.notas and self.clientes and self.productos):
+            raise RuntimeError("La base no tiene datos; quite --sin-datos o cargue datos sintéticos")
+        hoy = datetime.now()
+        self.periodo = {"fecha_ini": (hoy - timedelta(days=30)).isoformat(), "fecha_fin": hoy.isoformat()}
+
+        # (peso, grupo, operación)
+        self.operaciones: List[Tuple[int, str, Callable]] = [
+            (10, "catalogos", lambda s, r: ("GET", "/clientes", s.get(f"{base}/clientes"))),
+            (6, "catalogos", lambda s, r: ("GET", "/productos", s.get(f"{base}/productos"))),
+            (4, "catalogos", lambda s, r: ("GET", "/bootstrap", s.get(f"{base}/bootstrap"))),
+            (8, "listas", lambda s, r: ("GET", "/notas", s.get(f"{base}/notas", params={"limit": 2000}))),
+            (4, "listas", lambda s, r: ("GET", "/cotizaciones", s.get(f"{base}/cotizaciones", params={"limit": 2000}))),
+            (4, "listas", lambda s, r: ("GET", "/ordenes", s.get(f"{base}/ordenes", params={"limit": 2000}))),
+            (15, "detalle", lambda s, r: ("GET", "/notas/{id}", s.get(f"{base}/notas/{r.choice(self.notas)}"))),
+            (5, "detalle", self._detalle_cotizacion),
+            (5, "detalle", self._detalle_orden),
+            (8, "busqueda", lambda s, r: ("GET", "/clientes/buscar/{texto}",
+                                          s.get(f"{base}/clientes/buscar/{r.choice(self.nombres)}"))),
+            (6, "busqueda", lambda s, r: ("GET", "/autocomplete",
+                                          s.get(f"{base}/autocomplete", params={"q": r.choice(["cam", "fre", "afi", "bal"])}))),
+            (4, "busqueda", lambda s, r: ("GET", "/notas/buscar",
+                                          s.get(f"{base}/notas/buscar", params={"folio": f"-{r.randint(1, 999):03d}"}))),
+            (2, "reportes", lambda s, r: ("GET", "/reportes/ventas", s.get(f"{base}/reportes/ventas", params=self.periodo))),
+            (2, "reportes", lambda s, r: ("GET", "/reportes/clientes", s.get(f"{base}/reportes/clientes", params=self.periodo))),
+            (1, "reportes", lambda s, r: ("GET", "/reportes/cxc", s.get(f"{base}/reportes/cxc"))),
+            (5, "escritura", self._crear_nota),
+            (3, "escritura", self._pagar_nota),
+            (3, "escritura", self._movimiento),
+        ]
+        self._acumulado = []
+        total = 0
+        for peso, _, _ in self.operaciones:
+            total += peso
+            self._acumulado.append(total)
+
+    def _detalle_cotizacion(self, s, r):
+        if not self.cotizaciones:
+            return "GET", "/notas/{id}", s.get(f"{self.base}/notas/{r.choice(self.notas)}")
+        return "GET", "/cotizaciones/{id}", s.get(f"{self.base}/cotizaciones/{r.choice(self.cotizaciones)}")
+
+    def _detalle_orden(self, s, r):
+        if not self.ordenes:
+            return "GET", "/notas/{id}", s.get(f"{self.base}/notas/{r.choice(self.notas)}")
+        return "GET", "/ordenes/{id}", s.get(f"{self.base}/ordenes/{r.choice(self.ordenes)}")
+
+    def _crear_nota(self, s, r):
+        items = [{"cantidad": 1, "descripcion": r.choice(["Cambio de aceite", "Balanceo", "Alineación"]),
+                  "precio_unitario": 450.0, "importe": 450.0, "impuesto": 16.0}
+                 for _ in range(r.randint(1, 4))]
+        datos = {"cliente_id": r.choice(self.clientes), "metodo_pago": "Efectivo", "items": items}
+        return "POST", "/notas", s.post(f"{self.base}/notas", json=datos)
+
+    def _pagar_nota(self, s, r):
+        datos = {"monto": 1.0, "fecha_pago": datetime.now().date().isoformat(),
+                 "metodo_pago": "Efectivo", "memo": "carga"}
+        return "POST", "/notas/{id}/pagar", s.post(f"{self.base}/notas/{r.choice(self.notas)}/pagar", json=datos)
+
+    def _movimiento(self, s, r):
+        datos = {"producto_id": r.choice(self.productos), "tipo": "Entrada", "cantidad": 1,
+                 "motivo": "Prueba de carga", "usuario": "carga"}
+        return "POST", "/inventario/movimiento", s.post(f"{self.base}/inventario/movimiento", json=datos)
+
+    def elegir(self, rnd: random.Random) -> Tuple[str, Callable]:
+        x = rnd.random() * self._acumulado[-1]
+        for (peso, grupo, operacion), acumulado in zip(self.operaciones, self._acumulado):
+            if x < acumulado:
+                return grupo, operacion
+        return self.operaciones[-1][1], self.operaciones[-1][2]
+
+
+# ==================== EJECUCIÓN ====================
+
+class Resultados:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencias: Dict[str, List[float]] = defaultdict(list)
+        self.errores: Dict[str, int] = defaultdict(int)
+        self.rutas: Dict[str, List[float]] = defaultdict(list)
+
+    def agregar(self, grupo: str, ruta: str, segundos: float, ok: bool):
+        with self._lock:
+            self.latencias[grupo].append(segundos)
+            self.rutas[ruta].append(segundos)
+            if not ok:
+                self.errores[grupo] += 1
+
+    def resumen(self, duracion: float) -> Dict[str, Dict[str, float]]:
+        grupos = {}
+        for grupo, valores in sorted(self.latencias.items()):
+            grupos[grupo] = {
+                "peticiones": len(valores),
+                "errores": self.errores.get(grupo, 0),
+                "rps": round(len(valores) / duracion, 2),
+                "p50_ms": round(percentil(valores, 0.50) * 1000, 1),
+                "p95_ms": round(percentil(valores, 0.95) * 1000, 1),
+                "p99_ms": round(percentil(valores, 0.99) * 1000, 1),
+            }
+        todas = [v for valores in self.latencias.values() for v in valores]
+        grupos["total"] = {
+            "peticiones": len(todas),
+            "errores": sum(self.errores.values()),
+            "rps": round(len(todas) / duracion, 2),
+            "p50_ms": round(percentil(todas, 0.50) * 1000, 1),
+            "p95_ms": round(percentil(todas, 0.95) * 1000, 1),
+            "p99_ms": round(percentil(todas, 0.99) * 1000, 1),
+        }
+        return grupos
+
+
+def correr(escenario: Escenario, usuarios: int, duracion: float, calentamiento: float,
+           pausa: float, semilla: int) -> Tuple[Resultados, float]:
+    resultados = Resultados()
+    inicio_medicion = time.monotonic() + calentamiento
+    fin = inicio_medicion + duracion
+
+    def usuario(n: int):
+        rnd = random.Random(semilla * 1000 + n)
+        sesion = requests.Session()
+        while True:
+            ahora = time.monotonic()
+            if ahora >= fin:
+                return
+            grupo, operacion = escenario.elegir(rnd)
+            inicio = time.perf_counter()
+            try:
+                _, ruta, respuesta = operacion(sesion, rnd)
+                ok = respuesta.status_code < 400 or respuesta.status_code == 409
+            except requests.RequestException:
+                ruta, ok = grupo, False
+            segundos = time.perf_counter() - inicio
+            if ahora >= inicio_medicion:
+                resultados.agregar(grupo, ruta, segundos, ok)
+            if pausa:
+                time.sleep(rnd.expovariate(1 / pausa))
+
+    hilos = [threading.Thread(target=usuario, args=(n,), daemon=True) for n in range(usuarios)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    return resultados, duracion
+
+
+# ==================== REPORTE Y LÍNEAS BASE ====================
+
+def imprimir(resumen: Dict[str, Dict[str, float]], base: Optional[Dict] = None):
+    print(f"\n{'grupo':<12} {'peticiones':>10} {'errores':>8} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for grupo, d in resumen.items():
+        linea = (f"{grupo:<12} {d['peticiones']:>10} {d['errores']:>8} {d['rps']:>9.1f} "
+                 f"{d['p50_ms']:>9.1f} {d['p95_ms']:>9.1f} {d['p99_ms']:>9.1f}")
+        anterior = (base or {}).get(grupo)
+        if anterior and anterior.get("p95_ms"):
+            linea += f"   p95 {100 * (d['p95_ms'] / anterior['p95_ms'] - 1):+.0f}%"
+        print(linea)
+
+
+def comparar(resumen: Dict, base: Dict, tolerancia: float) -> List[str]:
+    """Grupos que empeoraron más de 'tolerancia' (fracción) contra la línea base"""
+    regresiones = []
+    for grupo, d in resumen.items():
+        anterior = base.get(grupo)
+        if not anterior:
+            continue
+        if anterior["p95_ms"] and d["p95_ms"] > anterior["p95_ms"] * (1 + tolerancia):
+            regresiones.append(f"{grupo}: p95 {anterior['p95_ms']} -> {d['p95_ms']} ms")
+        if anterior["rps"] and d["rps"] < anterior["rps"] * (1 - tolerancia):
+            regresiones.append(f"{grupo}: req/s {anterior['rps']} -> {d['rps']}")
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    agregar_argumentos(parser)
+    parser.add_argument("--bd", help="URL de la base del servidor (se BORRAN sus tablas). Default: SQLite temporal")
+    parser.add_argument("--servidor", help="usar un servidor ya levantado en lugar de iniciar uvicorn")
+    parser.add_argument("--sin-datos", action="store_true", help="no generar datos (la base ya los tiene)")
+    parser.add_argument("--workers", type=int, default=1, help="workers de uvicorn")
+    parser.add_argument("--usuarios", type=int, default=10)
+    parser.add_argument("--duracion", type=float, default=30.0, help="segundos medidos")
+    parser.add_argument("--calentamiento", type=float, default=5.0)
+    parser.add_argument("--pausa", type=float, default=0.0, help="pausa media entre peticiones de un usuario (s)")
+    parser.add_argument("--nombre", default="local", help="nombre de la línea base")
+    parser.add_argument("--guardar-base", action="store_true")
+    parser.add_argument("--tolerancia", type=float, default=0.2)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        proceso = None
+        try:
+            if args.servidor:
+                base_url = args.servidor.rstrip("/")
+            else:
+                url_bd = args.bd or f"sqlite:///{os.path.join(tmp, 'carga.db')}"
+                if not args.sin_datos:
+                    generador = generador_desde_args(args)
+                    resumen_carga = cargar_en_bd(generador, url_bd)
+                    print(f"Datos sintéticos: {resumen_carga['total']} filas en {resumen_carga['seconds']} s")
+                puerto = puerto_libre()
+                proceso = levantar_servidor(url_bd, puerto, args.workers)
+                base_url = f"http://127.0.0.1:{puerto}"
+
+            escenario = Escenario(base_url)
+            print(f"{args.usuarios} usuarios, {args.duracion:.0f} s (+{args.calentamiento:.0f} s de calentamiento) "
+                  f"contra {base_url}")
+            resultados, duracion = correr(escenario, args.usuarios, args.duracion,
+                                          args.calentamiento, args.pausa, args.semilla)
+        finally:
+            if proceso:
+                proceso.terminate()
+                proceso.wait(timeout=10)
+
+    resumen = resultados.resumen(duracion)
+    ruta_base = os.path.join(DIR_LINEAS_BASE, f"{args.nombre}.json")
+    base = None
+    if os.path.exists(ruta_base):
+        with open(ruta_base, encoding="utf-8") as f:
+            base = json.load(f)["grupos"]
+    imprimir(resumen, base)
+
+    if args.guardar_base:
+        os.makedirs(DIR_LINEAS_BASE, exist_ok=True)
+        with open(ruta_base, "w", encoding="utf-8") as f:
+            json.dump({"fecha": datetime.now().isoformat(timespec="seconds"),
+                       "parametros": {k: v for k, v in vars(args).items() if k != "guardar_base"},
+                       "grupos": resumen, "rutas_p95_ms": {
+                           ruta: round(percentil(v, 0.95) * 1000, 1) for ruta, v in sorted(resultados.rutas.items())}},
+                      f, indent=2, ensure_ascii=False)
+        print(f"\nLínea base guardada en {ruta_base}")
+    elif base:
+        regresiones = comparar(resumen, base, args.tolerancia)
+        if regresiones:
+            print(f"\nRegresiones (tolerancia {args.tolerancia:.0%}):")
+            for r in regresiones:
+                print(f"  {r}")
+            sys.exit(1)
+        print(f"\nSin regresiones contra {ruta_base}")
+
+
+if __name__ == "__main__":
+    main()
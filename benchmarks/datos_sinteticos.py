@@ -0,0 +1,369 @@
+"""
+Generador de datos sintéticos para pruebas de rendimiento.
+
+Produce clientes, proveedores, productos, movimientos de inventario,
+órdenes, cotizaciones, notas de venta con pagos y notas de proveedor a lo
+largo de varios años, con distribuciones parecidas a las de un taller:
+
+- Pocos clientes concentran muchas notas (popularidad tipo Zipf).
+- Importes log-normales, 1 a 8 partidas por documento (media ~3).
+- Volumen creciente año con año y menor en fin de semana.
+- Estados y pagos coherentes: las notas pagadas tienen pagos que suman el
+  total, las parciales una parte, las canceladas ninguno.
+
+Todo es determinista para una semilla y escala dada. Las filas salen en el
+formato de /admin/import-ndjson (tablas padre antes que hijas) y se pueden
+escribir a un archivo o insertar directo con ImportadorMasivo.
+
+    python -m benchmarks.datos_sinteticos --escala mediana --url sqlite:///bench.db
+    python -m benchmarks.datos_sinteticos --clientes 20000 --notas-por-dia 120 --salida datos.ndjson.gz
+"""
+
+import argparse
+import bisect
+import gzip
+import itertools
+import json
+import math
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Tuple
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from server.folios import formatear_folio
+from server.texto import clave_servicio
+
+# Tamaños predefinidos; cualquier valor se puede cambiar por línea de comandos
+ESCALAS = {
+    "pequena": {"clientes": 500, "proveedores": 30, "productos": 400, "anios": 1, "notas_por_dia": 10},
+    "mediana": {"clientes": 5000, "proveedores": 120, "productos": 3000, "anios": 3, "notas_por_dia": 40},
+    "grande": {"clientes": 50000, "proveedores": 400, "productos": 20000, "anios": 5, "notas_por_dia": 150},
+}
+
+SERVICIOS = [
+    "Cambio de aceite", "Afinación mayor", "Afinación menor", "Balanceo", "Alineación",
+    "Frenos delanteros", "Frenos traseros", "Cambio de filtro de aire", "Lavado de motor",
+    "Diagnóstico por computadora", "Cambio de clutch", "Suspensión delantera",
+    "Cambio de amortiguadores", "Carga de aire acondicionado", "Cambio de banda de distribución",
+    "Rectificado de discos", "Cambio de bujías", "Revisión general",
+]
+CATEGORIAS = ["Aceites", "Filtros", "Frenos", "Suspensión", "Eléctrico", "Motor", "Refacciones", "Llantas"]
+PIEZAS = ["Filtro", "Balata", "Bujía", "Amortiguador", "Banda", "Disco", "Bomba", "Sensor",
+          "Empaque", "Rótula", "Terminal", "Manguera", "Batería", "Aceite sintético", "Anticongelante"]
+MARCAS = [("Nissan", ["Versa", "Sentra", "Tsuru", "March", "NP300"]),
+          ("Chevrolet", ["Aveo", "Spark", "Beat", "Silverado"]),
+          ("Volkswagen", ["Jetta", "Vento", "Golf", "Polo"]),
+          ("Toyota", ["Corolla", "Hilux", "Yaris", "RAV4"]),
+          ("Ford", ["Fiesta", "Focus", "Ranger", "Lobo"]),
+          ("Honda", ["Civic", "CR-V", "City"])]
+NOMBRES = ["José", "María", "Juan", "Guadalupe", "Luis", "Ana", "Carlos", "Rosa", "Miguel", "Laura",
+           "Jorge", "Patricia", "Pedro", "Claudia", "Ricardo", "Verónica", "Fernando", "Alejandra"]
+APELLIDOS = ["Hernández", "García", "Martínez", "López", "González", "Pérez", "Rodríguez", "Sánchez",
+             "Ramírez", "Cruz", "Flores", "Gómez", "Morales", "Vázquez", "Reyes", "Jiménez"]
+MECANICOS = ["Raúl", "Esteban", "Memo", "Chuy", "Beto", "Toño"]
+METODOS_PAGO = ["Efectivo", "Tarjeta", "Transferencia"]
+
+ESTADOS_NOTA = [("Pagado", 70), ("Pagado Parcialmente", 15), ("Registrado", 10), ("Cancelado", 5)]
+ESTADOS_COTIZACION = [("Aceptada", 45), ("Pendiente", 30), ("Rechazada", 20), ("Cancelada", 5)]
+ESTADOS_ORDEN = [("Completada", 70), ("En Proceso", 12), ("Pendiente", 12), ("Cancelada", 6)]
+IVA = 16.0
+
+
+def _elegir(rnd: random.Random, opciones: List[Tuple[str, int]]) -> str:
+    return rnd.choices([o for o, _ in opciones], weights=[p for _, p in opciones])[0]
+
+
+class SelectorZipf:
+    """Índices 1..n donde el de rango k sale con probabilidad ~ 1/k^s"""
+
+    def __init__(self, n: int, s: float = 1.1, semilla: int = 0):
+        orden = list(range(1, n + 1))
+        random.Random(semilla).shuffle(orden)  # los populares no son siempre los primeros ids
+        self._ids = orden
+        self._acumulado = list(itertools.accumulate(1.0 / (k ** s) for k in range(1, n + 1)))
+
+    def __call__(self, rnd: random.Random) -> int:
+        i = bisect.bisect_left(self._acumulado, rnd.random() * self._acumulado[-1])
+        return self._ids[min(i, len(self._ids) - 1)]
+
+
+class GeneradorDatos:
+    """Filas (tabla, datos) para ImportadorMasivo o NDJSON"""
+
+    def __init__(self, clientes: int, proveedores: int, productos: int, anios: int,
+                 notas_por_dia: float, semilla: int = 42, hasta: datetime = None):
+        self.clientes = clientes
+        self.proveedores = proveedores
+        self.productos = productos
+        self.anios = anios
+        self.notas_por_dia = notas_por_dia
+        self.semilla = semilla
+        self.hasta = (hasta or datetime.now()).replace(hour=0, minute=0, second=0, microsecond=0)
+        self.desde = self.hasta - timedelta(days=365 * anios)
+        self._cliente = SelectorZipf(clientes, semilla=semilla)
+        self._producto = SelectorZipf(productos, s=0.9, semilla=semilla + 1)
+        self._precios: Dict[int, float] = {}
+        self.conteos: Dict[str, int] = {}
+
+    # ---------- utilidades ----------
+
+    def _rnd(self, *partes) -> random.Random:
+        """RNG propio por entidad: el mismo documento sale igual sin importar el orden"""
+        # Semilla de texto: estable entre procesos (hash() de str cambia con PYTHONHASHSEED)
+        return random.Random("|".join(map(str, (self.semilla,) + partes)))
+
+    def _fechas(self, por_dia: float, rnd: random.Random) -> Iterator[datetime]:
+        """Fechas ordenadas: más volumen en años recientes, menos en fin de semana"""
+        dias = (self.hasta - self.desde).days
+        for d in range(dias):
+            dia = self.desde + timedelta(days=d)
+            crecimiento = 0.7 + 0.6 * d / max(dias, 1)
+            semana = 0.35 if dia.weekday() == 6 else (0.7 if dia.weekday() == 5 else 1.0)
+            esperado = por_dia * crecimiento * semana
+            # Poisson con aproximación normal para volúmenes altos
+            if esperado > 30:
+                cantidad = max(0, int(rnd.gauss(esperado, math.sqrt(esperado))))
+            else:
+                cantidad, limite, p = 0, math.exp(-esperado), rnd.random()
+                while p > limite:
+                    cantidad += 1
+                    p *= rnd.random()
+            for _ in range(cantidad):
+                yield dia + timedelta(hours=rnd.randint(9, 18), minutes=rnd.randint(0, 59))
+
+    def _partidas(self, rnd: random.Random) -> List[Dict]:
+        partidas = []
+        for _ in range(min(8, 1 + int(rnd.expovariate(0.5)))):
+            if rnd.random() < 0.55:
+                descripcion = rnd.choice(SERVICIOS)
+                precio = round(rnd.lognormvariate(math.log(650), 0.6), 2)
+                producto = None
+            else:
+                producto = self._producto(rnd)
+                descripcion = self._nombre_producto(producto)
+                precio = self._precios.get(producto) or round(rnd.lognormvariate(math.log(300), 0.8), 2)
+            cantidad = 1 if rnd.random() < 0.8 else rnd.randint(2, 6)
+            partidas.append({
+                "cantidad": cantidad, "descripcion": descripcion,
+                "precio_unitario": precio, "importe": round(precio * cantidad, 2),
+                "impuesto": IVA, "producto_id_original": producto,
+            })
+        return partidas
+
+    @staticmethod
+    def _totales(partidas: List[Dict]) -> Tuple[float, float, float]:
+        subtotal = round(sum(p["importe"] for p in partidas), 2)
+        impuestos = round(sum(p["importe"] * p["impuesto"] / 100 for p in partidas), 2)
+        return subtotal, impuestos, round(subtotal + impuestos, 2)
+
+    @staticmethod
+    def _nombre_producto(i: int) -> str:
+        return f"{PIEZAS[i % len(PIEZAS)]} {CATEGORIAS[i % len(CATEGORIAS)].lower()} #{i}"
+
+    def _contar(self, tabla: str):
+        self.conteos[tabla] = self.conteos.get(tabla, 0) + 1
+
+    # ---------- tablas ----------
+
+    def _catalogos(self) -> Iterator[Tuple[str, Dict]]:
+        rnd = self._rnd("catalogos")
+        for i in range(1, self.clientes + 1):
+            empresa = rnd.random() < 0.15
+            nombre = (f"Transportes {rnd.choice(APELLIDOS)} {i}" if empresa else
+                      f"{rnd.choice(NOMBRES)} {rnd.choice(APELLIDOS)} {rnd.choice(APELLIDOS)} {i}")
+            yield "clientes", {"id_original": i, "nombre": nombre,
+                               "tipo": "Empresa" if empresa else "Particular",
+                               "telefono": f"55{rnd.randint(10000000, 99999999)}",
+                               "email": f"cliente{i}@ejemplo.mx" if rnd.random() < 0.6 else None,
+                               "ciudad": "Ciudad de México"}
+        for i in range(1, self.proveedores + 1):
+            yield "proveedores", {"id_original": i, "nombre": f"Refaccionaria {rnd.choice(APELLIDOS)} {i}",
+                                  "tipo": "Empresa", "telefono": f"55{rnd.randint(10000000, 99999999)}"}
+        for i, nombre in enumerate(SERVICIOS, start=1):
+            yield "servicios", {"id_original": i, "nombre": nombre, "clave": clave_servicio(nombre)}
+        for i in range(1, self.productos + 1):
+            compra = round(rnd.lognormvariate(math.log(180), 0.8), 2)
+            self._precios[i] = round(compra * rnd.uniform(1.3, 1.8), 2)
+            yield "productos", {"id_original": i, "codigo": f"P-{i:06d}", "nombre": self._nombre_producto(i),
+                                "categoria": CATEGORIAS[i % len(CATEGORIAS)],
+                                "stock_actual": rnd.randint(0, 60), "stock_min": rnd.choice([2, 5, 10]),
+                                "precio_compra": compra, "precio_venta": self._precios[i],
+                                "proveedor_id_original": rnd.randint(1, self.proveedores)}
+
+    def _movimientos(self) -> Iterator[Tuple[str, Dict]]:
+        rnd = self._rnd("movimientos")
+        for fecha in self._fechas(self.notas_por_dia * 0.8, rnd):
+            entrada = rnd.random() < 0.3
+            yield "movimientos_inventario", {
+                "producto_id_original": self._producto(rnd),
+                "tipo": "Entrada" if entrada else "Salida",
+                "cantidad": rnd.randint(5, 40) if entrada else rnd.randint(1, 4),
+                "motivo": "Compra a proveedor" if entrada else "Venta",
+                "usuario": "admin", "created_at": fecha.isoformat()}
+
+    def _documentos(self, tabla: str, serie: str, por_dia: float, estados) -> Iterator[Tuple[int, datetime, str, str]]:
+        """(id, fecha, folio, estado) de cada documento de la serie, en orden de fecha"""
+        rnd = self._rnd(tabla)
+        numeros: Dict[int, int] = {}
+        for i, fecha in enumerate(self._fechas(por_dia, rnd), start=1):
+            numeros[fecha.year] = numeros.get(fecha.year, 0) + 1
+            yield i, fecha, formatear_folio(serie, fecha.year, numeros[fecha.year]), _elegir(rnd, estados)
+
+    def _ordenes(self) -> Iterator[Tuple[str, Dict]]:
+        documentos = list(self._documentos("ordenes", "ORD", self.notas_por_dia * 0.5, ESTADOS_ORDEN))
+        for i, fecha, folio, estado in documentos:
+            rnd = self._rnd("orden", i)
+            marca, modelos = rnd.choice(MARCAS)
+            yield "ordenes", {"id_original": i, "folio": folio, "cliente_id_original": self._cliente(rnd),
+                              "vehiculo_marca": marca, "vehiculo_modelo": rnd.choice(modelos),
+                              "vehiculo_ano": str(rnd.randint(2005, self.hasta.year)),
+                              "vehiculo_placas": f"{rnd.randint(100, 999)}-ABC",
+                              "estado": estado, "mecanico_asignado": rnd.choice(MECANICOS),
+                              "fecha_recepcion": fecha.isoformat(), "created_at": fecha.isoformat()}
+        for i, fecha, _, _ in documentos:
+            for partida in self._partidas(self._rnd("orden", i, "partidas")):
+                yield "ordenes_items", {"orden_id_original": i, "cantidad": partida["cantidad"],
+                                        "descripcion": partida["descripcion"],
+                                        "producto_id_original": partida["producto_id_original"]}
+
+    def _cotizaciones(self) -> Iterator[Tuple[str, Dict]]:
+        documentos = list(self._documentos("cotizaciones", "COT", self.notas_por_dia * 0.6, ESTADOS_COTIZACION))
+        for i, fecha, folio, estado in documentos:
+            rnd = self._rnd("cotizacion", i)
+            subtotal, impuestos, total = self._totales(self._partidas(self._rnd("cotizacion", i, "partidas")))
+            yield "cotizaciones", {"id_original": i, "folio": folio, "cliente_id_original": self._cliente(rnd),
+                                   "estado": estado, "vigencia": (fecha + timedelta(days=30)).strftime("%d/%m/%Y"),
+                                   "subtotal": subtotal, "impuestos": impuestos, "total": total,
+                                   "created_at": fecha.isoformat()}
+        for i, _, _, _ in documentos:
+            for partida in self._partidas(self._rnd("cotizacion", i, "partidas")):
+                yield "cotizaciones_items", dict(partida, cotizacion_id_original=i)
+
+    def _notas(self) -> Iterator[Tuple[str, Dict]]:
+        documentos = list(self._documentos("notas_venta", "NV", self.notas_por_dia, ESTADOS_NOTA))
+        pagado: Dict[int, Tuple[float, datetime]] = {}
+        for i, fecha, folio, estado in documentos:
+            rnd = self._rnd("nota", i)
+            subtotal, impuestos, total = self._totales(self._partidas(self._rnd("nota", i, "partidas")))
+            if estado == "Pagado":
+                total_pagado = total
+            elif estado == "Pagado Parcialmente":
+                total_pagado = round(total * rnd.uniform(0.2, 0.8), 2)
+            else:
+                total_pagado = 0.0
+            if total_pagado:
+                pagado[i] = (total_pagado, fecha)
+            yield "notas_venta", {"id_original": i, "folio": folio, "cliente_id_original": self._cliente(rnd),
+                                  "estado": estado, "metodo_pago": rnd.choice(METODOS_PAGO),
+                                  "subtotal": subtotal, "impuestos": impuestos, "total": total,
+                                  "total_pagado": total_pagado, "saldo": round(total - total_pagado, 2),
+                                  "fecha": fecha.isoformat(), "created_at": fecha.isoformat()}
+        for i, _, _, _ in documentos:
+            for partida in self._partidas(self._rnd("nota", i, "partidas")):
+                yield "notas_venta_items", dict(partida, nota_id_original=i)
+        for i, (monto, fecha) in pagado.items():
+            rnd = self._rnd("pagos", i)
+            partes = 1 if rnd.random() < 0.75 else rnd.randint(2, 3)
+            restante = monto
+            for p in range(partes):
+                parcial = restante if p == partes - 1 else round(monto / partes, 2)
+                restante = round(restante - parcial, 2)
+                yield "notas_venta_pagos", {"nota_id_original": i, "monto": parcial,
+                                            "fecha_pago": (fecha + timedelta(days=7 * p)).isoformat(),
+                                            "metodo_pago": rnd.choice(METODOS_PAGO), "memo": ""}
+
+    def _notas_proveedor(self) -> Iterator[Tuple[str, Dict]]:
+        documentos = list(self._documentos("notas_proveedor", "NP", max(1.0, self.notas_por_dia * 0.1), ESTADOS_NOTA))
+        for i, fecha, folio, estado in documentos:
+            rnd = self._rnd("nota_proveedor", i)
+            subtotal, impuestos, total = self._totales(self._partidas(self._rnd("nota_proveedor", i, "partidas")))
+            total_pagado = total if estado == "Pagado" else 0.0
+            yield "notas_proveedor", {"id_original": i, "folio": folio,
+                                      "proveedor_id_original": rnd.randint(1, self.proveedores),
+                                      "estado": estado, "subtotal": subtotal, "impuestos": impuestos,
+                                      "total": total, "total_pagado": total_pagado,
+                                      "saldo": round(total - total_pagado, 2), "fecha": fecha.isoformat()}
+        for i, _, _, _ in documentos:
+            for partida in self._partidas(self._rnd("nota_proveedor", i, "partidas")):
+                partida.pop("producto_id_original")
+                yield "notas_proveedor_items", dict(partida, nota_id_original=i)
+
+    def filas(self) -> Iterator[Tuple[str, Dict]]:
+        for fila in itertools.chain(self._catalogos(), self._movimientos(), self._ordenes(),
+                                    self._cotizaciones(), self._notas(), self._notas_proveedor()):
+            self._contar(fila[0])
+            yield fila
+
+
+def escribir_ndjson(generador: GeneradorDatos, ruta: str):
+    abrir = gzip.open if ruta.endswith(".gz") else open
+    with abrir(ruta, "wt", encoding="utf-8") as salida:
+        for tabla, datos in generador.filas():
+            salida.write(json.dumps({"tabla": tabla, "datos": datos}, ensure_ascii=False))
+            salida.write("\n")
+
+
+def cargar_en_bd(generador: GeneradorDatos, url: str, lote: int = 2000, recrear: bool = True) -> Dict:
+    """Inserta los datos con ImportadorMasivo (mismo camino que /admin/import-ndjson)"""
+    from sqlalchemy import create_engine
+    from server.models import Base
+    from server.importacion import ImportadorMasivo
+
+    engine = create_engine(url)
+    if recrear:
+        Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    importador = ImportadorMasivo(engine, lote=lote)
+    importador.procesar(generador.filas())
+    resumen = importador.finalizar()
+    engine.dispose()
+    return resumen
+
+
+def generador_desde_args(args) -> GeneradorDatos:
+    escala = dict(ESCALAS[args.escala])
+    for campo in escala:
+        valor = getattr(args, campo, None)
+        if valor is not None:
+            escala[campo] = valor
+    return GeneradorDatos(semilla=args.semilla, **escala)
+
+
+def agregar_argumentos(parser: argparse.ArgumentParser):
+    parser.add_argument("--escala", choices=list(ESCALAS), default="pequena")
+    parser.add_argument("--clientes", type=int)
+    parser.add_argument("--proveedores", type=int)
+    parser.add_argument("--productos", type=int)
+    parser.add_argument("--anios", type=int, help="años de historia")
+    parser.add_argument("--notas-por-dia", dest="notas_por_dia", type=float)
+    parser.add_argument("--semilla", type=int, default=42)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    agregar_argumentos(parser)
+    destino = parser.add_mutually_exclusive_group(required=True)
+    destino.add_argument("--url", help="base destino (se BORRAN sus tablas)")
+    destino.add_argument("--salida", help="archivo NDJSON (.gz para comprimir) para /admin/import-ndjson")
+    parser.add_argument("--lote", type=int, default=2000)
+    args = parser.parse_args()
+
+    generador = generador_desde_args(args)
+    inicio = time.perf_counter()
+    if args.url:
+        resumen = cargar_en_bd(generador, args.url, args.lote)
+        print(f"Insertadas {resumen['total']} filas en {resumen['seconds']} s "
+              f"({resumen['rows_per_second']:.0f} filas/s)")
+    else:
+        escribir_ndjson(generador, args.salida)
+        print(f"Escrito {args.salida} en {time.perf_counter() - inicio:.1f} s")
+    for tabla, cantidad in generador.conteos.items():
+        print(f"  {tabla:<24} {cantidad:>10}")
+
+
+if __name__ == "__main__":
+    main()
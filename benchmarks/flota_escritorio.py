@@ -0,0 +1,528 @@
+"""
+Simulación de una flota de escritorios conectados a /ws.
+
+Cada cliente simulado abre su WebSocket como gui/websocket_client.py
+(websocket-client) y tiene abiertas algunas ventanas al azar. Al llegar un
+evento se traduce a señales igual que WebSocketClient.on_message (incluido
+el reparto de 'nota_convertida') y cada ventana que escucha esa señal hace
+la petición que haría en la aplicación: las listas se recargan completas y
+los formularios solo si el registro abierto es el del evento. Las
+reacciones de un cliente corren en un solo hilo, en orden, como los slots
+en el hilo principal de Qt. La precarga de /bootstrap que invalida cada
+evento no se vuelve a pedir aquí: la app la pide hasta abrir otra ventana.
+
+Un hilo escritor hace escrituras (nota, pago, movimiento de inventario,
+cliente) una tras otra y se mide:
+- propagación: desde que sale la escritura hasta que cada cliente recibe el evento;
+- sincronización: hasta que el cliente termina las recargas que provocó;
+- amplificación: peticiones de recarga (y bytes) por escritura;
+- CPU del servidor por escritura (utime + stime de uvicorn y sus workers,
+  de /proc; incluye atender las recargas).
+
+    python -m benchmarks.flota_escritorio --escritorios 200 --escrituras 300
+    python -m benchmarks.flota_escritorio --ventanas buscar_notas=1,clientes=0.5 --mezcla nota=1
+    python -m benchmarks.flota_escritorio --servidor http://127.0.0.1:8000 --sin-datos
+
+Con --servidor no se mide CPU a menos que se indique --pid del proceso.
+"""
+
+import argparse
+import json
+import os
+import queue
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Tuple
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+import websocket
+
+from benchmarks.carga_http import levantar_servidor, percentil, puerto_libre
+from benchmarks.datos_sinteticos import agregar_argumentos, cargar_en_bd, generador_desde_args
+
+LIMITE_LISTA = 2000   # el mismo LIMITE_LOCAL de los diálogos de búsqueda
+
+# Probabilidad de que un escritorio tenga abierta cada ventana
+PERFIL_VENTANAS = {
+    "notas": 0.6,
+    "pagos_nota": 0.2,
+    "cotizaciones": 0.3,
+    "ordenes": 0.3,
+    "clientes": 0.2,
+    "proveedores": 0.1,
+    "estado_cuenta": 0.1,
+    "estado_cuenta_proveedor": 0.05,
+    "buscar_notas": 0.3,
+    "buscar_cotizaciones": 0.1,
+    "buscar_ordenes": 0.1,
+    "buscar_notas_proveedor": 0.05,
+    "buscar_ordenes_borrador": 0.1,
+}
+
+MEZCLA_ESCRITURAS = {"nota": 5, "pago": 3, "movimiento": 3, "cliente": 1}
+
+
+def senales(tipo: str, datos: Dict) -> List[Tuple[str, Dict]]:
+    """Las señales que emitiría WebSocketClient.on_message para un evento"""
+    if tipo == 'nota_convertida':
+        salida = [('nota_creada', datos.get('nota', {}))]
+        if 'cotizacion' in datos:
+            salida.append(('cotizacion_actualizada', datos['cotizacion']))
+        if 'orden' in datos:
+            salida.append(('orden_actualizada', datos['orden']))
+        return salida
+    return [(tipo, datos)]
+
+
+def llave_evento(tipo: str, datos: Dict):
+    """Con qué se relaciona un evento con la escritura que lo produjo"""
+    if tipo == 'nota_convertida':
+        return datos.get('nota', {}).get('id')
+    if tipo == 'stock_actualizado':
+        return datos.get('producto_id')
+    return datos.get('id')
+
+
+# ==================== CLIENTE SIMULADO ====================
+
+class ClienteEscritorio:
+    """Un escritorio: su WebSocket, sus ventanas abiertas y su sesión HTTP"""
+
+    def __init__(self, n: int, base: str, ventanas: List[str], ids: Dict[str, List[int]],
+                 rnd: random.Random, metricas: "Metricas"):
+        self.n = n
+        self.base = base
+        self.ventanas = ventanas
+        self.metricas = metricas
+        self.sesion = requests.Session()
+        self.eventos: "queue.Queue" = queue.Queue()
+        self.conectado = threading.Event()
+        self.activo = True
+        self.ws = None
+
+        # Registro abierto en cada formulario (puede no existir; así pasa en la app)
+        def elegir(lista):
+            return rnd.choice(lista) if lista else None
+        self.nota_abierta = elegir(ids["notas"])
+        self.cotizacion_abierta = elegir(ids["cotizaciones"])
+        self.orden_abierta = elegir(ids["ordenes"])
+        self.nota_proveedor_abierta = elegir(ids["notas_proveedor"])
+        self.cliente_estado = elegir(ids["clientes"])
+        self.proveedor_estado = elegir(ids["proveedores"])
+
+        self.reacciones: Dict[str, List[Callable[[Dict], Optional[Tuple[str, str, Dict]]]]] = defaultdict(list)
+        for ventana in ventanas:
+            for senal, reaccion in self._ventana(ventana):
+                self.reacciones[senal].append(reaccion)
+
+    def _ventana(self, nombre: str):
+        """(señal, reacción) de cada ventana; la reacción regresa (ruta, url, params) o None"""
+        b = self.base
+        lista = lambda ruta, **params: (lambda d: (ruta, f"{b}{ruta}", params))
+        if nombre == "notas" or nombre == "pagos_nota":
+            return [("nota_creada", lambda d: ("/notas/{id}", f"{b}/notas/{d.get('id')}", {})
+                     if d.get('id') == self.nota_abierta else None)]
+        if nombre == "cotizaciones":
+            return [("cotizacion_actualizada", lambda d: ("/cotizaciones/buscar", f"{b}/cotizaciones/buscar",
+                                                          {"id": d.get('id')})
+                     if d.get('id') == self.cotizacion_abierta else None)]
+        if nombre == "ordenes":
+            return [("orden_creada", lambda d: ("/ordenes/{id}", f"{b}/ordenes/{d.get('id')}", {})
+                     if d.get('id') == self.orden_abierta else None)]
+        if nombre == "clientes":
+            return [(s, lista("/clientes")) for s in ("cliente_creado", "cliente_actualizado", "cliente_eliminado")]
+        if nombre == "proveedores":
+            return [(s, lista("/proveedores")) for s in ("proveedor_creado", "proveedor_actualizado", "proveedor_eliminado")]
+        if nombre == "estado_cuenta":
+            return [("nota_creada", lista("/notas/buscar", cliente_id=self.cliente_estado))]
+        if nombre == "estado_cuenta_proveedor":
+            return [(s, lista("/notas_proveedor/buscar", proveedor_id=self.proveedor_estado))
+                    for s in ("proveedor_creado", "nota_creada")]
+        if nombre == "buscar_notas":
+            return [("nota_creada", lista("/notas", limit=LIMITE_LISTA))]
+        if nombre == "buscar_cotizaciones":
+            return [("cotizacion_creada", lista("/cotizaciones", limit=LIMITE_LISTA))]
+        if nombre == "buscar_ordenes":
+            return [("orden_creada", lista("/ordenes", limit=LIMITE_LISTA))]
+        if nombre == "buscar_notas_proveedor":
+            return [("nota_proveedor_creada", lista("/notas_proveedor", limit=LIMITE_LISTA))]
+        if nombre == "buscar_ordenes_borrador":
+            return [("nota_creada", lista("/notas"))]
+        raise ValueError(f"Ventana desconocida: {nombre}")
+
+    # ---------- WebSocket (hilo de websocket-client) ----------
+
+    def _on_open(self, ws):
+        self.conectado.set()
+
+    def _on_message(self, ws, mensaje):
+        llegada = time.perf_counter()
+        try:
+            data = json.loads(mensaje)
+        except ValueError:
+            return
+        if 'type' in data:
+            self.eventos.put((llegada, data['type'], data.get('data', {})))
+
+    def _on_error(self, ws, error):
+        self.metricas.error_ws()
+
+    def _hilo_ws(self):
+        ws_url = self.base.replace("http", "ws", 1) + "/ws"
+        while self.activo:
+            self.ws = websocket.WebSocketApp(ws_url, on_open=self._on_open,
+                                             on_message=self._on_message, on_error=self._on_error)
+            self.ws.run_forever()
+            self.conectado.clear()
+            if self.activo:
+                time.sleep(1)
+
+    # ---------- Reacciones (el "hilo principal" del escritorio) ----------
+
+    def _hilo_reacciones(self):
+        while True:
+            evento = self.eventos.get()
+            if evento is None:
+                return
+            llegada, tipo, datos = evento
+            self.metricas.recibido(tipo, llave_evento(tipo, datos), llegada)
+            for senal, datos_senal in senales(tipo, datos):
+                for reaccion in self.reacciones.get(senal, ()):
+                    peticion = reaccion(datos_senal)
+                    if peticion is None:
+                        continue
+                    ruta, url, params = peticion
+                    try:
+                        respuesta = self.sesion.get(url, params=params)
+                        ok, tamano = respuesta.ok, len(respuesta.content)
+                    except requests.RequestException:
+                        ok, tamano = False, 0
+                    self.metricas.recarga(tipo, llave_evento(tipo, datos), ruta, ok, tamano, time.perf_counter())
+            self.eventos.task_done()
+
+    def iniciar(self):
+        threading.Thread(target=self._hilo_ws, daemon=True).start()
+        threading.Thread(target=self._hilo_reacciones, daemon=True).start()
+
+    def detener(self):
+        self.activo = False
+        if self.ws:
+            self.ws.close()
+        self.eventos.put(None)
+
+
+# ==================== MEDICIÓN ====================
+
+class Metricas:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.escrituras: List[Tuple[str, object, float, float, bool]] = []  # tipo, llave, inicio, duración, ok
+        self.llegadas: List[Tuple[str, object, float]] = []
+        self.recargas: List[Tuple[str, object, str, bool, int, float]] = []
+        self.errores_ws = 0
+        self._inicios: Dict[Tuple, List[float]] = defaultdict(list)
+
+    def escritura(self, tipo, llave, inicio: float, duracion: float, ok: bool):
+        with self._lock:
+            self.escrituras.append((tipo, llave, inicio, duracion, ok))
+
+    def recibido(self, tipo, llave, llegada: float):
+        with self._lock:
+            self.llegadas.append((tipo, llave, llegada))
+
+    def recarga(self, tipo, llave, ruta: str, ok: bool, tamano: int, fin: float):
+        with self._lock:
+            self.recargas.append((tipo, llave, ruta, ok, tamano, fin))
+
+    def error_ws(self):
+        with self._lock:
+            self.errores_ws += 1
+
+    def _inicio_escritura(self, tipo, llave, momento: float) -> Optional[float]:
+        """Inicio de la última escritura de ese evento antes de 'momento'"""
+        mejor = None
+        for inicio in self._inicios.get((tipo, llave), ()):
+            if inicio <= momento and (mejor is None or inicio > mejor):
+                mejor = inicio
+        return mejor
+
+    def resumen(self, clientes: int, duracion: float) -> Dict:
+        self._inicios.clear()
+        for tipo, llave, inicio, _, ok in self.escrituras:
+            if ok:
+                self._inicios[(tipo, llave)].append(inicio)
+
+        propagacion = []
+        for tipo, llave, llegada in self.llegadas:
+            inicio = self._inicio_escritura(tipo, llave, llegada)
+            if inicio is not None:
+                propagacion.append(llegada - inicio)
+
+        sincronizacion, por_ruta, bytes_recarga, errores_recarga = [], defaultdict(int), 0, 0
+        for tipo, llave, ruta, ok, tamano, fin in self.recargas:
+            por_ruta[ruta] += 1
+            bytes_recarga += tamano
+            errores_recarga += not ok
+            inicio = self._inicio_escritura(tipo, llave, fin)
+            if inicio is not None:
+                sincronizacion.append(fin - inicio)
+
+        exitosas = sum(1 for e in self.escrituras if e[4])
+        esperadas = exitosas * clientes
+        ms = lambda valores, p: round(percentil(valores, p) * 1000, 1)
+        return {
+            "clientes": clientes,
+            "escrituras": len(self.escrituras),
+            "escrituras_fallidas": len(self.escrituras) - exitosas,
+            "escrituras_por_s": round(len(self.escrituras) / duracion, 2) if duracion else 0,
+            "escritura_p50_ms": ms([e[3] for e in self.escrituras], 0.50),
+            "escritura_p95_ms": ms([e[3] for e in self.escrituras], 0.95),
+            "entregas_esperadas": esperadas,
+            "entregas_recibidas": len(propagacion),
+            "propagacion_p50_ms": ms(propagacion, 0.50),
+            "propagacion_p95_ms": ms(propagacion, 0.95),
+            "propagacion_p99_ms": ms(propagacion, 0.99),
+            "sincronizacion_p50_ms": ms(sincronizacion, 0.50),
+            "sincronizacion_p95_ms": ms(sincronizacion, 0.95),
+            "sincronizacion_p99_ms": ms(sincronizacion, 0.99),
+            "recargas": len(self.recargas),
+            "recargas_fallidas": errores_recarga,
+            "amplificacion": round(len(self.recargas) / exitosas, 2) if exitosas else 0,
+            "kb_recarga_por_escritura": round(bytes_recarga / 1024 / exitosas, 1) if exitosas else 0,
+            "recargas_por_ruta": dict(sorted(por_ruta.items(), key=lambda x: -x[1])),
+            "errores_ws": self.errores_ws,
+        }
+
+
+def cpu_proceso(pid: int) -> Optional[float]:
+    """Segundos de CPU (usuario + sistema) del proceso y sus hijos directos, de /proc"""
+    tick = os.sysconf('SC_CLK_TCK')
+
+    def leer(p):
+        with open(f"/proc/{p}/stat") as f:
+            campos = f.read().rsplit(')', 1)[1].split()
+        # Después del nombre: estado(0) ppid(1) ... utime(11) stime(12)
+        return int(campos[1]), (int(campos[11]) + int(campos[12])) / tick
+
+    try:
+        total = leer(pid)[1]
+    except (OSError, IndexError, ValueError):
+        return None
+    for entrada in os.listdir("/proc"):
+        if entrada.isdigit() and int(entrada) != pid:
+            try:
+                ppid, segundos = leer(entrada)
+            except (OSError, IndexError, ValueError):
+                continue
+            if ppid == pid:
+                total += segundos
+    return total
+
+
+# ==================== EJECUCIÓN ====================
+
+class Escritor:
+    """Escrituras en serie; cada una produce un evento que se difunde a toda la flota"""
+
+    def __init__(self, base: str, ids: Dict[str, List[int]], mezcla: Dict[str, float], metricas: Metricas):
+        self.base = base
+        self.ids = ids
+        self.metricas = metricas
+        self.sesion = requests.Session()
+        self.operaciones = [(peso, getattr(self, f"_{nombre}")) for nombre, peso in mezcla.items() if peso > 0]
+
+    def _nota(self, r):
+        items = [{"cantidad": 1, "descripcion": "Cambio de aceite", "precio_unitario": 450.0,
+                  "importe": 450.0, "impuesto": 16.0}]
+        respuesta = self.sesion.post(f"{self.base}/notas", json={
+            "cliente_id": r.choice(self.ids["clientes"]), "metodo_pago": "Efectivo", "items": items})
+        return "nota_creada", respuesta.json().get("id") if respuesta.ok else None, respuesta
+
+    def _pago(self, r):
+        nota_id = r.choice(self.ids["notas"])
+        respuesta = self.sesion.post(f"{self.base}/notas/{nota_id}/pagar", json={
+            "monto": 1.0, "fecha_pago": time.strftime('%Y-%m-%d'), "metodo_pago": "Efectivo", "memo": "flota"})
+        return "nota_actualizada", nota_id, respuesta
+
+    def _movimiento(self, r):
+        producto_id = r.choice(self.ids["productos"])
+        respuesta = self.sesion.post(f"{self.base}/inventario/movimiento", json={
+            "producto_id": producto_id, "tipo": "Entrada", "cantidad": 1, "motivo": "Flota", "usuario": "flota"})
+        return "stock_actualizado", producto_id, respuesta
+
+    def _cliente(self, r):
+        respuesta = self.sesion.post(f"{self.base}/clientes", json={
+            "nombre": f"Cliente flota {r.randint(1, 10 ** 9)}", "tipo": "Particular", "telefono": "0000000000"})
+        return "cliente_creado", respuesta.json().get("id") if respuesta.ok else None, respuesta
+
+    def correr(self, escrituras: int, por_segundo: float, semilla: int):
+        rnd = random.Random(semilla)
+        pesos = [p for p, _ in self.operaciones]
+        for _ in range(escrituras):
+            operacion = rnd.choices([o for _, o in self.operaciones], weights=pesos)[0]
+            inicio = time.perf_counter()
+            try:
+                tipo, llave, respuesta = operacion(rnd)
+                ok = respuesta.ok
+            except requests.RequestException:
+                tipo, llave, ok = "error", None, False
+            duracion = time.perf_counter() - inicio
+            self.metricas.escritura(tipo, llave, inicio, duracion, ok)
+            if por_segundo:
+                time.sleep(max(0.0, rnd.expovariate(por_segundo) - duracion))
+
+
+def obtener_ids(base: str) -> Dict[str, List[int]]:
+    s = requests.Session()
+    ids = {
+        "notas": [n["id"] for n in s.get(f"{base}/notas", params={"limit": LIMITE_LISTA}).json()],
+        "cotizaciones": [c["id"] for c in s.get(f"{base}/cotizaciones", params={"limit": 500}).json()],
+        "ordenes": [o["id"] for o in s.get(f"{base}/ordenes", params={"limit": 500}).json()],
+        "notas_proveedor": [n["id"] for n in s.get(f"{base}/notas_proveedor", params={"limit": 500}).json()],
+        "clientes": [c["id"] for c in s.get(f"{base}/clientes").json()],
+        "proveedores": [p["id"] for p in s.get(f"{base}/proveedores").json()],
+        "productos": [p["id"] for p in s.get(f"{base}/productos").json()],
+    }
+    if not (ids["notas"] and ids["clientes"] and ids["productos"]):
+        raise RuntimeError("La base no tiene datos; quite --sin-datos o cargue datos sintéticos")
+    return ids
+
+
+def leer_pesos(texto: Optional[str], defecto: Dict[str, float]) -> Dict[str, float]:
+    """'a=1,b=0.5' -> {'a': 1.0, 'b': 0.5}; los nombres deben existir en 'defecto'"""
+    if not texto:
+        return dict(defecto)
+    pesos = {}
+    for parte in texto.split(","):
+        nombre, _, valor = parte.partition("=")
+        nombre = nombre.strip()
+        if nombre not in defecto:
+            raise SystemExit(f"'{nombre}' no es válido; opciones: {', '.join(defecto)}")
+        pesos[nombre] = float(valor or 1)
+    return pesos
+
+
+def simular(base: str, clientes: int, ventanas: Dict[str, float], mezcla: Dict[str, float],
+            escrituras: int, por_segundo: float, semilla: int, pid: Optional[int],
+            espera_max: float = 60.0) -> Dict:
+    ids = obtener_ids(base)
+    metricas = Metricas()
+    rnd = random.Random(semilla)
+
+    flota = []
+    for n in range(clientes):
+        abiertas = [v for v, p in ventanas.items() if rnd.random() < p]
+        flota.append(ClienteEscritorio(n, base, abiertas, ids, random.Random(f"{semilla}-{n}"), metricas))
+    for cliente in flota:
+        cliente.iniciar()
+    limite = time.monotonic() + 30
+    for cliente in flota:
+        if not cliente.conectado.wait(max(0.0, limite - time.monotonic())):
+            raise RuntimeError(f"Solo se conectaron {sum(c.conectado.is_set() for c in flota)} de {clientes} clientes")
+    print(f"{clientes} escritorios conectados; {sum(len(c.ventanas) for c in flota)} ventanas abiertas")
+
+    escritor = Escritor(base, ids, mezcla, metricas)
+    cpu_inicio = cpu_proceso(pid) if pid else None
+    inicio = time.perf_counter()
+    escritor.correr(escrituras, por_segundo, semilla)
+    duracion_escrituras = time.perf_counter() - inicio
+
+    # Esperar a que la flota termine de reaccionar para contar todas las recargas
+    limite = time.monotonic() + espera_max
+    while time.monotonic() < limite and any(c.eventos.unfinished_tasks for c in flota):
+        time.sleep(0.05)
+    duracion = time.perf_counter() - inicio
+    cpu_fin = cpu_proceso(pid) if pid else None
+
+    for cliente in flota:
+        cliente.detener()
+
+    resumen = metricas.resumen(clientes, duracion_escrituras)
+    resumen["segundos_hasta_sincronizar"] = round(duracion, 2)
+    exitosas = resumen["escrituras"] - resumen["escrituras_fallidas"]
+    if cpu_inicio is not None and cpu_fin is not None and exitosas:
+        resumen["cpu_servidor_s"] = round(cpu_fin - cpu_inicio, 2)
+        resumen["cpu_ms_por_escritura"] = round((cpu_fin - cpu_inicio) * 1000 / exitosas, 2)
+    return resumen
+
+
+def imprimir(resumen: Dict):
+    print(f"\nEscrituras: {resumen['escrituras']} ({resumen['escrituras_fallidas']} fallidas), "
+          f"{resumen['escrituras_por_s']:.1f}/s; POST p50 {resumen['escritura_p50_ms']} ms, "
+          f"p95 {resumen['escritura_p95_ms']} ms")
+    print(f"Entregas WebSocket: {resumen['entregas_recibidas']} de {resumen['entregas_esperadas']} "
+          f"(errores ws: {resumen['errores_ws']})")
+    print(f"\n{'':<16} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for nombre in ("propagacion", "sincronizacion"):
+        print(f"{nombre:<16} {resumen[f'{nombre}_p50_ms']:>9.1f} {resumen[f'{nombre}_p95_ms']:>9.1f} "
+              f"{resumen[f'{nombre}_p99_ms']:>9.1f}")
+    print(f"\nAmplificación: {resumen['amplificacion']} recargas por escritura "
+          f"({resumen['kb_recarga_por_escritura']} KB), {resumen['recargas_fallidas']} fallidas")
+    for ruta, cantidad in resumen["recargas_por_ruta"].items():
+        print(f"  {ruta:<28} {cantidad:>8}")
+    if "cpu_ms_por_escritura" in resumen:
+        print(f"\nCPU del servidor: {resumen['cpu_servidor_s']} s, {resumen['cpu_ms_por_escritura']} ms por escritura")
+    print(f"Flota sincronizada {resumen['segundos_hasta_sincronizar']} s después de la primera escritura")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    agregar_argumentos(parser)
+    parser.add_argument("--bd", help="URL de la base del servidor (se BORRAN sus tablas). Default: SQLite temporal")
+    parser.add_argument("--servidor", help="usar un servidor ya levantado en lugar de iniciar uvicorn")
+    parser.add_argument("--pid", type=int, help="pid del servidor ya levantado, para medir su CPU")
+    parser.add_argument("--sin-datos", action="store_true", help="no generar datos (la base ya los tiene)")
+    parser.add_argument("--workers", type=int, default=1, help="workers de uvicorn")
+    parser.add_argument("--escritorios", type=int, default=100, help="escritorios simulados")
+    parser.add_argument("--escrituras", type=int, default=200)
+    parser.add_argument("--por-segundo", type=float, default=5.0,
+                        help="escrituras por segundo en promedio (0 = sin pausa)")
+    parser.add_argument("--ventanas", help="probabilidad de cada ventana abierta, p. ej. buscar_notas=1,clientes=0.5 "
+                                           f"(default: {','.join(f'{k}={v}' for k, v in PERFIL_VENTANAS.items())})")
+    parser.add_argument("--mezcla", help="pesos de las escrituras, p. ej. nota=5,pago=3 "
+                                         f"(default: {','.join(f'{k}={v}' for k, v in MEZCLA_ESCRITURAS.items())})")
+    parser.add_argument("--salida", help="guardar el resumen en este archivo JSON")
+    args = parser.parse_args()
+
+    ventanas = leer_pesos(args.ventanas, PERFIL_VENTANAS)
+    mezcla = leer_pesos(args.mezcla, MEZCLA_ESCRITURAS)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        proceso = None
+        try:
+            pid = args.pid
+            if args.servidor:
+                base_url = args.servidor.rstrip("/")
+            else:
+                url_bd = args.bd or f"sqlite:///{os.path.join(tmp, 'flota.db')}"
+                if not args.sin_datos:
+                    generador = generador_desde_args(args)
+                    resumen_carga = cargar_en_bd(generador, url_bd)
+                    print(f"Datos sintéticos: {resumen_carga['total']} filas en {resumen_carga['seconds']} s")
+                puerto = puerto_libre()
+                proceso = levantar_servidor(url_bd, puerto, args.workers)
+                base_url = f"http://127.0.0.1:{puerto}"
+                pid = proceso.pid
+
+            resumen = simular(base_url, args.escritorios, ventanas, mezcla, args.escrituras,
+                              args.por_segundo, args.semilla, pid)
+        finally:
+            if proceso:
+                proceso.terminate()
+                proceso.wait(timeout=10)
+
+    imprimir(resumen)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump({"parametros": vars(args), "resumen": resumen}, f, indent=2, ensure_ascii=False)
+        print(f"\nResumen guardado en {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
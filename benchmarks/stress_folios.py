@@ -0,0 +1,106 @@
+"""
+Prueba de concurrencia de folios: N hilos crean notas de venta al mismo
+tiempo y se verifica que no haya folios repetidos ni creaciones fallidas.
+
+    python -m benchmarks.stress_folios --url postgresql://.../taller_pruebas
+    python -m benchmarks.stress_folios --metodo anterior   # último id + 1, para comparar
+
+Sin --url usa una base SQLite temporal (SQLite serializa las escrituras,
+así que la prueba significativa es contra PostgreSQL).
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from server import crud
+from server.models import Base, Cliente, NotaVenta
+
+
+def folio_anterior(db) -> str:
+    """Método previo: leer la última nota y sumar 1 al id"""
+    ultimo = db.query(NotaVenta).order_by(NotaVenta.id.desc()).first()
+    numero = 1 if not ultimo else ultimo.id + 1
+    return f"NV-{datetime.now().year}-{numero:05d}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="URL de una base de pruebas (se BORRAN sus tablas)")
+    parser.add_argument("--hilos", type=int, default=50)
+    parser.add_argument("--notas", type=int, default=20, help="notas por hilo")
+    parser.add_argument("--metodo", choices=["secuencia", "anterior"], default="secuencia")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.url:
+            engine = create_engine(args.url, pool_size=args.hilos, max_overflow=10)
+        else:
+            engine = create_engine(f"sqlite:///{os.path.join(tmp, 'folios.db')}",
+                                   connect_args={"check_same_thread": False, "timeout": 60})
+        Base.metadata.drop_all(engine)
+        Base.metadata.create_all(engine)
+        SesionPrueba = sessionmaker(bind=engine)
+
+        with SesionPrueba() as db:
+            cliente = Cliente(nombre="Cliente prueba", tipo="Particular")
+            db.add(cliente)
+            db.commit()
+            cliente_id = cliente.id
+
+        folios, errores = [], []
+        lock = threading.Lock()
+        salida = threading.Barrier(args.hilos)
+
+        def creador():
+            salida.wait()
+            for _ in range(args.notas):
+                db = SesionPrueba()
+                try:
+                    datos = {"cliente_id": cliente_id}
+                    if args.metodo == "anterior":
+                        datos["folio"] = folio_anterior(db)
+                    item = {"cantidad": 1, "descripcion": "Cambio de aceite",
+                            "precio_unitario": 100.0, "importe": 100.0, "impuesto": 0.0}
+                    nota = crud.create_nota_venta(db, datos, [item])
+                    with lock:
+                        folios.append(nota.folio)
+                except Exception as e:
+                    db.rollback()
+                    with lock:
+                        errores.append(type(e).__name__)
+                finally:
+                    db.close()
+
+        hilos = [threading.Thread(target=creador) for _ in range(args.hilos)]
+        inicio = time.perf_counter()
+        for h in hilos:
+            h.start()
+        for h in hilos:
+            h.join()
+        segundos = time.perf_counter() - inicio
+
+        esperadas = args.hilos * args.notas
+        repetidos = {f: n for f, n in Counter(folios).items() if n > 1}
+        print(f"Método: {args.metodo}  hilos: {args.hilos}  notas: {esperadas}")
+        print(f"Creadas: {len(folios)}  errores: {len(errores)} {dict(Counter(errores))}")
+        print(f"Folios repetidos: {len(repetidos)}")
+        print(f"Tiempo: {segundos:.2f} s ({len(folios) / segundos:.0f} notas/s)")
+
+        ok = len(folios) == esperadas and not repetidos and not errores
+        print("OK" if ok else "FALLÓ")
+        sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Prueba de concurrencia de inventario: varios hilos venden (Salida) el
+mismo producto a la vez, mezclando movimientos sueltos y lotes, y se
+verifica que nunca se venda más de lo que había ni se pierda stock.
+
+    python -m benchmarks.stress_inventario --url postgresql://.../taller_pruebas
+    python -m benchmarks.stress_inventario --hilos 32 --stock 500
+
+Sin --url usa una base SQLite temporal.
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import sessionmaker
+
+from server import crud
+from server.models import Base, MovimientoInventario, Producto
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="URL de una base de pruebas (se BORRAN sus tablas)")
+    parser.add_argument("--hilos", type=int, default=32)
+    parser.add_argument("--stock", type=int, default=500, help="stock inicial de cada producto")
+    parser.add_argument("--productos", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.url:
+            engine = create_engine(args.url, pool_size=args.hilos, max_overflow=10)
+        else:
+            engine = create_engine(f"sqlite:///{os.path.join(tmp, 'inventario.db')}",
+                                   connect_args={"check_same_thread": False, "timeout": 60})
+        Base.metadata.drop_all(engine)
+        Base.metadata.create_all(engine)
+        SesionPrueba = sessionmaker(bind=engine)
+
+        with SesionPrueba() as db:
+            ids = []
+            for i in range(args.productos):
+                producto = crud.create_producto(db, {"codigo": f"P{i:03d}", "nombre": f"Producto {i}", "categoria": "Pruebas",
+                                                     "stock_actual": args.stock})
+                ids.append(producto.id)
+
+        vendidos = {pid: 0 for pid in ids}
+        rechazos = [0]
+        lock = threading.Lock()
+        salida = threading.Barrier(args.hilos)
+
+        def vendedor(semilla: int):
+            rnd = random.Random(semilla)
+            salida.wait()
+            while True:
+                db = SesionPrueba()
+                try:
+                    if rnd.random() < 0.3:
+                        lote = [{"producto_id": rnd.choice(ids), "tipo": "Salida", "cantidad": 1, "motivo": "Venta"}
+                                for _ in range(rnd.randint(2, 5))]
+                        crud.registrar_movimientos_lote(db, lote)
+                    else:
+                        lote = [{"producto_id": rnd.choice(ids), "tipo": "Salida", "cantidad": 1, "motivo": "Venta"}]
+                        crud.registrar_movimiento_inventario(db, lote[0]["producto_id"], "Salida", 1, "Venta", "Prueba")
+                    db.commit()
+                    with lock:
+                        for m in lote:
+                            vendidos[m["producto_id"]] += 1
+                except ValueError:
+                    db.rollback()
+                    with lock:
+                        rechazos[0] += 1
+                        # Se detiene cuando ya no hay nada que vender
+                        if all(v >= args.stock for v in vendidos.values()) or rechazos[0] > args.hilos * 50:
+                            return
+                finally:
+                    db.close()
+
+        hilos = [threading.Thread(target=vendedor, args=(i,)) for i in range(args.hilos)]
+        inicio = time.perf_counter()
+        for h in hilos:
+            h.start()
+        for h in hilos:
+            h.join()
+        segundos = time.perf_counter() - inicio
+
+        ok = True
+        with SesionPrueba() as db:
+            for pid in ids:
+                stock = db.query(Producto.stock_actual).filter(Producto.id == pid).scalar()
+                salidas = db.query(func.coalesce(func.sum(MovimientoInventario.cantidad), 0)).filter(
+                    MovimientoInventario.producto_id == pid, MovimientoInventario.tipo == "Salida").scalar()
+                correcto = stock >= 0 and stock + salidas == args.stock and salidas == vendidos[pid]
+                ok = ok and correcto
+                print(f"Producto {pid}: stock final {stock}, salidas registradas {salidas}, "
+                      f"ventas confirmadas {vendidos[pid]} {'✓' if correcto else '✗'}")
+
+        print(f"Rechazos por stock insuficiente: {rechazos[0]}  tiempo: {segundos:.2f} s")
+        print("OK" if ok else "FALLÓ")
+        sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -95,6 +95,76 @@ def check_gitignore():
     
     return True
 
+def check_pagos_escritorio():
+    """Los pagos tal como los arma gui/api_client.py pasan la validación del servidor"""
+    print("\n💳 Verificando pagos del escritorio contra la API...")
+    import tempfile
+    from datetime import date
+
+    temporal = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+    temporal.close()
+    url_anterior = os.environ.get('DATABASE_URL')
+    # Antes de importar server.main: el engine se crea al importar
+    os.environ['DATABASE_URL'] = f"sqlite:///{temporal.name}"
+    engine = None
+    respuestas = []
+    error = None
+    try:
+        from fastapi.testclient import TestClient
+        from server.database import engine
+        from server.main import app
+        from server.models import Base
+        from gui.api_client import TallerAPIClient
+
+        Base.metadata.create_all(bind=engine)
+        prueba = TestClient(app)
+        escritorio = TallerAPIClient(base_url="http://testserver")
+
+        def enviar(endpoint, data):
+            respuesta = prueba.post(endpoint, json=data)
+            respuestas.append((endpoint, respuesta))
+            return respuesta.json()
+
+        # El mismo cuerpo que envía el escritorio, sin pasar por la red
+        escritorio._post = enviar
+
+        cliente = escritorio.crear_cliente({"nombre": "Cliente prueba", "tipo": "Particular"})
+        proveedor = escritorio.crear_proveedor({"nombre": "Proveedor prueba", "tipo": "Empresa"})
+        item = {"cantidad": 1, "descripcion": "Servicio", "precio_unitario": 100.0,
+                "importe": 100.0, "impuesto": 16.0}
+        nota = escritorio.crear_nota({"cliente_id": cliente["id"], "metodo_pago": "Efectivo"}, [item])
+        nota_proveedor = escritorio.crear_nota_proveedor({"proveedor_id": proveedor["id"]}, [item])
+
+        escritorio.registrar_pago(nota["id"], 50.0, date.today(), "Efectivo", "")
+        escritorio.registrar_pago_proveedor(nota_proveedor["id"], 50.0, date.today(), "Efectivo", "")
+    except ImportError as e:
+        error = f"No se pudo importar el servidor: {e}"
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    finally:
+        # En Windows el archivo no se puede borrar mientras el pool lo tenga abierto
+        if engine is not None:
+            engine.dispose()
+        if url_anterior is None:
+            os.environ.pop('DATABASE_URL', None)
+        else:
+            os.environ['DATABASE_URL'] = url_anterior
+        try:
+            os.unlink(temporal.name)
+        except OSError:
+            pass
+
+    ok = error is None
+    for endpoint, respuesta in respuestas:
+        if respuesta.status_code == 200:
+            print(f"✅ POST {endpoint}")
+        else:
+            print(f"❌ POST {endpoint}: {respuesta.status_code} {respuesta.text[:200]}")
+            ok = False
+    if error:
+        print(f"❌ {error}")
+    return ok
+
 def main():
     print("="*50)
     print("🚀 VERIFICACIÓN PRE-DESPLIEGUE RAILWAY")
@@ -104,7 +174,8 @@ def main():
         check_files(),
         check_env_example(),
         check_requirements(),
-        check_gitignore()
+        check_gitignore(),
+        check_pagos_escritorio()
     ]
     
     print("\n" + "="*50)
@@ -0,0 +1,294 @@
+"""
+Base de los diálogos "Buscar ..." (notas, cotizaciones, órdenes y notas de proveedor).
+
+La tabla es un ModeloTablaColumnar detrás de un FiltroBusqueda
+(QSortFilterProxyModel). Al cargar la lista se calcula una sola vez, por
+fila y por cada columna filtrable, su texto normalizado (minúsculas, sin
+acentos); al buscar se compara contra esas llaves en lugar de leer las
+celdas, y si el texto nuevo solo agrega letras al anterior se revisan
+únicamente las filas que ya coincidían. La búsqueda corre cuando se deja
+de teclear (ESPERA_BUSQUEDA ms), no en cada tecla.
+
+Solo se descargan los LIMITE_LOCAL registros más recientes. Si el servidor
+regresó el límite completo (la lista local está recortada) y el criterio
+tiene búsqueda en el servidor (BUSQUEDA_SERVIDOR), el texto se busca allá
+para no dejar fuera registros viejos; con los demás criterios se avisa
+debajo de la búsqueda que solo se revisan los más recientes.
+
+Uso:
+    class BuscarNotasDialog(DialogoBusqueda):
+        TITULO = "Todas las Notas"
+        COLUMNAS = COLUMNAS_NOTAS
+        FILTROS = {"Folio": 1, "Cliente": 3}
+        BUSQUEDA_SERVIDOR = {"Folio": "folio"}
+        ...
+        def obtener_registros(self, limite):
+            return api_client.get_all_notas_venta(limit=limite)
+"""
+import unicodedata
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from PyQt5.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QPushButton,
+    QTableView, QLineEdit, QComboBox, QLabel, QHeaderView, QMessageBox
+)
+from PyQt5.QtCore import Qt, QTimer, QSortFilterProxyModel
+
+from gui.websocket_client import ws_client
+from gui.modelo_tabla import Columna, ModeloTablaColumnar
+from gui.styles import (
+    SECONDARY_WINDOW_GRADIENT, BUTTON_STYLE_2, INPUT_STYLE, TABLE_STYLE, LABEL_STYLE
+)
+
+ESPERA_BUSQUEDA = 250   # ms sin teclear antes de filtrar
+LIMITE_LOCAL = 2000     # registros que se descargan al abrir el diálogo
+
+
+def normalizar(texto) -> str:
+    """Minúsculas y sin acentos: 'Mecánico' -> 'mecanico'"""
+    texto = unicodedata.normalize('NFKD', str(texto).lower())
+    return ''.join(c for c in texto if not unicodedata.combining(c))
+
+
+def fecha_corta(fecha_iso):
+    if not fecha_iso:
+        return "N/A"
+    try:
+        return datetime.fromisoformat(fecha_iso).strftime("%d/%m/%Y")
+    except ValueError:
+        return fecha_iso  # Mostrar ISO si no se puede parsear
+
+
+def moneda(valor):
+    return f"${valor:.2f}"
+
+
+class FiltroBusqueda(QSortFilterProxyModel):
+    """Filtra las filas de un ModeloTablaColumnar con llaves de búsqueda precalculadas"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setSortRole(Qt.UserRole)
+        self._llaves: Dict[int, List[str]] = {}   # columna -> llave normalizada por fila
+        self._columna: Optional[int] = None
+        self._texto = ''
+        self._aceptadas: Optional[Set[int]] = None  # None = todas las filas
+
+    def indexar(self, columnas: Iterable[int]):
+        """Calcula las llaves del modelo origen; llamar después de cada cargar()"""
+        modelo = self.sourceModel()
+        filas = range(modelo.rowCount())
+        self._llaves = {col: [normalizar(modelo.texto(f, col)) for f in filas] for col in columnas}
+        self._columna, self._texto, self._aceptadas = None, '', None
+        self.invalidateFilter()
+
+    def filtrar(self, columna: int, texto: str):
+        texto = normalizar(texto)
+        llaves = self._llaves.get(columna)
+        if not texto or llaves is None:
+            aceptadas = None
+        elif columna == self._columna and self._aceptadas is not None and texto.startswith(self._texto):
+            # El texto solo creció: únicamente pueden seguir coincidiendo las que ya coincidían
+            aceptadas = {f for f in self._aceptadas if texto in llaves[f]}
+        else:
+            aceptadas = {f for f, llave in enumerate(llaves) if texto in llave}
+        self._columna, self._texto, self._aceptadas = columna, texto, aceptadas
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, fila, parent):
+        return self._aceptadas is None or fila in self._aceptadas
+
+
+class DialogoBusqueda(QDialog):
+    """Diálogo para buscar, ordenar y elegir un registro de una lista del servidor"""
+
+    TITULO = ""
+    NOMBRE = "registros"                      # para los mensajes de error
+    COLUMNAS: List[Columna] = []              # la columna 0 (ID) se oculta
+    FILTROS: Dict[str, int] = {}              # criterio del combo -> columna
+    BUSQUEDA_SERVIDOR: Dict[str, str] = {}    # criterio -> parámetro de búsqueda del servidor
+    SENALES_RECARGA: Tuple[str, ...] = ()     # señales del ws_client que recargan la lista
+    ATRIBUTO_SELECCION = "registro_seleccionado"
+    MENSAJE_SELECCION = "Seleccione un registro"
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        setattr(self, self.ATRIBUTO_SELECCION, None)
+        self._registros_locales: List[Dict] = []
+        self._recortado = False      # el servidor regresó LIMITE_LOCAL registros (hay más)
+        self._en_servidor = False    # la tabla muestra un resultado de búsqueda del servidor
+
+        self._espera = QTimer(self)
+        self._espera.setSingleShot(True)
+        self._espera.setInterval(ESPERA_BUSQUEDA)
+        self._espera.timeout.connect(self.filtrar)
+
+        self.setup_ui()
+        if ws_client:
+            for senal in self.SENALES_RECARGA:
+                try:
+                    getattr(ws_client, senal).connect(self.on_notificacion_remota)
+                except AttributeError:
+                    print(f"Advertencia: La señal '{senal}' no está definida en ws_client.")
+        QTimer.singleShot(5, self.cargar)
+
+    # ---------- Por diálogo ----------
+
+    def obtener_registros(self, limite: int) -> Optional[List[Dict]]:
+        """Los 'limite' registros más recientes"""
+        raise NotImplementedError
+
+    def buscar_en_servidor(self, parametro: str, texto: str) -> List[Dict]:
+        """Búsqueda en el servidor para los criterios de BUSQUEDA_SERVIDOR"""
+        raise NotImplementedError
+
+    # ---------- Interfaz ----------
+
+    def setup_ui(self):
+        self.setWindowTitle(self.TITULO)
+        self.setMinimumSize(900, 600)
+        self.setWindowState(Qt.WindowMaximized)
+        self.setStyleSheet(SECONDARY_WINDOW_GRADIENT)
+
+        layout = QVBoxLayout()
+
+        # Búsqueda
+        busqueda_layout = QHBoxLayout()
+        busqueda_layout.setSpacing(10)
+
+        lbl_buscar = QLabel("Buscar por:")
+        lbl_buscar.setStyleSheet(LABEL_STYLE)
+
+        self.cmb_filtro = QComboBox()
+        self.cmb_filtro.addItems(list(self.FILTROS))
+        self.cmb_filtro.setStyleSheet(INPUT_STYLE)
+        self.cmb_filtro.currentIndexChanged.connect(self.filtrar)
+
+        self.txt_buscar = QLineEdit()
+        self.txt_buscar.setPlaceholderText("Buscar...")
+        self.txt_buscar.setStyleSheet(INPUT_STYLE)
+        self.txt_buscar.textChanged.connect(self._programar_busqueda)
+        self.txt_buscar.returnPressed.connect(self.filtrar)
+
+        busqueda_layout.addWidget(lbl_buscar)
+        busqueda_layout.addWidget(self.cmb_filtro, 1)
+        busqueda_layout.addWidget(self.txt_buscar, 2)
+        layout.addLayout(busqueda_layout)
+
+        # Aviso de lista recortada (criterios sin búsqueda en el servidor)
+        self.lbl_aviso = QLabel()
+        self.lbl_aviso.setStyleSheet(LABEL_STYLE)
+        self.lbl_aviso.setVisible(False)
+        layout.addWidget(self.lbl_aviso)
+
+        # Tabla
+        self.tabla = QTableView()
+        self.tabla.setStyleSheet(TABLE_STYLE)
+        self.tabla.setSelectionBehavior(QTableView.SelectRows)
+        self.tabla.doubleClicked.connect(self.seleccionar)
+
+        # Todas las filas se entregan al proxy, que es quien filtra y ordena
+        self.modelo = ModeloTablaColumnar(self.COLUMNAS, self, bloque=None)
+        self.proxy = FiltroBusqueda(self)
+        self.proxy.setSourceModel(self.modelo)
+        self.tabla.setModel(self.proxy)
+
+        self.tabla.setSortingEnabled(True)
+        self.proxy.sort(-1)  # Orden del servidor (más recientes primero) hasta elegir columna
+
+        header = self.tabla.horizontalHeader()
+        header.setSectionResizeMode(QHeaderView.Stretch)
+        self.tabla.setColumnHidden(0, True)
+
+        layout.addWidget(self.tabla)
+
+        # Botones
+        botones_layout = QHBoxLayout()
+        self.btn_seleccionar = QPushButton("Seleccionar")
+        self.btn_cerrar = QPushButton("Cerrar")
+
+        for btn in [self.btn_seleccionar, self.btn_cerrar]:
+            btn.setStyleSheet(BUTTON_STYLE_2.replace("QToolButton", "QPushButton"))
+
+        self.btn_seleccionar.clicked.connect(self.seleccionar)
+        self.btn_cerrar.clicked.connect(self.reject)
+
+        botones_layout.addWidget(self.btn_seleccionar)
+        botones_layout.addWidget(self.btn_cerrar)
+        layout.addLayout(botones_layout)
+
+        self.setLayout(layout)
+
+    # ---------- Datos ----------
+
+    def on_notificacion_remota(self, data):
+        self.cargar()
+
+    def _programar_busqueda(self):
+        # Cada tecla reinicia la espera; se filtra una vez al dejar de teclear
+        self._espera.start()
+
+    def _mostrar(self, registros: List[Dict]):
+        self.modelo.cargar(registros)
+        self.proxy.indexar(self.FILTROS.values())
+
+    def cargar(self):
+        """Descarga los registros más recientes y vuelve a aplicar la búsqueda actual"""
+        try:
+            registros = self.obtener_registros(LIMITE_LOCAL)
+            if registros is None:
+                raise Exception("No se pudo obtener respuesta del servidor (api_client devolvió None)")
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Error al cargar {self.NOMBRE}: {e}")
+            return
+
+        self._registros_locales = registros
+        self._recortado = len(registros) >= LIMITE_LOCAL
+        self._en_servidor = False
+        self._mostrar(registros)
+        self.filtrar()
+
+    def filtrar(self):
+        """Filtra según el criterio; en el servidor si la lista local está recortada"""
+        self._espera.stop()
+        texto = self.txt_buscar.text()
+        criterio = self.cmb_filtro.currentText()
+        columna = self.FILTROS.get(criterio, 1)
+        parametro = self.BUSQUEDA_SERVIDOR.get(criterio)
+
+        if self._recortado and parametro and texto.strip():
+            try:
+                resultados = self.buscar_en_servidor(parametro, texto.strip())
+            except Exception as e:
+                QMessageBox.critical(self, "Error", f"Error al buscar {self.NOMBRE}: {e}")
+                return
+            self._mostrar(resultados or [])
+            self._en_servidor = True
+        elif self._en_servidor:
+            self._mostrar(self._registros_locales)
+            self._en_servidor = False
+
+        self._avisar_recorte(self._recortado and not parametro and bool(texto.strip()))
+        self.proxy.filtrar(columna, texto)
+
+    def _avisar_recorte(self, visible: bool):
+        if visible:
+            en_servidor = ", ".join(self.BUSQUEDA_SERVIDOR)
+            aviso = f"Solo se buscan los {LIMITE_LOCAL} registros más recientes de {self.NOMBRE}."
+            if en_servidor:
+                aviso += f" Para registros anteriores busque por {en_servidor}."
+            self.lbl_aviso.setText(aviso)
+        self.lbl_aviso.setVisible(visible)
+
+    def seleccionar(self):
+        """Guarda el registro de la fila seleccionada y cierra"""
+        indices = self.tabla.selectedIndexes()
+        if not indices:
+            QMessageBox.warning(self, "Aviso", self.MENSAJE_SELECCION)
+            return
+
+        fila = self.proxy.mapToSource(indices[0]).row()
+        # La fila ya tiene el registro completo de la lista; no hace falta volver a pedirla
+        setattr(self, self.ATRIBUTO_SELECCION, self.modelo.registro(fila))
+        self.accept()
@@ -3,27 +3,46 @@ from typing import List, Dict, Optional, Any
 import json
 from datetime import datetime
 import base64 # Requerido para manejar el logo
+import uuid
+import copy
+import time
+
+from gui.transporte import CircuitBreaker, TransporteHTTP
+
+# Segundos que se usan los catálogos de /bootstrap antes de volver a pedirlos
+PRECARGA_TTL = 120
 
 class TallerAPIClient:
     def __init__(self, base_url: str = "https://web-production-96c8.up.railway.app"):
         self.base_url = base_url
         self.session = requests.Session()
         self.session.headers.update({'Content-Type': 'application/json'})
-    
+        # Timeouts, reintentos, circuit breaker y latencias (ver gui/transporte.py)
+        self.transporte = TransporteHTTP(self.session, base_url)
+        # Catálogos de /bootstrap: sección -> (datos, instante)
+        self._precarga: Dict[str, tuple] = {}
+    
+    @staticmethod
+    def _encabezado_idempotencia() -> dict:
+        """Llave única por operación: el servidor no la ejecuta dos veces si se reintenta"""
+        return {'Idempotency-Key': uuid.uuid4().hex}
+
     def _get(self, endpoint: str, params: dict = None):
         """GET request"""
         try:
-            response = self.session.get(f"{self.base_url}{endpoint}", params=params, timeout=10)
-            response.raise_for_status()
+            response = self.transporte.solicitar('GET', endpoint, params=params)
             return response.json()
         except Exception as e:
             print(f"Error GET {endpoint}: {e}")
             return None
     
     def _post(self, endpoint: str, data: dict):
+        if endpoint != "/login":
+            self.invalidar_precarga()
         try:
-            response = self.session.post(f"{self.base_url}{endpoint}", json=data, timeout=10)
-            response.raise_for_status()
+            # La misma llave en todos los reintentos de esta operación
+            response = self.transporte.solicitar('POST', endpoint, json=data,
+                                                 headers=self._encabezado_idempotencia())
             return response.json()
         except requests.exceptions.HTTPError as e:
             print(f"Error {e.response.status_code} POST {endpoint}: {e.response.text}")
@@ -34,9 +53,10 @@ class TallerAPIClient:
     
     def _put(self, endpoint: str, data: dict):
         """PUT request"""
+        self.invalidar_precarga()
         try:
-            response = self.session.put(f"{self.base_url}{endpoint}", json=data, timeout=10)
-            response.raise_for_status()
+            response = self.transporte.solicitar('PUT', endpoint, json=data,
+                                                 headers=self._encabezado_idempotencia())
             return response.json()
         except Exception as e:
             print(f"Error PUT {endpoint}: {e}")
@@ -44,17 +64,58 @@ class TallerAPIClient:
     
     def _delete(self, endpoint: str):
         """DELETE request"""
+        self.invalidar_precarga()
         try:
-            response = self.session.delete(f"{self.base_url}{endpoint}", timeout=10)
-            response.raise_for_status()
+            response = self.transporte.solicitar('DELETE', endpoint)
             return response.json()
         except Exception as e:
             print(f"Error DELETE {endpoint}: {e}")
             return None
+
+    def servidor_disponible(self) -> bool:
+        """False mientras el circuit breaker considera caído al servidor"""
+        return self.transporte.circuito.estado != CircuitBreaker.ABIERTO
+
+    def estadisticas_latencia(self) -> Dict[str, Dict[str, float]]:
+        """Latencias y errores por endpoint desde que inició la aplicación"""
+        return self.transporte.estadisticas()
     
+    # ==================== BOOTSTRAP ====================
+
+    def cargar_bootstrap(self, forzar: bool = False) -> bool:
+        """
+        Trae configuración y catálogos en una sola petición (/bootstrap) y los
+        deja listos para los get_* siguientes. Sin 'forzar' no hace nada si la
+        precarga sigue vigente.
+        """
+        if not forzar and self._precarga and all(
+                time.monotonic() - instante < PRECARGA_TTL for _, instante in self._precarga.values()):
+            return True
+        datos = self._get("/bootstrap")
+        if not datos:
+            return False
+        ahora = time.monotonic()
+        datos.pop('generado', None)
+        self._precarga = {seccion: (valor, ahora) for seccion, valor in datos.items()}
+        return True
+
+    def invalidar_precarga(self):
+        """Descarta los catálogos precargados (hubo cambios en el servidor)"""
+        self._precarga = {}
+
+    def _de_precarga(self, seccion: str):
+        """Copia de la sección precargada, o None si no hay o ya venció"""
+        entrada = self._precarga.get(seccion)
+        if entrada is None or time.monotonic() - entrada[1] >= PRECARGA_TTL:
+            return None
+        return copy.deepcopy(entrada[0])
+
     # ==================== CLIENTES ====================
     
     def get_clientes(self) -> List[Dict]:
+        precargados = self._de_precarga('clientes')
+        if precargados is not None:
+            return precargados
         return self._get("/clientes") or []
     
     def buscar_clientes(self, texto: str) -> List[Dict]:
@@ -73,6 +134,9 @@ class TallerAPIClient:
     # ==================== PROVEEDORES ====================
     
     def get_proveedores(self) -> List[Dict]:
+        precargados = self._de_precarga('proveedores')
+        if precargados is not None:
+            return precargados
         return self._get("/proveedores") or []
     
     def buscar_proveedores(self, texto: str) -> List[Dict]:
@@ -91,6 +155,9 @@ class TallerAPIClient:
     # ==================== PRODUCTOS ====================
     
     def get_productos(self) -> List[Dict]:
+        precargados = self._de_precarga('productos')
+        if precargados is not None:
+            return precargados
         return self._get("/productos") or []
     
     def buscar_productos(self, texto: str) -> List[Dict]:
@@ -111,8 +178,10 @@ class TallerAPIClient:
     
     # ==================== ORDENES ====================
     
-    def get_all_ordenes(self, estado: str = None) -> List[Dict]:
+    def get_all_ordenes(self, estado: str = None, limit: Optional[int] = None) -> List[Dict]:
         params = {"estado": estado} if estado else {}
+        if limit:
+            params["limit"] = limit
         return self._get("/ordenes", params=params) or []
     
     def buscar_ordenes(self, **filtros) -> List[Dict]:
@@ -140,10 +209,16 @@ class TallerAPIClient:
     def cancelar_orden(self, orden_id: int) -> Optional[Dict]:
         return self._post(f"/ordenes/{orden_id}/cancelar", data={})
     
+    def convertir_orden_a_nota(self, orden_id: int) -> Optional[Dict]:
+        """Genera la nota de venta de la orden en el servidor. Regresa {'nota', 'orden'}."""
+        return self._post(f"/ordenes/{orden_id}/convertir-a-nota", data={})
+    
     # ==================== COTIZACIONES ====================
     
-    def get_all_cotizaciones(self, estado: str = None) -> List[Dict]:
+    def get_all_cotizaciones(self, estado: str = None, limit: Optional[int] = None) -> List[Dict]:
         params = {"estado": estado} if estado else {}
+        if limit:
+            params["limit"] = limit
         return self._get("/cotizaciones", params=params) or []
     
     def buscar_cotizaciones(self, **filtros) -> List[Dict]:
@@ -169,14 +244,24 @@ class TallerAPIClient:
         
         return self._put(f"/cotizaciones/{cotizacion_id}", datos_completos)
     
+    def get_cotizaciones_similares(self, descripciones: List[str], k: int = 10) -> List[Dict]:
+        """Cotizaciones históricas más parecidas a las descripciones dadas (con 'similitud')."""
+        return self._get("/cotizaciones/similares", params={"items": descripciones, "k": k}) or []
+    
+    def convertir_cotizacion_a_nota(self, cotizacion_id: int, observaciones: Optional[str] = None) -> Optional[Dict]:
+        """Genera la nota de venta de la cotización en el servidor. Regresa {'nota', 'cotizacion'}."""
+        datos = {'observaciones': observaciones} if observaciones is not None else {}
+        return self._post(f"/cotizaciones/{cotizacion_id}/convertir-a-nota", data=datos)
+    
     def cancelar_cotizacion(self, cotizacion_id: int) -> Optional[Dict]:
         """Marca una cotización como 'Cancelada'."""
         return self._post(f"/cotizaciones/{cotizacion_id}/cancelar", data={})
     
     # ==================== NOTAS DE VENTA ====================
     
-    def get_all_notas_venta(self) -> List[Dict]:
-        return self._get("/notas") or []
+    def get_all_notas_venta(self, limit: Optional[int] = None) -> List[Dict]:
+        params = {"limit": limit} if limit else {}
+        return self._get("/notas", params=params) or []
     
     def crear_nota(self, datos: Dict, items: List[Dict], **kwargs) -> Optional[Dict]:
         datos_completos = datos.copy()
@@ -231,8 +316,9 @@ class TallerAPIClient:
         datos_completos['items'] = items
         return self._put(f"/notas_proveedor/{nota_id}", datos_completos)
 
-    def get_all_notas_proveedor(self) -> List[Dict]:
-        return self._get("/notas_proveedor") or []
+    def get_all_notas_proveedor(self, limit: Optional[int] = None) -> List[Dict]:
+        params = {"limit": limit} if limit else {}
+        return self._get("/notas_proveedor", params=params) or []
 
     def get_nota_proveedor(self, nota_id: int) -> Optional[Dict]:
         return self._get(f"/notas_proveedor/{nota_id}")
@@ -272,6 +358,10 @@ class TallerAPIClient:
         }
         return self._post("/inventario/movimiento", datos)
     
+    def registrar_movimientos_lote(self, movimientos: List[Dict], usuario: str = "Sistema") -> Optional[Dict]:
+        """Aplica varios movimientos [{producto_id, tipo, cantidad, motivo}] en una sola transacción."""
+        return self._post("/inventario/movimientos/lote", {'movimientos': movimientos, 'usuario': usuario})
+    
     def get_movimientos_inventario(self, producto_id: int = None, tipo: str = None, limit: int = 100) -> List[Dict]:
         params = {}
         if producto_id:
@@ -282,6 +372,11 @@ class TallerAPIClient:
             params['limit'] = limit
         return self._get("/inventario/movimientos", params=params) or []
     
+    def autocompletar_descripcion(self, texto: str, limite: int = 10) -> List[str]:
+        """Sugerencias de descripción de items por prefijo (más usadas primero)."""
+        sugerencias = self._get("/autocomplete", params={"q": texto, "limit": limite}) or []
+        return [s['texto'] for s in sugerencias]
+    
     # ==================== REPORTES ====================
     
     def get_reporte_ventas(self, fecha_ini: datetime, fecha_fin: datetime) -> List[Dict]:
@@ -324,7 +419,9 @@ class TallerAPIClient:
     
     def get_config_empresa(self) -> Optional[Dict]:
         """Obtener configuración de empresa desde API"""
-        config = self._get("/configuracion")
+        config = self._de_precarga('configuracion')
+        if config is None:
+            config = self._get("/configuracion")
         if config and 'logo_data' in config and config['logo_data']:
             try:
                 # Decodificar Base64 a bytes
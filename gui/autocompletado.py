@@ -0,0 +1,92 @@
+"""
+Autocompletado de descripciones de items contra el servidor (/autocomplete).
+
+La consulta se dispara 250 ms después de la última tecla, y las respuestas
+se guardan por prefijo para no repetir llamadas al borrar y reescribir.
+"""
+from PyQt5.QtCore import QObject, QStringListModel, QTimer, Qt
+from PyQt5.QtWidgets import QCompleter
+
+from gui.api_client import api_client
+
+RETARDO_MS = 250
+MIN_CARACTERES = 2
+
+POPUP_STYLE = """
+    QListView {
+        background-color: white;
+        border: 2px solid #2CD5C4;
+        border-radius: 4px;
+        padding: 5px;
+        font-size: 16px;
+    }
+    QListView::item {
+        padding: 8px;
+        border-radius: 3px;
+    }
+    QListView::item:hover {
+        background-color: #E0F7FA;
+    }
+    QListView::item:selected {
+        background-color: #2CD5C4;
+        color: white;
+    }
+"""
+
+
+class CompletadorDescripciones(QObject):
+    """Conecta un QLineEdit al autocompletado del servidor con debounce"""
+
+    def __init__(self, line_edit, parent=None):
+        super().__init__(parent or line_edit)
+        self.line_edit = line_edit
+        self._cache = {}
+
+        self.modelo = QStringListModel(self)
+        self.completer = QCompleter(self.modelo, self)
+        self.completer.setCaseSensitivity(Qt.CaseInsensitive)
+        # El servidor ya filtra y ordena por frecuencia
+        self.completer.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
+        self.completer.setMaxVisibleItems(8)
+        self.completer.popup().setStyleSheet(POPUP_STYLE)
+        self.line_edit.setCompleter(self.completer)
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(RETARDO_MS)
+        self.timer.timeout.connect(self._consultar)
+
+        # textEdited (no textChanged) para no consultar al llenar el campo por código
+        self.line_edit.textEdited.connect(self._on_texto_editado)
+
+    def _on_texto_editado(self, texto):
+        if len(texto.strip()) < MIN_CARACTERES:
+            self.timer.stop()
+            return
+        self.timer.start()
+
+    def _consultar(self):
+        texto = self.line_edit.text().strip()
+        if len(texto) < MIN_CARACTERES or self.line_edit.isReadOnly():
+            return
+
+        clave = texto.lower()
+        sugerencias = self._cache.get(clave)
+        if sugerencias is None:
+            try:
+                sugerencias = api_client.autocompletar_descripcion(texto)
+            except Exception as e:
+                print(f"Error en autocompletado: {e}")
+                return
+            self._cache[clave] = sugerencias
+
+        # Si el usuario siguió escribiendo mientras tanto, esperar al siguiente disparo
+        if self.line_edit.text().strip() != texto:
+            return
+
+        self.modelo.setStringList(sugerencias)
+        if sugerencias and self.line_edit.hasFocus():
+            self.completer.complete()
+
+    def limpiar_cache(self):
+        self._cache.clear()
@@ -0,0 +1,202 @@
+"""
+Catálogos compartidos por todas las ventanas (clientes, proveedores, productos).
+
+Cada catálogo se descarga una sola vez por proceso y se guarda en un dict
+por id. Los eventos del WebSocket se aplican como cambios puntuales (alta,
+edición, baja, stock) en lugar de volver a descargar la lista, y la señal
+'cambiado' avisa a las ventanas suscritas. Los autocompletados de clientes
+y proveedores comparten un QStringListModel por catálogo, así que se
+actualizan solos sin reconstruir un QCompleter en cada ventana.
+"""
+from typing import Dict, List, Optional
+
+from PyQt5.QtCore import QObject, QStringListModel, Qt, pyqtSignal
+from PyQt5.QtWidgets import QCompleter
+
+from gui.api_client import api_client
+
+# Catálogo -> método del api_client que regresa la lista completa
+CATALOGOS = {
+    'clientes': 'get_clientes',
+    'proveedores': 'get_proveedores',
+    'productos': 'get_productos',
+}
+# Catálogos que se eligen por texto "Nombre - Tipo" en un QLineEdit
+CON_ETIQUETA = ('clientes', 'proveedores')
+
+POPUP_STYLE = """
+    QListView {
+        background-color: white;
+        border: 2px solid #2CD5C4;
+        border-radius: 4px;
+        padding: 5px;
+        font-size: 16px;
+        min-height: 60px;
+    }
+    QListView::item {
+        padding: 10px;
+        border-radius: 3px;
+        min-height: 30px;
+    }
+    QListView::item:hover {
+        background-color: #E0F7FA;
+    }
+    QListView::item:selected {
+        background-color: #2CD5C4;
+        color: white;
+    }
+"""
+
+
+def etiqueta(registro: Dict) -> str:
+    """Texto que se muestra en el autocompletado: 'Nombre - Tipo'"""
+    return f"{registro.get('nombre', 'Sin Nombre')} - {registro.get('tipo', 'Sin Tipo')}"
+
+
+class CatalogoStore(QObject):
+    """Catálogos indexados por id, actualizados con los eventos del servidor"""
+
+    cambiado = pyqtSignal(str)  # nombre del catálogo
+
+    def __init__(self, api=api_client):
+        super().__init__()
+        self._api = api
+        self._registros: Dict[str, Dict[int, Dict]] = {nombre: {} for nombre in CATALOGOS}
+        # Diccionarios vivos 'Nombre - Tipo' -> id; las ventanas guardan la referencia
+        self._etiquetas: Dict[str, Dict[str, int]] = {nombre: {} for nombre in CON_ETIQUETA}
+        self._modelos = {nombre: QStringListModel(self) for nombre in CON_ETIQUETA}
+        self._cargados = set()
+        self._conectado = False
+        self._desconectado = False
+
+    # ---------- Lectura ----------
+
+    def asegurar(self, nombre: str):
+        """Descarga el catálogo si aún no se tiene"""
+        if nombre not in self._cargados:
+            self.recargar(nombre)
+
+    def recargar(self, nombre: str):
+        registros = getattr(self._api, CATALOGOS[nombre])() or []
+        self._registros[nombre] = {r['id']: r for r in registros}
+        self._cargados.add(nombre)
+        self._reindexar(nombre)
+        self.cambiado.emit(nombre)
+
+    def lista(self, nombre: str) -> List[Dict]:
+        self.asegurar(nombre)
+        return list(self._registros[nombre].values())
+
+    def obtener(self, nombre: str, registro_id: int) -> Optional[Dict]:
+        self.asegurar(nombre)
+        return self._registros[nombre].get(registro_id)
+
+    def etiquetas(self, nombre: str) -> Dict[str, int]:
+        """Dict 'Nombre - Tipo' -> id; es el mismo objeto en cada llamada y se actualiza solo"""
+        self.asegurar(nombre)
+        return self._etiquetas[nombre]
+
+    def completer(self, nombre: str, parent=None) -> QCompleter:
+        """QCompleter sobre el modelo compartido del catálogo"""
+        self.asegurar(nombre)
+        completer = QCompleter(self._modelos[nombre], parent)
+        completer.setCaseSensitivity(Qt.CaseInsensitive)
+        completer.setFilterMode(Qt.MatchContains)
+        completer.setMaxVisibleItems(9)
+        completer.popup().setStyleSheet(POPUP_STYLE)
+        return completer
+
+    # ---------- Cambios ----------
+
+    def _reindexar(self, nombre: str):
+        if nombre not in CON_ETIQUETA:
+            return
+        etiquetas = self._etiquetas[nombre]
+        etiquetas.clear()
+        for registro in self._registros[nombre].values():
+            etiquetas[etiqueta(registro)] = registro['id']
+        self._modelos[nombre].setStringList(list(etiquetas))
+
+    def aplicar(self, nombre: str, registro: Dict):
+        """Alta o edición de un registro"""
+        if nombre not in self._cargados or not registro or 'id' not in registro:
+            return  # Se descargará completo la primera vez que se pida
+        anterior = self._registros[nombre].get(registro['id'])
+        self._registros[nombre][registro['id']] = registro
+        if nombre in CON_ETIQUETA and (anterior is None or etiqueta(anterior) != etiqueta(registro)):
+            self._reindexar(nombre)
+        self.cambiado.emit(nombre)
+
+    def eliminar(self, nombre: str, registro_id: Optional[int]):
+        if nombre not in self._cargados:
+            return
+        if self._registros[nombre].pop(registro_id, None) is not None:
+            self._reindexar(nombre)
+            self.cambiado.emit(nombre)
+
+    def aplicar_stock(self, data: Dict):
+        """stock_actualizado: {'stock': {producto_id: nuevo}} o {'producto_id', 'stock_actual'}"""
+        if 'productos' not in self._cargados:
+            return
+        stock = data.get('stock')
+        if stock is None and 'stock_actual' in data:
+            stock = {data.get('producto_id'): data['stock_actual']}
+        if stock is None:
+            # Evento sin el valor nuevo: se vuelve a descargar (una vez para todas las ventanas)
+            self.recargar('productos')
+            return
+        productos = self._registros['productos']
+        for producto_id, nuevo in stock.items():
+            producto = productos.get(int(producto_id))
+            if producto is not None:
+                producto['stock_actual'] = nuevo
+        self.cambiado.emit('productos')
+
+    # Slots (métodos del QObject, para que los eventos del hilo del WebSocket
+    # se apliquen en el hilo de la interfaz)
+    def _on_cliente(self, data):
+        self.aplicar('clientes', data)
+
+    def _on_cliente_eliminado(self, data):
+        self.eliminar('clientes', data.get('id'))
+
+    def _on_proveedor(self, data):
+        self.aplicar('proveedores', data)
+
+    def _on_proveedor_eliminado(self, data):
+        self.eliminar('proveedores', data.get('id'))
+
+    def _on_producto(self, data):
+        self.aplicar('productos', data)
+
+    def _on_producto_eliminado(self, data):
+        self.eliminar('productos', data.get('id'))
+
+    def _on_conexion(self, conectado):
+        # Mientras no hubo conexión se pudieron perder eventos: volver a descargar
+        if conectado and self._desconectado:
+            self._api.invalidar_precarga()
+            for nombre in list(self._cargados):
+                self.recargar(nombre)
+        self._desconectado = not conectado
+
+    def conectar(self, ws):
+        """Suscribe el store a los eventos del WebSocket (una sola vez)"""
+        if ws is None or self._conectado:
+            return
+        ws.cliente_creado.connect(self._on_cliente)
+        ws.cliente_actualizado.connect(self._on_cliente)
+        ws.cliente_eliminado.connect(self._on_cliente_eliminado)
+        ws.proveedor_creado.connect(self._on_proveedor)
+        ws.proveedor_actualizado.connect(self._on_proveedor)
+        ws.proveedor_eliminado.connect(self._on_proveedor_eliminado)
+        ws.producto_creado.connect(self._on_producto)
+        ws.producto_actualizado.connect(self._on_producto)
+        ws.producto_eliminado.connect(self._on_producto_eliminado)
+        ws.stock_actualizado.connect(self.aplicar_stock)
+        ws.connection_status.connect(self._on_conexion)
+        self._conectado = True
+
+
+# Instancia global
+catalogos = CatalogoStore()
@@ -6,7 +6,7 @@ from PyQt5.QtWidgets import (
     QLabel, QLineEdit, QGridLayout, QGroupBox,
     QDoubleSpinBox, QMessageBox, QTableView, QHeaderView,
     QMenu, QAction, QFrame, QWidget, QDateEdit, QComboBox,
-    QInputDialog, QCompleter,
+    QInputDialog,
     QTextEdit, QDialogButtonBox, QFileDialog
 )
 # QTimer es necesario para la carga asíncrona
@@ -27,6 +27,8 @@ from gui.styles import (
 )
 from datetime import datetime, timedelta
 from gui.api_client import api_client as db_helper 
+from gui.catalogos import catalogos
+from gui.autocompletado import CompletadorDescripciones
 from gui.websocket_client import ws_client
 from ml.predictor_ml_final import predictor_ml
 try:
@@ -61,6 +63,7 @@ class CotizacionesWindow(QDialog):
 
         # Variables BD
         self.cotizacion_actual_id = None
+        self.version_actual = None  # Para detectar cambios de otro usuario al guardar
         self.modo_edicion = False
 
         self._datos_cargados = False
@@ -72,9 +75,6 @@ class CotizacionesWindow(QDialog):
         self.conectar_senales()
 
         if ws_client:
-            # Recargar autocompletado si cambia un cliente
-            ws_client.cliente_creado.connect(self.on_notificacion_cliente)
-            ws_client.cliente_actualizado.connect(self.on_notificacion_cliente)
             ws_client.cotizacion_actualizada.connect(self.on_notificacion_cotizacion)
 
         QTimer.singleShot(100, self._cargar_datos_inicial)
@@ -88,10 +88,6 @@ class CotizacionesWindow(QDialog):
             self.cargar_clientes_bd()
             self._datos_cargados = True
 
-    def on_notificacion_cliente(self, data):
-        # Renombrado para consistencia
-        self.cargar_clientes_bd()
-
     def on_notificacion_cotizacion(self, data):
         if self.cotizacion_actual_id and data.get('id') == self.cotizacion_actual_id:
             print(f"Recargando cotización {self.cotizacion_actual_id} por notificación remota...")
@@ -382,6 +378,7 @@ class CotizacionesWindow(QDialog):
         self.txt_descripcion.setStyleSheet(INPUT_STYLE)
         self.txt_descripcion.setPlaceholderText("Ingrese descripción del producto o servicio a cotizar")
         grid_layout.addWidget(self.txt_descripcion, 1, 1)
+        self.completador_descripcion = CompletadorDescripciones(self.txt_descripcion)
         
         self.txt_precio = QLineEdit()
         self.txt_precio.setStyleSheet(INPUT_STYLE)
@@ -521,6 +518,7 @@ class CotizacionesWindow(QDialog):
                 })
             
             if self.modo_edicion and self.cotizacion_actual_id:
+                cotizacion_data['version'] = self.version_actual
                 cotizacion = db_helper.actualizar_cotizacion(self.cotizacion_actual_id, cotizacion_data, items)
                 mensaje = "Cotización actualizada"
             else:
@@ -539,6 +537,7 @@ class CotizacionesWindow(QDialog):
     def nueva_cotizacion(self):
         """Limpiar para nueva (Adaptado)"""
         self.cotizacion_actual_id = None
+        self.version_actual = None
         self.modo_edicion = False
         self.txt_folio.clear()
         self.txt_folio.setPlaceholderText("COT-Auto")
@@ -587,6 +586,7 @@ class CotizacionesWindow(QDialog):
         
         # Se asigna el ID y el modo_edicion ANTES de llamar a controlar_estado_campos
         self.cotizacion_actual_id = cotizacion['id']
+        self.version_actual = cotizacion.get('version')
         self.modo_edicion = False
         
         self.controlar_estado_campos(False) # Bloquea campos, pero ahora SÍ habilitará "Editar"
@@ -819,44 +819,10 @@ class CotizacionesWindow(QDialog):
     def cargar_clientes_bd(self):
         """Cargar clientes y configurar autocompletado (Renombrado)"""
         try:
-            # Esta llamada ahora usa api_client
-            clientes = db_helper.get_clientes()
-            self.clientes_dict.clear()
-            
-            nombres = []
-            for cliente in clientes:
-                nombre_completo = f"{cliente['nombre']} - {cliente['tipo']}"
-                nombres.append(nombre_completo)
-                self.clientes_dict[nombre_completo] = cliente['id']
-            
-            completer = QCompleter(nombres)
-            completer.setCaseSensitivity(Qt.CaseInsensitive)
-            completer.setFilterMode(Qt.MatchContains)
-            completer.setMaxVisibleItems(9)
-            completer.popup().setStyleSheet("""
-                QListView {
-                    background-color: white;
-                    border: 2px solid #2CD5C4;
-                    border-radius: 4px;
-                    padding: 5px;
-                    font-size: 16px;
-                    min-height: 60px;
-                }
-                QListView::item {
-                    padding: 10px;
-                    border-radius: 3px;
-                    min-height: 30px;
-                }
-                QListView::item:hover {
-                    background-color: #E0F7FA;
-                }
-                QListView::item:selected {
-                    background-color: #2CD5C4;
-                    color: white;
-                }
-            """)
-            
-            self.txt_cliente.setCompleter(completer)
+            # Dict y autocompletado compartidos (gui/catalogos.py)
+            self.clientes_dict = catalogos.etiquetas('clientes')
+            if self.txt_cliente.completer() is None:
+                self.txt_cliente.setCompleter(catalogos.completer('clientes', self))
             
         except Exception as e:
             print(f"Error al cargar clientes: {e}")
@@ -868,88 +834,37 @@ class CotizacionesWindow(QDialog):
     def generar_nota_desde_cotizacion(self):
         """
         Toma la cotización actual y genera una Nota de Venta.
+        El servidor copia los items y liga ambos folios en una sola operación.
         """
         if not self.cotizacion_actual_id:
             self.mostrar_advertencia("Cargue una cotización guardada antes de generar la nota.")
             return
         
-        cotizacion_actual = db_helper.buscar_cotizaciones(folio=self.txt_folio.text())[0]
-        if cotizacion_actual.get('nota_folio'):
-            self.mostrar_advertencia(
-                f"Esta cotización ya generó la nota: {cotizacion_actual['nota_folio']}\n"
-                "No se puede generar otra nota."
-            )
-            return  
-
-        nombre_cliente = self.txt_cliente.text()
-        cliente_id = self.clientes_dict.get(nombre_cliente)
-        
-        if not cliente_id:
-            self.mostrar_advertencia("Cliente no válido. Seleccione un cliente de la lista.")
+        if not any(self.tipo_por_fila.get(fila, 'normal') == 'normal' for fila in range(self.tabla_model.rowCount())):
+            self.mostrar_advertencia("La cotización no tiene items para transferir a la nota.")
             return
             
         try:
-            fecha_hoy = QDate.currentDate().toString('yyyy-MM-dd')
-            referencia = self.txt_proyecto.text()
-
-            nota_data = {
-                'cliente_id': cliente_id,
-                'fecha': fecha_hoy,
-                'observaciones': referencia,
-                'metodo_pago': None
-            }
-
-            items_para_nota = []
-            for fila in range(self.tabla_model.rowCount()):
-                tipo = self.tipo_por_fila.get(fila, 'normal')
-                
-                if tipo == 'normal':
-                    cantidad = int(self.tabla_model.item(fila, 0).text())
-                    descripcion = self.tabla_model.item(fila, 1).text()
-                    precio_unitario = float(self.tabla_model.item(fila, 2).text().replace('$', '').replace(',', ''))
-                    impuesto_porcentaje = self.iva_por_fila.get(fila, 16.0)
-                    importe = cantidad * precio_unitario
-                    
-                    items_para_nota.append({
-                        'cantidad': cantidad,
-                        'descripcion': descripcion,
-                        'precio_unitario': precio_unitario,
-                        'importe': importe,
-                        'impuesto': impuesto_porcentaje
-                    })
-
-            if not items_para_nota:
-                self.mostrar_advertencia("La cotización no tiene items para transferir a la nota.")
-                return
-
-            nueva_nota = db_helper.crear_nota(nota_data, items_para_nota, cotizacion_folio=self.txt_folio.text())
+            resultado = db_helper.convertir_cotizacion_a_nota(
+                self.cotizacion_actual_id,
+                observaciones=self.txt_proyecto.text()
+            )
             
-            if nueva_nota and nueva_nota.get('folio'):
-                cotizacion_data_update = {
-                    'cliente_id': cliente_id,
-                    'estado': 'Aceptada',
-                    'vigencia': self.date_vigencia.date().toString("dd/MM/yyyy"),
-                    'observaciones': self.txt_proyecto.text()
-                }
-                
-                db_helper.actualizar_cotizacion(
-                    self.cotizacion_actual_id, 
-                    cotizacion_data_update, 
-                    items_para_nota,
-                    nota_folio=nueva_nota['folio']
+            if not resultado or not resultado.get('nota'):
+                self.mostrar_advertencia(
+                    "No se pudo generar la nota.\n"
+                    "Verifique que la cotización no haya generado ya una nota ni esté cancelada."
                 )
-                
-                self.mostrar_exito(
-                    f"Nota generada: {nueva_nota['folio']}\n"
-                    f"Desde cotización: {self.txt_folio.text()}"
-                )
-                
-                try:
-                    cotizacion_actualizada = db_helper.buscar_cotizaciones(folio=self.txt_folio.text())[0]
-                    if cotizacion_actualizada:
-                        self.cargar_cotizacion_en_formulario(cotizacion_actualizada)
-                except Exception as e:
-                    print(f"Error al recargar cotización tras generar nota: {e}")
+                return
+            
+            nueva_nota = resultado['nota']
+            self.mostrar_exito(
+                f"Nota generada: {nueva_nota['folio']}\n"
+                f"Desde cotización: {self.txt_folio.text()}"
+            )
+            
+            if resultado.get('cotizacion'):
+                self.cargar_cotizacion_en_formulario(resultado['cotizacion'])
                 
         except Exception as e:
             self.mostrar_error(f"Error al crear la nota: {e}")
@@ -962,7 +877,8 @@ class CotizacionesWindow(QDialog):
     
     def mostrar_menu_contextual(self, position):
         """Muestra un menú contextual al hacer clic derecho en una fila de la tabla  """
-        if not self.modo_edicion:
+        # Disponible al editar o al capturar una cotización nueva
+        if not self.modo_edicion and self.cotizacion_actual_id:
             return
             
         indexes = self.tabla_items.selectedIndexes()
@@ -970,6 +886,10 @@ class CotizacionesWindow(QDialog):
         menu = QMenu(self)
         
         menu.addSection("Insertar")
+        action_similar = QAction("🔎 Copiar de Cotización Similar", self)
+        action_similar.triggered.connect(self.copiar_de_cotizacion_similar)
+        menu.addAction(action_similar)
+        
         action_nota = QAction("➕ Agregar Nota", self)
         action_nota.triggered.connect(self.insertar_nota)
         menu.addAction(action_nota)
@@ -1022,6 +942,54 @@ class CotizacionesWindow(QDialog):
         
         menu.exec_(self.tabla_items.viewport().mapToGlobal(position))
 
+    def copiar_de_cotizacion_similar(self):
+        """Busca cotizaciones históricas parecidas a los items actuales y copia sus partidas"""
+        descripciones = [
+            self.tabla_model.item(fila, 1).text()
+            for fila in range(self.tabla_model.rowCount())
+            if self.tipo_por_fila.get(fila, 'normal') == 'normal' and self.tabla_model.item(fila, 1)
+        ]
+        if self.txt_descripcion.text().strip():
+            descripciones.append(self.txt_descripcion.text().strip())
+
+        if not descripciones:
+            self.mostrar_advertencia("Agregue al menos un item o escriba una descripción para buscar similares.")
+            return
+
+        try:
+            similares = db_helper.get_cotizaciones_similares(descripciones, k=10)
+        except Exception as e:
+            self.mostrar_error(f"Error al buscar cotizaciones similares: {e}")
+            return
+
+        similares = [c for c in similares if c['id'] != self.cotizacion_actual_id]
+        if not similares:
+            self.mostrar_info("No se encontraron cotizaciones similares.")
+            return
+
+        opciones = [
+            f"{c['folio']} - {c.get('cliente_nombre', '')} - ${c.get('total', 0):,.2f} ({c['similitud'] * 100:.0f}%)"
+            for c in similares
+        ]
+        opcion, ok = QInputDialog.getItem(
+            self, "Cotizaciones Similares", "Seleccione la cotización a copiar:", opciones, 0, False
+        )
+        if not ok:
+            return
+
+        cotizacion = similares[opciones.index(opcion)]
+        existentes = {d.lower() for d in descripciones}
+        for item in cotizacion.get('items', []):
+            if item['descripcion'].lower() in existentes:
+                continue
+            self._agregar_item_tabla(
+                str(item['cantidad']),
+                item['descripcion'],
+                item['precio_unitario'],
+                item['impuesto']
+            )
+        self.calcular_totales()
+
     def _insertar_fila_especial(self, texto, tipo, bg_color, fg_color, bold=False, height=None):
         """Helper para insertar notas y secciones (de notas_windows)"""
         fila = self.tabla_model.rowCount()
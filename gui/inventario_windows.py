@@ -7,7 +7,7 @@ from PyQt5.QtWidgets import (
     QLineEdit, QGridLayout, QGroupBox, QMessageBox, QTableView, 
     QHeaderView, QFrame, QWidget, QComboBox, QSpinBox, 
     QDoubleSpinBox, QTabWidget, QTextEdit, QScrollArea, QInputDialog,
-    QCompleter, QFileDialog
+    QFileDialog
 )
 from PyQt5.QtCore import Qt, QTimer
 from PyQt5.QtGui import QStandardItemModel, QStandardItem, QColor
@@ -16,9 +16,11 @@ from gui.styles import (
     SECONDARY_WINDOW_GRADIENT, BUTTON_STYLE_2, GROUP_BOX_STYLE,
     LABEL_STYLE, INPUT_STYLE, TABLE_STYLE, MESSAGE_BOX_STYLE
 )
+from gui.modelo_tabla import Columna, ModeloTablaColumnar
 
 try:
     from gui.api_client import api_client as db_helper
+    from gui.catalogos import catalogos
     from gui.websocket_client import ws_client
 except ImportError:
     print("Error: No se pudo importar 'api_client' o 'ws_client'.")
@@ -32,6 +34,58 @@ except ImportError as e:
     generar_pdf_orden_compra = None
 
 
+# ==================== COLUMNAS DE LAS TABLAS ====================
+
+BLANCO = QColor(255, 255, 255)
+COLORES_ESTADO_STOCK = {
+    "SIN STOCK": QColor(255, 107, 107),
+    "BAJO": QColor(255, 177, 66),
+    "OK": QColor(46, 213, 196),
+}
+
+
+def _estado_stock(producto):
+    stock_actual = producto.get('stock_actual', 0)
+    if stock_actual == 0:
+        return "SIN STOCK"
+    if stock_actual <= producto.get('stock_min', 0):
+        return "BAJO"
+    return "OK"
+
+
+def _fecha_movimiento(fecha_iso):
+    if not fecha_iso or fecha_iso == 'N/A':
+        return fecha_iso or 'N/A'
+    try:
+        return datetime.fromisoformat(fecha_iso).strftime("%d/%m/%Y %H:%M")
+    except ValueError:
+        return fecha_iso
+
+
+COLUMNAS_PRODUCTOS = [
+    Columna("ID", lambda p: p.get('id', 'N/A')),
+    Columna("Código", lambda p: p.get('codigo', 'N/A')),
+    Columna("Nombre", lambda p: p.get('nombre', 'N/A'), alineacion=Qt.AlignLeft | Qt.AlignVCenter),
+    Columna("Categoría", lambda p: p.get('categoria', 'N/A')),
+    Columna("Stock", lambda p: p.get('stock_actual', 0)),
+    Columna("P. Venta", lambda p: p.get('precio_venta', 0), texto=lambda v: f"${v:.2f}",
+            alineacion=Qt.AlignRight | Qt.AlignVCenter),
+    Columna("Estado", _estado_stock, fondo=COLORES_ESTADO_STOCK.get, frente=lambda v: BLANCO),
+]
+
+COLUMNAS_MOVIMIENTOS = [
+    Columna("ID", lambda m: m.get('id', 'N/A')),
+    Columna("Fecha", lambda m: m.get('fecha', 'N/A'), texto=_fecha_movimiento),
+    Columna("Tipo", lambda m: m.get('tipo', 'N/A'),
+            fondo=lambda t: QColor(46, 213, 196) if t == "Entrada" else QColor(255, 107, 107),
+            frente=lambda t: BLANCO),
+    Columna("Producto", lambda m: m.get('producto', 'N/A'), alineacion=Qt.AlignLeft | Qt.AlignVCenter),
+    Columna("Cantidad", lambda m: m.get('cantidad', 0)),
+    Columna("Usuario", lambda m: m.get('usuario', 'N/A')),
+    Columna("Motivo", lambda m: m.get('motivo', ''), alineacion=Qt.AlignLeft | Qt.AlignVCenter),
+]
+
+
 class InventarioWindow(QDialog):
     
     def __init__(self, parent=None):
@@ -52,12 +106,8 @@ class InventarioWindow(QDialog):
         self.setup_ui()
         self.conectar_senales()
 
-        if ws_client:
-            ws_client.producto_creado.connect(self.on_notificacion_producto)
-            ws_client.producto_actualizado.connect(self.on_notificacion_producto)
-            ws_client.stock_actualizado.connect(self.on_notificacion_producto)
-            ws_client.proveedor_creado.connect(self.on_notificacion_proveedor)
-            ws_client.proveedor_actualizado.connect(self.on_notificacion_proveedor)
+        # Altas, ediciones y stock llegan ya aplicados al catálogo compartido
+        catalogos.cambiado.connect(self.on_catalogo_cambiado)
         
         QTimer.singleShot(100, self._cargar_datos_inicial)
     
@@ -67,12 +117,10 @@ class InventarioWindow(QDialog):
             self.cargar_productos_desde_bd()
             self._datos_cargados = True
 
-    def on_notificacion_producto(self, data):
-        self.cargar_productos_desde_bd()
+    def on_catalogo_cambiado(self, nombre):
+        if nombre == 'productos' and self._datos_cargados:
+            self.cargar_productos_desde_bd()
 
-    def on_notificacion_proveedor(self, data):
-        self.cargar_proveedores_bd()
-    
     def setup_ui(self):
         main_layout = QVBoxLayout()
         main_layout.setContentsMargins(10, 10, 10, 10)
@@ -306,10 +354,8 @@ class InventarioWindow(QDialog):
             
             layout.addLayout(header_layout)
             
-            self.tabla_productos_model = QStandardItemModel()
-            self.tabla_productos_model.setHorizontalHeaderLabels([
-                "ID", "Código", "Nombre", "Categoría", "Stock", "P. Venta", "Estado"
-            ])
+            # Modelo por columnas: las celdas se calculan solo al pintarse
+            self.tabla_productos_model = ModeloTablaColumnar(COLUMNAS_PRODUCTOS, self)
             
             self.tabla_productos = QTableView()
             self.tabla_productos.setModel(self.tabla_productos_model)
@@ -456,10 +502,7 @@ class InventarioWindow(QDialog):
         filtros_layout.addStretch()
         layout.addLayout(filtros_layout)
         
-        self.tabla_movimientos_model = QStandardItemModel()
-        self.tabla_movimientos_model.setHorizontalHeaderLabels([
-            "ID", "Fecha", "Tipo", "Producto", "Cantidad", "Usuario", "Motivo"
-        ])
+        self.tabla_movimientos_model = ModeloTablaColumnar(COLUMNAS_MOVIMIENTOS, self)
         
         self.tabla_movimientos = QTableView()
         self.tabla_movimientos.setModel(self.tabla_movimientos_model)
@@ -624,7 +667,7 @@ class InventarioWindow(QDialog):
         producto = db_helper.crear_producto(datos)
         
         if producto:
-            self.cargar_productos_desde_bd()
+            catalogos.aplicar('productos', producto)
             self.limpiar_formulario_producto()
             self.spin_stock_actual.setReadOnly(True)
             self.mostrar_exito("Producto agregado correctamente.")
@@ -661,7 +704,7 @@ class InventarioWindow(QDialog):
         producto = db_helper.actualizar_producto(self.producto_en_edicion_id, datos)
         
         if producto:
-            self.cargar_productos_desde_bd() 
+            catalogos.aplicar('productos', producto)
             self.limpiar_formulario_producto()
             self.spin_stock_actual.setReadOnly(True)
             self.mostrar_exito("Producto actualizado correctamente.")
@@ -674,9 +717,8 @@ class InventarioWindow(QDialog):
             self.mostrar_advertencia("Seleccione un producto.")
             return
         
-        producto_id = int(self.tabla_productos_model.item(fila, 0).text())
-        productos = db_helper.get_productos()
-        producto = next((p for p in productos if p['id'] == producto_id), None)
+        producto_id = self.tabla_productos_model.registro(fila)['id']
+        producto = catalogos.obtener('productos', producto_id)
         
         if producto:
             self.cargar_datos_formulario_producto(producto)
@@ -691,9 +733,8 @@ class InventarioWindow(QDialog):
             self.mostrar_advertencia("Seleccione un producto.")
             return
         
-        producto_id = int(self.tabla_productos_model.item(fila, 0).text())
-        productos = db_helper.get_productos()
-        producto = next((p for p in productos if p['id'] == producto_id), None)
+        producto_id = self.tabla_productos_model.registro(fila)['id']
+        producto = catalogos.obtener('productos', producto_id)
         nombre_producto = producto['nombre'] if producto else f"ID {producto_id}"
         
         if producto:
@@ -705,7 +746,7 @@ class InventarioWindow(QDialog):
             
             if respuesta == QMessageBox.Yes:
                 if db_helper.eliminar_producto(producto_id):
-                    self.cargar_productos_desde_bd()
+                    catalogos.eliminar('productos', producto_id)
                     self.limpiar_formulario_producto()
                     self.mostrar_exito("Producto eliminado.")
                 else:
@@ -717,10 +758,9 @@ class InventarioWindow(QDialog):
             self.mostrar_advertencia("Seleccione un producto.")
             return
         
-        producto_id = int(self.tabla_productos_model.item(fila, 0).text())
+        producto_id = self.tabla_productos_model.registro(fila)['id']
         
-        productos = db_helper.get_productos()
-        producto = next((p for p in productos if p['id'] == producto_id), None)
+        producto = catalogos.obtener('productos', producto_id)
         
         if producto:
             cantidad, ok = QInputDialog.getInt(
@@ -737,7 +777,7 @@ class InventarioWindow(QDialog):
                 
                 if ok2:
                     if db_helper.registrar_movimiento_inventario(producto_id, "Entrada", cantidad, motivo, "Admin"):
-                        self.cargar_productos_desde_bd() 
+                        catalogos.recargar('productos')
                         self.mostrar_exito(f"Se agregaron {cantidad} unidades.")
                     else:
                         self.mostrar_error("No se pudo registrar la entrada.")
@@ -748,10 +788,9 @@ class InventarioWindow(QDialog):
             self.mostrar_advertencia("Seleccione un producto.")
             return
         
-        producto_id = int(self.tabla_productos_model.item(fila, 0).text())
+        producto_id = self.tabla_productos_model.registro(fila)['id']
         
-        productos = db_helper.get_productos()
-        producto = next((p for p in productos if p['id'] == producto_id), None)
+        producto = catalogos.obtener('productos', producto_id)
         
         if producto:
             stock_actual = producto.get('stock_actual', 0)
@@ -773,52 +812,17 @@ class InventarioWindow(QDialog):
                 
                 if ok2:
                     if db_helper.registrar_movimiento_inventario(producto_id, "Salida", cantidad, motivo, "Admin"):
-                        self.cargar_productos_desde_bd() 
+                        catalogos.recargar('productos')
                         self.mostrar_exito(f"Se retiraron {cantidad} unidades.")
                     else:
                         self.mostrar_error("No se pudo registrar la salida.")
     
     def cargar_proveedores_bd(self):
         try:
-            proveedores = db_helper.get_proveedores()
-            self.proveedores_dict.clear()
-            
-            nombres_proveedores = []
-            for prov in proveedores:
-                nombre = prov.get('nombre', 'Sin Nombre')
-                tipo = prov.get('tipo', 'Sin Tipo')
-                nombre_completo = f"{nombre} - {tipo}"
-                nombres_proveedores.append(nombre_completo)
-                self.proveedores_dict[nombre_completo] = prov.get('id')
-            
-            completer = QCompleter(nombres_proveedores)
-            completer.setCaseSensitivity(Qt.CaseInsensitive)
-            completer.setFilterMode(Qt.MatchContains)
-            completer.setMaxVisibleItems(9)
-            completer.popup().setStyleSheet("""
-                QListView {
-                    background-color: white;
-                    border: 2px solid #2CD5C4;
-                    border-radius: 4px;
-                    padding: 5px;
-                    font-size: 16px;
-                    min-height: 60px;
-                }
-                QListView::item {
-                    padding: 10px;
-                    border-radius: 3px;
-                    min-height: 30px;
-                }
-                QListView::item:hover {
-                    background-color: #E0F7FA;
-                }
-                QListView::item:selected {
-                    background-color: #2CD5C4;
-                    color: white;
-                }
-            """)
-            
-            self.txt_proveedor.setCompleter(completer)
+            # Dict y autocompletado compartidos (gui/catalogos.py)
+            self.proveedores_dict = catalogos.etiquetas('proveedores')
+            if self.txt_proveedor.completer() is None:
+                self.txt_proveedor.setCompleter(catalogos.completer('proveedores', self))
             
         except Exception as e:
             self.mostrar_error(f"Error al cargar proveedores: {e}")
@@ -826,44 +830,12 @@ class InventarioWindow(QDialog):
     def actualizar_tabla_productos(self, productos=None):
         if productos is None:
             try:
-                productos = db_helper.get_productos()
+                productos = catalogos.lista('productos')
             except Exception as e:
                 self.mostrar_error(f"No se pudo leer productos: {e}")
                 return
 
-        self.tabla_productos_model.clear()
-        self.tabla_productos_model.setHorizontalHeaderLabels([
-            "ID", "Código", "Nombre", "Categoría", "Stock", "P. Venta", "Estado"
-        ])
-        
-        for producto in productos:
-            stock_actual = producto.get('stock_actual', 0)
-            stock_min = producto.get('stock_min', 0)
-            
-            if stock_actual == 0:
-                estado = "SIN STOCK"
-                color_estado = QColor(255, 107, 107)
-            elif stock_actual <= stock_min:
-                estado = "BAJO"
-                color_estado = QColor(255, 177, 66)
-            else:
-                estado = "OK"
-                color_estado = QColor(46, 213, 196)
-            
-            fila = [
-                self._crear_item(producto.get('id', 'N/A'), Qt.AlignCenter),
-                self._crear_item(producto.get('codigo', 'N/A'), Qt.AlignCenter),
-                self._crear_item(producto.get('nombre', 'N/A'), Qt.AlignLeft | Qt.AlignVCenter),
-                self._crear_item(producto.get('categoria', 'N/A'), Qt.AlignCenter),
-                self._crear_item(stock_actual, Qt.AlignCenter),
-                self._crear_item(f"${producto.get('precio_venta', 0):.2f}", Qt.AlignRight | Qt.AlignVCenter),
-                self._crear_item(estado, Qt.AlignCenter)
-            ]
-            
-            fila[6].setBackground(color_estado)
-            fila[6].setForeground(QColor(255, 255, 255))
-            
-            self.tabla_productos_model.appendRow(fila)
+        self.tabla_productos_model.cargar(productos)
     
     def actualizar_tabla_movimientos(self):
         try:
@@ -879,40 +851,8 @@ class InventarioWindow(QDialog):
             self.mostrar_error(f"No se pudo leer movimientos: {e}")
             return
 
-        self.tabla_movimientos_model.clear()
-        self.tabla_movimientos_model.setHorizontalHeaderLabels([
-            "ID", "Fecha", "Tipo", "Producto", "Cantidad", "Usuario", "Motivo"
-        ])
-        
-        for mov in reversed(movimientos):
-            
-            fecha_str = mov.get('fecha', 'N/A')
-            if fecha_str != 'N/A' and fecha_str:
-                try:
-                    fecha_dt = datetime.fromisoformat(fecha_str)
-                    fecha_str = fecha_dt.strftime("%d/%m/%Y %H:%M")
-                except ValueError:
-                    pass 
-            
-            fila = [
-                self._crear_item(mov.get('id', 'N/A'), Qt.AlignCenter),
-                self._crear_item(fecha_str, Qt.AlignCenter), # <-- LÍNEA NUEVA
-                self._crear_item(mov.get('tipo', 'N/A'), Qt.AlignCenter),
-                self._crear_item(mov.get('producto', 'N/A'), Qt.AlignLeft | Qt.AlignVCenter),
-                self._crear_item(mov.get('cantidad', 0), Qt.AlignCenter),
-                self._crear_item(mov.get('usuario', 'N/A'), Qt.AlignCenter),
-                self._crear_item(mov.get('motivo', ''), Qt.AlignLeft | Qt.AlignVCenter)
-            ]
-            
-            tipo = mov.get('tipo')
-            if tipo == "Entrada":
-                fila[2].setBackground(QColor(46, 213, 196))
-                fila[2].setForeground(QColor(255, 255, 255))
-            else:
-                fila[2].setBackground(QColor(255, 107, 107))
-                fila[2].setForeground(QColor(255, 255, 255))
-            
-            self.tabla_movimientos_model.appendRow(fila)
+        # Más recientes primero
+        self.tabla_movimientos_model.cargar(list(reversed(movimientos)))
     
     def actualizar_alertas(self):
         try:
@@ -942,7 +882,7 @@ class InventarioWindow(QDialog):
             
             # CORRECCIÓN 2: Crear los items para las nuevas columnas
             # (El 'proveedor_nombre' y 'precio_compra' vienen del API gracias a los
-            # cambios que hicimos en server/main.py en _producto_to_dict)
+            # cambios que hicimos en ProductoSalida, server/esquemas.py)
             item_proveedor = self._crear_item(producto.get('proveedor_nombre', 'N/A'), Qt.AlignLeft | Qt.AlignVCenter)
             item_precio = self._crear_item(f"${producto.get('precio_compra', 0):,.2f}", Qt.AlignRight | Qt.AlignVCenter)
 
@@ -973,11 +913,10 @@ class InventarioWindow(QDialog):
             return
         
         fila = current.row()
-        producto_id = int(self.tabla_productos_model.item(fila, 0).text())
+        producto_id = self.tabla_productos_model.registro(fila)['id']
 
         try:
-            productos = db_helper.get_productos()
-            producto = next((p for p in productos if p['id'] == producto_id), None)
+            producto = catalogos.obtener('productos', producto_id)
         except Exception as e:
             print(f"Error al leer producto para panel: {e}")
             return
@@ -1030,40 +969,8 @@ class InventarioWindow(QDialog):
             self.mostrar_error(f"No se pudo filtrar movimientos: {e}")
             return
         
-        self.tabla_movimientos_model.clear()
-        self.tabla_movimientos_model.setHorizontalHeaderLabels([
-            "ID", "Fecha", "Tipo", "Producto", "Cantidad", "Usuario", "Motivo"
-        ])
-        
-        for mov in reversed(movimientos):
-
-            fecha_str = mov.get('fecha', 'N/A')
-            if fecha_str != 'N/A' and fecha_str:
-                try:
-                    fecha_dt = datetime.fromisoformat(fecha_str)
-                    fecha_str = fecha_dt.strftime("%d/%m/%Y %H:%M")
-                except ValueError:
-                    pass
-            
-            fila = [
-                self._crear_item(mov.get('id', 'N/A'), Qt.AlignCenter),
-                self._crear_item(fecha_str, Qt.AlignCenter), # <-- LÍNEA NUEVA
-                self._crear_item(mov.get('tipo', 'N/A'), Qt.AlignCenter),
-                self._crear_item(mov.get('producto', 'N/A'), Qt.AlignLeft | Qt.AlignVCenter),
-                self._crear_item(mov.get('cantidad', 0), Qt.AlignCenter),
-                self._crear_item(mov.get('usuario', 'N/A'), Qt.AlignCenter),
-                self._crear_item(mov.get('motivo', ''), Qt.AlignLeft | Qt.AlignVCenter)
-            ]
-            
-            tipo = mov.get('tipo')
-            if tipo == "Entrada":
-                fila[2].setBackground(QColor(46, 213, 196))
-                fila[2].setForeground(QColor(255, 255, 255))
-            else:
-                fila[2].setBackground(QColor(255, 107, 107))
-                fila[2].setForeground(QColor(255, 255, 255))
-            
-            self.tabla_movimientos_model.appendRow(fila)
+        # Más recientes primero
+        self.tabla_movimientos_model.cargar(list(reversed(movimientos)))
     
     def cargar_datos_formulario_producto(self, producto):
         self.txt_id_prod.setText(str(producto.get('id', '')))
@@ -1100,7 +1007,7 @@ class InventarioWindow(QDialog):
         
         if not self.modo_edicion:
             try:
-                productos = db_helper.get_productos()
+                productos = catalogos.lista('productos')
                 if any(p.get('codigo') == self.txt_codigo.text().strip() for p in productos):
                     self.mostrar_error("El código ya existe.")
                     self.txt_codigo.setFocus()
@@ -12,6 +12,8 @@ class LoginWindow(QDialog):
         super().__init__()
         self.db_helper = db_helper        
         self.usuario_logueado = None
+        # Configuración y catálogos en un solo viaje; las ventanas los toman de ahí
+        self.db_helper.cargar_bootstrap()
         
         self.setWindowTitle("Iniciar Sesión")
         self.setWindowFlags(self.windowFlags() | Qt.WindowMinimizeButtonHint | Qt.WindowMaximizeButtonHint)
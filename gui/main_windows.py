@@ -11,6 +11,7 @@ from gui.reportes_windows import ReportesWindow
 from gui.configuracion_windows import ConfiguracionWindow
 
 from gui.utils import recolor_icon
+from gui.api_client import api_client
 
 # Importar los estilos desde styles.py
 from gui.styles import MAIN_WINDOW_GRADIENT, ROUNDED_FRAME, BUTTON_STYLE_2
@@ -157,6 +158,9 @@ class MainWindow(QDialog):
         """Tarea en segundo plano para instanciar todas las ventanas."""
         print("Pre-calentando ventanas en segundo plano...")
         try:
+            # Una sola petición para los catálogos de todas las ventanas
+            api_client.cargar_bootstrap()
+
             if self.window_instances["administracion"] is None:
                 self.window_instances["administracion"] = AdministracionWindow(self, self.usuario_actual)
                 # Pre-calentar las sub-ventanas de admin
@@ -0,0 +1,150 @@
+"""
+Modelo de tabla por columnas para listas grandes.
+
+En lugar de crear un QStandardItem por celda, cada columna guarda un
+arreglo con su valor de ordenamiento (se calcula una sola vez al cargar)
+y el texto, la alineación y los colores se calculan en data() solo para
+las celdas que la vista pinta. Las filas se entregan a la vista por
+bloques con canFetchMore/fetchMore, así que abrir una tabla de 100 000
+registros solo construye lo que cabe en pantalla.
+
+Uso:
+    columnas = [
+        Columna("Folio", lambda n: n['folio']),
+        Columna("Total", lambda n: n['total'], texto=lambda v: f"${v:.2f}",
+                alineacion=Qt.AlignRight | Qt.AlignVCenter),
+    ]
+    modelo = ModeloTablaColumnar(columnas)
+    tabla.setModel(modelo)
+    modelo.cargar(registros)
+    registro = modelo.registro(tabla.currentIndex().row())
+
+Con bloque=None todas las filas se entregan al cargar; es lo que necesita
+un QSortFilterProxyModel encima, que solo filtra y ordena las filas que el
+modelo ya entregó.
+"""
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, Qt
+
+BLOQUE_FILAS = 500
+
+
+class Columna:
+    """Definición de una columna: de dónde sale el valor y cómo se muestra"""
+
+    __slots__ = ('titulo', 'valor', 'texto', 'alineacion', 'fondo', 'frente')
+
+    def __init__(self, titulo: str, valor: Callable[[Dict], Any],
+                 texto: Optional[Callable[[Any], str]] = None,
+                 alineacion=Qt.AlignCenter,
+                 fondo: Optional[Callable[[Any], Any]] = None,
+                 frente: Optional[Callable[[Any], Any]] = None):
+        self.titulo = titulo
+        self.valor = valor          # registro -> valor (también se usa para ordenar)
+        self.texto = texto          # valor -> texto mostrado (str() por defecto)
+        self.alineacion = alineacion
+        self.fondo = fondo          # valor -> QColor o None
+        self.frente = frente        # valor -> QColor o None
+
+
+def _clave_orden(valor):
+    # None al final y sin comparar tipos distintos entre sí
+    return (valor is None, valor if valor is not None else 0)
+
+
+class ModeloTablaColumnar(QAbstractTableModel):
+    """Tabla de solo lectura con almacenamiento por columnas y carga incremental"""
+
+    def __init__(self, columnas: Sequence[Columna], parent=None, bloque: Optional[int] = BLOQUE_FILAS):
+        super().__init__(parent)
+        self.columnas = list(columnas)
+        self.bloque = bloque
+        self._registros: List[Dict] = []
+        self._valores: List[List[Any]] = [[] for _ in self.columnas]
+        self._orden: List[int] = []      # fila mostrada -> posición en los arreglos
+        self._visibles = 0               # filas ya entregadas a la vista
+
+    # ---------- Datos ----------
+
+    def cargar(self, registros: Sequence[Dict]):
+        """Reemplaza todo el contenido de la tabla"""
+        self.beginResetModel()
+        self._registros = list(registros)
+        self._valores = [[columna.valor(r) for r in self._registros] for columna in self.columnas]
+        self._orden = list(range(len(self._registros)))
+        self._visibles = len(self._registros) if self.bloque is None else min(self.bloque, len(self._registros))
+        self.endResetModel()
+
+    def limpiar(self):
+        self.cargar([])
+
+    def registro(self, fila: int) -> Optional[Dict]:
+        """Registro original mostrado en la fila (None si la fila no existe)"""
+        if 0 <= fila < self._visibles:
+            return self._registros[self._orden[fila]]
+        return None
+
+    def valor(self, fila: int, columna: int) -> Any:
+        return self._valores[columna][self._orden[fila]]
+
+    def texto(self, fila: int, columna: int) -> str:
+        valor = self.valor(fila, columna)
+        formato = self.columnas[columna].texto
+        return formato(valor) if formato else ('' if valor is None else str(valor))
+
+    def total_registros(self) -> int:
+        """Registros cargados, incluidos los que la vista aún no ha pedido"""
+        return len(self._registros)
+
+    # ---------- QAbstractTableModel ----------
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._visibles
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columnas)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        fila, col = index.row(), index.column()
+        columna = self.columnas[col]
+        if role == Qt.DisplayRole:
+            return self.texto(fila, col)
+        if role == Qt.UserRole:
+            return self.valor(fila, col)
+        if role == Qt.TextAlignmentRole:
+            return int(columna.alineacion)
+        if role == Qt.BackgroundRole and columna.fondo:
+            return columna.fondo(self.valor(fila, col))
+        if role == Qt.ForegroundRole and columna.frente:
+            return columna.frente(self.valor(fila, col))
+        return None
+
+    def headerData(self, seccion, orientacion, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientacion == Qt.Horizontal and seccion < len(self.columnas):
+            return self.columnas[seccion].titulo
+        return super().headerData(seccion, orientacion, role)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._visibles < len(self._registros)
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+        nuevas = min(self.bloque, len(self._registros) - self._visibles)
+        if nuevas <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self._visibles, self._visibles + nuevas - 1)
+        self._visibles += nuevas
+        self.endInsertRows()
+
+    def sort(self, columna, orden=Qt.AscendingOrder):
+        """Ordena todos los registros (no solo los visibles) por el valor de la columna"""
+        if not 0 <= columna < len(self.columnas):
+            return
+        valores = self._valores[columna]
+        self.layoutAboutToBeChanged.emit()
+        self._orden.sort(key=lambda i: _clave_orden(valores[i]), reverse=(orden == Qt.DescendingOrder))
+        self.layoutChanged.emit()
@@ -5,14 +5,14 @@ from PyQt5.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QPushButton, QSizePolicy, QApplication,
     QLabel, QLineEdit, QGridLayout, QGroupBox, QDoubleSpinBox, QMessageBox,
     QTableView, QHeaderView, QMenu, QAction, QFrame, QWidget, QDateEdit, 
-    QCompleter, QInputDialog, QFileDialog
+    QInputDialog, QFileDialog
 )
 from PyQt5.QtCore import Qt, QDate, QTimer
 from PyQt5.QtGui import QDoubleValidator, QStandardItemModel, QStandardItem, QColor, QFont
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from gui.api_client import api_client as db_helper
-from gui.websocket_client import ws_client
+from gui.catalogos import catalogos
 
 from gui.styles import (
     SECONDARY_WINDOW_GRADIENT, BUTTON_STYLE_2, GROUP_BOX_STYLE, LABEL_STYLE,
@@ -54,14 +54,12 @@ class NotasProveedoresWindow(QDialog):
         
         self.proveedores_dict = {}
         self.nota_actual_id = None
+        self.version_actual = None  # Para detectar cambios de otro usuario al guardar
         self.modo_edicion = False
         self._datos_cargados = False
 
         self.setup_ui()
         self.conectar_senales()
-        
-        if ws_client:
-            ws_client.proveedor_creado.connect(self.on_notificacion_proveedor)
 
         self.nueva_nota() 
         QTimer.singleShot(100, self._cargar_datos_inicial)
@@ -71,9 +69,6 @@ class NotasProveedoresWindow(QDialog):
             self.cargar_proveedores_bd()
             self._datos_cargados = True
 
-    def on_notificacion_proveedor(self, data):
-        self.cargar_proveedores_bd()
-    
     def on_notificacion_nota(self, data):
         if self.nota_actual_id and data.get('id') == self.nota_actual_id:
             print(f"Recargando nota proveedor {self.nota_actual_id} por notificación.")
@@ -448,46 +443,10 @@ class NotasProveedoresWindow(QDialog):
     
     def cargar_proveedores_bd(self):
         try:
-            proveedores = db_helper.get_proveedores() 
-            self.proveedores_dict.clear() 
-            
-            nombres_proveedores = [] 
-            for proveedor in proveedores:
-                nombre = proveedor.get('nombre', 'Proveedor Desconocido')
-                tipo = proveedor.get('tipo', 'Sin Tipo')
-                
-                nombre_completo = f"{nombre} - {tipo}"
-                nombres_proveedores.append(nombre_completo)
-                self.proveedores_dict[nombre_completo] = proveedor['id']
-            
-            completer = QCompleter(nombres_proveedores)
-            completer.setCaseSensitivity(Qt.CaseInsensitive)
-            completer.setFilterMode(Qt.MatchContains)
-            completer.setMaxVisibleItems(9)
-            completer.popup().setStyleSheet("""
-                QListView {
-                    background-color: white;
-                    border: 2px solid #2CD5C4;
-                    border-radius: 4px;
-                    padding: 5px;
-                    font-size: 16px;
-                    min-height: 60px;
-                }
-                QListView::item {
-                    padding: 10px;
-                    border-radius: 3px;
-                    min-height: 30px;
-                }
-                QListView::item:hover {
-                    background-color: #E0F7FA;
-                }
-                QListView::item:selected {
-                    background-color: #2CD5C4;
-                    color: white;
-                }
-            """)
-            
-            self.txt_proveedor.setCompleter(completer) 
+            # Dict y autocompletado compartidos (gui/catalogos.py)
+            self.proveedores_dict = catalogos.etiquetas('proveedores')
+            if self.txt_proveedor.completer() is None:
+                self.txt_proveedor.setCompleter(catalogos.completer('proveedores', self))
             
         except Exception as e:
             self.mostrar_error(f"Error al cargar proveedores: {e}")
@@ -542,6 +501,7 @@ class NotasProveedoresWindow(QDialog):
                 items.append(item_data)
             
             if self.modo_edicion and self.nota_actual_id:
+                nota_data['version'] = self.version_actual
                 nota = db_helper.actualizar_nota_proveedor(self.nota_actual_id, nota_data, items)
                 mensaje = "Nota actualizada correctamente"
             else:
@@ -561,6 +521,7 @@ class NotasProveedoresWindow(QDialog):
 
     def nueva_nota(self):
             self.nota_actual_id = None
+            self.version_actual = None
             self.modo_edicion = False
             self.txt_folio.clear()
             self.txt_folio.setPlaceholderText("NP-Auto")
@@ -617,6 +578,7 @@ class NotasProveedoresWindow(QDialog):
             return
 
         self.nota_actual_id = nota['id']
+        self.version_actual = nota.get('version')
         self.modo_edicion = False
         
         self.txt_folio.setText(nota['folio'])
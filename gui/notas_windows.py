@@ -5,13 +5,15 @@ from PyQt5.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QPushButton, QSizePolicy, QApplication,
     QLabel, QLineEdit, QGridLayout, QGroupBox, QDoubleSpinBox, QMessageBox,
     QTableView, QHeaderView, QMenu, QAction, QFrame, QWidget, QDateEdit, 
-    QCompleter, QInputDialog, QFileDialog
+    QInputDialog, QFileDialog
 )
 from PyQt5.QtCore import Qt, QDate, QTimer
 from PyQt5.QtGui import QDoubleValidator, QStandardItemModel, QStandardItem, QColor
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from gui.api_client import api_client as db_helper
+from gui.catalogos import catalogos
+from gui.autocompletado import CompletadorDescripciones
 from gui.websocket_client import ws_client
 from gui.styles import (
     SECONDARY_WINDOW_GRADIENT, BUTTON_STYLE_2, GROUP_BOX_STYLE, LABEL_STYLE,
@@ -51,6 +53,7 @@ class NotasWindow(QDialog):
         self.tipo_por_fila = {}
         self.clientes_dict = {}
         self.nota_actual_id = None
+        self.version_actual = None  # Para detectar cambios de otro usuario al guardar
         self.modo_edicion = False
         self._datos_cargados = False  # Flag para evitar recargas
 
@@ -62,8 +65,6 @@ class NotasWindow(QDialog):
         
         # WebSocket al final
         if ws_client:
-            ws_client.cliente_creado.connect(self.on_notificacion_cliente)
-            ws_client.cliente_actualizado.connect(self.on_notificacion_cliente)
             ws_client.nota_creada.connect(self.on_notificacion_nota)
     
     def _cargar_datos_inicial(self):
@@ -72,9 +73,6 @@ class NotasWindow(QDialog):
             self.cargar_clientes_bd()
             self._datos_cargados = True
 
-    def on_notificacion_cliente(self, data):
-        self.cargar_clientes_bd()
-
     def on_notificacion_nota(self, data):
         if self.nota_actual_id and data.get('id') == self.nota_actual_id:
             try:
@@ -194,6 +192,7 @@ class NotasWindow(QDialog):
         self.txt_descripcion.setStyleSheet(INPUT_STYLE)
         self.txt_descripcion.setPlaceholderText("Ingrese descripción")
         grid_layout.addWidget(self.txt_descripcion, 1, 1)
+        self.completador_descripcion = CompletadorDescripciones(self.txt_descripcion)
         
         self.txt_precio = QLineEdit()
         self.txt_precio.setStyleSheet(INPUT_STYLE)
@@ -367,31 +366,10 @@ class NotasWindow(QDialog):
     
     def cargar_clientes_bd(self):
         try:
-            clientes = db_helper.get_clientes()
-            self.clientes_dict.clear()
-            
-            nombres_clientes = [f"{c['nombre']} - {c['tipo']}" for c in clientes]
-            for nombre, cliente in zip(nombres_clientes, clientes):
-                self.clientes_dict[nombre] = cliente['id']
-            
-            completer = QCompleter(nombres_clientes)
-            completer.setCaseSensitivity(Qt.CaseInsensitive)
-            completer.setFilterMode(Qt.MatchContains)
-            completer.setMaxVisibleItems(9)
-            completer.popup().setStyleSheet("""
-                QListView {
-                    background-color: white;
-                    border: 2px solid #2CD5C4;
-                    border-radius: 4px;
-                    padding: 5px;
-                    font-size: 16px;
-                }
-                QListView::item { padding: 10px; min-height: 30px; }
-                QListView::item:hover { background-color: #E0F7FA; }
-                QListView::item:selected { background-color: #2CD5C4; color: white; }
-            """)
-            
-            self.txt_cliente.setCompleter(completer)
+            # Dict y autocompletado compartidos (gui/catalogos.py)
+            self.clientes_dict = catalogos.etiquetas('clientes')
+            if self.txt_cliente.completer() is None:
+                self.txt_cliente.setCompleter(catalogos.completer('clientes', self))
             
         except Exception as e:
             self.mostrar_error(f"Error al cargar clientes: {e}")
@@ -434,6 +412,7 @@ class NotasWindow(QDialog):
                 })
             
             if self.modo_edicion and self.nota_actual_id:
+                nota_data['version'] = self.version_actual
                 nota = db_helper.actualizar_nota(self.nota_actual_id, nota_data, items)
                 mensaje = "Nota actualizada"
             else:
@@ -451,6 +430,7 @@ class NotasWindow(QDialog):
     
     def nueva_nota(self):
         self.nota_actual_id = None
+        self.version_actual = None
         self.modo_edicion = False
         self.txt_folio.clear()
         self.txt_folio.setPlaceholderText("NV-Auto")
@@ -507,6 +487,7 @@ class NotasWindow(QDialog):
     
     def cargar_nota_en_formulario(self, nota):
         self.nota_actual_id = nota['id']
+        self.version_actual = nota.get('version')
         self.modo_edicion = False
         
         self.txt_folio.setText(nota['folio'])
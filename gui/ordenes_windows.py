@@ -9,7 +9,7 @@ from PyQt5.QtWidgets import (
     QMenu, QAction, QFrame, QWidget, QDateEdit,
     QComboBox,
     QInputDialog,
-    QCompleter, QFileDialog
+    QFileDialog
 )
 from PyQt5.QtCore import Qt, QDate, QTimer
 from PyQt5.QtGui import QStandardItemModel, QStandardItem, QColor, QFont
@@ -24,12 +24,15 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 try:
     from gui.api_client import api_client as db_helper
+    from gui.catalogos import catalogos
     from gui.websocket_client import ws_client
 
 except ImportError:
     print("Error: No se pudo importar 'api_client' o 'ws_client'.") 
     db_helper = None 
 
+from gui.autocompletado import CompletadorDescripciones
+
 try:
     from dialogs.buscar_ordenes_dialog import BuscarOrdenesDialog
 except ImportError as e:
@@ -69,8 +72,6 @@ class OrdenesWindow(QDialog):
         self.conectar_senales()
         
         if ws_client:
-            ws_client.cliente_creado.connect(self.on_notificacion_cliente)
-            ws_client.cliente_actualizado.connect(self.on_notificacion_cliente)
             ws_client.orden_creada.connect(self.on_notificacion_orden) 
         
         self.nueva_orden()
@@ -82,9 +83,6 @@ class OrdenesWindow(QDialog):
             self.cargar_clientes_bd()
             self._datos_cargados = True
 
-    def on_notificacion_cliente(self, data):
-        self.cargar_clientes_bd()
-
     def on_notificacion_orden(self, data):
         if self.orden_actual_id and data.get('id') == self.orden_actual_id:
             print(f"Recargando orden {self.orden_actual_id} por notificación remota.")
@@ -219,6 +217,7 @@ class OrdenesWindow(QDialog):
         self.txt_descripcion.setStyleSheet(INPUT_STYLE)
         self.txt_descripcion.setPlaceholderText("Descripción del trabajo a realizar")
         grid_layout.addWidget(self.txt_descripcion, 1, 1)
+        self.completador_descripcion = CompletadorDescripciones(self.txt_descripcion)
         
         self.btn_agregar = QPushButton("Agregar")
         self.btn_agregar.setStyleSheet(FORM_BUTTON_STYLE)
@@ -372,43 +371,10 @@ class OrdenesWindow(QDialog):
         if not db_helper: return
         
         try:
-            clientes = db_helper.get_clientes()
-            self.clientes_dict.clear()
-            nombres_clientes = []
-            
-            for cliente in clientes:
-                nombre_completo = f"{cliente['nombre']} - {cliente['tipo']}"
-                nombres_clientes.append(nombre_completo)
-                self.clientes_dict[nombre_completo] = cliente['id']
-            
-            completer = QCompleter(nombres_clientes)
-            completer.setCaseSensitivity(Qt.CaseInsensitive)
-            completer.setFilterMode(Qt.MatchContains)
-            completer.setMaxVisibleItems(9)
-            completer.popup().setStyleSheet("""
-                QListView {
-                    background-color: white;
-                    border: 2px solid #2CD5C4;
-                    border-radius: 4px;
-                    padding: 5px;
-                    font-size: 16px;
-                    min-height: 60px;
-                }
-                QListView::item {
-                    padding: 10px;
-                    border-radius: 3px;
-                    min-height: 30px;
-                }
-                QListView::item:hover {
-                    background-color: #E0F7FA;
-                }
-                QListView::item:selected {
-                    background-color: #2CD5C4;
-                    color: white;
-                }
-            """)
-            
-            self.txt_cliente.setCompleter(completer)
+            # Dict y autocompletado compartidos (gui/catalogos.py)
+            self.clientes_dict = catalogos.etiquetas('clientes')
+            if self.txt_cliente.completer() is None:
+                self.txt_cliente.setCompleter(catalogos.completer('clientes', self))
             
         except Exception as e:
             self.mostrar_error(f"Error al cargar clientes: {e}")
@@ -464,6 +430,7 @@ class OrdenesWindow(QDialog):
         
         try:
             if self.orden_actual_id:
+                orden_data['version'] = (self.orden_actual_obj or {}).get('version')
                 orden = db_helper.actualizar_orden(self.orden_actual_id, orden_data, items_a_guardar)
                 if not orden:
                     raise Exception("La API no devolvió la orden actualizada.")
@@ -899,15 +866,6 @@ class OrdenesWindow(QDialog):
         if self.orden_actual_obj.get('nota_folio'):
             self.mostrar_advertencia(f"Ya se generó una Nota de Venta para esta orden (Folio Nota: {self.orden_actual_obj['nota_folio']}).")
             return
-        
-        try:
-            notas_existentes = db_helper.buscar_notas(orden_folio=self.txt_folio.text())
-            if notas_existentes:
-                self.mostrar_advertencia(f"Ya se generó una Nota de Venta para esta orden (Folio Nota: {notas_existentes[0]['folio']}).")
-                return
-        except Exception as e:
-            self.mostrar_error(f"Error al verificar notas existentes: {e}")
-            return
 
         respuesta = QMessageBox.question(
             self, "Confirmar Generación", 
@@ -920,88 +878,24 @@ class OrdenesWindow(QDialog):
         if respuesta == QMessageBox.No:
             return
 
-        nombre_cliente = self.txt_cliente.text()
-        cliente_id = self.clientes_dict.get(nombre_cliente, None)
-        
-        if not cliente_id:
-            self.mostrar_advertencia("El cliente seleccionado no es válido.")
-            return
-
-        marca = self.txt_marca.text()
-        modelo = self.txt_modelo.text()
-        ano = self.txt_ano.text()
-        placa = self.txt_placa.text()
-        
-        observaciones_list = []
-        if marca: observaciones_list.append(f"Marca: {marca}")
-        if modelo: observaciones_list.append(f"Modelo: {modelo}")
-        if ano: observaciones_list.append(f"Año: {ano}")
-        if placa: observaciones_list.append(f"Placa: {placa}")
-        
-        observaciones_str = ", ".join(observaciones_list)
-        
-        nota_data = {
-            'cliente_id': cliente_id,
-            'fecha': datetime.now().strftime('%Y-%m-%d'),
-            'observaciones': observaciones_str,
-            'metodo_pago': None 
-        }
-
-        items_para_nota = []
-        for fila in range(self.tabla_model.rowCount()):
-            tipo = self.tipo_por_fila.get(fila, 'normal')
-            
-            if tipo == 'normal':
-                try:
-                    cantidad_str = self.tabla_model.item(fila, 0).text()
-                    cantidad = int(float(cantidad_str))
-                    descripcion = self.tabla_model.item(fila, 1).text()
-                    
-                    items_para_nota.append({
-                        'cantidad': cantidad,
-                        'descripcion': descripcion,
-                        'precio_unitario': 0.00,
-                        'importe': 0.00,
-                        'impuesto': 16.0
-                    })
-                except Exception as e:
-                    print(f"Omitiendo fila {fila} por error al leer datos: {e}")
-
-        if not items_para_nota:
-            self.mostrar_advertencia("La orden no tiene items válidos para transferir a la nota.")
-            return
-        
+        # El servidor copia los items, crea la nota y factura la orden en una sola operación
         try:
-            nueva_nota = db_helper.crear_nota(
-                nota_data, 
-                items_para_nota,
-                cotizacion_folio=None,
-                orden_folio=self.txt_folio.text(),
-                estado='Borrador'
-            )
+            resultado = db_helper.convertir_orden_a_nota(self.orden_actual_id)
             
-            if nueva_nota and nueva_nota.get('folio'):
-                
-                datos_orden_update = {
-                    'estado': 'Facturada',
-                    'nota_folio': nueva_nota['folio']
-                }
-                orden_actualizada = db_helper.actualizar_orden_campos_simples(
-                    self.orden_actual_id, 
-                    datos_orden_update
+            if resultado and resultado.get('nota'):
+                nueva_nota = resultado['nota']
+                if resultado.get('orden'):
+                    self.cargar_orden_en_formulario(resultado['orden'])
+                self.mostrar_exito(
+                    f"Nota generada: {nueva_nota['folio']} (en estado Borrador)\n"
+                    f"Orden {self.txt_folio.text()} actualizada a 'Facturada' y bloqueada."
                 )
-                
-                if orden_actualizada:
-                    self.cargar_orden_en_formulario(orden_actualizada)
-                    self.mostrar_exito(
-                        f"Nota generada: {nueva_nota['folio']} (en estado Borrador)\n"
-                        f"Orden {self.txt_folio.text()} actualizada a 'Facturada' y bloqueada."
-                    )
-                else:
-                    self.mostrar_error("Se creó la nota, pero no se pudo actualizar la orden.")
-
             else:
-                self.mostrar_error("No se pudo crear la nota (respuesta nula de la BD).")
+                self.mostrar_error(
+                    "No se pudo crear la nota.\n"
+                    "Verifique que la orden esté guardada como 'Completada', tenga items "
+                    "y no tenga ya una nota generada."
+                )
                 
         except Exception as e:
             self.mostrar_error(f"Error al crear la nota: {e}")
@@ -0,0 +1,248 @@
+"""
+Transporte HTTP del cliente de escritorio.
+
+Envuelve la requests.Session del api_client con:
+- Timeouts separados de conexión y de lectura (un servidor caído falla en
+  ~3 s en lugar de 10 s).
+- Reintentos con backoff exponencial y jitter para llamadas idempotentes:
+  GET/PUT/DELETE y los POST que llevan Idempotency-Key. Solo se reintenta
+  ante errores de red, timeouts y 429/502/503/504.
+- Presupuesto de tiempo por llamada: no se empieza un reintento que ya no
+  cabe en él. En el hilo de la interfaz el presupuesto es PRESUPUESTO_UI y
+  un timeout de lectura no se reintenta (otros 10 s con la ventana
+  congelada); en hilos de fondo sí.
+- Circuit breaker: tras varios fallos seguidos las llamadas fallan al
+  instante durante unos segundos; después pasa una sola de prueba y si
+  responde el circuito se cierra.
+- Estadísticas de latencia por endpoint (ver TransporteHTTP.estadisticas),
+  junto con el tiempo que el servidor reporta en 'Server-Timing'; la
+  diferencia entre ambos es red y cola. Las llamadas que pasan de
+  LLAMADA_LENTA segundos se reportan en consola.
+"""
+
+import random
+import re
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+
+import requests
+
+TIMEOUT_CONEXION = 3.05
+TIMEOUT_LECTURA = 10
+REINTENTOS = 3
+BACKOFF_BASE = 0.3
+BACKOFF_MAXIMO = 4.0
+PRESUPUESTO = 25.0
+PRESUPUESTO_UI = 8.0
+STATUS_REINTENTABLES = {429, 502, 503, 504}
+
+UMBRAL_CIRCUITO = 5
+ESPERA_CIRCUITO = 15.0
+
+MUESTRAS_LATENCIA = 200
+LLAMADA_LENTA = 2.0
+
+_NUMERO_EN_RUTA = re.compile(r'/\d+(?=/|$)')
+_DURACION_TIMING = re.compile(r'(\w+);dur=([\d.]+)')
+
+
+def _server_timing(respuesta: requests.Response) -> Dict[str, float]:
+    """'app;dur=12.3, bd;dur=4.0;desc="3 sentencias"' -> {'app': 12.3, 'bd': 4.0} (ms)"""
+    return {nombre: float(ms) for nombre, ms in
+            _DURACION_TIMING.findall(respuesta.headers.get('Server-Timing', ''))}
+
+
+class CircuitoAbierto(requests.exceptions.ConnectionError):
+    """El servidor falló varias veces seguidas; no se intenta la llamada"""
+
+
+class CircuitBreaker:
+    CERRADO, ABIERTO, SEMIABIERTO = 'cerrado', 'abierto', 'semiabierto'
+
+    def __init__(self, umbral: int = UMBRAL_CIRCUITO, espera: float = ESPERA_CIRCUITO):
+        self.umbral = umbral
+        self.espera = espera
+        self.estado = self.CERRADO
+        self._fallos = 0
+        self._abierto_desde = 0.0
+        self._prueba_en_curso = False
+        self._lock = threading.Lock()
+
+    def permitir(self) -> bool:
+        with self._lock:
+            if self.estado == self.CERRADO:
+                return True
+            if self.estado == self.ABIERTO:
+                if time.monotonic() - self._abierto_desde < self.espera:
+                    return False
+                self.estado = self.SEMIABIERTO
+            # Semiabierto: solo una llamada de prueba a la vez
+            if self._prueba_en_curso:
+                return False
+            self._prueba_en_curso = True
+            return True
+
+    def exito(self):
+        with self._lock:
+            self.estado = self.CERRADO
+            self._fallos = 0
+            self._prueba_en_curso = False
+
+    def fallo(self):
+        with self._lock:
+            self._fallos += 1
+            self._prueba_en_curso = False
+            if self.estado == self.SEMIABIERTO or self._fallos >= self.umbral:
+                self.estado = self.ABIERTO
+                self._abierto_desde = time.monotonic()
+
+    def liberar(self):
+        """La llamada terminó sin saber si el servidor responde (error local)"""
+        with self._lock:
+            self._prueba_en_curso = False
+
+    def segundos_para_reintentar(self) -> float:
+        with self._lock:
+            if self.estado != self.ABIERTO:
+                return 0.0
+            return max(0.0, self.espera - (time.monotonic() - self._abierto_desde))
+
+
+class _Latencias:
+    __slots__ = ('llamadas', 'errores', 'reintentos', 'muestras', 'servidor')
+
+    def __init__(self):
+        self.llamadas = 0
+        self.errores = 0
+        self.reintentos = 0
+        self.muestras: Deque[float] = deque(maxlen=MUESTRAS_LATENCIA)
+        self.servidor: Deque[float] = deque(maxlen=MUESTRAS_LATENCIA)  # ms de Server-Timing
+
+    def resumen(self) -> Dict[str, float]:
+        orden = sorted(self.muestras)
+        n = len(orden)
+        servidor = sorted(self.servidor)
+
+        def percentil(p):
+            return round(orden[min(n - 1, int(p * n))] * 1000, 1) if n else 0.0
+
+        return {
+            "llamadas": self.llamadas,
+            "errores": self.errores,
+            "reintentos": self.reintentos,
+            "p50_ms": percentil(0.50),
+            "p95_ms": percentil(0.95),
+            "max_ms": round(orden[-1] * 1000, 1) if n else 0.0,
+            "servidor_p50_ms": servidor[len(servidor) // 2] if servidor else 0.0,
+        }
+
+
+class TransporteHTTP:
+    """Ejecuta las peticiones del api_client con reintentos, circuito y métricas"""
+
+    def __init__(self, session: requests.Session, base_url: str,
+                 timeout_conexion: float = TIMEOUT_CONEXION,
+                 timeout_lectura: float = TIMEOUT_LECTURA,
+                 reintentos: int = REINTENTOS,
+                 presupuesto: float = PRESUPUESTO):
+        self.session = session
+        self.base_url = base_url
+        self.timeout = (timeout_conexion, timeout_lectura)
+        self.reintentos = reintentos
+        self.presupuesto = presupuesto
+        self.circuito = CircuitBreaker()
+        self._latencias: Dict[Tuple[str, str], _Latencias] = {}
+        self._lock = threading.Lock()
+
+    # ---------- Métricas ----------
+
+    def _registro(self, metodo: str, endpoint: str) -> _Latencias:
+        clave = (metodo, _NUMERO_EN_RUTA.sub('/{id}', endpoint.split('?')[0]))
+        with self._lock:
+            registro = self._latencias.get(clave)
+            if registro is None:
+                registro = self._latencias[clave] = _Latencias()
+            return registro
+
+    def estadisticas(self) -> Dict[str, Dict[str, float]]:
+        """{'GET /notas/{id}': {llamadas, errores, reintentos, p50_ms, p95_ms, max_ms, servidor_p50_ms}}"""
+        with self._lock:
+            return {f"{m} {ruta}": reg.resumen() for (m, ruta), reg in sorted(self._latencias.items())}
+
+    # ---------- Peticiones ----------
+
+    @staticmethod
+    def _es_idempotente(metodo: str, headers: Optional[dict]) -> bool:
+        return metodo != 'POST' or bool(headers and headers.get('Idempotency-Key'))
+
+    def _espera(self, intento: int, respuesta: Optional[requests.Response]) -> float:
+        if respuesta is not None:
+            retry_after = respuesta.headers.get('Retry-After', '')
+            if retry_after.isdigit():
+                return min(float(retry_after), BACKOFF_MAXIMO)
+        # Backoff exponencial con "full jitter"
+        return random.uniform(0, min(BACKOFF_MAXIMO, BACKOFF_BASE * (2 ** intento)))
+
+    def solicitar(self, metodo: str, endpoint: str, **kwargs) -> requests.Response:
+        """
+        Regresa la respuesta (con status 2xx) o lanza la excepción de requests
+        del último intento. CircuitoAbierto si el servidor se considera caído.
+        """
+        registro = self._registro(metodo, endpoint)
+        intentos = 1 + (self.reintentos if self._es_idempotente(metodo, kwargs.get('headers')) else 0)
+        hilo_ui = threading.current_thread() is threading.main_thread()
+        limite = time.monotonic() + (min(self.presupuesto, PRESUPUESTO_UI) if hilo_ui else self.presupuesto)
+        kwargs.setdefault('timeout', self.timeout)
+
+        for intento in range(intentos):
+            if not self.circuito.permitir():
+                registro.errores += 1
+                raise CircuitoAbierto(
+                    f"Servidor sin respuesta; reintento en {self.circuito.segundos_para_reintentar():.0f} s")
+
+            inicio = time.monotonic()
+            respuesta = None
+            try:
+                respuesta = self.session.request(metodo, f"{self.base_url}{endpoint}", **kwargs)
+                duracion = time.monotonic() - inicio
+                registro.muestras.append(duracion)
+                registro.llamadas += 1
+                timing = _server_timing(respuesta)
+                if 'app' in timing:
+                    registro.servidor.append(timing['app'])
+                if duracion >= LLAMADA_LENTA:
+                    print(f"Llamada lenta {metodo} {endpoint}: {duracion * 1000:.0f} ms "
+                          f"(servidor {timing.get('app', 0):.0f} ms, bd {timing.get('bd', 0):.0f} ms)")
+                if respuesta.status_code not in STATUS_REINTENTABLES:
+                    # Un 4xx es un error del cliente, el servidor sí respondió
+                    self.circuito.exito()
+                    respuesta.raise_for_status()
+                    return respuesta
+                self.circuito.fallo()
+                error = requests.exceptions.HTTPError(
+                    f"{respuesta.status_code} en {metodo} {endpoint}", response=respuesta)
+            except requests.exceptions.HTTPError:
+                registro.errores += 1
+                raise
+            except requests.exceptions.RequestException as e:
+                # Red, timeouts y respuestas cortadas (ChunkedEncodingError...)
+                registro.muestras.append(time.monotonic() - inicio)
+                registro.llamadas += 1
+                self.circuito.fallo()
+                error = e
+            except Exception:
+                # Sin esto una llamada de prueba dejaría el circuito bloqueado
+                registro.errores += 1
+                self.circuito.liberar()
+                raise
+
+            espera = self._espera(intento, respuesta)
+            ultimo = (intento == intentos - 1
+                      or (hilo_ui and isinstance(error, requests.exceptions.ReadTimeout)))
+            if ultimo or time.monotonic() + espera + self.timeout[0] > limite:
+                registro.errores += 1
+                raise error
+            registro.reintentos += 1
+            time.sleep(espera)
@@ -3,6 +3,8 @@ import websocket
 import json
 import time
 
+from gui.api_client import api_client
+
 class WebSocketClient(QThread):
     # Señales para diferentes eventos
     cliente_creado = pyqtSignal(dict)
@@ -15,6 +17,7 @@ class WebSocketClient(QThread):
     
     producto_creado = pyqtSignal(dict)
     producto_actualizado = pyqtSignal(dict)
+    producto_eliminado = pyqtSignal(dict)
     stock_actualizado = pyqtSignal(dict)
     
     orden_creada = pyqtSignal(dict)
@@ -79,6 +82,8 @@ class WebSocketClient(QThread):
             data = json.loads(message)
             event_type = data.get('type')
             event_data = data.get('data', {})
+            # Cualquier cambio en el servidor deja vieja la precarga de /bootstrap
+            api_client.invalidar_precarga()
             
             # Emitir señal según tipo de evento
             if event_type == 'cliente_creado':
@@ -97,6 +102,8 @@ class WebSocketClient(QThread):
                 self.producto_creado.emit(event_data)
             elif event_type == 'producto_actualizado':
                 self.producto_actualizado.emit(event_data)
+            elif event_type == 'producto_eliminado':
+                self.producto_eliminado.emit(event_data)
             elif event_type == 'stock_actualizado':
                 self.stock_actualizado.emit(event_data)
             elif event_type == 'orden_creada':
@@ -111,6 +118,13 @@ class WebSocketClient(QThread):
                 self.nota_creada.emit(event_data)
             elif event_type == 'nota_actualizada':
                 self.nota_actualizada.emit(event_data)
+            elif event_type == 'nota_convertida':
+                # Un solo evento por conversión: nota nueva + documento origen
+                self.nota_creada.emit(event_data.get('nota', {}))
+                if 'cotizacion' in event_data:
+                    self.cotizacion_actualizada.emit(event_data['cotizacion'])
+                if 'orden' in event_data:
+                    self.orden_actualizada.emit(event_data['orden'])
             elif event_type == 'nota_proveedor_creada':
                 self.nota_proveedor_creada.emit(event_data)
             elif event_type == 'nota_proveedor_actualizada':
@@ -155,5 +169,8 @@ def init_websocket(server_url: str = "web-production-96c8.up.railway.app"):
     global ws_client
     if ws_client is None:
         ws_client = WebSocketClient(server_url)
+        # Los catálogos compartidos se mantienen al día con los eventos
+        from gui.catalogos import catalogos
+        catalogos.conectar(ws_client)
         ws_client.start()
     return ws_client
\ No newline at end of file
@@ -0,0 +1,144 @@
+"""
+Índice de prefijos para autocompletar descripciones de items.
+
+Las claves se guardan normalizadas (minúsculas, sin acentos) en una lista
+ordenada y se consultan con bisect. Además de la descripción completa se
+indexa cada sufijo que empieza en palabra ('de aceite', 'aceite'), para que
+'aceite' también sugiera 'Cambio de aceite'. Cada descripción normalizada
+se muestra con la variante original más usada.
+"""
+
+import heapq
+import threading
+from bisect import bisect_left, insort
+from collections import defaultdict
+from typing import Dict, Iterable, List, Set
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from server.bitacora import obtener_logger
+from server.models import CotizacionItem, NotaVentaItem, OrdenItem, Producto
+from server.texto import STOPWORDS, normalizar_texto
+
+log = obtener_logger('autocompletado')
+
+# Peso extra de los nombres de producto del catálogo
+PESO_PRODUCTO = 5
+# Máximo de claves que se revisan por consulta (prefijos muy cortos)
+MAX_CANDIDATOS = 5000
+# Consultas recientes memorizadas (se invalidan al registrar descripciones)
+MAX_CACHE = 2048
+
+
+class IndicePrefijos:
+    """Lista ordenada de claves normalizadas con frecuencias"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.cargado = False
+        self._claves: List[str] = []                      # ordenadas (incluye sufijos)
+        self._destinos: Dict[str, Set[str]] = defaultdict(set)  # clave/sufijo -> descripciones normalizadas
+        self._frecuencias: Dict[str, int] = defaultdict(int)
+        self._variantes: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self._cache: Dict[tuple, List[Dict]] = {}
+
+    @staticmethod
+    def _sufijos(normalizada: str) -> List[str]:
+        palabras = normalizada.split(' ')
+        return [
+            ' '.join(palabras[i:]) for i in range(len(palabras))
+            if i == 0 or palabras[i] not in STOPWORDS
+        ]
+
+    def _registrar(self, texto: str, veces: int, ordenar: bool):
+        texto = ' '.join((texto or '').split())
+        normalizada = normalizar_texto(texto)
+        if not normalizada:
+            return
+        if normalizada not in self._frecuencias:
+            for sufijo in self._sufijos(normalizada):
+                if sufijo not in self._destinos and ordenar:
+                    insort(self._claves, sufijo)
+                self._destinos[sufijo].add(normalizada)
+        self._frecuencias[normalizada] += veces
+        self._variantes[normalizada][texto] += veces
+
+    def registrar(self, textos: Iterable[str], veces: int = 1):
+        """Suma uso a descripciones (alta de items). No hace nada si aún no se cargó."""
+        if not self.cargado:
+            return
+        with self._lock:
+            sufijos = []
+            for texto in textos:
+                self._registrar(texto, veces, ordenar=True)
+                sufijos.extend(self._sufijos(normalizar_texto(texto)))
+            # Solo se invalidan las consultas cuyo prefijo cubre lo registrado
+            for clave in [c for c in self._cache if any(s.startswith(c[0]) for s in sufijos)]:
+                del self._cache[clave]
+
+    def reiniciar(self):
+        """Vacía el índice; se vuelve a construir en la siguiente consulta (limpieza, importación)"""
+        with self._lock:
+            self._claves = []
+            self._destinos.clear()
+            self._frecuencias.clear()
+            self._variantes.clear()
+            self._cache.clear()
+            self.cargado = False
+
+    def asegurar_cargado(self, db: Session):
+        """Construye el índice desde los items históricos y el catálogo de productos"""
+        if self.cargado:
+            return
+        with self._lock:
+            if self.cargado:
+                return
+            for modelo in (NotaVentaItem, CotizacionItem, OrdenItem):
+                filas = db.query(modelo.descripcion, func.count(modelo.id)).group_by(modelo.descripcion)
+                for descripcion, veces in filas.yield_per(5000):
+                    self._registrar(descripcion, veces, ordenar=False)
+            for (nombre,) in db.query(Producto.nombre).filter(Producto.activo == True):
+                self._registrar(nombre, PESO_PRODUCTO, ordenar=False)
+
+            self._claves = sorted(self._destinos)
+            self.cargado = True
+            log.info("Índice de autocompletado cargado",
+                     extra={"descripciones": len(self._frecuencias), "claves": len(self._claves)})
+
+    def _mostrar(self, normalizada: str) -> str:
+        variantes = self._variantes[normalizada]
+        return max(variantes.items(), key=lambda par: par[1])[0]
+
+    def buscar(self, prefijo: str, limite: int = 10) -> List[Dict]:
+        """Sugerencias que empiezan (en alguna palabra) con el prefijo, por frecuencia"""
+        prefijo = normalizar_texto(prefijo)
+        if not prefijo:
+            return []
+        with self._lock:
+            resultado = self._cache.get((prefijo, limite))
+            if resultado is not None:
+                return resultado
+
+            claves = self._claves
+            inicio = bisect_left(claves, prefijo)
+            candidatas: Set[str] = set()
+            for i in range(inicio, min(inicio + MAX_CANDIDATOS, len(claves))):
+                clave = claves[i]
+                if not clave.startswith(prefijo):
+                    break
+                candidatas.update(self._destinos[clave])
+
+            mejores = heapq.nlargest(limite, candidatas, key=lambda n: (n.startswith(prefijo), self._frecuencias[n]))
+            resultado = [{"texto": self._mostrar(n), "frecuencia": self._frecuencias[n]} for n in mejores]
+            if len(self._cache) >= MAX_CACHE:
+                self._cache.clear()
+            self._cache[(prefijo, limite)] = resultado
+            return resultado
+
+    def __len__(self):
+        return len(self._frecuencias)
+
+
+# Instancia global
+indice_descripciones = IndicePrefijos()
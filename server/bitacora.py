@@ -0,0 +1,119 @@
+"""
+Bitácora (logging) del servidor: registros con nivel, en JSON, escritos
+desde un hilo aparte.
+
+Los endpoints solo encolan el LogRecord (QueueHandler); el formato a JSON
+y la escritura a stdout los hace un QueueListener en su propio hilo, así
+que un log no bloquea el event loop aunque el pipe de Railway vaya lento.
+
+    log = obtener_logger('notas')
+    log.info("Nota creada", extra={"nota_id": nota.id, "folio": nota.folio})
+    muestrear_payload(log, "Nota recibida", datos)
+
+Los campos de 'extra' salen como llaves del JSON. Variables de entorno:
+- LOG_NIVEL: DEBUG, INFO (default), WARNING...
+- LOG_FORMATO: 'json' (default) o 'texto' para desarrollo.
+- LOG_MUESTREO_PAYLOAD: fracción de payloads que se vuelcan en DEBUG (0.05).
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional
+
+RAIZ = 'taller'
+MUESTREO_PAYLOAD = float(os.getenv('LOG_MUESTREO_PAYLOAD', '0.05'))
+
+# Atributos propios de LogRecord; todo lo demás viene de 'extra'
+_ATRIBUTOS_RECORD = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+_listener: Optional[QueueListener] = None
+
+
+class FormatoJSON(logging.Formatter):
+    """Una línea JSON por registro: fecha, nivel, logger, mensaje y campos extra"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        datos: Dict[str, Any] = {
+            "fecha": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            "nivel": record.levelname,
+            "logger": record.name,
+            "mensaje": record.getMessage(),
+        }
+        for llave, valor in vars(record).items():
+            if llave not in _ATRIBUTOS_RECORD and not llave.startswith('_'):
+                datos[llave] = valor
+        if record.exc_info:
+            datos["traceback"] = self.formatException(record.exc_info)
+        return json.dumps(datos, ensure_ascii=False, default=str)
+
+
+class _QueueHandlerDiferido(QueueHandler):
+    """
+    Encola el registro tal cual. QueueHandler.prepare() lo formatea en el
+    hilo que llama (para poder serializarlo entre procesos); aquí la cola es
+    del mismo proceso, así que el formato se deja al hilo del listener.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+def configurar_logging(nivel: Optional[str] = None, formato: Optional[str] = None):
+    """Instala la cola y el hilo escritor (una sola vez por proceso)"""
+    global _listener
+    if _listener is not None:
+        return
+
+    nivel = (nivel or os.getenv('LOG_NIVEL', 'INFO')).upper()
+    formato = (formato or os.getenv('LOG_FORMATO', 'json')).lower()
+
+    salida = logging.StreamHandler(sys.stdout)
+    if formato == 'texto':
+        salida.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+    else:
+        salida.setFormatter(FormatoJSON())
+
+    cola: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    raiz = logging.getLogger(RAIZ)
+    raiz.setLevel(nivel)
+    raiz.handlers[:] = [_QueueHandlerDiferido(cola)]
+    raiz.propagate = False
+
+    _listener = QueueListener(cola, salida, respect_handler_level=True)
+    _listener.start()
+    atexit.register(detener_logging)
+
+
+def detener_logging():
+    """Escribe lo que quede en la cola y detiene el hilo"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def obtener_logger(nombre: str) -> logging.Logger:
+    return logging.getLogger(f"{RAIZ}.{nombre}")
+
+
+def muestrear_payload(log: logging.Logger, mensaje: str, payload: Any,
+                      tasa: float = MUESTREO_PAYLOAD, **campos):
+    """
+    Vuelca un payload completo solo en nivel DEBUG y solo para una fracción
+    'tasa' de las llamadas. Se guarda una copia superficial porque el
+    registro se formatea después, en el hilo del listener.
+    """
+    if not log.isEnabledFor(logging.DEBUG) or random.random() >= tasa:
+        return
+    if isinstance(payload, dict):
+        payload = dict(payload)
+    elif isinstance(payload, list):
+        payload = list(payload)
+    log.debug(mensaje, extra={"payload": payload, **campos})
@@ -0,0 +1,146 @@
+"""
+Caché en memoria del resultado de /reportes/* (el JSON ya serializado).
+
+La llave es (tipo, fecha_ini, fecha_fin) con las fechas normalizadas a
+datetime local sin zona; cxc no tiene rango y cubre todas las fechas.
+
+- Invalidación precisa: al crear, modificar, pagar o cancelar una nota se
+  llama invalidar_fechas(nota.fecha) y se descartan solo las entradas cuyo
+  rango contiene esa fecha (más las que no tienen rango).
+- Un resultado que se calculó mientras hubo una invalidación no se guarda
+  (guardar() compara la generación con la del inicio), así una escritura
+  concurrente no deja en caché un reporte viejo.
+- LRU + TTL: como máximo REPORTES_CACHE_MAX entradas. Los periodos que ya
+  cerraron (fecha_fin antes de hoy) duran REPORTES_CACHE_TTL_CERRADO
+  segundos (24 h); los abiertos y cxc, REPORTES_CACHE_TTL (5 min). El TTL
+  cubre lo que se escribe sin pasar por la API (modo local del escritorio).
+
+El caché vive en el proceso; con varios workers cada uno tiene el suyo
+(el Procfile arranca uno solo).
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Dict, Optional, Tuple
+
+TTL_DEFAULT = int(os.getenv('REPORTES_CACHE_TTL', '300'))
+TTL_CERRADO_DEFAULT = int(os.getenv('REPORTES_CACHE_TTL_CERRADO', str(24 * 3600)))
+MAX_DEFAULT = int(os.getenv('REPORTES_CACHE_MAX', '128'))
+
+Llave = Tuple[str, Optional[datetime], Optional[datetime]]
+
+
+def _normalizar(fecha) -> Optional[datetime]:
+    """datetime local sin zona (las notas se guardan así); date -> 00:00"""
+    if fecha is None:
+        return None
+    if not isinstance(fecha, datetime):
+        fecha = datetime(fecha.year, fecha.month, fecha.day)
+    if fecha.tzinfo is not None:
+        fecha = fecha.astimezone().replace(tzinfo=None)
+    return fecha
+
+
+class _Entrada:
+    __slots__ = ('cuerpo', 'expira')
+
+    def __init__(self, cuerpo: bytes, expira: float):
+        self.cuerpo = cuerpo
+        self.expira = expira
+
+
+class CacheReportes:
+    """Cuerpos JSON de reportes por (tipo, rango) con LRU, TTL e invalidación por fecha"""
+
+    def __init__(self, ttl: int = TTL_DEFAULT, ttl_cerrado: int = TTL_CERRADO_DEFAULT,
+                 maximo: int = MAX_DEFAULT):
+        self.ttl = ttl
+        self.ttl_cerrado = ttl_cerrado
+        self.maximo = maximo
+        self._lock = threading.Lock()
+        self._entradas: "OrderedDict[Llave, _Entrada]" = OrderedDict()
+        self._generacion = 0
+        self.aciertos = 0
+        self.fallos = 0
+        self.invalidadas = 0
+        self.desalojadas = 0
+
+    @staticmethod
+    def llave(tipo: str, fecha_ini=None, fecha_fin=None) -> Llave:
+        return (tipo, _normalizar(fecha_ini), _normalizar(fecha_fin))
+
+    @property
+    def generacion(self) -> int:
+        """Tomarla antes de calcular el reporte y pasarla a guardar()"""
+        return self._generacion
+
+    def obtener(self, llave: Llave) -> Optional[bytes]:
+        with self._lock:
+            entrada = self._entradas.get(llave)
+            if entrada is not None and entrada.expira <= time.monotonic():
+                del self._entradas[llave]
+                entrada = None
+            if entrada is None:
+                self.fallos += 1
+                return None
+            self._entradas.move_to_end(llave)
+            self.aciertos += 1
+            return entrada.cuerpo
+
+    def guardar(self, llave: Llave, cuerpo: bytes, generacion: int):
+        _, _, fecha_fin = llave
+        hoy = datetime.combine(date.today(), datetime.min.time())
+        ttl = self.ttl_cerrado if fecha_fin is not None and fecha_fin < hoy else self.ttl
+        with self._lock:
+            if generacion != self._generacion:
+                return  # Hubo escrituras mientras se calculaba
+            self._entradas[llave] = _Entrada(cuerpo, time.monotonic() + ttl)
+            self._entradas.move_to_end(llave)
+            while len(self._entradas) > self.maximo:
+                self._entradas.popitem(last=False)
+                self.desalojadas += 1
+
+    def invalidar_fechas(self, *fechas):
+        """Descarta los reportes cuyo rango contiene alguna de las fechas (y los sin rango)"""
+        fechas = [f for f in (_normalizar(f) for f in fechas) if f is not None]
+        with self._lock:
+            self._generacion += 1
+            for llave in list(self._entradas):
+                _, inicio, fin = llave
+                if inicio is None or fin is None or any(inicio <= f <= fin for f in fechas):
+                    del self._entradas[llave]
+                    self.invalidadas += 1
+
+    def invalidar_tipo(self, *tipos: str):
+        """Descarta todos los reportes de esos tipos (p. ej. al renombrar un cliente)"""
+        with self._lock:
+            self._generacion += 1
+            for llave in list(self._entradas):
+                if llave[0] in tipos:
+                    del self._entradas[llave]
+                    self.invalidadas += 1
+
+    def limpiar(self):
+        with self._lock:
+            self._generacion += 1
+            self.invalidadas += len(self._entradas)
+            self._entradas.clear()
+
+    def estadisticas(self) -> Dict[str, float]:
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                "reportes_cache_entradas": len(self._entradas),
+                "reportes_cache_aciertos_total": self.aciertos,
+                "reportes_cache_fallos_total": self.fallos,
+                "reportes_cache_invalidadas_total": self.invalidadas,
+                "reportes_cache_desalojadas_total": self.desalojadas,
+                "reportes_cache_tasa_aciertos": round(self.aciertos / consultas, 4) if consultas else 0.0,
+            }
+
+
+# Instancia global
+cache_reportes = CacheReportes()
@@ -0,0 +1,158 @@
+"""
+Caché en memoria de los catálogos chicos (clientes, proveedores, productos,
+configuración, usuarios) como JSON ya serializado.
+
+Cada catálogo tiene un contador en catalogos_version. Los endpoints que
+escriben llaman escritura('clientes', db) después de su commit: se sube el
+contador con un solo UPDATE ... RETURNING y se reconstruye el JSON en el
+mismo momento (write-through), así la siguiente lectura ya no va a la BD.
+
+Las lecturas regresan los bytes guardados sin tocar el pool de conexiones.
+Cada CATALOGOS_VERIFICAR_CADA segundos (2 s) una lectura compara la
+versión guardada con la de la BD; si otro worker escribió, se reconstruye.
+Además cada entrada se reconstruye a lo más cada CATALOGOS_TTL segundos
+(60 s), para lo que se escribe sin pasar por la API (modo local del
+escritorio, scripts).
+
+Un resultado solo reemplaza al guardado si su versión es igual o mayor,
+así una lectura lenta no pisa lo que dejó una escritura más reciente.
+"""
+
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from server.models import VersionCatalogo
+
+VERIFICAR_CADA_DEFAULT = float(os.getenv('CATALOGOS_VERIFICAR_CADA', '2'))
+TTL_DEFAULT = float(os.getenv('CATALOGOS_TTL', '60'))
+
+Constructor = Callable[[Session], bytes]
+
+
+class _Entrada:
+    __slots__ = ('version', 'cuerpo', 'construida', 'verificada')
+
+    def __init__(self, version: int, cuerpo: bytes):
+        self.version = version
+        self.cuerpo = cuerpo
+        self.construida = self.verificada = time.monotonic()
+
+
+class CacheCatalogos:
+    """JSON de cada catálogo con su versión en la BD"""
+
+    def __init__(self, verificar_cada: float = VERIFICAR_CADA_DEFAULT, ttl: float = TTL_DEFAULT):
+        self.verificar_cada = verificar_cada
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._constructores: Dict[str, Constructor] = {}
+        self._entradas: Dict[str, _Entrada] = {}
+        self._tablas_listas = set()
+        self.aciertos = 0
+        self.verificaciones = 0
+        self.reconstrucciones = 0
+
+    def registrar(self, nombre: str, construir: Constructor):
+        """construir(db) -> bytes con el JSON completo del catálogo"""
+        self._constructores[nombre] = construir
+
+    # ---------- BD ----------
+
+    def _preparar_tabla(self, engine):
+        url = str(engine.url)
+        if url not in self._tablas_listas:
+            VersionCatalogo.__table__.create(bind=engine, checkfirst=True)
+            self._tablas_listas.add(url)
+
+    def _version_bd(self, engine, nombre: str) -> int:
+        self._preparar_tabla(engine)
+        t = VersionCatalogo.__table__
+        with engine.connect() as conn:
+            return conn.execute(select(t.c.version).where(t.c.nombre == nombre)).scalar() or 0
+
+    def _incrementar_bd(self, engine, nombre: str) -> int:
+        self._preparar_tabla(engine)
+        t = VersionCatalogo.__table__
+        stmt = (update(t).where(t.c.nombre == nombre)
+                .values(version=t.c.version + 1).returning(t.c.version))
+        with engine.begin() as conn:
+            version = conn.execute(stmt).scalar()
+        if version is not None:
+            return version
+        try:
+            with engine.begin() as conn:
+                conn.execute(t.insert().values(nombre=nombre, version=0))
+        except IntegrityError:
+            pass  # Otro proceso lo creó al mismo tiempo
+        with engine.begin() as conn:
+            return conn.execute(stmt).scalar()
+
+    # ---------- Caché ----------
+
+    def _guardar(self, nombre: str, version: int, cuerpo: bytes):
+        with self._lock:
+            actual = self._entradas.get(nombre)
+            if actual is None or version >= actual.version:
+                self._entradas[nombre] = _Entrada(version, cuerpo)
+            self.reconstrucciones += 1
+
+    def _construir(self, nombre: str, db: Session, version: int) -> bytes:
+        cuerpo = self._constructores[nombre](db)
+        self._guardar(nombre, version, cuerpo)
+        return cuerpo
+
+    # ---------- API ----------
+
+    def obtener(self, nombre: str, db: Session) -> bytes:
+        """JSON del catálogo; solo consulta la BD si toca verificar la versión"""
+        ahora = time.monotonic()
+        with self._lock:
+            entrada = self._entradas.get(nombre)
+            if (entrada is not None and ahora - entrada.verificada < self.verificar_cada
+                    and ahora - entrada.construida < self.ttl):
+                self.aciertos += 1
+                return entrada.cuerpo
+
+        engine = db.get_bind()
+        version = self._version_bd(engine, nombre)
+        with self._lock:
+            self.verificaciones += 1
+            if (entrada is not None and entrada.version == version
+                    and ahora - entrada.construida < self.ttl):
+                entrada.verificada = ahora
+                return entrada.cuerpo
+        # La versión se lee antes de construir: si alguien escribe en medio,
+        # la siguiente verificación lo detecta
+        return self._construir(nombre, db, version)
+
+    def escritura(self, db: Session, *nombres: str):
+        """Después del commit de una escritura: sube la versión y reconstruye"""
+        engine = db.get_bind()
+        for nombre in nombres:
+            version = self._incrementar_bd(engine, nombre)
+            self._construir(nombre, db, version)
+
+    def invalidar_todo(self, engine, nombres: Optional[Iterable[str]] = None):
+        """Sube la versión de todos los catálogos (importaciones, limpieza de datos)"""
+        for nombre in list(nombres or self._constructores):
+            self._incrementar_bd(engine, nombre)
+        with self._lock:
+            self._entradas.clear()
+
+    def estadisticas(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "catalogos_cache_aciertos_total": self.aciertos,
+                "catalogos_cache_verificaciones_total": self.verificaciones,
+                "catalogos_cache_reconstrucciones_total": self.reconstrucciones,
+            }
+
+
+# Instancia global
+cache_catalogos = CacheCatalogos()
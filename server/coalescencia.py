@@ -0,0 +1,185 @@
+"""
+Coalescencia de GET idénticos en las colecciones más pedidas.
+
+Después de cada broadcast todos los escritorios abiertos piden lo mismo
+(GET /productos, GET /notas...) casi al mismo tiempo. Este middleware
+deja pasar solo la primera petición de cada (ruta, query string): las
+que llegan mientras está en curso esperan y reciben los mismos bytes, y
+durante COALESCENCIA_TTL segundos (1 s) la respuesta se sigue repitiendo
+desde memoria. Una ráfaga de 30 peticiones cuesta una consulta.
+
+Consistencia con las escrituras:
+- Cualquier petición que no sea GET/HEAD/OPTIONS sube la generación al
+  empezar y al terminar y vacía las respuestas recientes. Una petición
+  solo se une a un cálculo (o reutiliza una respuesta) de la generación
+  actual, así que los GET que dispara un broadcast nunca reciben datos
+  leídos antes de la escritura que lo provocó.
+- Mientras hay escrituras en curso los GET pasan directo.
+- Solo se comparten respuestas 200; si la original falla, cada petición
+  en espera se ejecuta por su cuenta.
+
+Va por dentro de la compresión: se comparten los bytes sin comprimir y
+cada petición negocia su Accept-Encoding. El estado vive en el proceso
+(el Procfile arranca un solo worker); lo que se escribe sin pasar por la
+API se ve a lo más COALESCENCIA_TTL segundos después.
+"""
+
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+TTL_DEFAULT = float(os.getenv('COALESCENCIA_TTL', '1.0'))
+MAX_RECIENTES = 256
+METODOS_LECTURA = {'GET', 'HEAD', 'OPTIONS'}
+# Colecciones que todos los escritorios recargan tras un broadcast
+RUTAS_DEFAULT = frozenset({
+    '/clientes', '/proveedores', '/productos', '/servicios',
+    '/ordenes', '/cotizaciones', '/notas', '/notas_proveedor',
+    '/inventario/movimientos',
+})
+
+Respuesta = Tuple[int, List[Tuple[bytes, bytes]], bytes]
+
+
+class _Vuelo:
+    """Un cálculo en curso y la respuesta que comparte al terminar"""
+    __slots__ = ('generacion', 'listo', 'respuesta')
+
+    def __init__(self, generacion: int):
+        self.generacion = generacion
+        self.listo = asyncio.Event()
+        self.respuesta: Optional[Respuesta] = None
+
+
+class _Reciente:
+    __slots__ = ('generacion', 'expira', 'respuesta')
+
+    def __init__(self, generacion: int, expira: float, respuesta: Respuesta):
+        self.generacion = generacion
+        self.expira = expira
+        self.respuesta = respuesta
+
+
+async def _enviar(send, respuesta: Respuesta, origen: bytes):
+    status, headers, cuerpo = respuesta
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": headers + [(b'x-coalesced', origen)],
+    })
+    await send({"type": "http.response.body", "body": cuerpo})
+
+
+class Coalescedor:
+    """Cálculos en curso, respuestas recientes y generación de escrituras"""
+
+    def __init__(self, rutas=RUTAS_DEFAULT, ttl: float = TTL_DEFAULT):
+        self.rutas = frozenset(rutas)
+        self.ttl = ttl
+        self.generacion = 0
+        self.escrituras = 0
+        self.en_vuelo: Dict[Tuple[str, bytes], _Vuelo] = {}
+        self.recientes: "OrderedDict[Tuple[str, bytes], _Reciente]" = OrderedDict()
+        self.calculadas = 0
+        self.compartidas = 0
+        self.repetidas = 0
+
+    def escritura(self, delta: int):
+        """+1 al empezar una escritura y -1 al terminar; ambas invalidan"""
+        self.escrituras += delta
+        self.generacion += 1
+        self.recientes.clear()
+
+    def reciente(self, llave) -> Optional[Respuesta]:
+        entrada = self.recientes.get(llave)
+        if entrada is None:
+            return None
+        if entrada.generacion == self.generacion and entrada.expira > time.monotonic():
+            return entrada.respuesta
+        del self.recientes[llave]
+        return None
+
+    def guardar_reciente(self, llave, vuelo: _Vuelo):
+        if self.ttl <= 0 or vuelo.generacion != self.generacion:
+            return
+        self.recientes[llave] = _Reciente(vuelo.generacion, time.monotonic() + self.ttl, vuelo.respuesta)
+        self.recientes.move_to_end(llave)
+        while len(self.recientes) > MAX_RECIENTES:
+            self.recientes.popitem(last=False)
+
+    def limpiar(self):
+        self.generacion += 1
+        self.recientes.clear()
+
+    def estadisticas(self) -> Dict[str, float]:
+        return {
+            "coalescencia_calculadas_total": self.calculadas,
+            "coalescencia_compartidas_total": self.compartidas,
+            "coalescencia_repetidas_total": self.repetidas,
+            "coalescencia_en_vuelo": len(self.en_vuelo),
+        }
+
+
+# Instancia global
+coalescedor = Coalescedor()
+
+
+class MiddlewareCoalescencia:
+    """Middleware ASGI: un solo cálculo por GET idéntico concurrente"""
+
+    def __init__(self, app, estado: Coalescedor = None):
+        self.app = app
+        self.estado = estado or coalescedor
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+        estado = self.estado
+        metodo = scope['method']
+        if metodo not in METODOS_LECTURA:
+            estado.escritura(1)
+            try:
+                return await self.app(scope, receive, send)
+            finally:
+                estado.escritura(-1)
+        if metodo != 'GET' or scope['path'] not in estado.rutas or estado.escrituras:
+            return await self.app(scope, receive, send)
+
+        llave = (scope['path'], scope.get('query_string', b''))
+        reciente = estado.reciente(llave)
+        if reciente is not None:
+            estado.repetidas += 1
+            return await _enviar(send, reciente, b'cache')
+
+        vuelo = estado.en_vuelo.get(llave)
+        if vuelo is not None and vuelo.generacion == estado.generacion:
+            await vuelo.listo.wait()
+            if vuelo.respuesta is not None:
+                estado.compartidas += 1
+                return await _enviar(send, vuelo.respuesta, b'shared')
+            return await self.app(scope, receive, send)
+
+        vuelo = estado.en_vuelo[llave] = _Vuelo(estado.generacion)
+        estado.calculadas += 1
+        respuesta = {"status": None, "headers": [], "cuerpo": [], "completa": False}
+
+        async def send_guardando(mensaje):
+            if mensaje['type'] == 'http.response.start':
+                respuesta['status'] = mensaje['status']
+                respuesta['headers'] = list(mensaje.get('headers', []))
+            elif mensaje['type'] == 'http.response.body':
+                respuesta['cuerpo'].append(mensaje.get('body', b''))
+                respuesta['completa'] = not mensaje.get('more_body', False)
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive, send_guardando)
+            if respuesta['status'] == 200 and respuesta['completa']:
+                vuelo.respuesta = (200, respuesta['headers'], b''.join(respuesta['cuerpo']))
+                estado.guardar_reciente(llave, vuelo)
+        finally:
+            if estado.en_vuelo.get(llave) is vuelo:
+                del estado.en_vuelo[llave]
+            vuelo.listo.set()
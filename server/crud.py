@@ -1,7 +1,10 @@
 from sqlalchemy.orm import joinedload
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, func
+from sqlalchemy import and_, or_, func, update, bindparam, select, event
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.exc import StaleDataError
 from typing import List, Optional, Dict, Any
+from collections import defaultdict
 from datetime import datetime
 from sqlalchemy.orm import joinedload
 
@@ -10,8 +13,58 @@ from server.models import (
     Orden, OrdenItem, Cotizacion, CotizacionItem,
     NotaVenta, NotaVentaItem, NotaVentaPago, Usuario,
     NotaProveedor, NotaProveedorItem, NotaProveedorPago,
-    ConfigEmpresa
+    ConfigEmpresa, Servicio
 )
+from server.texto import clave_servicio, normalizar_texto
+from server.folios import siguiente_folio
+from server.bitacora import obtener_logger
+
+log = obtener_logger('crud')
+
+
+# ==================== CONCURRENCIA (VERSIONES) ====================
+
+# Reintentos de operaciones conmutativas (pagos) ante un conflicto de versión
+REINTENTOS_CONFLICTO = 5
+
+
+class ConflictoVersion(ValueError):
+    """El documento cambió desde que el cliente lo leyó (If-Match / version)"""
+
+
+def _verificar_version(documento, version: Optional[int]):
+    """Compara la versión que el cliente leyó con la actual (si la envió)"""
+    if version is not None and documento.version != int(version):
+        raise ConflictoVersion(
+            f"El documento fue modificado por otro usuario (versión {documento.version}, "
+            f"se esperaba {version}). Recárguelo e intente de nuevo."
+        )
+
+
+def _commit_versionado(db: Session):
+    """
+    Commit de un documento con version_id_col: si otro proceso lo modificó
+    entre la lectura y el UPDATE, el UPDATE ... WHERE version = :leida no
+    afecta filas y se reporta como conflicto.
+    """
+    try:
+        db.commit()
+    except StaleDataError:
+        db.rollback()
+        raise ConflictoVersion("El documento fue modificado por otro usuario. Recárguelo e intente de nuevo.")
+
+
+def _con_reintentos(db: Session, operacion):
+    """
+    Repite una operación conmutativa (un abono, quitar un pago) si perdió la
+    carrera de versión; cada intento vuelve a leer la nota y a validar.
+    """
+    for _ in range(REINTENTOS_CONFLICTO):
+        try:
+            return operacion()
+        except StaleDataError:
+            db.rollback()
+    raise ConflictoVersion("La nota está recibiendo muchos cambios simultáneos. Intente de nuevo.")
 
 
 # ==================== CLIENTES ====================
@@ -251,8 +304,175 @@ def search_productos(db: Session, busqueda: str) -> List[Producto]:
     ).all()
 
 
+# ==================== CATÁLOGO DE SERVICIOS ====================
+
+# clave_servicio -> Servicio.id (los ids no cambian; se vacía al limpiar datos)
+_cache_servicios: Dict[str, int] = {}
+
+
+def limpiar_cache_servicios():
+    _cache_servicios.clear()
+
+
+# Los ids que se leen o crean dentro de una transacción quedan en
+# db.info hasta el commit: si la transacción se revierte (conflicto de
+# folio o de versión, error al crear) el servicio no existe y no debe
+# quedar en el caché del proceso. Los savepoints (begin_nested) también
+# disparan estos eventos; solo cuenta la transacción externa.
+@event.listens_for(Session, 'after_commit')
+def _publicar_servicios(db):
+    if not db.in_nested_transaction():
+        _cache_servicios.update(db.info.pop('servicios_pendientes', {}))
+
+
+@event.listens_for(Session, 'after_rollback')
+def _descartar_servicios(db):
+    if not db.in_nested_transaction():
+        db.info.pop('servicios_pendientes', None)
+
+
+def get_all_servicios(db: Session) -> List[Servicio]:
+    """Obtener el catálogo de servicios activos"""
+    return db.query(Servicio).filter(Servicio.activo == True).order_by(Servicio.nombre).all()
+
+
+def resolver_servicio(db: Session, descripcion: str) -> Optional[int]:
+    """Obtener (o crear) el servicio del catálogo que corresponde a una descripción libre"""
+    clave = clave_servicio(descripcion)[:200]
+    if not clave:
+        return None
+
+    pendientes = db.info.setdefault('servicios_pendientes', {})
+    servicio_id = _cache_servicios.get(clave) or pendientes.get(clave)
+    if servicio_id:
+        return servicio_id
+
+    servicio_id = db.query(Servicio.id).filter(Servicio.clave == clave).scalar()
+    if not servicio_id:
+        try:
+            with db.begin_nested():
+                servicio = Servicio(nombre=' '.join(descripcion.split())[:200], clave=clave)
+                db.add(servicio)
+                db.flush()
+            servicio_id = servicio.id
+        except IntegrityError:
+            # Otra petición lo creó al mismo tiempo
+            servicio_id = db.query(Servicio.id).filter(Servicio.clave == clave).scalar()
+
+    if servicio_id:
+        pendientes[clave] = servicio_id
+    return servicio_id
+
+
+def _asignar_servicio(db: Session, item):
+    """Ligar un item (nota, cotización u orden) a su servicio del catálogo"""
+    if not item.servicio_id and item.descripcion:
+        item.servicio_id = resolver_servicio(db, item.descripcion)
+
+
+def backfill_servicios(db: Session, lote: int = 1000) -> Dict[str, int]:
+    """
+    Asigna servicio_id (y producto_id por nombre) a los items históricos.
+    Agrupa las descripciones distintas por clave_servicio, crea los servicios
+    faltantes con la variante más usada como nombre y actualiza los items con
+    UPDATEs por descripción en lotes.
+    """
+    modelos = (NotaVentaItem, CotizacionItem, OrdenItem)
+
+    # 1. Descripciones sin servicio, agrupadas por clave
+    variantes: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+    for modelo in modelos:
+        filas = db.query(modelo.descripcion, func.count(modelo.id)).filter(
+            modelo.servicio_id.is_(None)
+        ).group_by(modelo.descripcion)
+        for descripcion, veces in filas:
+            if descripcion:
+                variantes[clave_servicio(descripcion)[:200]][descripcion] += veces
+
+    # 2. Crear servicios faltantes
+    servicios = dict(db.query(Servicio.clave, Servicio.id).all())
+    nuevos = []
+    for clave, textos in variantes.items():
+        if clave and clave not in servicios:
+            nombre = max(textos.items(), key=lambda par: par[1])[0]
+            nuevos.append(Servicio(nombre=' '.join(nombre.split())[:200], clave=clave))
+    db.add_all(nuevos)
+    db.flush()
+    servicios.update({s.clave: s.id for s in nuevos})
+    db.commit()
+    _cache_servicios.update(servicios)
+
+    # 3. UPDATE masivo por descripción
+    productos = {normalizar_texto(nombre): pid for pid, nombre in db.query(Producto.id, Producto.nombre)}
+    parametros = [
+        {
+            'b_descripcion': descripcion,
+            'b_servicio': servicios[clave],
+            'b_producto': productos.get(normalizar_texto(descripcion))
+        }
+        for clave, textos in variantes.items() if clave in servicios
+        for descripcion in textos
+    ]
+
+    actualizados = 0
+    for modelo in modelos:
+        tabla = modelo.__table__
+        stmt = update(tabla).where(
+            tabla.c.descripcion == bindparam('b_descripcion'),
+            tabla.c.servicio_id.is_(None)
+        ).values(
+            servicio_id=bindparam('b_servicio'),
+            producto_id=func.coalesce(tabla.c.producto_id, bindparam('b_producto'))
+        )
+        for i in range(0, len(parametros), lote):
+            resultado = db.execute(stmt, parametros[i:i + lote])
+            actualizados += max(resultado.rowcount or 0, 0)
+            db.commit()
+
+    return {
+        "servicios_nuevos": len(nuevos),
+        "servicios_total": len(servicios),
+        "descripciones": len(parametros),
+        "items_actualizados": actualizados
+    }
+
+
 # ==================== MOVIMIENTOS DE INVENTARIO ====================
 
+def _ajustar_stock(db: Session, producto_id: int, delta: int) -> Optional[int]:
+    """
+    Suma 'delta' al stock en un solo UPDATE condicional (sin leer antes).
+    Regresa el stock nuevo, o None si el producto no existe o el stock
+    quedaría negativo; la condición se evalúa en la BD, así que dos salidas
+    simultáneas de la última pieza no pueden pasar las dos.
+    """
+    stock = func.coalesce(Producto.stock_actual, 0)
+    stmt = update(Producto).where(Producto.id == producto_id)
+    if delta < 0:
+        stmt = stmt.where(stock >= -delta)
+    stmt = stmt.values(stock_actual=stock + delta).returning(Producto.stock_actual)
+    return db.execute(stmt, execution_options={"synchronize_session": "fetch"}).scalar()
+
+
+def _error_stock(db: Session, producto_id: int) -> Optional[ValueError]:
+    """Explica por qué falló un ajuste (solo se consulta en el caso de error)"""
+    disponible = db.query(Producto.stock_actual).filter(Producto.id == producto_id).scalar()
+    if disponible is None and not db.query(Producto.id).filter(Producto.id == producto_id).first():
+        return None
+    return ValueError(f"Stock insuficiente. Disponible: {disponible or 0}")
+
+
+def _delta_movimiento(tipo: str, cantidad: int) -> int:
+    if isinstance(cantidad, bool) or not isinstance(cantidad, (int, float)) or cantidad <= 0 or int(cantidad) != cantidad:
+        raise ValueError("La cantidad debe ser un entero mayor a 0")
+    cantidad = int(cantidad)
+    if tipo == "Entrada":
+        return cantidad
+    if tipo == "Salida":
+        return -cantidad
+    raise ValueError("Tipo de movimiento inválido. Use 'Entrada' o 'Salida'")
+
+
 def registrar_movimiento_inventario(
     db: Session,
     producto_id: int,
@@ -261,19 +481,14 @@ def registrar_movimiento_inventario(
     motivo: str,
     usuario: str
 ) -> Optional[MovimientoInventario]:
-    producto = get_producto(db, producto_id)
-    if not producto:
-        return None
+    delta = _delta_movimiento(tipo, cantidad)
     
     # Actualizar stock
-    if tipo == "Entrada":
-        producto.stock_actual += cantidad
-    elif tipo == "Salida":
-        if producto.stock_actual < cantidad:
-            raise ValueError(f"Stock insuficiente. Disponible: {producto.stock_actual}")
-        producto.stock_actual -= cantidad
-    else:
-        raise ValueError("Tipo de movimiento inválido. Use 'Entrada' o 'Salida'")
+    if _ajustar_stock(db, producto_id, delta) is None:
+        error = _error_stock(db, producto_id)
+        if error is None:
+            return None
+        raise error
     
     # Crear movimiento
     movimiento = MovimientoInventario(
@@ -289,6 +504,45 @@ def registrar_movimiento_inventario(
     return movimiento
 
 
+def registrar_movimientos_lote(
+    db: Session,
+    movimientos: List[Dict[str, Any]],
+    usuario: str = "Sistema"
+) -> Dict[int, int]:
+    """
+    Aplica varios movimientos en la transacción de la sesión (todo o nada).
+    Los cambios se suman por producto y se aplica un UPDATE condicional por
+    producto, en orden de id para que dos lotes simultáneos no se bloqueen
+    mutuamente. Regresa {producto_id: stock nuevo}. No hace commit.
+    """
+    deltas: Dict[int, int] = defaultdict(int)
+    for i, datos in enumerate(movimientos):
+        try:
+            deltas[int(datos['producto_id'])] += _delta_movimiento(datos.get('tipo'), datos.get('cantidad'))
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"Movimiento {i + 1}: {e}")
+
+    stock_nuevo: Dict[int, int] = {}
+    for producto_id in sorted(deltas):
+        nuevo = _ajustar_stock(db, producto_id, deltas[producto_id])
+        if nuevo is None:
+            error = _error_stock(db, producto_id)
+            raise ValueError(f"Producto {producto_id}: {error or 'no encontrado'}")
+        stock_nuevo[producto_id] = nuevo
+
+    db.add_all([
+        MovimientoInventario(
+            producto_id=int(datos['producto_id']),
+            tipo=datos['tipo'],
+            cantidad=datos['cantidad'],
+            motivo=datos.get('motivo', ''),
+            usuario=datos.get('usuario', usuario)
+        )
+        for datos in movimientos
+    ])
+    return stock_nuevo
+
+
 def get_movimientos_inventario(
     db: Session,
     producto_id: Optional[int] = None,
@@ -310,15 +564,18 @@ def get_movimientos_inventario(
 
 # ==================== ÓRDENES DE TRABAJO ====================
 
-def get_all_ordenes(db: Session, estado: Optional[str] = None) -> List[Orden]:
-    """Obtener todas las órdenes (opcional: filtrar por estado)"""
+def get_all_ordenes(db: Session, estado: Optional[str] = None, limit: Optional[int] = None) -> List[Orden]:
+    """Obtener todas las órdenes (opcional: filtrar por estado, solo las 'limit' más recientes)"""
     query = db.query(Orden).options(
         joinedload(Orden.cliente), 
         joinedload(Orden.items)
     )
     if estado:
         query = query.filter(Orden.estado == estado)
-    return query.order_by(Orden.created_at.desc()).all()
+    query = query.order_by(Orden.created_at.desc())
+    if limit:
+        query = query.limit(limit)
+    return query.all()
 
 
 def get_orden(db: Session, orden_id: int) -> Optional[Orden]:
@@ -343,10 +600,8 @@ def search_ordenes_by_folio(db: Session, folio: str) -> List[Orden]:
 def create_orden(db: Session, orden_data: Dict[str, Any], items: List[Dict[str, Any]]) -> Orden:
     """Crear nueva orden de trabajo con items"""
     # Generar folio único si no existe
-    if 'folio' not in orden_data:
-        ultimo_folio = db.query(Orden).order_by(Orden.id.desc()).first()
-        numero = 1 if not ultimo_folio else ultimo_folio.id + 1
-        orden_data['folio'] = f"ORD-{datetime.now().year}-{numero:05d}"
+    if not orden_data.get('folio'):
+        orden_data['folio'] = siguiente_folio(db, 'ORD')
     
     # Crear orden
     nueva_orden = Orden(**orden_data)
@@ -357,6 +612,7 @@ def create_orden(db: Session, orden_data: Dict[str, Any], items: List[Dict[str,
     for item_data in items:
         item = OrdenItem(orden_id=nueva_orden.id, **item_data)
         db.add(item)
+        _asignar_servicio(db, item)
     
     db.commit()
     db.refresh(nueva_orden)
@@ -367,12 +623,16 @@ def update_orden(
     db: Session, 
     orden_id: int, 
     orden_data: Dict[str, Any], 
-    items: Optional[List[Dict[str, Any]]] = None
+    items: Optional[List[Dict[str, Any]]] = None,
+    version: Optional[int] = None
 ) -> Optional[Orden]:
     orden = get_orden(db, orden_id)
     if not orden:
         return None
 
+    orden_data.pop('version', None)
+    _verificar_version(orden, version)
+
     if orden.estado == 'Cancelada':
         raise ValueError("No se puede modificar una orden cancelada.")
 
@@ -389,10 +649,11 @@ def update_orden(
         for item_data in items:
             item = OrdenItem(orden_id=orden.id, **item_data)
             db.add(item)
+            _asignar_servicio(db, item)
     
     orden.updated_at = datetime.now()
     
-    db.commit()
+    _commit_versionado(db)
     db.refresh(orden)
     return orden
 
@@ -405,7 +666,7 @@ def cambiar_estado_orden(db: Session, orden_id: int, nuevo_estado: str) -> Optio
         if nuevo_estado == "Completada" and not orden.fecha_entrega:
             orden.fecha_entrega = datetime.now()
         orden.updated_at = datetime.now()
-        db.commit()
+        _commit_versionado(db)
         db.refresh(orden)
     return orden
 
@@ -422,15 +683,18 @@ def delete_orden(db: Session, orden_id: int) -> bool:
 
 # ==================== COTIZACIONES ====================
 
-def get_all_cotizaciones(db: Session, estado: Optional[str] = None) -> List[Cotizacion]:
-    """Obtener todas las cotizaciones"""
+def get_all_cotizaciones(db: Session, estado: Optional[str] = None, limit: Optional[int] = None) -> List[Cotizacion]:
+    """Obtener todas las cotizaciones (opcional: solo las 'limit' más recientes)"""
     query = db.query(Cotizacion).options(
         joinedload(Cotizacion.cliente), 
         joinedload(Cotizacion.items)
     )
     if estado:
         query = query.filter(Cotizacion.estado == estado)
-    return query.order_by(Cotizacion.created_at.desc()).all()
+    query = query.order_by(Cotizacion.created_at.desc())
+    if limit:
+        query = query.limit(limit)
+    return query.all()
 
 def search_cotizaciones(db: Session, folio: Optional[str] = None, cliente_id: Optional[int] = None) -> List[Cotizacion]:
     """Buscar cotizaciones por folio o cliente_id"""
@@ -458,10 +722,8 @@ def search_cotizaciones_by_folio(db: Session, folio: str) -> List[Cotizacion]:
 def create_cotizacion(db: Session, cotizacion_data: Dict[str, Any], items: List[Dict[str, Any]]) -> Cotizacion:
     """Crear nueva cotización con items"""
     # Generar folio único si no existe
-    if 'folio' not in cotizacion_data:
-        ultimo_folio = db.query(Cotizacion).order_by(Cotizacion.id.desc()).first()
-        numero = 1 if not ultimo_folio else ultimo_folio.id + 1
-        cotizacion_data['folio'] = f"COT-{datetime.now().year}-{numero:05d}"
+    if not cotizacion_data.get('folio'):
+        cotizacion_data['folio'] = siguiente_folio(db, 'COT')
     
     # Crear cotización
     nueva_cotizacion = Cotizacion(**cotizacion_data)
@@ -475,6 +737,7 @@ def create_cotizacion(db: Session, cotizacion_data: Dict[str, Any], items: List[
     for item_data in items:
         item = CotizacionItem(cotizacion_id=nueva_cotizacion.id, **item_data)
         db.add(item)
+        _asignar_servicio(db, item)
         subtotal += item.importe
         impuestos_total += (item.importe * item.impuesto / 100)
     
@@ -492,7 +755,8 @@ def update_cotizacion(
     cotizacion_id: int, 
     cotizacion_data: Dict[str, Any], 
     items: List[Dict[str, Any]],
-    nota_folio: Optional[str] = None
+    nota_folio: Optional[str] = None,
+    version: Optional[int] = None
 ) -> Optional[Cotizacion]:
     """
     Actualizar una cotización existente.
@@ -506,6 +770,9 @@ def update_cotizacion(
     if cotizacion.estado == 'Cancelada':
             raise ValueError("No se puede modificar una cotización Cancelada.")
 
+    cotizacion_data.pop('version', None)
+    _verificar_version(cotizacion, version)
+
     # 1. Actualizar datos de la cotización
     for key, value in cotizacion_data.items():
         if hasattr(cotizacion, key):
@@ -534,6 +801,7 @@ def update_cotizacion(
         }
         item = CotizacionItem(cotizacion_id=cotizacion.id, **item_data_limpia)
         db.add(item)
+        _asignar_servicio(db, item)
         subtotal += item_data_limpia.get('importe', 0)
         impuestos_total += (item_data_limpia.get('importe', 0) * item_data_limpia.get('impuesto', 0) / 100)
     
@@ -543,7 +811,7 @@ def update_cotizacion(
     
     cotizacion.updated_at = datetime.now()
     
-    db.commit()
+    _commit_versionado(db)
     db.refresh(cotizacion)
     return cotizacion
 
@@ -568,17 +836,20 @@ def cancelar_cotizacion(db: Session, cotizacion_id: int) -> bool:
     
     cotizacion.estado = 'Cancelada'
     cotizacion.updated_at = datetime.now()
-    db.commit()
+    _commit_versionado(db)
     return True
 
 # ==================== NOTAS DE VENTA ====================
 
-def get_all_notas(db: Session, estado: Optional[str] = None) -> List[NotaVenta]:
-    """Obtener todas las notas de venta"""
+def get_all_notas(db: Session, estado: Optional[str] = None, limit: Optional[int] = None) -> List[NotaVenta]:
+    """Obtener todas las notas de venta (opcional: solo las 'limit' más recientes)"""
     query = db.query(NotaVenta)
     if estado:
         query = query.filter(NotaVenta.estado == estado)
-    return query.order_by(NotaVenta.fecha.desc()).all()
+    query = query.order_by(NotaVenta.fecha.desc())
+    if limit:
+        query = query.limit(limit)
+    return query.all()
 
 
 def get_nota(db: Session, nota_id: int) -> Optional[NotaVenta]:
@@ -608,11 +879,16 @@ def search_notas(
 
 def create_nota_venta(db: Session, nota_data: Dict[str, Any], items: List[Dict[str, Any]], estado: Optional[str] = 'Registrado') -> NotaVenta:
     """Crear nueva nota de venta con items"""
+    nueva_nota = _agregar_nota_venta(db, nota_data, items, estado)
+    db.commit()
+    db.refresh(nueva_nota)
+    return nueva_nota
+
+def _agregar_nota_venta(db: Session, nota_data: Dict[str, Any], items: List[Dict[str, Any]], estado: Optional[str]) -> NotaVenta:
+    """Agrega la nota y sus items a la sesión, sin commit"""
     # Generar folio único si no existe
-    if 'folio' not in nota_data:
-        ultimo_folio = db.query(NotaVenta).order_by(NotaVenta.id.desc()).first()
-        numero = 1 if not ultimo_folio else ultimo_folio.id + 1
-        nota_data['folio'] = f"NV-{datetime.now().year}-{numero:05d}"
+    if not nota_data.get('folio'):
+        nota_data['folio'] = siguiente_folio(db, 'NV')
     
     nota_data['estado'] = estado
     nota_data['total_pagado'] = 0.0
@@ -628,6 +904,7 @@ def create_nota_venta(db: Session, nota_data: Dict[str, Any], items: List[Dict[s
     for item_data in items:
         item = NotaVentaItem(nota_id=nueva_nota.id, **item_data)
         db.add(item)
+        _asignar_servicio(db, item)
         subtotal += item.importe
         impuestos_total += (item.importe * item.impuesto / 100)
     
@@ -635,16 +912,14 @@ def create_nota_venta(db: Session, nota_data: Dict[str, Any], items: List[Dict[s
     nueva_nota.impuestos = impuestos_total
     nueva_nota.total = subtotal + impuestos_total
     nueva_nota.saldo = nueva_nota.total
-    
-    db.commit()
-    db.refresh(nueva_nota)
     return nueva_nota
 
 def update_nota_venta(
     db: Session, 
     nota_id: int, 
     nota_data: Dict[str, Any], 
-    items: List[Dict[str, Any]]
+    items: List[Dict[str, Any]],
+    version: Optional[int] = None
 ) -> Optional[NotaVenta]:
     """
     Actualizar una nota de venta existente.
@@ -657,6 +932,9 @@ def update_nota_venta(
     if nota.estado == 'Cancelada' or nota.estado == 'Pagado':
         raise ValueError("No se puede modificar una nota Pagada o Cancelada.")
     
+    nota_data.pop('version', None)
+    _verificar_version(nota, version)
+    
     # 1. Actualizar datos de la nota
     for key, value in nota_data.items():
         if hasattr(nota, key):
@@ -672,6 +950,7 @@ def update_nota_venta(
     for item_data in items:
         item = NotaVentaItem(nota_id=nota.id, **item_data)
         db.add(item)
+        _asignar_servicio(db, item)
         subtotal += item.importe
         impuestos_total += (item.importe * item.impuesto / 100)
     
@@ -694,7 +973,7 @@ def update_nota_venta(
         
     nota.updated_at = datetime.now()
     
-    db.commit()
+    _commit_versionado(db)
     db.refresh(nota)
     return nota
 
@@ -711,7 +990,7 @@ def cancelar_nota(db: Session, nota_id: int) -> bool:
     nota.estado = 'Cancelada'
     nota.saldo = 0.0 # Al cancelar, el saldo pendiente es 0
     nota.updated_at = datetime.now()
-    db.commit()
+    _commit_versionado(db)
     return True
 
 def get_pagos_por_nota(db: Session, nota_id: int) -> List[NotaVentaPago]:
@@ -726,6 +1005,17 @@ def registrar_pago_nota(
     fecha_pago: datetime, 
     metodo_pago: str, 
     memo: Optional[str] = None
+) -> Optional[NotaVenta]:
+    """Abonar a la nota; si otro pago la modificó al mismo tiempo, se reintenta con el saldo nuevo"""
+    return _con_reintentos(db, lambda: _registrar_pago_nota(db, nota_id, monto, fecha_pago, metodo_pago, memo))
+
+def _registrar_pago_nota(
+    db: Session, 
+    nota_id: int, 
+    monto: float, 
+    fecha_pago: datetime, 
+    metodo_pago: str, 
+    memo: Optional[str] = None
 ) -> Optional[NotaVenta]:
     """
     Registrar un pago o abono a una nota de venta y actualizar su estado.
@@ -780,6 +1070,10 @@ def get_pago_by_id(db: Session, pago_id: int) -> Optional[NotaVentaPago]:
     return db.query(NotaVentaPago).filter(NotaVentaPago.id == pago_id).first()
 
 def eliminar_pago_nota(db: Session, pago_id: int) -> Optional[NotaVenta]:
+    """Quitar un pago; si la nota cambió al mismo tiempo, se reintenta"""
+    return _con_reintentos(db, lambda: _eliminar_pago_nota(db, pago_id))
+
+def _eliminar_pago_nota(db: Session, pago_id: int) -> Optional[NotaVenta]:
     """
     Elimina un registro de pago y revierte los cambios en la Nota de Venta.
     """
@@ -822,11 +1116,116 @@ def eliminar_pago_nota(db: Session, pago_id: int) -> Optional[NotaVenta]:
     
     return nota
 
+# ==================== CONVERSIONES A NOTA ====================
+
+def _ligar_nota_folio(db: Session, modelo, documento_id: int, nota_folio: str, estado: str):
+    """
+    Marca el documento origen con la nota generada, solo si aún no tenía
+    una. Si otra petición lo convirtió primero, no se actualiza nada y se
+    revierte toda la conversión.
+    """
+    resultado = db.execute(
+        update(modelo)
+        .where(modelo.id == documento_id, modelo.nota_folio.is_(None))
+        .values(nota_folio=nota_folio, estado=estado, updated_at=datetime.now(), version=modelo.version + 1)
+        .execution_options(synchronize_session="fetch")
+    )
+    if resultado.rowcount != 1:
+        db.rollback()
+        raise ValueError("El documento ya generó una nota de venta.")
+
+def convertir_cotizacion_a_nota(db: Session, cotizacion_id: int, observaciones: Optional[str] = None) -> Optional[NotaVenta]:
+    """
+    Genera la nota de venta de una cotización en una sola transacción:
+    copia los items, liga ambos folios y marca la cotización como Aceptada.
+    """
+    cotizacion = get_cotizacion(db, cotizacion_id)
+    if not cotizacion:
+        return None
+    if cotizacion.nota_folio:
+        raise ValueError(f"Esta cotización ya generó la nota: {cotizacion.nota_folio}")
+    if cotizacion.estado == 'Cancelada':
+        raise ValueError("No se puede generar una nota de una cotización cancelada.")
+    if not cotizacion.items:
+        raise ValueError("La cotización no tiene items para transferir a la nota.")
+    
+    nota_data = {
+        'cliente_id': cotizacion.cliente_id,
+        'fecha': datetime.now(),
+        'observaciones': observaciones if observaciones is not None else cotizacion.observaciones,
+        'metodo_pago': None,
+        'cotizacion_folio': cotizacion.folio
+    }
+    items = [{
+        'cantidad': i.cantidad,
+        'descripcion': i.descripcion,
+        'precio_unitario': i.precio_unitario or 0.0,
+        'importe': (i.cantidad or 0) * (i.precio_unitario or 0.0),
+        'impuesto': i.impuesto if i.impuesto is not None else 16.0,
+        'servicio_id': i.servicio_id,
+        'producto_id': i.producto_id
+    } for i in cotizacion.items]
+    
+    nota = _agregar_nota_venta(db, nota_data, items, 'Registrado')
+    _ligar_nota_folio(db, Cotizacion, cotizacion_id, nota.folio, 'Aceptada')
+    db.commit()
+    db.refresh(nota)
+    return nota
+
+def convertir_orden_a_nota(db: Session, orden_id: int) -> Optional[NotaVenta]:
+    """
+    Genera la nota de venta (Borrador, precios en $0) de una orden
+    Completada en una sola transacción y marca la orden como Facturada.
+    """
+    orden = get_orden(db, orden_id)
+    if not orden:
+        return None
+    if orden.estado != 'Completada':
+        raise ValueError("Solo se puede generar una nota si el estado de la Orden es 'Completada'.")
+    if orden.nota_folio:
+        raise ValueError(f"Ya se generó una Nota de Venta para esta orden (Folio Nota: {orden.nota_folio}).")
+    existente = db.query(NotaVenta.folio).filter(NotaVenta.orden_folio == orden.folio).first()
+    if existente:
+        raise ValueError(f"Ya se generó una Nota de Venta para esta orden (Folio Nota: {existente[0]}).")
+    if not orden.items:
+        raise ValueError("La orden no tiene items válidos para transferir a la nota.")
+    
+    vehiculo = [
+        ("Marca", orden.vehiculo_marca), ("Modelo", orden.vehiculo_modelo),
+        ("Año", orden.vehiculo_ano), ("Placa", orden.vehiculo_placas)
+    ]
+    nota_data = {
+        'cliente_id': orden.cliente_id,
+        'fecha': datetime.now(),
+        'observaciones': ", ".join(f"{etiqueta}: {valor}" for etiqueta, valor in vehiculo if valor),
+        'metodo_pago': None,
+        'orden_folio': orden.folio
+    }
+    items = [{
+        'cantidad': i.cantidad,
+        'descripcion': i.descripcion,
+        'precio_unitario': 0.0,
+        'importe': 0.0,
+        'impuesto': 16.0,
+        'servicio_id': i.servicio_id,
+        'producto_id': i.producto_id
+    } for i in orden.items]
+    
+    nota = _agregar_nota_venta(db, nota_data, items, 'Borrador')
+    _ligar_nota_folio(db, Orden, orden_id, nota.folio, 'Facturada')
+    db.commit()
+    db.refresh(nota)
+    return nota
+
+
 # ==================== NOTAS DE PROVEEDOR ====================
 
-def get_all_notas_proveedor(db: Session) -> List[NotaProveedor]:
-    """Obtener todas las notas de proveedor"""
-    return db.query(NotaProveedor).order_by(NotaProveedor.fecha.desc()).all()
+def get_all_notas_proveedor(db: Session, limit: Optional[int] = None) -> List[NotaProveedor]:
+    """Obtener todas las notas de proveedor (opcional: solo las 'limit' más recientes)"""
+    query = db.query(NotaProveedor).order_by(NotaProveedor.fecha.desc())
+    if limit:
+        query = query.limit(limit)
+    return query.all()
 
 
 def get_nota_proveedor(db: Session, nota_id: int) -> Optional[NotaProveedor]:
@@ -844,10 +1243,8 @@ def search_notas_proveedor_by_folio(db: Session, folio: str) -> List[NotaProveed
 def create_nota_proveedor(db: Session, nota_data: Dict[str, Any], items: List[Dict[str, Any]]) -> NotaProveedor:
     """Crear nueva nota de proveedor con items"""
     # Generar folio único si no existe
-    if 'folio' not in nota_data:
-        ultimo_folio = db.query(NotaProveedor).order_by(NotaProveedor.id.desc()).first()
-        numero = 1 if not ultimo_folio else ultimo_folio.id + 1
-        nota_data['folio'] = f"NP-{datetime.now().year}-{numero:05d}"
+    if not nota_data.get('folio'):
+        nota_data['folio'] = siguiente_folio(db, 'NP')
     
     nota_data['estado'] = 'Registrado'
     nota_data['total_pagado'] = 0.0
@@ -880,7 +1277,8 @@ def update_nota_proveedor(
     db: Session, 
     nota_id: int, 
     nota_data: Dict[str, Any], 
-    items: List[Dict[str, Any]]
+    items: List[Dict[str, Any]],
+    version: Optional[int] = None
 ) -> Optional[NotaProveedor]:
     """
     Actualizar una nota de proveedor existente.
@@ -892,6 +1290,9 @@ def update_nota_proveedor(
     if nota.estado == 'Cancelada' or nota.estado == 'Pagado':
         raise ValueError("No se puede modificar una nota Pagada o Cancelada.")
     
+    nota_data.pop('version', None)
+    _verificar_version(nota, version)
+    
     # 1. Actualizar datos de la nota
     for key, value in nota_data.items():
         if hasattr(nota, key):
@@ -928,7 +1329,7 @@ def update_nota_proveedor(
         
     nota.updated_at = datetime.now()
     
-    db.commit()
+    _commit_versionado(db)
     db.refresh(nota)
     return nota
 
@@ -936,10 +1337,8 @@ def update_nota_proveedor(
 def create_nota_proveedor(db: Session, nota_data: Dict[str, Any], items: List[Dict[str, Any]]) -> NotaProveedor:
     """Crear nueva nota de proveedor con items"""
     # Generar folio único si no existe
-    if 'folio' not in nota_data:
-        ultimo_folio = db.query(NotaProveedor).order_by(NotaProveedor.id.desc()).first()
-        numero = 1 if not ultimo_folio else ultimo_folio.id + 1
-        nota_data['folio'] = f"NP-{datetime.now().year}-{numero:05d}"
+    if not nota_data.get('folio'):
+        nota_data['folio'] = siguiente_folio(db, 'NP')
     
     nota_data['estado'] = 'Registrado'
     nota_data['total_pagado'] = 0.0
@@ -980,7 +1379,7 @@ def cancelar_nota_proveedor(db: Session, nota_id: int) -> bool:
     nota.estado = 'Cancelada'
     nota.saldo = 0.0
     nota.updated_at = datetime.now()
-    db.commit()
+    _commit_versionado(db)
     return True
 
 def get_pagos_por_nota_proveedor(db: Session, nota_id: int) -> List[NotaProveedorPago]:
@@ -995,6 +1394,17 @@ def registrar_pago_nota_proveedor(
     fecha_pago: datetime, 
     metodo_pago: str, 
     memo: Optional[str] = None
+) -> Optional[NotaProveedor]:
+    """Abonar a la nota; si otro pago la modificó al mismo tiempo, se reintenta con el saldo nuevo"""
+    return _con_reintentos(db, lambda: _registrar_pago_nota_proveedor(db, nota_id, monto, fecha_pago, metodo_pago, memo))
+
+def _registrar_pago_nota_proveedor(
+    db: Session, 
+    nota_id: int, 
+    monto: float, 
+    fecha_pago: datetime, 
+    metodo_pago: str, 
+    memo: Optional[str] = None
 ) -> Optional[NotaProveedor]:
     """
     Registrar un pago a una nota de proveedor y actualizar su estado.
@@ -1048,6 +1458,10 @@ def get_pago_proveedor_by_id(db: Session, pago_id: int) -> Optional[NotaProveedo
     return db.query(NotaProveedorPago).filter(NotaProveedorPago.id == pago_id).first()
 
 def eliminar_pago_nota_proveedor(db: Session, pago_id: int) -> Optional[NotaProveedor]:
+    """Quitar un pago; si la nota cambió al mismo tiempo, se reintenta"""
+    return _con_reintentos(db, lambda: _eliminar_pago_nota_proveedor(db, pago_id))
+
+def _eliminar_pago_nota_proveedor(db: Session, pago_id: int) -> Optional[NotaProveedor]:
     """
     Elimina un registro de pago a proveedor y revierte los cambios en la Nota de Proveedor.
     """
@@ -1086,6 +1500,78 @@ def eliminar_pago_nota_proveedor(db: Session, pago_id: int) -> Optional[NotaProv
     
     return nota
 
+# ==================== LISTAS POR COLUMNAS ====================
+# Las listas completas (GET /notas, /cotizaciones...) se leen como filas y
+# salen como dicts con la forma de los esquemas de salida, sin crear objetos
+# ORM: una consulta para los documentos (con el nombre del cliente o
+# proveedor) y una por cada detalle (partidas, pagos), en lugar de la carga
+# perezosa de cada documento.
+
+# Ids por consulta de detalle (SQLite admite 999 parámetros por sentencia)
+IDS_POR_CONSULTA = 900
+
+
+def _filas_documentos(db: Session, modelo, relacionado, columna_relacion, campo_nombre: str,
+                      detalles: Dict[str, tuple], orden, estado: Optional[str] = None,
+                      limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    detalles: {'items': (NotaVentaItem, 'nota_id'), ...}; cada documento
+    recibe la lista de sus filas de detalle bajo esa llave.
+    """
+    consulta = (select(modelo.__table__, relacionado.nombre.label(campo_nombre))
+                .outerjoin(relacionado, relacionado.id == columna_relacion))
+    if estado:
+        consulta = consulta.where(modelo.estado == estado)
+    # El id desempata fechas iguales para que el límite sea estable
+    consulta = consulta.order_by(orden.desc(), modelo.id.desc())
+    if limit:
+        consulta = consulta.limit(limit)
+    documentos = [dict(fila) for fila in db.execute(consulta).mappings()]
+    if not documentos:
+        return documentos
+
+    por_id = {}
+    for documento in documentos:
+        por_id[documento['id']] = documento
+        for nombre in detalles:
+            documento[nombre] = []
+
+    # Los detalles se piden con los ids ya leídos (no se repite la consulta
+    # de documentos: una fila insertada en medio no aparece en los detalles)
+    ids = list(por_id)
+    for nombre, (modelo_detalle, llave) in detalles.items():
+        columna = getattr(modelo_detalle, llave)
+        for i in range(0, len(ids), IDS_POR_CONSULTA):
+            consulta = (select(modelo_detalle.__table__)
+                        .where(columna.in_(ids[i:i + IDS_POR_CONSULTA]))
+                        .order_by(modelo_detalle.id))
+            for fila in db.execute(consulta).mappings():
+                por_id[fila[llave]][nombre].append(dict(fila))
+    return documentos
+
+
+def filas_ordenes(db: Session, estado: Optional[str] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    return _filas_documentos(db, Orden, Cliente, Orden.cliente_id, 'cliente_nombre',
+                             {'items': (OrdenItem, 'orden_id')}, Orden.created_at, estado, limit)
+
+
+def filas_cotizaciones(db: Session, estado: Optional[str] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    return _filas_documentos(db, Cotizacion, Cliente, Cotizacion.cliente_id, 'cliente_nombre',
+                             {'items': (CotizacionItem, 'cotizacion_id')}, Cotizacion.created_at, estado, limit)
+
+
+def filas_notas(db: Session, estado: Optional[str] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    return _filas_documentos(db, NotaVenta, Cliente, NotaVenta.cliente_id, 'cliente_nombre',
+                             {'items': (NotaVentaItem, 'nota_id'), 'pagos': (NotaVentaPago, 'nota_id')},
+                             NotaVenta.fecha, estado, limit)
+
+
+def filas_notas_proveedor(db: Session, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    return _filas_documentos(db, NotaProveedor, Proveedor, NotaProveedor.proveedor_id, 'proveedor_nombre',
+                             {'items': (NotaProveedorItem, 'nota_id'), 'pagos': (NotaProveedorPago, 'nota_id')},
+                             NotaProveedor.fecha, limit=limit)
+
+
 # ==================== USUARIOS ====================
 import bcrypt
 from sqlalchemy import and_
@@ -1110,7 +1596,7 @@ def verificar_credenciales(db: Session, username: str, password: str) -> Optiona
             db.commit()
             return usuario
     except Exception as e:
-        print(f"Error verificando credenciales: {e}")
+        log.warning("Error verificando credenciales: %s", e)
         return None
     
     return None
@@ -1156,7 +1642,7 @@ def crear_usuario_crud(db: Session, datos: Dict) -> Optional[Usuario]:
         db.refresh(nuevo_usuario)
         return nuevo_usuario
     except Exception as e:
-        print(f"Error crear_usuario: {e}")
+        log.warning("Error crear_usuario: %s", e)
         db.rollback()
         return None
 
@@ -1185,7 +1671,7 @@ def actualizar_usuario(db: Session, usuario_id: int, datos: Dict) -> Optional[Us
         db.refresh(usuario)
         return usuario
     except Exception as e:
-        print(f"Error actualizar_usuario: {e}")
+        log.warning("Error actualizar_usuario: %s", e)
         db.rollback()
         return None
 
@@ -1197,7 +1683,7 @@ def contar_admins_activos(db: Session) -> int:
             Usuario.activo == True
         ).count()
     except Exception as e:
-        print(f"Error contar_admins_activos: {e}")
+        log.warning("Error contar_admins_activos: %s", e)
         return 0
 
 def eliminar_usuario(db: Session, usuario_id: int) -> bool:
@@ -1211,7 +1697,7 @@ def eliminar_usuario(db: Session, usuario_id: int) -> bool:
         db.commit()
         return True
     except Exception as e:
-        print(f"Error eliminar_usuario: {e}")
+        log.warning("Error eliminar_usuario: %s", e)
         db.rollback()
         return False
 
@@ -1223,7 +1709,7 @@ def get_config_empresa(db: Session) -> Optional[ConfigEmpresa]:
         config = db.query(ConfigEmpresa).first()
         return config
     except Exception as e:
-        print(f"Error get_config_empresa: {e}")
+        log.warning("Error get_config_empresa: %s", e)
         return None
 
 def guardar_config_empresa(db: Session, datos: Dict) -> bool:
@@ -1242,7 +1728,7 @@ def guardar_config_empresa(db: Session, datos: Dict) -> bool:
         db.commit()
         return True
     except Exception as e:
-        print(f"Error guardar_config_empresa: {e}")
+        log.warning("Error guardar_config_empresa: %s", e)
         db.rollback()
         return False
 
@@ -1254,7 +1740,7 @@ def get_usuarios(db: Session) -> List[Usuario]:
         # Añadimos el filtro para mostrar solo los activos
         return db.query(Usuario).filter(Usuario.activo == True).all()
     except Exception as e:
-        print(f"Error get_usuarios: {e}")
+        log.warning("Error get_usuarios: %s", e)
         return []
 
 def get_usuario(db: Session, usuario_id: int) -> Optional[Usuario]:
@@ -1262,7 +1748,7 @@ def get_usuario(db: Session, usuario_id: int) -> Optional[Usuario]:
     try:
         return db.query(Usuario).filter(Usuario.id == usuario_id).first()
     except Exception as e:
-        print(f"Error get_usuario: {e}")
+        log.warning("Error get_usuario: %s", e)
         return None
 
 def crear_usuario_crud(db: Session, datos: Dict) -> Optional[Usuario]:
@@ -1283,7 +1769,7 @@ def crear_usuario_crud(db: Session, datos: Dict) -> Optional[Usuario]:
         db.refresh(nuevo_usuario)
         return nuevo_usuario
     except Exception as e:
-        print(f"Error crear_usuario: {e}")
+        log.warning("Error crear_usuario: %s", e)
         db.rollback()
         return None
 
@@ -1303,7 +1789,7 @@ def actualizar_usuario(db: Session, usuario_id: int, datos: Dict) -> Optional[Us
         db.refresh(usuario)
         return usuario
     except Exception as e:
-        print(f"Error actualizar_usuario: {e}")
+        log.warning("Error actualizar_usuario: %s", e)
         db.rollback()
         return None
 
@@ -1315,7 +1801,7 @@ def contar_admins_activos(db: Session) -> int:
             Usuario.activo == True
         ).count()
     except Exception as e:
-        print(f"Error contar_admins_activos: {e}")
+        log.warning("Error contar_admins_activos: %s", e)
         return 0
 
 def eliminar_usuario(db: Session, usuario_id: int) -> bool:
@@ -1331,30 +1817,90 @@ def eliminar_usuario(db: Session, usuario_id: int) -> bool:
         db.commit()
         return True
     except Exception as e:
-        print(f"Error eliminar_usuario (soft delete): {e}")
+        log.warning("Error eliminar_usuario (soft delete): %s", e)
         db.rollback()
         return False
 
 # ==================== ESTADÍSTICAS Y REPORTES ====================
+# Los reportes de notas muestran una línea por nota: se leen solo esas
+# columnas (Row, una tupla con nombres), sin objetos ORM en el identity
+# map ni carga de partidas y pagos. El resultado completo se serializa y se
+# guarda en cache_reportes, así que se lee de una vez.
+
 
-def get_reporte_ventas_por_periodo(db: Session, fecha_ini: datetime, fecha_fin: datetime) -> List[NotaVenta]:
-    """Obtiene notas de venta (no canceladas) dentro de un rango de fechas."""
-    return db.query(NotaVenta).filter(
+def _columnas_reporte_notas():
+    return select(
+        NotaVenta.id, NotaVenta.folio, NotaVenta.fecha, NotaVenta.cliente_id,
+        Cliente.nombre.label('cliente_nombre'), NotaVenta.estado, NotaVenta.metodo_pago,
+        NotaVenta.subtotal, NotaVenta.impuestos, NotaVenta.total,
+        NotaVenta.total_pagado, NotaVenta.saldo
+    ).outerjoin(Cliente, Cliente.id == NotaVenta.cliente_id)
+
+
+def get_reporte_ventas_por_periodo(db: Session, fecha_ini: datetime, fecha_fin: datetime) -> List[Any]:
+    """Notas de venta (no canceladas) dentro de un rango de fechas, como filas."""
+    return db.execute(_columnas_reporte_notas().where(
         NotaVenta.fecha.between(fecha_ini, fecha_fin),
         NotaVenta.estado != 'Cancelada'
-    ).order_by(NotaVenta.fecha.asc()).all()
+    ).order_by(NotaVenta.fecha.asc())).all()
 
 def get_reporte_servicios_mas_solicitados(db: Session, fecha_ini: datetime, fecha_fin: datetime) -> List[Any]:
-    """Obtiene servicios (items de nota) más vendidos por cantidad en un periodo."""
-    return db.query(
-        NotaVentaItem.descripcion,
-        func.sum(NotaVentaItem.cantidad).label('total_vendido')
-    ).join(NotaVenta, NotaVenta.id == NotaVentaItem.nota_id).filter(
+    """
+    Obtiene servicios (items de nota) más vendidos por cantidad en un periodo.
+    Agrupa por servicio_id (entero indexado); los items aún sin catálogo
+    (antes del backfill) se agrupan por clave_servicio, como en
+    resolver_servicio, y se suman al servicio con esa clave si existe.
+    """
+    filtros = (
         NotaVenta.fecha.between(fecha_ini, fecha_fin),
         NotaVenta.estado != 'Cancelada'
-    ).group_by(NotaVentaItem.descripcion).order_by(
-        func.sum(NotaVentaItem.cantidad).desc()
-    ).limit(100).all()
+    )
+    totales: Dict[int, float] = defaultdict(float)
+    for servicio_id, total in db.query(
+        NotaVentaItem.servicio_id,
+        func.sum(NotaVentaItem.cantidad)
+    ).join(NotaVenta, NotaVenta.id == NotaVentaItem.nota_id).filter(
+        *filtros, NotaVentaItem.servicio_id.isnot(None)
+    ).group_by(NotaVentaItem.servicio_id):
+        totales[servicio_id] += total or 0
+
+    # Sin catálogo: clave -> total y la variante de texto más vendida
+    por_clave: Dict[str, float] = defaultdict(float)
+    variantes: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+    for descripcion, total in db.query(
+        NotaVentaItem.descripcion,
+        func.sum(NotaVentaItem.cantidad)
+    ).join(NotaVenta, NotaVenta.id == NotaVentaItem.nota_id).filter(
+        *filtros, NotaVentaItem.servicio_id.is_(None)
+    ).group_by(NotaVentaItem.descripcion):
+        clave = clave_servicio(descripcion or '')[:200]
+        por_clave[clave] += total or 0
+        variantes[clave][descripcion] += total or 0
+
+    claves = [c for c in por_clave if c]
+    servicio_de_clave: Dict[str, int] = {}
+    for i in range(0, len(claves), IDS_POR_CONSULTA):
+        servicio_de_clave.update(db.query(Servicio.clave, Servicio.id).filter(
+            Servicio.clave.in_(claves[i:i + IDS_POR_CONSULTA])))
+
+    resultados = []
+    for clave, total in por_clave.items():
+        servicio_id = servicio_de_clave.get(clave)
+        if servicio_id:
+            totales[servicio_id] += total
+        else:
+            nombre = max(variantes[clave].items(), key=lambda par: par[1])[0]
+            resultados.append((nombre, total))
+
+    ids = list(totales)
+    nombres: Dict[int, str] = {}
+    for i in range(0, len(ids), IDS_POR_CONSULTA):
+        nombres.update(db.query(Servicio.id, Servicio.nombre).filter(
+            Servicio.id.in_(ids[i:i + IDS_POR_CONSULTA])))
+    resultados.extend((nombres.get(sid, ''), total) for sid, total in totales.items())
+
+    resultados.sort(key=lambda r: r[1] or 0, reverse=True)
+    return resultados[:100]
 
 def get_reporte_clientes_frecuentes(db: Session, fecha_ini: datetime, fecha_fin: datetime) -> List[Any]:
     """Obtiene clientes con más compras (por monto total) en el periodo."""
@@ -1369,9 +1915,9 @@ def get_reporte_clientes_frecuentes(db: Session, fecha_ini: datetime, fecha_fin:
         func.sum(NotaVenta.total).desc()
     ).limit(100).all()
 
-def get_reporte_cuentas_por_cobrar(db: Session) -> List[NotaVenta]:
-    """Obtiene todas las notas de venta con saldo pendiente (no canceladas)."""
-    return db.query(NotaVenta).filter(
+def get_reporte_cuentas_por_cobrar(db: Session) -> List[Any]:
+    """Notas de venta con saldo pendiente (no canceladas), como filas."""
+    return db.execute(_columnas_reporte_notas().where(
         NotaVenta.saldo > 0.01,
         NotaVenta.estado != 'Cancelada'
-    ).order_by(NotaVenta.fecha.asc()).all()
\ No newline at end of file
+    ).order_by(NotaVenta.fecha.asc())).all()
\ No newline at end of file
@@ -0,0 +1,385 @@
+"""
+Esquemas (Pydantic v2) de lo que sale y entra por la API.
+
+Salida: un modelo por entidad con from_attributes. Se llena igual de un
+objeto ORM que de un dict/fila de una consulta por columnas (crud.filas_*),
+así las listas grandes no crean objetos ORM. Los vacíos salen como antes:
+'' en textos y fechas, 0.0 en montos, 'N/A' en los nombres relacionados
+que lo usaban; las fechas salen en ISO 8601.
+
+    a_dict(NotaSalida, nota)                 # dict para broadcast y respuestas sueltas
+    respuesta_lista(NotaSalida, filas)       # validación y JSON en pydantic-core
+
+Entrada: ClienteEntrada, ProductoEntrada... validan el cuerpo antes de
+llegar a crud; los campos que no son columnas se ignoran y las
+actualizaciones (…Cambios) solo llevan lo que el cliente envió
+(datos()).
+"""
+
+import base64
+from datetime import date, datetime
+from typing import Annotated, Any, Dict, Iterable, List, Optional, Type, Union
+
+from pydantic import AliasChoices, AliasPath, BaseModel, BeforeValidator, ConfigDict, Field, TypeAdapter
+from starlette.responses import Response
+
+
+def _o(defecto):
+    """El valor, o 'defecto' si viene vacío (None, '' o 0)"""
+    return BeforeValidator(lambda valor: valor or defecto)
+
+
+Texto = Annotated[str, _o('')]
+Monto = Annotated[float, _o(0.0)]
+Numero = Union[int, float]                             # sin convertir 1 -> 1.0
+Entero = Annotated[Numero, _o(0)]
+Fecha = Annotated[Union[datetime, str], _o('')]       # datetime, o '' si no hay
+NombreOpcional = Annotated[str, _o('N/A')]
+
+
+def _nombre_de(relacion: str, campo: str):
+    """'campo' si viene en la fila; si no, relacion.nombre del objeto ORM"""
+    return AliasChoices(campo, AliasPath(relacion, 'nombre'))
+
+
+def _base64(valor):
+    if isinstance(valor, (bytes, bytearray, memoryview)):
+        return base64.b64encode(bytes(valor)).decode('ascii')
+    return valor or None
+
+
+class Esquema(BaseModel):
+    # coerce_numbers_to_str: columnas de texto que SQLite pudo guardar como número
+    model_config = ConfigDict(from_attributes=True, coerce_numbers_to_str=True)
+
+
+# ==================== SALIDA: CATÁLOGOS ====================
+
+class ClienteSalida(Esquema):
+    id: int
+    nombre: Optional[str] = None
+    tipo: Optional[str] = None
+    email: Texto = ''
+    telefono: Texto = ''
+    rfc: Texto = ''
+    calle: Texto = ''
+    colonia: Texto = ''
+    ciudad: Texto = ''
+    estado: Texto = ''
+    cp: Texto = ''
+    pais: Annotated[str, _o('México')] = 'México'
+
+
+class ProveedorSalida(ClienteSalida):
+    pass
+
+
+class ProductoSalida(Esquema):
+    id: int
+    codigo: Optional[str] = None
+    nombre: Optional[str] = None
+    categoria: Texto = ''
+    ubicacion: Texto = ''
+    proveedor_id: Optional[int] = None
+    proveedor_nombre: NombreOpcional = Field('N/A', validation_alias=_nombre_de('proveedor', 'proveedor_nombre'))
+    precio_compra: Monto = 0.0
+    precio_venta: Monto = 0.0
+    stock_actual: Entero = 0
+    stock_min: Entero = 0
+    descripcion: Texto = ''
+
+
+class MovimientoSalida(Esquema):
+    id: int
+    producto_id: Optional[int] = None
+    producto: NombreOpcional = Field('N/A', validation_alias=_nombre_de('producto', 'producto_nombre'))
+    tipo: Optional[str] = None
+    cantidad: Optional[Numero] = None
+    motivo: Texto = ''
+    usuario: Texto = ''
+    fecha: Fecha = Field('', validation_alias=AliasChoices('fecha', 'created_at'))
+
+
+# ==================== SALIDA: DOCUMENTOS ====================
+
+class ItemOrdenSalida(Esquema):
+    id: int
+    cantidad: Optional[Numero] = None
+    descripcion: Optional[str] = None
+    servicio_id: Optional[int] = None
+
+
+class OrdenSalida(Esquema):
+    id: int
+    folio: Optional[str] = None
+    version: Optional[int] = None
+    cliente_id: Optional[int] = None
+    cliente_nombre: NombreOpcional = Field('N/A', validation_alias=_nombre_de('cliente', 'cliente_nombre'))
+    vehiculo_marca: Texto = ''
+    vehiculo_modelo: Texto = ''
+    vehiculo_ano: Texto = ''
+    vehiculo_placas: Texto = ''
+    vehiculo_vin: Texto = ''
+    vehiculo_color: Texto = ''
+    vehiculo_kilometraje: Texto = ''
+    estado: Optional[str] = None
+    fecha_recepcion: Fecha = ''
+    fecha_promesa: Fecha = ''
+    fecha_entrega: Fecha = ''
+    mecanico_asignado: Texto = ''
+    observaciones: Texto = ''
+    nota_folio: Texto = ''
+    items: List[ItemOrdenSalida] = []
+
+
+class ItemDocumentoSalida(Esquema):
+    """Partida con precio (cotizaciones y notas de venta)"""
+    id: int
+    cantidad: Optional[Numero] = None
+    descripcion: Optional[str] = None
+    precio_unitario: Monto = 0.0
+    importe: Monto = 0.0
+    impuesto: Monto = 0.0
+    servicio_id: Optional[int] = None
+
+
+class CotizacionSalida(Esquema):
+    id: int
+    folio: Optional[str] = None
+    version: Optional[int] = None
+    cliente_id: Optional[int] = None
+    cliente_nombre: NombreOpcional = Field('N/A', validation_alias=_nombre_de('cliente', 'cliente_nombre'))
+    estado: Optional[str] = None
+    vigencia: Annotated[str, _o('30 días')] = '30 días'
+    subtotal: Monto = 0.0
+    impuestos: Monto = 0.0
+    total: Monto = 0.0
+    observaciones: Texto = ''
+    fecha: Fecha = Field('', validation_alias=AliasChoices('fecha', 'created_at'))
+    created_at: Fecha = ''
+    nota_folio: Texto = ''
+    items: List[ItemDocumentoSalida] = []
+
+
+class PagoSalida(Esquema):
+    id: int
+    monto: Optional[float] = None
+    fecha_pago: Fecha = ''
+    metodo_pago: Optional[str] = None
+    memo: Texto = ''
+
+
+class NotaSalida(Esquema):
+    id: int
+    folio: Optional[str] = None
+    version: Optional[int] = None
+    cliente_id: Optional[int] = None
+    cliente_nombre: Texto = Field('', validation_alias=_nombre_de('cliente', 'cliente_nombre'))
+    estado: Optional[str] = None
+    metodo_pago: Texto = ''
+    subtotal: Monto = 0.0
+    impuestos: Monto = 0.0
+    total: Monto = 0.0
+    total_pagado: Monto = 0.0
+    saldo: Monto = 0.0
+    fecha: Fecha = ''
+    observaciones: Texto = ''
+    cotizacion_folio: Texto = ''
+    orden_folio: Texto = ''
+    items: List[ItemDocumentoSalida] = []
+    pagos: List[PagoSalida] = []
+
+
+class ItemNotaProveedorSalida(Esquema):
+    id: int
+    cantidad: Optional[Numero] = None
+    descripcion: Optional[str] = None
+    precio_unitario: Monto = 0.0
+    importe: Monto = 0.0
+    impuesto: Monto = 0.0
+
+
+class PagoProveedorSalida(PagoSalida):
+    nota_id: Optional[int] = None
+
+
+class NotaProveedorSalida(Esquema):
+    id: int
+    folio: Optional[str] = None
+    version: Optional[int] = None
+    proveedor_id: Optional[int] = None
+    proveedor_nombre: Texto = Field('', validation_alias=_nombre_de('proveedor', 'proveedor_nombre'))
+    estado: Annotated[str, _o('Registrado')] = 'Registrado'
+    metodo_pago: Annotated[str, _o('Efectivo')] = 'Efectivo'
+    fecha: Fecha = ''
+    observaciones: Texto = ''
+    subtotal: Monto = 0.0
+    impuestos: Monto = 0.0
+    total: Monto = 0.0
+    total_pagado: Monto = 0.0
+    saldo: Monto = 0.0
+    items: List[ItemNotaProveedorSalida] = []
+    pagos: List[PagoProveedorSalida] = []
+
+
+# ==================== SALIDA: REPORTES ====================
+
+class NotaReporteSalida(Esquema):
+    """Una línea por nota (reportes de ventas y CxC): sin partidas ni pagos"""
+    id: int
+    folio: Optional[str] = None
+    fecha: Fecha = ''
+    cliente_id: Optional[int] = None
+    cliente_nombre: Texto = ''
+    estado: Optional[str] = None
+    metodo_pago: Texto = ''
+    subtotal: Monto = 0.0
+    impuestos: Monto = 0.0
+    total: Monto = 0.0
+    total_pagado: Monto = 0.0
+    saldo: Monto = 0.0
+
+
+# ==================== SALIDA: SISTEMA ====================
+
+class ConfigSalida(Esquema):
+    id: int
+    nombre_comercial: Optional[str] = None
+    razon_social: Texto = ''
+    rfc: Texto = ''
+    calle: Texto = ''
+    colonia: Texto = ''
+    ciudad: Texto = ''
+    estado: Texto = ''
+    cp: Texto = ''
+    pais: Annotated[str, _o('México')] = 'México'
+    telefono1: Texto = ''
+    telefono2: Texto = ''
+    email: Texto = ''
+    sitio_web: Texto = ''
+    logo_data: Annotated[Optional[str], BeforeValidator(_base64)] = None   # Base64
+
+
+class UsuarioSalida(Esquema):
+    id: int
+    username: Optional[str] = None
+    password_hash: Optional[str] = None   # Necesario para login
+    nombre_completo: Optional[str] = None
+    email: Texto = ''
+    rol: Optional[str] = None
+    activo: Optional[bool] = None
+    ultimo_acceso: Fecha = ''
+
+
+# ==================== CONVERSIÓN ====================
+
+_adaptadores: Dict[type, TypeAdapter] = {}
+
+
+def _adaptador_lista(esquema: Type[Esquema]) -> TypeAdapter:
+    adaptador = _adaptadores.get(esquema)
+    if adaptador is None:
+        adaptador = _adaptadores[esquema] = TypeAdapter(List[esquema])
+    return adaptador
+
+
+def a_dict(esquema: Type[Esquema], objeto: Any, vacio: Any = None) -> Any:
+    """Objeto ORM (o fila) -> dict con la forma de 'esquema'; 'vacio' si no hay objeto"""
+    if objeto is None:
+        return vacio
+    return esquema.model_validate(objeto).model_dump()
+
+
+def a_lista(esquema: Type[Esquema], objetos: Iterable[Any]) -> List[Dict]:
+    return [esquema.model_validate(o).model_dump() for o in objetos]
+
+
+def respuesta_lista(esquema: Type[Esquema], objetos: Iterable[Any]) -> Response:
+    """Lista validada y convertida a JSON sin pasar por dicts de Python"""
+    adaptador = _adaptador_lista(esquema)
+    filas = adaptador.validate_python(list(objetos), from_attributes=True)
+    return Response(adaptador.dump_json(filas), media_type="application/json")
+
+
+# ==================== ENTRADA ====================
+
+class Entrada(BaseModel):
+    model_config = ConfigDict(extra='ignore')
+
+    def datos(self) -> Dict[str, Any]:
+        """Solo los campos que el cliente envió (para crud.create_* / update_*)"""
+        return self.model_dump(exclude_unset=True)
+
+
+class ClienteCambios(Entrada):
+    nombre: Optional[str] = None
+    tipo: Optional[str] = None
+    email: Optional[str] = None
+    telefono: Optional[str] = None
+    calle: Optional[str] = None
+    colonia: Optional[str] = None
+    ciudad: Optional[str] = None
+    estado: Optional[str] = None
+    cp: Optional[str] = None
+    pais: Optional[str] = None
+    rfc: Optional[str] = None
+    activo: Optional[bool] = None
+
+
+class ClienteEntrada(ClienteCambios):
+    nombre: str
+    tipo: str
+
+
+# Mismas columnas que Cliente
+ProveedorCambios = ClienteCambios
+ProveedorEntrada = ClienteEntrada
+
+
+class ProductoCambios(Entrada):
+    codigo: Optional[str] = None
+    nombre: Optional[str] = None
+    categoria: Optional[str] = None
+    stock_actual: Optional[Numero] = None
+    stock_min: Optional[Numero] = None
+    ubicacion: Optional[str] = None
+    precio_compra: Optional[float] = None
+    precio_venta: Optional[float] = None
+    proveedor_id: Optional[int] = None
+    descripcion: Optional[str] = None
+    activo: Optional[bool] = None
+
+
+class ProductoEntrada(ProductoCambios):
+    codigo: str
+    nombre: str
+    categoria: str
+
+
+def _solo_fecha(valor):
+    """'YYYY-MM-DD' (lo que envía el escritorio) o ISO completo -> date"""
+    if isinstance(valor, str):
+        valor = datetime.fromisoformat(valor)
+    if isinstance(valor, datetime):
+        return valor.date()
+    return valor
+
+
+class PagoEntrada(Entrada):
+    monto: float
+    fecha_pago: Annotated[date, BeforeValidator(_solo_fecha)]
+    metodo_pago: str
+    memo: str = ''
+
+
+class MovimientoEntrada(Entrada):
+    producto_id: int
+    tipo: str
+    cantidad: Numero
+    motivo: str = ''
+    usuario: str = 'Sistema'
+
+
+class MovimientosLoteEntrada(Entrada):
+    movimientos: List[MovimientoEntrada]
+    usuario: str = 'Sistema'
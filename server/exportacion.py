@@ -0,0 +1,80 @@
+"""
+Exportación completa de la BD como NDJSON comprimido con gzip.
+
+El formato es el mismo que recibe /admin/import-ndjson: una línea
+{"tabla": ..., "datos": {...}} por fila, tablas padre primero, con el id
+como 'id_original' y cada llave foránea como '<campo>_id_original'.
+Todas las tablas se leen dentro de una sola transacción (REPEATABLE READ
+en PostgreSQL) con cursores del lado del servidor, así que la copia es
+consistente y la memoria no crece con el tamaño de la base.
+"""
+
+import base64
+import json
+import zlib
+from datetime import datetime
+from typing import Any, Dict, Iterator
+
+from sqlalchemy import select
+
+from server.importacion import ESQUEMA_IMPORTACION, ORDEN_TABLAS
+
+FILAS_POR_FETCH = 2000
+# Tamaño de los fragmentos comprimidos que se envían
+TAMANO_FRAGMENTO = 64 * 1024
+VERSION_FORMATO = 1
+
+
+def _valor_json(valor: Any) -> Any:
+    if isinstance(valor, datetime):
+        return valor.isoformat()
+    if isinstance(valor, (bytes, bytearray, memoryview)):
+        return base64.b64encode(bytes(valor)).decode('ascii')
+    return valor
+
+
+def _renombres(tabla: str) -> Dict[str, str]:
+    """columna -> nombre en el archivo ('id' -> 'id_original', 'cliente_id' -> 'cliente_id_original')"""
+    _, foraneas = ESQUEMA_IMPORTACION[tabla]
+    renombres = {columna: campo for campo, (columna, _, _) in foraneas.items()}
+    renombres['id'] = 'id_original'
+    return renombres
+
+
+def lineas_exportacion(engine) -> Iterator[bytes]:
+    """Genera las líneas NDJSON (sin comprimir) de todas las tablas importables"""
+    with engine.connect() as conn:
+        if engine.dialect.name == 'postgresql':
+            conn = conn.execution_options(isolation_level='REPEATABLE READ')
+        with conn.begin():
+            meta = {"version": VERSION_FORMATO, "exportado": datetime.now().isoformat()}
+            yield json.dumps({"tabla": "_meta", "datos": meta}).encode('utf-8') + b"\n"
+
+            for tabla in ORDEN_TABLAS:
+                modelo, _ = ESQUEMA_IMPORTACION[tabla]
+                t = modelo.__table__
+                renombres = _renombres(tabla)
+                resultado = conn.execution_options(
+                    stream_results=True, yield_per=FILAS_POR_FETCH
+                ).execute(select(t).order_by(t.c.id))
+
+                for fila in resultado.mappings():
+                    datos = {renombres.get(k, k): _valor_json(v) for k, v in fila.items()}
+                    yield json.dumps({"tabla": tabla, "datos": datos}, ensure_ascii=False).encode('utf-8') + b"\n"
+
+
+def exportar_gzip(engine) -> Iterator[bytes]:
+    """Comprime las líneas al vuelo en fragmentos de ~64 KB"""
+    compresor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    buffer = []
+    tamano = 0
+    for linea in lineas_exportacion(engine):
+        comprimido = compresor.compress(linea)
+        if comprimido:
+            buffer.append(comprimido)
+            tamano += len(comprimido)
+            if tamano >= TAMANO_FRAGMENTO:
+                yield b"".join(buffer)
+                buffer, tamano = [], 0
+    buffer.append(compresor.flush())
+    yield b"".join(buffer)
@@ -0,0 +1,158 @@
+"""
+Asignación de folios por serie y año ('NV-2025-00042').
+
+Cada serie/año tiene un contador en folios_secuencia que se incrementa con
+un solo UPDATE ... SET ultimo = ultimo + n RETURNING ultimo, en una
+transacción corta e independiente de la del documento. Así dos peticiones
+simultáneas nunca obtienen el mismo número y el bloqueo de la fila dura
+solo lo que tarda ese UPDATE. Si la creación del documento falla, el
+número se pierde (puede haber huecos, nunca duplicados).
+
+Con FOLIOS_BLOQUE > 1 cada proceso reserva bloques de n números y los
+reparte en memoria; se ahorra el viaje a la BD a cambio de que el orden
+de los folios entre procesos no siga el orden de creación.
+
+Las importaciones insertan documentos con su folio original: después de
+cada una, sincronizar() sube los contadores hasta el mayor número
+importado de cada serie/año.
+"""
+
+import os
+import re
+import threading
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from server.models import Cotizacion, NotaProveedor, NotaVenta, Orden, SecuenciaFolio
+
+# Serie -> modelo (para tomar el último número existente al iniciar un contador)
+SERIES = {
+    'NV': NotaVenta,
+    'ORD': Orden,
+    'COT': Cotizacion,
+    'NP': NotaProveedor,
+}
+
+BLOQUE_DEFAULT = int(os.getenv('FOLIOS_BLOQUE', '1'))
+
+_FOLIO = re.compile(r'^([A-Z]+)-(\d{4})-(\d+)$')
+
+
+def formatear_folio(serie: str, anio: int, numero: int) -> str:
+    return f"{serie}-{anio}-{numero:05d}"
+
+
+class AsignadorFolios:
+    """Contadores por serie/año con reserva opcional de bloques por proceso"""
+
+    def __init__(self, bloque: int = BLOQUE_DEFAULT):
+        self.bloque = max(1, bloque)
+        self._lock = threading.Lock()
+        # (url, serie, año) -> [siguiente, último reservado]
+        self._bloques: Dict[Tuple[str, str, int], List[int]] = {}
+        self._tablas_listas = set()
+
+    # ---------- BD ----------
+
+    def _preparar_tabla(self, engine):
+        url = str(engine.url)
+        if url not in self._tablas_listas:
+            SecuenciaFolio.__table__.create(bind=engine, checkfirst=True)
+            self._tablas_listas.add(url)
+
+    def _ultimo_existente(self, conn, serie: str, anio: int) -> int:
+        """Mayor número ya usado en la serie/año (solo al crear el contador)"""
+        modelo = SERIES.get(serie)
+        if modelo is None:
+            return 0
+        prefijo = f"{serie}-{anio}-"
+        maximo = 0
+        for (folio,) in conn.execute(select(modelo.folio).where(modelo.folio.like(prefijo + '%'))):
+            sufijo = folio[len(prefijo):]
+            if sufijo.isdigit():
+                maximo = max(maximo, int(sufijo))
+        return maximo
+
+    def _reservar(self, engine, serie: str, anio: int, cantidad: int) -> int:
+        """Incrementa el contador en 'cantidad' y regresa el último número reservado"""
+        t = SecuenciaFolio.__table__
+        stmt = (
+            update(t)
+            .where(t.c.serie == serie, t.c.anio == anio)
+            .values(ultimo=t.c.ultimo + cantidad)
+            .returning(t.c.ultimo)
+        )
+        with engine.begin() as conn:
+            ultimo = conn.execute(stmt).scalar()
+        if ultimo is not None:
+            return ultimo
+
+        # Primer folio de la serie en el año: crear el contador
+        try:
+            with engine.begin() as conn:
+                inicial = self._ultimo_existente(conn, serie, anio)
+                conn.execute(t.insert().values(serie=serie, anio=anio, ultimo=inicial))
+        except IntegrityError:
+            pass  # Otro proceso lo creó al mismo tiempo
+        with engine.begin() as conn:
+            return conn.execute(stmt).scalar()
+
+    # ---------- API ----------
+
+    def siguiente(self, engine, serie: str, anio: Optional[int] = None) -> str:
+        anio = anio or datetime.now().year
+        clave = (str(engine.url), serie, anio)
+        with self._lock:
+            self._preparar_tabla(engine)
+            bloque = self._bloques.get(clave)
+            if not bloque or bloque[0] > bloque[1]:
+                ultimo = self._reservar(engine, serie, anio, self.bloque)
+                bloque = [ultimo - self.bloque + 1, ultimo]
+                self._bloques[clave] = bloque
+            numero = bloque[0]
+            bloque[0] += 1
+        return formatear_folio(serie, anio, numero)
+
+    def reiniciar(self):
+        """Olvida los bloques reservados (después de limpiar la BD)"""
+        with self._lock:
+            self._bloques.clear()
+
+    def sincronizar(self, engine, series=None):
+        """
+        Después de importar: ningún contador queda por debajo del mayor folio
+        existente de su serie/año. Los contadores que aún no existen se crean
+        desde la tabla en el primer folio, como siempre.
+        """
+        t = SecuenciaFolio.__table__
+        with self._lock:
+            self._preparar_tabla(engine)
+            maximos: Dict[Tuple[str, int], int] = defaultdict(int)
+            with engine.connect() as conn:
+                for serie in series or SERIES:
+                    modelo = SERIES[serie]
+                    for (folio,) in conn.execute(select(modelo.folio).where(modelo.folio.like(serie + '-%'))):
+                        partes = _FOLIO.match(folio or '')
+                        if partes and partes.group(1) == serie:
+                            llave = (serie, int(partes.group(2)))
+                            maximos[llave] = max(maximos[llave], int(partes.group(3)))
+            with engine.begin() as conn:
+                for (serie, anio), maximo in maximos.items():
+                    conn.execute(update(t).where(t.c.serie == serie, t.c.anio == anio,
+                                                 t.c.ultimo < maximo).values(ultimo=maximo))
+            # Los bloques en memoria pueden contener números ya importados
+            self._bloques.clear()
+
+
+# Instancia global
+asignador_folios = AsignadorFolios()
+
+
+def siguiente_folio(db: Session, serie: str) -> str:
+    """Folio nuevo para un documento, usando el engine de la sesión"""
+    return asignador_folios.siguiente(db.get_bind(), serie)
@@ -0,0 +1,196 @@
+"""
+Soporte para el encabezado Idempotency-Key en POST/PUT/DELETE.
+
+Si una petición trae 'Idempotency-Key', la primera respuesta que se
+complete con esa llave (mismo método y ruta) se guarda en memoria y las
+repeticiones reciben esa misma respuesta sin volver a ejecutar el
+endpoint: un reintento del cliente después de un timeout no crea otra
+nota ni registra otro pago. Si la repetición llega mientras la primera
+sigue en curso, espera a que termine.
+
+- Reusar la llave con un cuerpo distinto regresa 422.
+- Las respuestas 5xx no se guardan (el reintento vuelve a ejecutarse).
+- Las entradas expiran después de IDEMPOTENCIA_TTL segundos (24 h) y se
+  guardan como máximo IDEMPOTENCIA_MAX; al pasar el límite se descartan
+  las más antiguas.
+
+El almacén vive en el proceso; con varios workers cada uno tiene el suyo
+(el Procfile arranca uno solo).
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+ENCABEZADO = b'idempotency-key'
+METODOS = {'POST', 'PUT', 'PATCH', 'DELETE'}
+# Rutas que no pasan por el almacén (cuerpos grandes o en streaming)
+RUTAS_EXCLUIDAS = ('/admin/',)
+
+TTL_DEFAULT = int(os.getenv('IDEMPOTENCIA_TTL', str(24 * 3600)))
+MAX_DEFAULT = int(os.getenv('IDEMPOTENCIA_MAX', '10000'))
+MAX_LARGO_LLAVE = 255
+
+
+class _Entrada:
+    __slots__ = ('huella', 'creada', 'listo', 'status', 'headers', 'cuerpo')
+
+    def __init__(self, huella: str):
+        self.huella = huella
+        self.creada = time.monotonic()
+        self.listo = asyncio.Event()
+        self.status: Optional[int] = None
+        self.headers: List[Tuple[bytes, bytes]] = []
+        self.cuerpo = b''
+
+
+class AlmacenIdempotencia:
+    """Respuestas por (método, ruta, llave) con expiración por TTL"""
+
+    def __init__(self, ttl: int = TTL_DEFAULT, maximo: int = MAX_DEFAULT):
+        self.ttl = ttl
+        self.maximo = maximo
+        self._entradas: "OrderedDict[Tuple[str, str, str], _Entrada]" = OrderedDict()
+
+    def _purgar(self):
+        limite = time.monotonic() - self.ttl
+        while self._entradas:
+            llave, entrada = next(iter(self._entradas.items()))
+            if entrada.creada >= limite and len(self._entradas) <= self.maximo:
+                break
+            if not entrada.listo.is_set() and entrada.creada >= limite:
+                break  # No se descarta una petición en curso
+            del self._entradas[llave]
+
+    def obtener(self, llave) -> Optional[_Entrada]:
+        self._purgar()
+        return self._entradas.get(llave)
+
+    def reservar(self, llave, huella: str) -> _Entrada:
+        entrada = _Entrada(huella)
+        self._entradas[llave] = entrada
+        self._purgar()
+        return entrada
+
+    def guardar(self, llave, entrada: _Entrada, status: int, headers, cuerpo: bytes):
+        entrada.status = status
+        entrada.headers = headers
+        entrada.cuerpo = cuerpo
+        entrada.listo.set()
+
+    def descartar(self, llave, entrada: _Entrada):
+        """La petición falló: se olvida la llave y se libera a quien espere"""
+        if self._entradas.get(llave) is entrada:
+            del self._entradas[llave]
+        entrada.listo.set()
+
+    def limpiar(self):
+        self._entradas.clear()
+
+    def estadisticas(self) -> Dict[str, int]:
+        self._purgar()
+        en_curso = sum(1 for e in self._entradas.values() if not e.listo.is_set())
+        return {"entradas": len(self._entradas), "en_curso": en_curso, "ttl": self.ttl}
+
+
+# Instancia global
+almacen_idempotencia = AlmacenIdempotencia()
+
+
+async def _respuesta_json(send, status: int, datos: dict, extra=()):
+    cuerpo = json.dumps(datos).encode('utf-8')
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b'content-type', b'application/json'),
+                    (b'content-length', str(len(cuerpo)).encode())] + list(extra),
+    })
+    await send({"type": "http.response.body", "body": cuerpo})
+
+
+class MiddlewareIdempotencia:
+    """Middleware ASGI: guarda y repite respuestas según Idempotency-Key"""
+
+    def __init__(self, app, almacen: AlmacenIdempotencia = None):
+        self.app = app
+        self.almacen = almacen or almacen_idempotencia
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['method'] not in METODOS:
+            return await self.app(scope, receive, send)
+        ruta = scope['path']
+        llave_cliente = dict(scope['headers']).get(ENCABEZADO)
+        if not llave_cliente or ruta.startswith(RUTAS_EXCLUIDAS):
+            return await self.app(scope, receive, send)
+
+        llave_cliente = llave_cliente.decode('latin-1').strip()
+        if len(llave_cliente) > MAX_LARGO_LLAVE:
+            return await _respuesta_json(send, 400, {"detail": "Idempotency-Key demasiado larga"})
+
+        # Leer el cuerpo completo para compararlo en las repeticiones
+        partes = []
+        while True:
+            mensaje = await receive()
+            if mensaje['type'] == 'http.disconnect':
+                return
+            partes.append(mensaje.get('body', b''))
+            if not mensaje.get('more_body'):
+                break
+        cuerpo = b''.join(partes)
+        huella = hashlib.sha256(cuerpo).hexdigest()
+        llave = (scope['method'], ruta, llave_cliente)
+
+        entrada = self.almacen.obtener(llave)
+        while entrada is not None:
+            if entrada.huella != huella:
+                return await _respuesta_json(
+                    send, 422, {"detail": "Idempotency-Key ya usada con otro contenido"})
+            await entrada.listo.wait()
+            if entrada.status is not None:
+                await send({
+                    "type": "http.response.start",
+                    "status": entrada.status,
+                    "headers": entrada.headers + [(b'idempotent-replayed', b'true')],
+                })
+                await send({"type": "http.response.body", "body": entrada.cuerpo})
+                return
+            # La original falló; se vuelve a intentar (o se espera a otro reintento)
+            entrada = self.almacen.obtener(llave)
+
+        entrada = self.almacen.reservar(llave, huella)
+
+        entregado = False
+
+        async def receive_repetido():
+            nonlocal entregado
+            if not entregado:
+                entregado = True
+                return {"type": "http.request", "body": cuerpo, "more_body": False}
+            return await receive()
+
+        respuesta = {"status": None, "headers": [], "cuerpo": []}
+
+        async def send_guardando(mensaje):
+            if mensaje['type'] == 'http.response.start':
+                respuesta['status'] = mensaje['status']
+                respuesta['headers'] = list(mensaje.get('headers', []))
+            elif mensaje['type'] == 'http.response.body':
+                respuesta['cuerpo'].append(mensaje.get('body', b''))
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive_repetido, send_guardando)
+        except BaseException:
+            self.almacen.descartar(llave, entrada)
+            raise
+
+        status = respuesta['status']
+        if status is None or status >= 500:
+            self.almacen.descartar(llave, entrada)
+        else:
+            self.almacen.guardar(llave, entrada, status, respuesta['headers'],
+                                 b''.join(respuesta['cuerpo']))
@@ -0,0 +1,330 @@
+"""
+Importación masiva de datos con mapeo de IDs.
+
+Formato NDJSON (una fila por línea, tablas padre antes que hijas):
+
+    {"tabla": "clientes", "datos": {"id_original": 7, "nombre": "...", ...}}
+    {"tabla": "notas_venta", "datos": {"id_original": 3, "cliente_id_original": 7, ...}}
+
+Los campos '<x>_id_original' se traducen a los IDs nuevos de la tabla padre.
+Las filas se acumulan por tabla y se insertan en lotes con un solo
+INSERT ... RETURNING id por lote (executemany), en lugar de un flush por
+fila; cada lote se confirma en su propia transacción.
+"""
+
+import base64
+import json
+import threading
+import time
+import zlib
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from sqlalchemy import DateTime, LargeBinary, insert, select
+
+from server.bitacora import obtener_logger
+from server.models import (
+    Cliente, Proveedor, Producto, MovimientoInventario,
+    Orden, OrdenItem, Cotizacion, CotizacionItem,
+    NotaVenta, NotaVentaItem, NotaVentaPago,
+    NotaProveedor, NotaProveedorItem, NotaProveedorPago,
+    ConfigEmpresa, Servicio
+)
+
+log = obtener_logger('importacion')
+
+# tabla -> (modelo, {campo_original: (columna, tabla_padre, obligatorio)})
+ESQUEMA_IMPORTACION = {
+    "config_empresa": (ConfigEmpresa, {}),
+    "clientes": (Cliente, {}),
+    "proveedores": (Proveedor, {}),
+    "servicios": (Servicio, {}),
+    "productos": (Producto, {
+        "proveedor_id_original": ("proveedor_id", "proveedores", False),
+    }),
+    "movimientos_inventario": (MovimientoInventario, {
+        "producto_id_original": ("producto_id", "productos", True),
+    }),
+    "ordenes": (Orden, {
+        "cliente_id_original": ("cliente_id", "clientes", True),
+    }),
+    "ordenes_items": (OrdenItem, {
+        "orden_id_original": ("orden_id", "ordenes", True),
+        "servicio_id_original": ("servicio_id", "servicios", False),
+        "producto_id_original": ("producto_id", "productos", False),
+    }),
+    "cotizaciones": (Cotizacion, {
+        "cliente_id_original": ("cliente_id", "clientes", True),
+    }),
+    "cotizaciones_items": (CotizacionItem, {
+        "cotizacion_id_original": ("cotizacion_id", "cotizaciones", True),
+        "servicio_id_original": ("servicio_id", "servicios", False),
+        "producto_id_original": ("producto_id", "productos", False),
+    }),
+    "notas_venta": (NotaVenta, {
+        "cliente_id_original": ("cliente_id", "clientes", True),
+    }),
+    "notas_venta_items": (NotaVentaItem, {
+        "nota_id_original": ("nota_id", "notas_venta", True),
+        "servicio_id_original": ("servicio_id", "servicios", False),
+        "producto_id_original": ("producto_id", "productos", False),
+    }),
+    "notas_venta_pagos": (NotaVentaPago, {
+        "nota_id_original": ("nota_id", "notas_venta", True),
+    }),
+    "notas_proveedor": (NotaProveedor, {
+        "proveedor_id_original": ("proveedor_id", "proveedores", True),
+    }),
+    "notas_proveedor_items": (NotaProveedorItem, {
+        "nota_id_original": ("nota_id", "notas_proveedor", True),
+    }),
+    "notas_proveedor_pagos": (NotaProveedorPago, {
+        "nota_id_original": ("nota_id", "notas_proveedor", True),
+    }),
+}
+
+# Orden de dependencias (padres primero)
+ORDEN_TABLAS = list(ESQUEMA_IMPORTACION)
+
+LOTE_DEFAULT = 1000
+
+
+def _convertir(valor: Any, tipo) -> Any:
+    """Convierte valores JSON a los tipos de columna (fechas ISO, binarios en Base64)"""
+    if valor is None or valor == '':
+        return None if isinstance(tipo, (DateTime, LargeBinary)) else valor
+    if isinstance(tipo, DateTime) and isinstance(valor, str):
+        return datetime.fromisoformat(valor)
+    if isinstance(tipo, LargeBinary) and isinstance(valor, str):
+        return base64.b64decode(valor)
+    return valor
+
+
+class ImportadorMasivo:
+    """
+    Inserta filas por lotes manteniendo los mapeos id_original -> id nuevo.
+
+    Se puede alimentar en varias llamadas a procesar() (por ejemplo, conforme
+    llega el cuerpo de la petición); el estado se conserva entre llamadas.
+    """
+
+    def __init__(self, engine, lote: int = LOTE_DEFAULT,
+                 tablas: Optional[Set[str]] = None,
+                 progreso: Optional[Callable[[str, int, float], None]] = None):
+        self.engine = engine
+        self.lote = lote
+        self.tablas = tablas
+        self.progreso = progreso
+        self.mapas: Dict[str, Dict[Any, int]] = {t: {} for t in ORDEN_TABLAS}
+        self.insertados: Dict[str, int] = {t: 0 for t in ORDEN_TABLAS}
+        self.omitidos: Dict[str, int] = {t: 0 for t in ORDEN_TABLAS}
+        self.inicio = time.perf_counter()
+        self._tabla_actual: Optional[str] = None
+        self._pendientes: List[Tuple[Any, Dict]] = []
+        self._columnas = {
+            t: {c.name: c.type for c in modelo.__table__.columns if c.name != 'id'}
+            for t, (modelo, _) in ESQUEMA_IMPORTACION.items()
+        }
+
+    # ---------- preparación de filas ----------
+
+    def _preparar(self, tabla: str, datos: Dict) -> Optional[Tuple[Any, Dict]]:
+        _, foraneas = ESQUEMA_IMPORTACION[tabla]
+        datos = dict(datos)
+        id_original = datos.pop("id_original", None)
+
+        for campo, (columna, padre, obligatorio) in foraneas.items():
+            if campo not in datos:
+                continue  # Puede venir ya mapeado en 'columna'
+            original = datos.pop(campo)
+            nuevo = self.mapas[padre].get(original) if original is not None else None
+            if nuevo is None and obligatorio:
+                return None
+            datos[columna] = nuevo
+
+        # Para filas sin *_id_original, una FK obligatoria debe venir ya mapeada
+        for campo, (columna, _, obligatorio) in foraneas.items():
+            if obligatorio and datos.get(columna) is None:
+                return None
+
+        columnas = self._columnas[tabla]
+        fila = {k: _convertir(v, columnas[k]) for k, v in datos.items() if k in columnas}
+        return id_original, fila
+
+    # ---------- escritura ----------
+
+    def _insertar_lote(self, tabla: str, pendientes: List[Tuple[Any, Dict]]):
+        modelo, _ = ESQUEMA_IMPORTACION[tabla]
+        t = modelo.__table__
+
+        if tabla == "config_empresa":
+            self._importar_config(pendientes)
+            return
+        if tabla == "servicios":
+            pendientes = self._mapear_servicios_existentes(pendientes)
+            if not pendientes:
+                return
+
+        # executemany exige las mismas llaves en todas las filas del lote
+        llaves = set().union(*(fila.keys() for _, fila in pendientes))
+        filas = [{k: fila.get(k) for k in llaves} for _, fila in pendientes]
+        for fila in filas:
+            for k in llaves:
+                if fila[k] is None and t.c[k].default is not None and not t.c[k].nullable:
+                    del fila[k]
+        # Si alguna fila perdió llaves, se agrupan por conjunto de llaves
+        grupos: Dict[frozenset, List[int]] = {}
+        for i, fila in enumerate(filas):
+            grupos.setdefault(frozenset(fila), []).append(i)
+
+        with self.engine.begin() as conn:
+            for indices in grupos.values():
+                stmt = insert(t).returning(t.c.id, sort_by_parameter_order=True)
+                ids = conn.execute(stmt, [filas[i] for i in indices]).scalars().all()
+                mapa = self.mapas[tabla]
+                for i, nuevo_id in zip(indices, ids):
+                    id_original = pendientes[i][0]
+                    if id_original is not None:
+                        mapa[id_original] = nuevo_id
+
+        self.insertados[tabla] += len(pendientes)
+        if self.progreso:
+            transcurrido = time.perf_counter() - self.inicio
+            self.progreso(tabla, self.insertados[tabla], self.total / transcurrido if transcurrido else 0.0)
+
+    def _importar_config(self, pendientes: List[Tuple[Any, Dict]]):
+        t = ConfigEmpresa.__table__
+        with self.engine.begin() as conn:
+            for _, fila in pendientes:
+                existente = conn.execute(select(t.c.id).limit(1)).scalar()
+                if existente:
+                    conn.execute(t.update().where(t.c.id == existente).values(**fila))
+                else:
+                    conn.execute(insert(t).values(**fila))
+        self.insertados["config_empresa"] += len(pendientes)
+
+    def _mapear_servicios_existentes(self, pendientes: List[Tuple[Any, Dict]]) -> List[Tuple[Any, Dict]]:
+        """La clave de servicio es única: las que ya existen solo se mapean"""
+        t = Servicio.__table__
+        claves = [fila.get("clave") for _, fila in pendientes if fila.get("clave")]
+        with self.engine.connect() as conn:
+            existentes = dict(conn.execute(select(t.c.clave, t.c.id).where(t.c.clave.in_(claves))).all())
+        nuevos = []
+        for id_original, fila in pendientes:
+            existente = existentes.get(fila.get("clave"))
+            if existente is None:
+                nuevos.append((id_original, fila))
+            elif id_original is not None:
+                self.mapas["servicios"][id_original] = existente
+        return nuevos
+
+    def _vaciar(self):
+        if self._pendientes:
+            pendientes, self._pendientes = self._pendientes, []
+            self._insertar_lote(self._tabla_actual, pendientes)
+
+    # ---------- API ----------
+
+    def procesar(self, registros: Iterable[Tuple[str, Dict]]):
+        """Agrega filas (tabla, datos); inserta cada vez que se llena un lote o cambia la tabla"""
+        for tabla, datos in registros:
+            if tabla not in ESQUEMA_IMPORTACION:
+                continue
+            if self.tablas is not None and tabla not in self.tablas:
+                continue
+            if tabla != self._tabla_actual:
+                self._vaciar()
+                self._tabla_actual = tabla
+
+            preparada = self._preparar(tabla, datos)
+            if preparada is None:
+                self.omitidos[tabla] += 1
+                continue
+            self._pendientes.append(preparada)
+            if len(self._pendientes) >= self.lote:
+                self._vaciar()
+
+    def finalizar(self) -> Dict[str, Any]:
+        """Inserta lo pendiente y regresa el resumen"""
+        self._vaciar()
+        segundos = time.perf_counter() - self.inicio
+        return {
+            "imported": {t: n for t, n in self.insertados.items() if n},
+            "skipped": {t: n for t, n in self.omitidos.items() if n},
+            "total": self.total,
+            "seconds": round(segundos, 2),
+            "rows_per_second": round(self.total / segundos, 1) if segundos else 0.0
+        }
+
+    @property
+    def total(self) -> int:
+        return sum(self.insertados.values())
+
+
+# ==================== LECTORES ====================
+
+def registros_desde_json(data: Dict[str, List[Dict]]) -> Iterator[Tuple[str, Dict]]:
+    """Formato JSON clásico {tabla: [filas]} en orden de dependencias"""
+    for tabla in ORDEN_TABLAS:
+        for fila in data.get(tabla, []) or []:
+            yield tabla, fila
+
+
+def registro_desde_linea(linea: bytes) -> Optional[Tuple[str, Dict]]:
+    linea = linea.strip()
+    if not linea:
+        return None
+    obj = json.loads(linea)
+    return obj["tabla"], obj.get("datos", {})
+
+
+class LectorNDJSON:
+    """
+    Parte un flujo de bytes (opcionalmente gzip) en registros NDJSON
+    conforme llegan los fragmentos, sin cargar el cuerpo completo.
+    """
+
+    def __init__(self, gzip: bool = False):
+        self._descompresor = zlib.decompressobj(16 + zlib.MAX_WBITS) if gzip else None
+        self._resto = b""
+
+    def alimentar(self, fragmento: bytes) -> List[Tuple[str, Dict]]:
+        if self._descompresor is not None:
+            fragmento = self._descompresor.decompress(fragmento)
+        datos = self._resto + fragmento
+        lineas = datos.split(b"\n")
+        self._resto = lineas.pop()
+        return [r for r in (registro_desde_linea(l) for l in lineas) if r is not None]
+
+    def terminar(self) -> List[Tuple[str, Dict]]:
+        if self._descompresor is not None:
+            self._resto += self._descompresor.flush()
+        resto, self._resto = self._resto, b""
+        return [r for r in (registro_desde_linea(l) for l in resto.split(b"\n")) if r is not None]
+
+
+# ==================== ESTADO (para consultar el avance) ====================
+
+_estado_lock = threading.Lock()
+estado_importacion: Dict[str, Any] = {"activa": False}
+
+
+def reportar_progreso(tabla: str, insertados: int, filas_por_segundo: float):
+    with _estado_lock:
+        estado_importacion.update({
+            "activa": True,
+            "tabla": tabla,
+            "insertados_tabla": insertados,
+            "filas_por_segundo": round(filas_por_segundo, 1),
+            "actualizado": datetime.now().isoformat()
+        })
+    log.info("Lote importado", extra={"tabla": tabla, "filas": insertados,
+                                       "filas_por_segundo": round(filas_por_segundo, 1)})
+
+
+def marcar_importacion(activa: bool, resumen: Optional[Dict] = None):
+    with _estado_lock:
+        estado_importacion.clear()
+        estado_importacion["activa"] = activa
+        if resumen:
+            estado_importacion["resumen"] = resumen
@@ -1,18 +1,41 @@
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Depends, HTTPException
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Depends, HTTPException, Query, Request, Header, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
 from typing import List, Dict, Any, Optional
 import sys
 import os
-import traceback
 import base64
+import gzip
 from sqlalchemy.orm import joinedload
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from server.database import get_db_sync, SessionLocal
+from server.database import get_db_sync, SessionLocal, engine
 from server import crud
-import json
+from server.similares import indice_cotizaciones
+from server.autocompletado import indice_descripciones
+from server.importacion import (
+    ImportadorMasivo, LectorNDJSON, LOTE_DEFAULT, estado_importacion,
+    marcar_importacion, registros_desde_json, reportar_progreso
+)
+from server.exportacion import exportar_gzip
+from server.folios import asignador_folios
+from server.idempotencia import MiddlewareIdempotencia
+from server.metricas import MiddlewareMetricas, instrumentar_engine, registro_metricas
+from server.bitacora import configurar_logging, obtener_logger, muestrear_payload
+from server.respuestas import MiddlewareCompresion, RespuestaJSON, codificar_json
+from server.cache_reportes import cache_reportes
+from server.coalescencia import MiddlewareCoalescencia, coalescedor
+from server.catalogos import cache_catalogos
+from server.esquemas import (
+    a_dict, a_lista, respuesta_lista,
+    ClienteSalida, ProveedorSalida, ProductoSalida, MovimientoSalida, OrdenSalida,
+    CotizacionSalida, NotaSalida, NotaProveedorSalida, NotaReporteSalida, ConfigSalida, UsuarioSalida,
+    ClienteEntrada, ClienteCambios, ProveedorEntrada, ProveedorCambios,
+    ProductoEntrada, ProductoCambios, PagoEntrada, MovimientoEntrada, MovimientosLoteEntrada
+)
 from datetime import datetime
 
 from server.models import (
@@ -26,7 +49,10 @@ from server.models import (
 from pydantic import BaseModel
 from server.crud import verificar_credenciales
 
-app = FastAPI(title="Taller API Distribuida")
+app = FastAPI(title="Taller API Distribuida", default_response_class=RespuestaJSON)
+
+configurar_logging()
+log = obtener_logger('api')
 
 # Modelo Pydantic para el login
 class LoginData(BaseModel):
@@ -40,6 +66,21 @@ def get_db():
     finally:
         db.close()
 
+def _version_solicitada(if_match: Optional[str], datos: Dict[str, Any]) -> Optional[int]:
+    """
+    Versión del documento que el cliente leyó: encabezado If-Match
+    ('3', '"3"' o 'W/"3"') o, si no viene, el campo 'version' del cuerpo.
+    """
+    version = datos.pop('version', None)
+    if if_match and if_match.strip() != '*':
+        version = if_match.strip().removeprefix('W/').strip('"')
+    if version in (None, ''):
+        return None
+    try:
+        return int(version)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail=f"Versión inválida: {version}")
+
 # ==================== LOGIN ====================
 @app.post("/login")
 def login(data: LoginData, db: Session = Depends(get_db)):
@@ -47,8 +88,9 @@ def login(data: LoginData, db: Session = Depends(get_db)):
     usuario = verificar_credenciales(db, data.username, data.password)
     if not usuario:
         raise HTTPException(status_code=401, detail="Usuario o contraseña incorrectos")
-    # _usuario_to_dict ya está definido al final de main.py
-    return _usuario_to_dict(usuario)
+    # verificar_credenciales guarda ultimo_acceso
+    cache_catalogos.escritura(db, 'usuarios')
+    return a_dict(UsuarioSalida, usuario)
 
 app.add_middleware(
     CORSMiddleware,
@@ -56,6 +98,18 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# GET idénticos y simultáneos a las colecciones comparten una sola ejecución;
+# va por dentro de idempotencia para que las repeticiones no cuenten como escrituras
+app.add_middleware(MiddlewareCoalescencia)
+# Repite la respuesta guardada cuando un POST/PUT llega con la misma Idempotency-Key
+app.add_middleware(MiddlewareIdempotencia)
+# br/gzip según Accept-Encoding; va por fuera de idempotencia para que las
+# respuestas guardadas queden sin comprimir y se negocien en cada repetición
+app.add_middleware(MiddlewareCompresion)
+# Latencia por ruta, sentencias SQL por petición y Server-Timing (ver /metrics).
+# Se agrega al final para que sea el más externo y mida todo lo demás.
+app.add_middleware(MiddlewareMetricas)
+instrumentar_engine(engine)
 
 # ==================== WEBSOCKET MANAGER ====================
 class ConnectionManager:
@@ -70,9 +124,11 @@ class ConnectionManager:
         self.active_connections.remove(websocket)
     
     async def broadcast(self, message: dict):
+        # Se codifica una vez para todas las conexiones
+        texto = codificar_json(message).decode('utf-8')
         for connection in self.active_connections:
             try:
-                await connection.send_json(message)
+                await connection.send_text(texto)
             except:
                 pass
 
@@ -89,41 +145,58 @@ async def websocket_endpoint(websocket: WebSocket):
         manager.disconnect(websocket)
 
 
+# ==================== CATÁLOGOS EN CACHÉ ====================
+# JSON completo de cada catálogo (server/catalogos.py); los endpoints que
+# escriben llaman cache_catalogos.escritura(db, ...) después del commit.
+cache_catalogos.registrar('clientes', lambda db: respuesta_lista(ClienteSalida, crud.get_all_clientes(db)).body)
+cache_catalogos.registrar('proveedores', lambda db: respuesta_lista(ProveedorSalida, crud.get_all_proveedores(db)).body)
+cache_catalogos.registrar('productos', lambda db: respuesta_lista(ProductoSalida, crud.get_all_productos(db)).body)
+cache_catalogos.registrar('usuarios', lambda db: respuesta_lista(UsuarioSalida, crud.get_usuarios(db)).body)
+cache_catalogos.registrar('configuracion', lambda db: codificar_json(a_dict(ConfigSalida, crud.get_config_empresa(db))))
+
+def _catalogo(nombre: str, db: Session) -> Response:
+    return Response(cache_catalogos.obtener(nombre, db), media_type="application/json")
+
 # ==================== CLIENTES ====================
 @app.get("/clientes")
 def get_clientes(db: Session = Depends(get_db)):
-    clientes = crud.get_all_clientes(db)
-    return [_cliente_to_dict(c) for c in clientes]
+    return _catalogo('clientes', db)
 
 @app.get("/clientes/buscar/{texto}")
 def buscar_clientes(texto: str, db: Session = Depends(get_db)):
     clientes = crud.search_clientes(db, texto)
-    return [_cliente_to_dict(c) for c in clientes]
+    return respuesta_lista(ClienteSalida, clientes)
 
 @app.post("/clientes")
-async def crear_cliente(datos: Dict[str, Any], db: Session = Depends(get_db)):
-    cliente = crud.create_cliente(db, datos)
+async def crear_cliente(datos: ClienteEntrada, db: Session = Depends(get_db)):
+    cliente = crud.create_cliente(db, datos.datos())
+    cache_catalogos.escritura(db, 'clientes')
     await manager.broadcast({
         "type": "cliente_creado",
-        "data": _cliente_to_dict(cliente)
+        "data": a_dict(ClienteSalida, cliente)
     })
-    return _cliente_to_dict(cliente)
+    return a_dict(ClienteSalida, cliente)
 
 @app.put("/clientes/{cliente_id}")
-async def actualizar_cliente(cliente_id: int, datos: Dict[str, Any], db: Session = Depends(get_db)):
-    cliente = crud.update_cliente(db, cliente_id, datos)
+async def actualizar_cliente(cliente_id: int, datos: ClienteCambios, db: Session = Depends(get_db)):
+    cliente = crud.update_cliente(db, cliente_id, datos.datos())
     if cliente:
+        cache_catalogos.escritura(db, 'clientes')
+        # Los reportes muestran el nombre del cliente
+        cache_reportes.invalidar_tipo('ventas', 'cxc', 'clientes')
         await manager.broadcast({
             "type": "cliente_actualizado",
-            "data": _cliente_to_dict(cliente)
+            "data": a_dict(ClienteSalida, cliente)
         })
-        return _cliente_to_dict(cliente)
+        return a_dict(ClienteSalida, cliente)
     raise HTTPException(status_code=404, detail="Cliente no encontrado")
 
 @app.delete("/clientes/{cliente_id}")
 async def eliminar_cliente(cliente_id: int, db: Session = Depends(get_db)):
     success = crud.delete_cliente(db, cliente_id)
     if success:
+        cache_catalogos.escritura(db, 'clientes')
+        cache_reportes.invalidar_tipo('ventas', 'cxc', 'clientes')
         await manager.broadcast({
             "type": "cliente_eliminado",
             "data": {"id": cliente_id}
@@ -134,38 +207,41 @@ async def eliminar_cliente(cliente_id: int, db: Session = Depends(get_db)):
 # ==================== PROVEEDORES ====================
 @app.get("/proveedores")
 def get_proveedores(db: Session = Depends(get_db)):
-    proveedores = crud.get_all_proveedores(db)
-    return [_proveedor_to_dict(p) for p in proveedores]
+    return _catalogo('proveedores', db)
 
 @app.get("/proveedores/buscar/{texto}")
 def buscar_proveedores_api(texto: str, db: Session = Depends(get_db)):
     proveedores = crud.search_proveedores(db, texto)
-    return [_proveedor_to_dict(p) for p in proveedores]
+    return respuesta_lista(ProveedorSalida, proveedores)
 
 @app.post("/proveedores")
-async def crear_proveedor(datos: Dict[str, Any], db: Session = Depends(get_db)):
-    proveedor = crud.create_proveedor(db, datos)
+async def crear_proveedor(datos: ProveedorEntrada, db: Session = Depends(get_db)):
+    proveedor = crud.create_proveedor(db, datos.datos())
+    cache_catalogos.escritura(db, 'proveedores')
     await manager.broadcast({
         "type": "proveedor_creado",
-        "data": _proveedor_to_dict(proveedor)
+        "data": a_dict(ProveedorSalida, proveedor)
     })
-    return _proveedor_to_dict(proveedor)
+    return a_dict(ProveedorSalida, proveedor)
 
 @app.put("/proveedores/{proveedor_id}")
-async def actualizar_proveedor_api(proveedor_id: int, datos: Dict[str, Any], db: Session = Depends(get_db)):
-    proveedor = crud.update_proveedor(db, proveedor_id, datos)
+async def actualizar_proveedor_api(proveedor_id: int, datos: ProveedorCambios, db: Session = Depends(get_db)):
+    proveedor = crud.update_proveedor(db, proveedor_id, datos.datos())
     if proveedor:
+        # Los productos muestran el nombre del proveedor
+        cache_catalogos.escritura(db, 'proveedores', 'productos')
         await manager.broadcast({
             "type": "proveedor_actualizado",
-            "data": _proveedor_to_dict(proveedor)
+            "data": a_dict(ProveedorSalida, proveedor)
         })
-        return _proveedor_to_dict(proveedor)
+        return a_dict(ProveedorSalida, proveedor)
     raise HTTPException(status_code=404, detail="Proveedor no encontrado")
 
 @app.delete("/proveedores/{proveedor_id}")
 async def eliminar_proveedor_api(proveedor_id: int, db: Session = Depends(get_db)):
     success = crud.delete_proveedor(db, proveedor_id)
     if success:
+        cache_catalogos.escritura(db, 'proveedores', 'productos')
         await manager.broadcast({
             "type": "proveedor_eliminado",
             "data": {"id": proveedor_id}
@@ -176,20 +252,21 @@ async def eliminar_proveedor_api(proveedor_id: int, db: Session = Depends(get_db
 # ==================== PRODUCTOS ====================
 @app.get("/productos")
 def get_productos(db: Session = Depends(get_db)):
-    productos = crud.get_all_productos(db)
-    return [_producto_to_dict(p) for p in productos]
+    return _catalogo('productos', db)
 
 @app.get("/productos/buscar/{texto}")
 def buscar_productos(texto: str, db: Session = Depends(get_db)):
     productos = crud.search_productos(db, texto)
-    return [_producto_to_dict(p) for p in productos]
+    return respuesta_lista(ProductoSalida, productos)
 
 @app.post("/productos")
-async def crear_producto(datos: Dict[str, Any], db: Session = Depends(get_db)):
-    producto = crud.create_producto(db, datos)
+async def crear_producto(datos: ProductoEntrada, db: Session = Depends(get_db)):
+    producto = crud.create_producto(db, datos.datos())
+    cache_catalogos.escritura(db, 'productos')
+    indice_descripciones.registrar([producto.nombre])
     await manager.broadcast({
         "type": "producto_creado",
-        "data": _producto_to_dict(producto)
+        "data": a_dict(ProductoSalida, producto)
     })
     
     if producto.stock_actual > 0:
@@ -198,21 +275,23 @@ async def crear_producto(datos: Dict[str, Any], db: Session = Depends(get_db)):
             "data": {
                 "producto_id": producto.id,
                 "tipo": "Entrada",
-                "cantidad": producto.stock_actual
+                "cantidad": producto.stock_actual,
+                "stock_actual": producto.stock_actual
             }
         })
         
-    return _producto_to_dict(producto)
+    return a_dict(ProductoSalida, producto)
 
 @app.put("/productos/{producto_id}")
-async def actualizar_producto(producto_id: int, datos: Dict[str, Any], db: Session = Depends(get_db)):
-    producto = crud.update_producto(db, producto_id, datos)
+async def actualizar_producto(producto_id: int, datos: ProductoCambios, db: Session = Depends(get_db)):
+    producto = crud.update_producto(db, producto_id, datos.datos())
     if producto:
+        cache_catalogos.escritura(db, 'productos')
         await manager.broadcast({
             "type": "producto_actualizado",
-            "data": _producto_to_dict(producto)
+            "data": a_dict(ProductoSalida, producto)
         })
-        return _producto_to_dict(producto)
+        return a_dict(ProductoSalida, producto)
     raise HTTPException(status_code=404)
 
 @app.delete("/productos/{producto_id}")
@@ -220,6 +299,7 @@ async def eliminar_producto_api(producto_id: int, db: Session = Depends(get_db))
     # Usamos soft_delete=True por defecto como en crud.py
     success = crud.delete_producto(db, producto_id, soft_delete=True)
     if success:
+        cache_catalogos.escritura(db, 'productos')
         await manager.broadcast({
             "type": "producto_eliminado",
             "data": {"id": producto_id}
@@ -227,11 +307,17 @@ async def eliminar_producto_api(producto_id: int, db: Session = Depends(get_db))
         return {"success": True}
     raise HTTPException(status_code=404, detail="Producto no encontrado")
 
+# ==================== SERVICIOS ====================
+@app.get("/servicios")
+def get_servicios(db: Session = Depends(get_db)):
+    servicios = crud.get_all_servicios(db)
+    return [{"id": s.id, "nombre": s.nombre} for s in servicios]
+
 # ==================== ORDENES ====================
 @app.get("/ordenes")
-def get_ordenes(estado: str = None, db: Session = Depends(get_db)):
-    ordenes = crud.get_all_ordenes(db, estado=estado)
-    return [_orden_to_dict(o) for o in ordenes]
+def get_ordenes(estado: str = None, limit: Optional[int] = None, db: Session = Depends(get_db)):
+    ordenes = crud.filas_ordenes(db, estado=estado, limit=limit)
+    return respuesta_lista(OrdenSalida, ordenes)
 
 @app.post("/ordenes")
 async def crear_orden(datos: Dict[str, Any], db: Session = Depends(get_db)):
@@ -246,29 +332,32 @@ async def crear_orden(datos: Dict[str, Any], db: Session = Depends(get_db)):
          datos['fecha_recepcion'] = datetime.now()
 
     orden = crud.create_orden(db, datos, items)
+    indice_descripciones.registrar([i.descripcion for i in orden.items])
     await manager.broadcast({
         "type": "orden_creada",
-        "data": _orden_to_dict(orden)
+        "data": a_dict(OrdenSalida, orden)
     })
-    return _orden_to_dict(orden)
+    return a_dict(OrdenSalida, orden)
 
 @app.get("/ordenes/buscar")
 def buscar_ordenes_api(folio: str, db: Session = Depends(get_db)):
     """Busca órdenes por folio (usado por la UI)"""
     ordenes = crud.search_ordenes_by_folio(db, folio)
-    return [_orden_to_dict(o) for o in ordenes]
+    return respuesta_lista(OrdenSalida, ordenes)
 
 @app.get("/ordenes/{orden_id}")
-def get_orden_por_id(orden_id: int, db: Session = Depends(get_db)):
+def get_orden_por_id(orden_id: int, response: Response, db: Session = Depends(get_db)):
     orden = crud.get_orden(db, orden_id)
     if orden:
-        return _orden_to_dict(orden)
+        response.headers["ETag"] = f'"{orden.version}"'
+        return a_dict(OrdenSalida, orden)
     raise HTTPException(status_code=404, detail="Orden no encontrada")
 
 @app.put("/ordenes/{orden_id}")
-async def actualizar_orden_api(orden_id: int, datos: Dict[str, Any], db: Session = Depends(get_db)):
+async def actualizar_orden_api(orden_id: int, datos: Dict[str, Any], if_match: Optional[str] = Header(None), db: Session = Depends(get_db)):
     try:
         items = datos.pop('items', None) 
+        version = _version_solicitada(if_match, datos)
 
         if 'fecha_recepcion' in datos and isinstance(datos['fecha_recepcion'], str):
             try:
@@ -280,20 +369,25 @@ async def actualizar_orden_api(orden_id: int, datos: Dict[str, Any], db: Session
             db=db,
             orden_id=orden_id,
             orden_data=datos,
-            items=items
+            items=items,
+            version=version
         )
         
         if not orden:
             raise HTTPException(status_code=404, detail="Orden no encontrada")
-            
+
+        if items is not None:
+            indice_descripciones.registrar([i.descripcion for i in orden.items])
         await manager.broadcast({
             "type": "orden_actualizada", 
-            "data": _orden_to_dict(orden)
+            "data": a_dict(OrdenSalida, orden)
         })
-        return _orden_to_dict(orden)
+        return a_dict(OrdenSalida, orden)
         
+    except crud.ConflictoVersion as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
-        print(f"Error al actualizar orden API: {e}")
+        log.warning("Error al actualizar orden API: %s", e)
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.post("/ordenes/{orden_id}/cancelar")
@@ -305,41 +399,65 @@ async def cancelar_orden_api(orden_id: int, db: Session = Depends(get_db)):
         
         await manager.broadcast({
             "type": "orden_actualizada",
-            "data": _orden_to_dict(orden)
+            "data": a_dict(OrdenSalida, orden)
         })
-        return _orden_to_dict(orden)
+        return a_dict(OrdenSalida, orden)
     
+    except crud.ConflictoVersion as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
-        print(f"Error al cancelar orden API: {e}")
+        log.warning("Error al cancelar orden API: %s", e)
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.post("/ordenes/{orden_id}/convertir-a-nota")
+async def convertir_orden_a_nota_api(orden_id: int, db: Session = Depends(get_db)):
+    """Genera la nota de venta de una orden Completada en una sola petición"""
+    try:
+        nota = crud.convertir_orden_a_nota(db, orden_id)
+    except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    if not nota:
+        raise HTTPException(status_code=404, detail="Orden no encontrada")
+    
+    orden = crud.get_orden(db, orden_id)
+    cache_reportes.invalidar_fechas(nota.fecha)
+    indice_descripciones.registrar([i.descripcion for i in nota.items])
+    await manager.broadcast({
+        "type": "nota_convertida",
+        "data": {"nota": {"id": nota.id}, "orden": a_dict(OrdenSalida, orden)}
+    })
+    return {"nota": a_dict(NotaSalida, nota), "orden": a_dict(OrdenSalida, orden)}
 
 # ==================== COTIZACIONES ====================
 @app.get("/cotizaciones")
-def get_cotizaciones(estado: str = None, db: Session = Depends(get_db)):
-    cotizaciones = crud.get_all_cotizaciones(db, estado=estado)
-    return [_cotizacion_to_dict(c) for c in cotizaciones]
+def get_cotizaciones(estado: str = None, limit: Optional[int] = None, db: Session = Depends(get_db)):
+    cotizaciones = crud.filas_cotizaciones(db, estado=estado, limit=limit)
+    return respuesta_lista(CotizacionSalida, cotizaciones)
 
 @app.post("/cotizaciones")
 async def crear_cotizacion(datos: Dict[str, Any], db: Session = Depends(get_db)):
     items = datos.pop('items', [])
     cotizacion = crud.create_cotizacion(db, datos, items)
+    indice_cotizaciones.actualizar(cotizacion.id, [i.descripcion for i in cotizacion.items])
+    indice_descripciones.registrar([i.descripcion for i in cotizacion.items])
     await manager.broadcast({
         "type": "cotizacion_creada",
-        "data": _cotizacion_to_dict(cotizacion)
+        "data": a_dict(CotizacionSalida, cotizacion)
     })
-    return _cotizacion_to_dict(cotizacion)
+    return a_dict(CotizacionSalida, cotizacion)
 
 @app.get("/cotizaciones/buscar")
 def buscar_cotizaciones_api(folio: str, db: Session = Depends(get_db)):
     """Busca cotizaciones por folio (usado por la UI)"""
     cotizaciones = crud.search_cotizaciones_by_folio(db, folio)
-    return [_cotizacion_to_dict(c) for c in cotizaciones]
+    return respuesta_lista(CotizacionSalida, cotizaciones)
 
 @app.put("/cotizaciones/{cotizacion_id}")
-async def actualizar_cotizacion_api(cotizacion_id: int, datos: Dict[str, Any], db: Session = Depends(get_db)):
+async def actualizar_cotizacion_api(cotizacion_id: int, datos: Dict[str, Any], if_match: Optional[str] = Header(None), db: Session = Depends(get_db)):
     try:
         items = datos.pop('items', [])
         nota_folio = datos.pop('nota_folio', None) # Extraer el nota_folio
+        version = _version_solicitada(if_match, datos)
 
         # Convertir fecha si viene
         if 'vigencia' in datos and isinstance(datos['vigencia'], str):
@@ -348,7 +466,7 @@ async def actualizar_cotizacion_api(cotizacion_id: int, datos: Dict[str, Any], d
                 fecha_obj = datetime.strptime(datos['vigencia'], '%d/%m/%Y').date()
                 datos['vigencia'] = fecha_obj
             except ValueError as e:
-                print(f"Advertencia: Fecha de vigencia inválida: {e}")
+                log.warning("Fecha de vigencia inválida: %s", e)
                 datos.pop('vigencia') 
         
         cotizacion = crud.update_cotizacion(
@@ -356,32 +474,91 @@ async def actualizar_cotizacion_api(cotizacion_id: int, datos: Dict[str, Any], d
             cotizacion_id=cotizacion_id,
             cotizacion_data=datos,
             items=items,
-            nota_folio=nota_folio # Pasarlo al CRUD
+            nota_folio=nota_folio, # Pasarlo al CRUD
+            version=version
         )
         
         if not cotizacion:
             raise HTTPException(status_code=404, detail="Cotización no encontrada")
-            
+
+        indice_cotizaciones.actualizar(cotizacion.id, [i.descripcion for i in cotizacion.items])
+        indice_descripciones.registrar([i.descripcion for i in cotizacion.items])
         await manager.broadcast({
             "type": "cotizacion_actualizada", 
-            "data": _cotizacion_to_dict(cotizacion)
+            "data": a_dict(CotizacionSalida, cotizacion)
         })
-        return _cotizacion_to_dict(cotizacion)
+        return a_dict(CotizacionSalida, cotizacion)
         
+    except crud.ConflictoVersion as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
-        print(f"Error al actualizar cotización API: {e}")
+        log.warning("Error al actualizar cotización API: %s", e)
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.get("/cotizaciones/buscar")
 def buscar_cotizaciones_api(folio: Optional[str] = None, cliente_id: Optional[int] = None, db: Session = Depends(get_db)):
     cotizaciones = crud.search_cotizaciones(db, folio=folio, cliente_id=cliente_id)
-    return [_cotizacion_to_dict(c) for c in cotizaciones]
+    return respuesta_lista(CotizacionSalida, cotizaciones)
+
+@app.get("/cotizaciones/similares")
+def get_cotizaciones_similares(items: List[str] = Query(...), k: int = 10, db: Session = Depends(get_db)):
+    """Cotizaciones históricas más parecidas a una lista de descripciones"""
+    indice_cotizaciones.asegurar_cargado(db)
+    resultados = indice_cotizaciones.buscar(items, k=min(k, 50))
+    return _similares_to_list(db, resultados)
+
+@app.get("/cotizaciones/{cotizacion_id}/similares")
+def get_similares_de_cotizacion(cotizacion_id: int, k: int = 10, db: Session = Depends(get_db)):
+    indice_cotizaciones.asegurar_cargado(db)
+    resultados = indice_cotizaciones.buscar_por_id(cotizacion_id, k=min(k, 50))
+    if resultados is None:
+        raise HTTPException(status_code=404, detail="Cotización no encontrada en el índice")
+    return _similares_to_list(db, resultados)
+
+def _similares_to_list(db: Session, resultados):
+    """Carga las cotizaciones del top-k (una sola consulta) respetando el orden por similitud"""
+    if not resultados:
+        return []
+    ids = [cot_id for cot_id, _ in resultados]
+    cotizaciones = db.query(Cotizacion).options(
+        joinedload(Cotizacion.cliente),
+        joinedload(Cotizacion.items)
+    ).filter(Cotizacion.id.in_(ids)).all()
+    por_id = {c.id: c for c in cotizaciones}
+
+    salida = []
+    for cot_id, similitud in resultados:
+        if cot_id in por_id:
+            d = a_dict(CotizacionSalida, por_id[cot_id])
+            d['similitud'] = round(similitud, 4)
+            salida.append(d)
+    return salida
+
+@app.post("/cotizaciones/{cotizacion_id}/convertir-a-nota")
+async def convertir_cotizacion_a_nota_api(cotizacion_id: int, datos: Optional[Dict[str, Any]] = None, db: Session = Depends(get_db)):
+    """Genera la nota de venta de una cotización en una sola petición"""
+    try:
+        nota = crud.convertir_cotizacion_a_nota(db, cotizacion_id, observaciones=(datos or {}).get('observaciones'))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not nota:
+        raise HTTPException(status_code=404, detail="Cotización no encontrada")
+    
+    cotizacion = crud.get_cotizacion(db, cotizacion_id)
+    cache_reportes.invalidar_fechas(nota.fecha)
+    indice_descripciones.registrar([i.descripcion for i in nota.items])
+    await manager.broadcast({
+        "type": "nota_convertida",
+        "data": {"nota": {"id": nota.id}, "cotizacion": a_dict(CotizacionSalida, cotizacion)}
+    })
+    return {"nota": a_dict(NotaSalida, nota), "cotizacion": a_dict(CotizacionSalida, cotizacion)}
 
 @app.get("/cotizaciones/{cotizacion_id}")
-def get_cotizacion_por_id(cotizacion_id: int, db: Session = Depends(get_db)):
+def get_cotizacion_por_id(cotizacion_id: int, response: Response, db: Session = Depends(get_db)):
     cotizacion = crud.get_cotizacion(db, cotizacion_id)
     if cotizacion:
-        return _cotizacion_to_dict(cotizacion)
+        response.headers["ETag"] = f'"{cotizacion.version}"'
+        return a_dict(CotizacionSalida, cotizacion)
     raise HTTPException(status_code=404, detail="Cotización no encontrada")
     
 @app.post("/cotizaciones/{cotizacion_id}/cancelar")
@@ -390,78 +567,61 @@ async def cancelar_cotizacion_api(cotizacion_id: int, db: Session = Depends(get_
         success = crud.cancelar_cotizacion(db, cotizacion_id)
         if not success:
              raise HTTPException(status_code=400, detail="No se pudo cancelar la cotización (ya aceptada o cancelada)")
+        indice_cotizaciones.quitar(cotizacion_id)
         
         cotizacion = crud.get_cotizacion(db, cotizacion_id) 
         await manager.broadcast({
             "type": "cotizacion_actualizada", # Usamos señal genérica
-            "data": _cotizacion_to_dict(cotizacion)
+            "data": a_dict(CotizacionSalida, cotizacion)
         })
-        return _cotizacion_to_dict(cotizacion)
+        return a_dict(CotizacionSalida, cotizacion)
     
+    except crud.ConflictoVersion as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
-        print(f"Error al cancelar cotización API: {e}")
+        log.warning("Error al cancelar cotización API: %s", e)
         raise HTTPException(status_code=400, detail=str(e))
 
-# ==================== NOTAS DE VENTA (CON DEBUG) ====================
+# ==================== NOTAS DE VENTA ====================
 @app.post("/notas")
 async def crear_nota(datos: Dict[str, Any], db: Session = Depends(get_db)):
     try:
-        print("\n" + "="*60)
-        print("📥 DATOS RECIBIDOS DEL CLIENTE:")
-        print(f"   Datos completos: {datos}")
-        print(f"   Tipo de datos: {type(datos)}")
-        print("="*60 + "\n")
-        
+        # Payload completo solo en DEBUG y para una muestra de las peticiones
+        muestrear_payload(log, "Nota recibida", datos)
+
         items = datos.pop('items', [])
         estado = datos.pop('estado', 'Registrado')
         cotizacion_folio = datos.pop('cotizacion_folio', None)
         orden_folio = datos.pop('orden_folio', None)
 
-        print(f"📦 Items extraídos: {items}")
-        print(f"🏷️  Estado: {estado}")
-        print(f"📋 Datos nota: {datos}")
-        
-        if 'fecha' in datos:
-            print(f"📅 Fecha recibida: '{datos['fecha']}' (tipo: {type(datos['fecha'])})")
-            if isinstance(datos['fecha'], str):
-                try:
-                    fecha_obj = datetime.strptime(datos['fecha'], '%Y-%m-%d')
-                    datos['fecha'] = fecha_obj
-                    print(f"✅ Fecha convertida: {fecha_obj}")
-                except ValueError as ve:
-                    print(f"⚠️  Error convirtiendo fecha: {ve}")
-                    datos['fecha'] = datetime.now()
-
-        print(f"\n🔧 Llamando crud.create_nota_venta...")
-        nota = crud.create_nota_venta(db, nota_data=datos, items=items, estado=estado)
-        print(f"✅ Nota creada: ID={nota.id}, Folio={nota.folio}")
+        if 'fecha' in datos and isinstance(datos['fecha'], str):
+            try:
+                datos['fecha'] = datetime.strptime(datos['fecha'], '%Y-%m-%d')
+            except ValueError as ve:
+                log.warning("Fecha de nota inválida, se usa la actual: %s", ve)
+                datos['fecha'] = datetime.now()
 
-        if cotizacion_folio or orden_folio:
-            nota.cotizacion_folio = cotizacion_folio
-            nota.orden_folio = orden_folio
-            db.commit()
-            db.refresh(nota)
+        # Los folios de origen se guardan en la misma transacción que la nota
+        datos['cotizacion_folio'] = cotizacion_folio
+        datos['orden_folio'] = orden_folio
 
+        nota = crud.create_nota_venta(db, nota_data=datos, items=items, estado=estado)
+        log.info("Nota creada", extra={"nota_id": nota.id, "folio": nota.folio, "items": len(items)})
+
+        cache_reportes.invalidar_fechas(nota.fecha)
+        indice_descripciones.registrar([i.descripcion for i in nota.items])
         await manager.broadcast({"type": "nota_creada", "data": {"id": nota.id}})
         
-        resultado = _nota_to_dict(nota)
-        print(f"📤 Retornando: {resultado}\n")
-        return resultado
+        return a_dict(NotaSalida, nota)
         
     except Exception as e:
-        print("\n" + "="*60)
-        print("❌ ERROR AL CREAR NOTA:")
-        print(f"   Mensaje: {str(e)}")
-        print(f"   Tipo: {type(e).__name__}")
-        print("\n📜 TRACEBACK COMPLETO:")
-        print(traceback.format_exc())
-        print("="*60 + "\n")
+        log.exception("Error al crear nota")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/notas")
-def get_notas(db: Session = Depends(get_db)):
-    notas = crud.get_all_notas(db) 
-    return [_nota_to_dict(n) for n in notas]
+def get_notas(limit: Optional[int] = None, db: Session = Depends(get_db)):
+    notas = crud.filas_notas(db, limit=limit)
+    return respuesta_lista(NotaSalida, notas)
 
 @app.get("/notas/buscar")
 def buscar_notas_api(
@@ -481,19 +641,21 @@ def buscar_notas_api(
         orden_folio=orden_folio,
         cotizacion_folio=cotizacion_folio
     )
-    return [_nota_to_dict(n) for n in notas]
+    return respuesta_lista(NotaSalida, notas)
 
 @app.get("/notas/{nota_id}")
-def get_nota_por_id(nota_id: int, db: Session = Depends(get_db)):
+def get_nota_por_id(nota_id: int, response: Response, db: Session = Depends(get_db)):
     nota = crud.get_nota(db, nota_id)
     if nota:
-        return _nota_to_dict(nota)
+        response.headers["ETag"] = f'"{nota.version}"'
+        return a_dict(NotaSalida, nota)
     raise HTTPException(status_code=404, detail="Nota no encontrada")
 
 @app.put("/notas/{nota_id}")
-async def actualizar_nota_api(nota_id: int, datos: Dict[str, Any], db: Session = Depends(get_db)):
+async def actualizar_nota_api(nota_id: int, datos: Dict[str, Any], if_match: Optional[str] = Header(None), db: Session = Depends(get_db)):
     try:
         items = datos.pop('items', [])
+        version = _version_solicitada(if_match, datos)
         
         # Convertir fecha si viene
         if 'fecha' in datos and isinstance(datos['fecha'], str):
@@ -502,27 +664,36 @@ async def actualizar_nota_api(nota_id: int, datos: Dict[str, Any], db: Session =
                 fecha_obj = datetime.strptime(datos['fecha'], '%Y-%m-%d').date()
                 datos['fecha'] = fecha_obj
             except ValueError as ve:
-                print(f"Advertencia: Fecha inválida, no se actualizará: {e}")
+                log.warning("Fecha inválida, no se actualizará: %s", ve)
                 datos.pop('fecha') # No actualizar si es inválida
-        
+
+        # Si cambia la fecha, los reportes del día anterior también cambian
+        anterior = crud.get_nota(db, nota_id) if 'fecha' in datos else None
+        fecha_anterior = anterior.fecha if anterior else None
+
         nota = crud.update_nota_venta(
             db=db,
             nota_id=nota_id,
             nota_data=datos,
-            items=items
+            items=items,
+            version=version
         )
         
         if not nota:
             raise HTTPException(status_code=404, detail="Nota no encontrada")
-            
+
+        cache_reportes.invalidar_fechas(nota.fecha, fecha_anterior)
+        indice_descripciones.registrar([i.descripcion for i in nota.items])
         await manager.broadcast({
             "type": "nota_actualizada", # Usamos una señal genérica
-            "data": _nota_to_dict(nota)
+            "data": a_dict(NotaSalida, nota)
         })
-        return _nota_to_dict(nota)
+        return a_dict(NotaSalida, nota)
         
+    except crud.ConflictoVersion as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
-        print(f"Error al actualizar nota API: {e}")
+        log.warning("Error al actualizar nota API: %s", e)
         raise HTTPException(status_code=400, detail=str(e))
     
 @app.post("/notas/{nota_id}/cancelar")
@@ -535,50 +706,56 @@ async def cancelar_nota_api(nota_id: int, db: Session = Depends(get_db)):
         
         # Si fue exitoso, obtenemos la nota actualizada para devolverla
         nota = crud.get_nota(db, nota_id) 
+        cache_reportes.invalidar_fechas(nota.fecha)
         await manager.broadcast({
             "type": "nota_actualizada",
-            "data": _nota_to_dict(nota)
+            "data": a_dict(NotaSalida, nota)
         })
-        return _nota_to_dict(nota)
+        return a_dict(NotaSalida, nota)
     
+    except crud.ConflictoVersion as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
-        print(f"Error al cancelar nota API: {e}")
+        log.warning("Error al cancelar nota API: %s", e)
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.post("/notas/{nota_id}/pagar")
-async def registrar_pago_api(nota_id: int, datos: Dict[str, Any], db: Session = Depends(get_db)):
+async def registrar_pago_api(nota_id: int, datos: PagoEntrada, db: Session = Depends(get_db)):
     try:
-        # El cliente enviará la fecha como string ISO (YYYY-MM-DD)
-        fecha_pago_obj = datetime.fromisoformat(datos['fecha_pago']).date()
-
         nota = crud.registrar_pago_nota(
             db=db,
             nota_id=nota_id,
-            monto=float(datos['monto']),
-            fecha_pago=fecha_pago_obj,
-            metodo_pago=datos['metodo_pago'],
-            memo=datos['memo']
+            monto=datos.monto,
+            fecha_pago=datos.fecha_pago,
+            metodo_pago=datos.metodo_pago,
+            memo=datos.memo
         )
+        cache_reportes.invalidar_fechas(nota.fecha)
         await manager.broadcast({
             "type": "nota_actualizada", # Usamos una señal genérica
-            "data": _nota_to_dict(nota)
+            "data": a_dict(NotaSalida, nota)
         })
-        return _nota_to_dict(nota)
+        return a_dict(NotaSalida, nota)
+    except crud.ConflictoVersion as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
-        print(f"Error al registrar pago API: {e}")
+        log.warning("Error al registrar pago API: %s", e)
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.delete("/pagos/{pago_id}")
 async def eliminar_pago_api(pago_id: int, db: Session = Depends(get_db)):
     try:
         nota = crud.eliminar_pago_nota(db, pago_id)
+        cache_reportes.invalidar_fechas(nota.fecha)
         await manager.broadcast({
             "type": "nota_actualizada",
-            "data": _nota_to_dict(nota)
+            "data": a_dict(NotaSalida, nota)
         })
-        return _nota_to_dict(nota)
+        return a_dict(NotaSalida, nota)
+    except crud.ConflictoVersion as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
-        print(f"Error al eliminar pago API: {e}")
+        log.warning("Error al eliminar pago API: %s", e)
         raise HTTPException(status_code=400, detail=str(e))
 
 # ==================== MOVIMIENTOS INVENTARIO ====================
@@ -596,70 +773,131 @@ def get_movimientos_api(
             tipo=tipo, 
             limit=limit
         )
-        # Usamos el nuevo _movimiento_to_dict que añadiremos abajo
-        return [_movimiento_to_dict(m) for m in movimientos]
+        # Cada movimiento con el nombre de su producto (MovimientoSalida)
+        return respuesta_lista(MovimientoSalida, movimientos)
     except Exception as e:
-        print(f"Error al obtener movimientos API: {e}")
+        log.warning("Error al obtener movimientos API: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/inventario/movimiento")
-async def crear_movimiento(datos: Dict[str, Any], db: Session = Depends(get_db)):
-    movimiento = crud.registrar_movimiento_inventario(
-        db,
-        producto_id=datos['producto_id'],
-        tipo=datos['tipo'],
-        cantidad=datos['cantidad'],
-        motivo=datos['motivo'],
-        usuario=datos.get('usuario', 'Sistema')
-    )
+async def crear_movimiento(datos: MovimientoEntrada, db: Session = Depends(get_db)):
+    try:
+        movimiento = crud.registrar_movimiento_inventario(
+            db,
+            producto_id=datos.producto_id,
+            tipo=datos.tipo,
+            cantidad=datos.cantidad,
+            motivo=datos.motivo,
+            usuario=datos.usuario
+        )
+    except ValueError as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+    if not movimiento:
+        raise HTTPException(status_code=404, detail="Producto no encontrado")
     
     try:
         db.commit()
         db.refresh(movimiento)
+        stock_actual = db.query(Producto.stock_actual).filter(Producto.id == datos.producto_id).scalar()
     except Exception as e:
         db.rollback()
-        print(f"Error al hacer commit del movimiento: {e}")
+        log.warning("Error al hacer commit del movimiento: %s", e)
         raise HTTPException(status_code=500, detail=f"Error al guardar: {e}")
 
+    cache_catalogos.escritura(db, 'productos')
     await manager.broadcast({
         "type": "stock_actualizado",
         "data": {
-            "producto_id": datos['producto_id'],
-            "tipo": datos['tipo'],
-            "cantidad": datos['cantidad']
+            "producto_id": datos.producto_id,
+            "tipo": datos.tipo,
+            "cantidad": datos.cantidad,
+            "stock_actual": stock_actual
         }
     })
     return {"success": True}
 
+@app.post("/inventario/movimientos/lote")
+async def crear_movimientos_lote(datos: MovimientosLoteEntrada, db: Session = Depends(get_db)):
+    """
+    Aplica una lista de movimientos en una sola transacción (todo o nada)
+    y avisa a los clientes con un solo evento.
+    """
+    movimientos = [m.datos() for m in datos.movimientos]
+    if not movimientos:
+        raise HTTPException(status_code=400, detail="Sin movimientos")
+    try:
+        stock = crud.registrar_movimientos_lote(db, movimientos, usuario=datos.usuario)
+        db.commit()
+    except ValueError as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        db.rollback()
+        log.warning("Error al guardar lote de movimientos: %s", e)
+        raise HTTPException(status_code=500, detail=f"Error al guardar: {e}")
+
+    cache_catalogos.escritura(db, 'productos')
+    await manager.broadcast({
+        "type": "stock_actualizado",
+        "data": {
+            "lote": True,
+            "movimientos": len(movimientos),
+            "stock": stock
+        }
+    })
+    return {"success": True, "movimientos": len(movimientos), "stock": stock}
+
+# ==================== AUTOCOMPLETADO ====================
+
+@app.get("/autocomplete")
+def autocompletar_descripcion(q: str, limit: int = 10, db: Session = Depends(get_db)):
+    """Sugerencias de descripción por prefijo (items históricos y productos)"""
+    indice_descripciones.asegurar_cargado(db)
+    return indice_descripciones.buscar(q, limite=min(limit, 50))
+
 # ==================== REPORTES ====================
+# Ventas, servicios, clientes y CxC salen del caché de reportes
+# (server/cache_reportes.py); las escrituras de notas lo invalidan por fecha.
+
+def _reporte_cacheado(tipo: str, fecha_ini: Optional[datetime], fecha_fin: Optional[datetime], generar) -> Response:
+    """Cuerpo JSON del caché o, si no está, generar() y guardarlo"""
+    llave = cache_reportes.llave(tipo, fecha_ini, fecha_fin)
+    cuerpo = cache_reportes.obtener(llave)
+    if cuerpo is None:
+        generacion = cache_reportes.generacion
+        cuerpo = generar()
+        cache_reportes.guardar(llave, cuerpo, generacion)
+    return Response(cuerpo, media_type="application/json")
 
 @app.get("/reportes/ventas")
 def get_reporte_ventas(fecha_ini: datetime, fecha_fin: datetime, db: Session = Depends(get_db)):
     try:
-        # Llama a la función existente en crud.py
-        notas = crud.get_reporte_ventas_por_periodo(db, fecha_ini, fecha_fin)
-        # Serializa los resultados usando la función _nota_to_dict que ya existe
-        return [_nota_to_dict(n) for n in notas]
+        # Filas por columnas (una línea por nota)
+        return _reporte_cacheado('ventas', fecha_ini, fecha_fin, lambda: respuesta_lista(
+            NotaReporteSalida, crud.get_reporte_ventas_por_periodo(db, fecha_ini, fecha_fin)).body)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/reportes/servicios")
 def get_reporte_servicios(fecha_ini: datetime, fecha_fin: datetime, db: Session = Depends(get_db)):
-    try:
-        # Llama a la función existente en crud.py
+    def generar():
         resultados = crud.get_reporte_servicios_mas_solicitados(db, fecha_ini, fecha_fin)
         # Serializa la respuesta (lista de tuplas)
-        return [{"descripcion": r[0], "total_vendido": r[1]} for r in resultados]
+        return codificar_json([{"descripcion": r[0], "total_vendido": r[1]} for r in resultados])
+    try:
+        return _reporte_cacheado('servicios', fecha_ini, fecha_fin, generar)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/reportes/clientes")
 def get_reporte_clientes(fecha_ini: datetime, fecha_fin: datetime, db: Session = Depends(get_db)):
-    try:
-        # Llama a la función existente en crud.py
+    def generar():
         resultados = crud.get_reporte_clientes_frecuentes(db, fecha_ini, fecha_fin)
         # Serializa la respuesta (lista de tuplas)
-        return [{"cliente": r[0], "total_notas": r[1], "monto_total": r[2]} for r in resultados]
+        return codificar_json([{"cliente": r[0], "total_notas": r[1], "monto_total": r[2]} for r in resultados])
+    try:
+        return _reporte_cacheado('clientes', fecha_ini, fecha_fin, generar)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -668,16 +906,15 @@ def get_reporte_inventario_bajo(db: Session = Depends(get_db)):
     try:
         # Llama a la función existente en crud.py (get_productos_bajo_stock)
         productos = crud.get_productos_bajo_stock(db)
-        return [_producto_to_dict(p) for p in productos]
+        return respuesta_lista(ProductoSalida, productos)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/reportes/cxc")
 def get_reporte_cxc(db: Session = Depends(get_db)):
     try:
-        # Llama a la función existente en crud.py
-        notas = crud.get_reporte_cuentas_por_cobrar(db)
-        return [_nota_to_dict(n) for n in notas]
+        return _reporte_cacheado('cxc', None, None, lambda: respuesta_lista(
+            NotaReporteSalida, crud.get_reporte_cuentas_por_cobrar(db)).body)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -698,18 +935,19 @@ async def crear_nota_proveedor_api(datos: Dict[str, Any], db: Session = Depends(
         
         await manager.broadcast({
             "type": "nota_proveedor_creada", 
-            "data": _nota_proveedor_to_dict(nota)
+            "data": a_dict(NotaProveedorSalida, nota, vacio={})
         })
-        return _nota_proveedor_to_dict(nota)
+        return a_dict(NotaProveedorSalida, nota, vacio={})
         
     except Exception as e:
-        print(f"Error al crear nota proveedor API: {e}")
+        log.warning("Error al crear nota proveedor API: %s", e)
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.put("/notas_proveedor/{nota_id}")
-async def actualizar_nota_proveedor_api(nota_id: int, datos: Dict[str, Any], db: Session = Depends(get_db)):
+async def actualizar_nota_proveedor_api(nota_id: int, datos: Dict[str, Any], if_match: Optional[str] = Header(None), db: Session = Depends(get_db)):
     try:
         items = datos.pop('items', [])
+        version = _version_solicitada(if_match, datos)
         
         if 'fecha' in datos and isinstance(datos['fecha'], str):
             try:
@@ -722,7 +960,8 @@ async def actualizar_nota_proveedor_api(nota_id: int, datos: Dict[str, Any], db:
             db=db,
             nota_id=nota_id,
             nota_data=datos,
-            items=items
+            items=items,
+            version=version
         )
         
         if not nota:
@@ -730,18 +969,20 @@ async def actualizar_nota_proveedor_api(nota_id: int, datos: Dict[str, Any], db:
             
         await manager.broadcast({
             "type": "nota_proveedor_actualizada", 
-            "data": _nota_proveedor_to_dict(nota)
+            "data": a_dict(NotaProveedorSalida, nota, vacio={})
         })
-        return _nota_proveedor_to_dict(nota)
+        return a_dict(NotaProveedorSalida, nota, vacio={})
         
+    except crud.ConflictoVersion as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
-        print(f"Error al actualizar nota proveedor API: {e}")
+        log.warning("Error al actualizar nota proveedor API: %s", e)
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.get("/notas_proveedor")
-def get_notas_proveedor(db: Session = Depends(get_db)):
-    notas = crud.get_all_notas_proveedor(db)
-    return [_nota_proveedor_to_dict(n) for n in notas]
+def get_notas_proveedor(limit: Optional[int] = None, db: Session = Depends(get_db)):
+    notas = crud.filas_notas_proveedor(db, limit=limit)
+    return respuesta_lista(NotaProveedorSalida, notas)
 
 @app.get("/notas_proveedor/buscar")
 def buscar_notas_proveedor_api(
@@ -756,34 +997,35 @@ def buscar_notas_proveedor_api(
         query = query.filter(NotaProveedor.proveedor_id == proveedor_id)
     
     notas = query.order_by(NotaProveedor.fecha.desc()).all()
-    return [_nota_proveedor_to_dict(n) for n in notas]
+    return respuesta_lista(NotaProveedorSalida, notas)
 
 
 @app.get("/notas_proveedor/{nota_id}")
-def get_nota_proveedor(nota_id: int, db: Session = Depends(get_db)):
+def get_nota_proveedor(nota_id: int, response: Response, db: Session = Depends(get_db)):
     nota = crud.get_nota_proveedor(db, nota_id)
     if nota:
-        return _nota_proveedor_to_dict(nota)
+        response.headers["ETag"] = f'"{nota.version}"'
+        return a_dict(NotaProveedorSalida, nota, vacio={})
     raise HTTPException(status_code=404, detail="Nota de proveedor no encontrada")
 
 @app.post("/notas_proveedor/{nota_id}/pagar")
-async def registrar_pago_proveedor_api(nota_id: int, datos: Dict[str, Any], db: Session = Depends(get_db)):
+async def registrar_pago_proveedor_api(nota_id: int, datos: PagoEntrada, db: Session = Depends(get_db)):
     try:
-        fecha_pago_obj = datetime.fromisoformat(datos['fecha_pago']).date()
-
         nota = crud.registrar_pago_nota_proveedor(
             db=db,
             nota_id=nota_id,
-            monto=float(datos['monto']),
-            fecha_pago=fecha_pago_obj,
-            metodo_pago=datos['metodo_pago'],
-            memo=datos['memo']
+            monto=datos.monto,
+            fecha_pago=datos.fecha_pago,
+            metodo_pago=datos.metodo_pago,
+            memo=datos.memo
         )
         await manager.broadcast({
             "type": "nota_proveedor_actualizada",
-            "data": _nota_proveedor_to_dict(nota)
+            "data": a_dict(NotaProveedorSalida, nota, vacio={})
         })
-        return _nota_proveedor_to_dict(nota)
+        return a_dict(NotaProveedorSalida, nota, vacio={})
+    except crud.ConflictoVersion as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -793,9 +1035,11 @@ async def eliminar_pago_proveedor_api(pago_id: int, db: Session = Depends(get_db
         nota = crud.eliminar_pago_nota_proveedor(db, pago_id)
         await manager.broadcast({
             "type": "nota_proveedor_actualizada",
-            "data": _nota_proveedor_to_dict(nota)
+            "data": a_dict(NotaProveedorSalida, nota, vacio={})
         })
-        return _nota_proveedor_to_dict(nota)
+        return a_dict(NotaProveedorSalida, nota, vacio={})
+    except crud.ConflictoVersion as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -812,20 +1056,71 @@ async def cancelar_nota_proveedor_api(nota_id: int, db: Session = Depends(get_db
         nota = crud.get_nota_proveedor(db, nota_id) 
         await manager.broadcast({
             "type": "nota_proveedor_actualizada",
-            "data": _nota_proveedor_to_dict(nota)
+            "data": a_dict(NotaProveedorSalida, nota, vacio={})
         })
-        return _nota_proveedor_to_dict(nota)
+        return a_dict(NotaProveedorSalida, nota, vacio={})
     
+    except crud.ConflictoVersion as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
-        print(f"Error al cancelar nota proveedor API: {e}")
+        log.warning("Error al cancelar nota proveedor API: %s", e)
         raise HTTPException(status_code=400, detail=str(e))
 
+# ==================== BOOTSTRAP ====================
+
+# Sección -> función que la genera; lo que cada ventana pide al abrir
+SECCIONES_BOOTSTRAP = {
+    'configuracion': lambda db: a_dict(ConfigSalida, crud.get_config_empresa(db)),
+    'clientes': lambda db: a_lista(ClienteSalida, crud.get_all_clientes(db)),
+    'proveedores': lambda db: a_lista(ProveedorSalida, crud.get_all_proveedores(db)),
+    'productos': lambda db: a_lista(ProductoSalida, crud.get_all_productos(db)),
+}
+
+@app.get("/bootstrap")
+def bootstrap(request: Request, incluir: Optional[str] = None, db: Session = Depends(get_db)):
+    """
+    Catálogos y configuración en una sola respuesta (comprimida con gzip si
+    el cliente lo acepta). 'incluir' limita las secciones: ?incluir=clientes,productos
+    """
+    secciones = [s.strip() for s in incluir.split(',')] if incluir else list(SECCIONES_BOOTSTRAP)
+    desconocidas = [s for s in secciones if s not in SECCIONES_BOOTSTRAP]
+    if desconocidas:
+        raise HTTPException(status_code=400, detail=f"Secciones desconocidas: {', '.join(desconocidas)}")
+
+    datos = {s: SECCIONES_BOOTSTRAP[s](db) for s in secciones}
+    datos['generado'] = datetime.now().isoformat()
+    cuerpo = codificar_json(datos)
+
+    headers = {"Vary": "Accept-Encoding"}
+    if 'gzip' in request.headers.get('accept-encoding', ''):
+        cuerpo = gzip.compress(cuerpo, compresslevel=6)
+        headers["Content-Encoding"] = "gzip"
+    return Response(content=cuerpo, media_type="application/json", headers=headers)
+
+# ==================== MÉTRICAS ====================
+@app.get("/metrics")
+def metricas():
+    """Métricas del proceso en formato de texto de Prometheus"""
+    extra = {"websocket_connections": len(manager.active_connections)}
+    extra.update(cache_reportes.estadisticas())
+    extra.update(coalescedor.estadisticas())
+    extra.update(cache_catalogos.estadisticas())
+    checkedout = getattr(engine.pool, 'checkedout', None)
+    if checkedout:
+        extra["db_pool_checked_out"] = checkedout()
+    return Response(registro_metricas.texto_prometheus(extra),
+                    media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/metrics/consultas-lentas")
+def consultas_lentas():
+    """Últimas sentencias SQL que pasaron CONSULTA_LENTA_MS, con su SQL"""
+    return registro_metricas.consultas_lentas()
+
 # ==================== NUEVO: CONFIGURACION ====================
 
 @app.get("/configuracion")
 def get_configuracion_api(db: Session = Depends(get_db)):
-    config = crud.get_config_empresa(db)
-    return _config_to_dict(config)
+    return _catalogo('configuracion', db)
 
 @app.post("/configuracion")
 async def guardar_configuracion_api(datos: Dict[str, Any], db: Session = Depends(get_db)):
@@ -836,10 +1131,11 @@ async def guardar_configuracion_api(datos: Dict[str, Any], db: Session = Depends
         
         success = crud.guardar_config_empresa(db, datos)
         if success:
+            cache_catalogos.escritura(db, 'configuracion')
             config = crud.get_config_empresa(db)
             await manager.broadcast({
                 "type": "config_actualizada",
-                "data": _config_to_dict(config)
+                "data": a_dict(ConfigSalida, config)
             })
             return {"success": True}
         else:
@@ -852,14 +1148,13 @@ async def guardar_configuracion_api(datos: Dict[str, Any], db: Session = Depends
 
 @app.get("/usuarios")
 def get_usuarios_api(db: Session = Depends(get_db)):
-    usuarios = crud.get_usuarios(db)
-    return [_usuario_to_dict(u) for u in usuarios]
+    return _catalogo('usuarios', db)
 
 @app.get("/usuarios/{usuario_id}")
 def get_usuario_api(usuario_id: int, db: Session = Depends(get_db)):
     usuario = crud.get_usuario(db, usuario_id)
     if usuario:
-        return _usuario_to_dict(usuario)
+        return a_dict(UsuarioSalida, usuario)
     raise HTTPException(status_code=404, detail="Usuario no encontrado")
 
 @app.get("/usuarios/contar_admins")
@@ -872,11 +1167,12 @@ async def crear_usuario_api(datos: Dict[str, Any], db: Session = Depends(get_db)
     try:
         usuario = crud.crear_usuario_crud(db, datos)
         if usuario:
+            cache_catalogos.escritura(db, 'usuarios')
             await manager.broadcast({
                 "type": "usuario_creado",
-                "data": _usuario_to_dict(usuario)
+                "data": a_dict(UsuarioSalida, usuario)
             })
-            return _usuario_to_dict(usuario)
+            return a_dict(UsuarioSalida, usuario)
         else:
             raise HTTPException(status_code=400, detail="No se pudo crear el usuario (¿username duplicado?)")
     except Exception as e:
@@ -887,11 +1183,12 @@ async def actualizar_usuario_api(usuario_id: int, datos: Dict[str, Any], db: Ses
     try:
         usuario = crud.actualizar_usuario(db, usuario_id, datos)
         if usuario:
+            cache_catalogos.escritura(db, 'usuarios')
             await manager.broadcast({
                 "type": "usuario_actualizado",
-                "data": _usuario_to_dict(usuario)
+                "data": a_dict(UsuarioSalida, usuario)
             })
-            return _usuario_to_dict(usuario)
+            return a_dict(UsuarioSalida, usuario)
         else:
             raise HTTPException(status_code=404, detail="Usuario no encontrado")
     except Exception as e:
@@ -902,6 +1199,7 @@ async def eliminar_usuario_api(usuario_id: int, db: Session = Depends(get_db)):
     try:
         success = crud.eliminar_usuario(db, usuario_id)
         if success:
+            cache_catalogos.escritura(db, 'usuarios')
             await manager.broadcast({
                 "type": "usuario_eliminado",
                 "data": {"id": usuario_id}
@@ -1305,6 +1603,7 @@ async def load_sample_data():
         db.add_all(clientes + proveedores + productos)
         db.commit()
         db.close()
+        cache_catalogos.invalidar_todo(engine)
         
         return {
             "success": True,
@@ -1944,358 +2243,28 @@ async def fix_notas_venta_columns():
     
 @app.post("/admin/import-data")
 async def import_data(data: Dict[str, Any]):
-    """Importar datos desde JSON con mapeo de IDs"""
+    """Importar datos desde JSON con mapeo de IDs (inserción por lotes)"""
     try:
-        from server.database import SessionLocal
-        from server.models import (
-            Cliente, Proveedor, Producto, Orden, OrdenItem,
-            Cotizacion, CotizacionItem, NotaVenta, NotaVentaItem,
-            NotaVentaPago, NotaProveedor, NotaProveedorItem,
-            NotaProveedorPago, MovimientoInventario, ConfigEmpresa
-        )
-        from datetime import datetime
-        import base64
-        
-        db = SessionLocal()
-        imported = {}
-        
-        # Mapeos de IDs antiguos → nuevos
-        map_clientes = {}
-        map_proveedores = {}
-        map_productos = {}
-        map_ordenes = {}
-        map_cotizaciones = {}
-        map_notas_venta = {}
-        map_notas_proveedor = {}
-        
-        print("\n🔄 INICIANDO IMPORTACIÓN...")
-        
-        # ==================== CONFIG EMPRESA ====================
-        print("\n📋 Importando configuración empresa...")
-        for c_data in data.get("config_empresa", []):
-            if c_data.get("logo_data"):
-                c_data["logo_data"] = base64.b64decode(c_data["logo_data"])
-            
-            # Verificar si ya existe
-            existing = db.query(ConfigEmpresa).first()
-            if existing:
-                # Actualizar existente
-                for key, value in c_data.items():
-                    setattr(existing, key, value)
-            else:
-                config = ConfigEmpresa(**c_data)
-                db.add(config)
-        
-        db.commit()
-        imported["config_empresa"] = len(data.get("config_empresa", []))
-        print(f"✅ Config: {imported['config_empresa']}")
-        
-        # ==================== CLIENTES ====================
-        print("\n👥 Importando clientes...")
-        for c_data in data.get("clientes", []):
-            id_original = c_data.pop("id_original", None)
-            cliente = Cliente(**c_data)
-            db.add(cliente)
-            db.flush()
-            if id_original:
-                map_clientes[id_original] = cliente.id
-        
-        db.commit()
-        imported["clientes"] = len(data.get("clientes", []))
-        print(f"✅ Clientes: {imported['clientes']}")
-        
-        # ==================== PROVEEDORES ====================
-        print("\n🏭 Importando proveedores...")
-        for p_data in data.get("proveedores", []):
-            id_original = p_data.pop("id_original", None)
-            proveedor = Proveedor(**p_data)
-            db.add(proveedor)
-            db.flush()
-            if id_original:
-                map_proveedores[id_original] = proveedor.id
-        
-        db.commit()
-        imported["proveedores"] = len(data.get("proveedores", []))
-        print(f"✅ Proveedores: {imported['proveedores']}")
-        
-        # ==================== PRODUCTOS ====================
-        print("\n📦 Importando productos...")
-        for p_data in data.get("productos", []):
-            id_original = p_data.pop("id_original", None)
-            proveedor_id_original = p_data.pop("proveedor_id_original", None)
-            
-            # Mapear proveedor
-            if proveedor_id_original and proveedor_id_original in map_proveedores:
-                p_data["proveedor_id"] = map_proveedores[proveedor_id_original]
-            else:
-                p_data["proveedor_id"] = None
-            
-            producto = Producto(**p_data)
-            db.add(producto)
-            db.flush()
-            if id_original:
-                map_productos[id_original] = producto.id
-        
-        db.commit()
-        imported["productos"] = len(data.get("productos", []))
-        print(f"✅ Productos: {imported['productos']}")
-        
-        # ==================== MOVIMIENTOS INVENTARIO ====================
-        print("\n📊 Importando movimientos inventario...")
-        for m_data in data.get("movimientos_inventario", []):
-            producto_id_original = m_data.pop("producto_id_original", None)
-            
-            if producto_id_original and producto_id_original in map_productos:
-                m_data["producto_id"] = map_productos[producto_id_original]
-                
-                # Convertir fecha
-                if m_data.get("created_at"):
-                    m_data["created_at"] = datetime.fromisoformat(m_data["created_at"])
-                
-                movimiento = MovimientoInventario(**m_data)
-                db.add(movimiento)
-        
-        db.commit()
-        imported["movimientos_inventario"] = len(data.get("movimientos_inventario", []))
-        print(f"✅ Movimientos: {imported['movimientos_inventario']}")
-        
-        # ==================== ÓRDENES ====================
-        print("\n🔧 Importando órdenes...")
-        for o_data in data.get("ordenes", []):
-            id_original = o_data.pop("id_original", None)
-            cliente_id_original = o_data.pop("cliente_id_original", None)
-            
-            if cliente_id_original and cliente_id_original in map_clientes:
-                o_data["cliente_id"] = map_clientes[cliente_id_original]
-                
-                # Convertir fechas
-                for campo in ["fecha_recepcion", "fecha_promesa", "fecha_entrega"]:
-                    if o_data.get(campo):
-                        o_data[campo] = datetime.fromisoformat(o_data[campo])
-                
-                orden = Orden(**o_data)
-                db.add(orden)
-                db.flush()
-                if id_original:
-                    map_ordenes[id_original] = orden.id
-        
-        db.commit()
-        imported["ordenes"] = len(data.get("ordenes", []))
-        print(f"✅ Órdenes: {imported['ordenes']}")
-        
-        # ==================== ÓRDENES ITEMS ====================
-        print("\n📝 Importando items de órdenes...")
-        for i_data in data.get("ordenes_items", []):
-            orden_id_original = i_data.pop("orden_id_original", None)
-            
-            if orden_id_original and orden_id_original in map_ordenes:
-                i_data["orden_id"] = map_ordenes[orden_id_original]
-                item = OrdenItem(**i_data)
-                db.add(item)
-        
-        db.commit()
-        imported["ordenes_items"] = len(data.get("ordenes_items", []))
-        print(f"✅ Items Órdenes: {imported['ordenes_items']}")
-        
-        # ==================== COTIZACIONES ====================
-        print("\n💰 Importando cotizaciones...")
-        for c_data in data.get("cotizaciones", []):
-            id_original = c_data.pop("id_original", None)
-            cliente_id_original = c_data.pop("cliente_id_original", None)
-            
-            if cliente_id_original and cliente_id_original in map_clientes:
-                c_data["cliente_id"] = map_clientes[cliente_id_original]
-                
-                # Remover campos que pueden no existir en el modelo
-                fecha_value = c_data.pop("fecha", None)
-                vigencia_value = c_data.pop("vigencia", None)
-                
-                # Solo agregar si el modelo los tiene y tienen valor
-                if fecha_value:
-                    try:
-                        c_data["fecha"] = datetime.fromisoformat(fecha_value).date()
-                    except:
-                        pass  # Ignorar si el campo no existe
-                
-                if vigencia_value:
-                    try:
-                        c_data["vigencia"] = datetime.fromisoformat(vigencia_value).date()
-                    except:
-                        pass  # Ignorar si el campo no existe
-                
-                # Crear cotización solo con campos válidos
-                try:
-                    cotizacion = Cotizacion(**c_data)
-                    db.add(cotizacion)
-                    db.flush()
-                    if id_original:
-                        map_cotizaciones[id_original] = cotizacion.id
-                except TypeError as e:
-                    print(f"⚠️  Error en cotización {id_original}: {e}")
-                    continue
-
-        db.commit()
-        imported["cotizaciones"] = len(data.get("cotizaciones", []))
-        print(f"✅ Cotizaciones: {imported['cotizaciones']}")
-        
-        # ==================== COTIZACIONES ITEMS ====================
-        print("\n📋 Importando items de cotizaciones...")
-        for i_data in data.get("cotizaciones_items", []):
-            cotizacion_id_original = i_data.pop("cotizacion_id_original", None)
-            
-            if cotizacion_id_original and cotizacion_id_original in map_cotizaciones:
-                i_data["cotizacion_id"] = map_cotizaciones[cotizacion_id_original]
-                item = CotizacionItem(**i_data)
-                db.add(item)
-        
-        db.commit()
-        imported["cotizaciones_items"] = len(data.get("cotizaciones_items", []))
-        print(f"✅ Items Cotizaciones: {imported['cotizaciones_items']}")
-        
-        # ==================== NOTAS VENTA ====================
-        print("\n🧾 Importando notas de venta...")
-        for n_data in data.get("notas_venta", []):
-            id_original = n_data.pop("id_original", None)
-            cliente_id_original = n_data.pop("cliente_id_original", None)
-            
-            if cliente_id_original and cliente_id_original in map_clientes:
-                n_data["cliente_id"] = map_clientes[cliente_id_original]
-                
-                if n_data.get("fecha"):
-                    n_data["fecha"] = datetime.fromisoformat(n_data["fecha"])
-                
-                nota = NotaVenta(**n_data)
-                db.add(nota)
-                db.flush()
-                if id_original:
-                    map_notas_venta[id_original] = nota.id
-        
-        db.commit()
-        imported["notas_venta"] = len(data.get("notas_venta", []))
-        print(f"✅ Notas Venta: {imported['notas_venta']}")
-        
-        # ==================== NOTAS VENTA ITEMS ====================
-        print("\n📦 Importando items de notas venta...")
-        for i_data in data.get("notas_venta_items", []):
-            nota_id_original = i_data.pop("nota_id_original", None)
-            producto_id_original = i_data.pop("producto_id_original", None)  # Remover siempre
-            
-            if nota_id_original and nota_id_original in map_notas_venta:
-                i_data["nota_id"] = map_notas_venta[nota_id_original]
-                
-                # NO agregar producto_id si el modelo no lo tiene
-                # El modelo solo usa: nota_id, cantidad, descripcion, precio_unitario, importe, impuesto
-                
-                try:
-                    item = NotaVentaItem(**i_data)
-                    db.add(item)
-                except TypeError as e:
-                    print(f"⚠️  Error en item nota venta: {e}")
-                    continue
-
-        db.commit()
-        imported["notas_venta_items"] = len(data.get("notas_venta_items", []))
-        print(f"✅ Items Notas Venta: {imported['notas_venta_items']}")
-        
-        # ==================== NOTAS VENTA PAGOS ====================
-        print("\n💳 Importando pagos de notas venta...")
-        for p_data in data.get("notas_venta_pagos", []):
-            nota_id_original = p_data.pop("nota_id_original", None)
-            
-            if nota_id_original and nota_id_original in map_notas_venta:
-                p_data["nota_id"] = map_notas_venta[nota_id_original]
-                
-                if p_data.get("fecha_pago"):
-                    p_data["fecha_pago"] = datetime.fromisoformat(p_data["fecha_pago"])
-                
-                pago = NotaVentaPago(**p_data)
-                db.add(pago)
-        
-        db.commit()
-        imported["notas_venta_pagos"] = len(data.get("notas_venta_pagos", []))
-        print(f"✅ Pagos Notas Venta: {imported['notas_venta_pagos']}")
-        
-        # ==================== NOTAS PROVEEDOR ====================
-        print("\n🏪 Importando notas de proveedor...")
-        for n_data in data.get("notas_proveedor", []):
-            id_original = n_data.pop("id_original", None)
-            proveedor_id_original = n_data.pop("proveedor_id_original", None)
-            
-            if proveedor_id_original and proveedor_id_original in map_proveedores:
-                n_data["proveedor_id"] = map_proveedores[proveedor_id_original]
-                
-                # Remover campos que pueden no existir
-                fecha_value = n_data.pop("fecha", None)
-                fecha_venc_value = n_data.pop("fecha_vencimiento", None)
-                
-                # Solo agregar fecha si existe y es válida
-                if fecha_value:
-                    try:
-                        n_data["fecha"] = datetime.fromisoformat(fecha_value).date()
-                    except:
-                        pass
-                
-                # NO agregar fecha_vencimiento si el modelo no lo tiene
-                
-                try:
-                    nota = NotaProveedor(**n_data)
-                    db.add(nota)
-                    db.flush()
-                    if id_original:
-                        map_notas_proveedor[id_original] = nota.id
-                except TypeError as e:
-                    print(f"⚠️  Error en nota proveedor {id_original}: {e}")
-                    continue
-
-        db.commit()
-        imported["notas_proveedor"] = len(data.get("notas_proveedor", []))
-        print(f"✅ Notas Proveedor: {imported['notas_proveedor']}")
-        # ==================== NOTAS PROVEEDOR ITEMS ====================
-        print("\n📦 Importando items de notas proveedor...")
-        for i_data in data.get("notas_proveedor_items", []):
-            nota_id_original = i_data.pop("nota_id_original", None)
-            producto_id_original = i_data.pop("producto_id_original", None)  # Remover siempre
-            
-            if nota_id_original and nota_id_original in map_notas_proveedor:
-                i_data["nota_id"] = map_notas_proveedor[nota_id_original]
-                
-                # NO agregar producto_id
-                
-                try:
-                    item = NotaProveedorItem(**i_data)
-                    db.add(item)
-                except TypeError as e:
-                    print(f"⚠️  Error en item nota proveedor: {e}")
-                    continue
-
-        db.commit()
-        imported["notas_proveedor_items"] = len(data.get("notas_proveedor_items", []))
-        print(f"✅ Items Notas Proveedor: {imported['notas_proveedor_items']}")
-        
-        # ==================== NOTAS PROVEEDOR PAGOS ====================
-        print("\n💵 Importando pagos de notas proveedor...")
-        for p_data in data.get("notas_proveedor_pagos", []):
-            nota_id_original = p_data.pop("nota_id_original", None)
-            
-            if nota_id_original and nota_id_original in map_notas_proveedor:
-                p_data["nota_id"] = map_notas_proveedor[nota_id_original]
-                
-                if p_data.get("fecha_pago"):
-                    p_data["fecha_pago"] = datetime.fromisoformat(p_data["fecha_pago"])
-                
-                pago = NotaProveedorPago(**p_data)
-                db.add(pago)
-        
-        db.commit()
-        imported["notas_proveedor_pagos"] = len(data.get("notas_proveedor_pagos", []))
-        print(f"✅ Pagos Notas Proveedor: {imported['notas_proveedor_pagos']}")
-        
-        db.close()
+        from server.database import engine
         
+        log.info("Iniciando importación")
+        importador = ImportadorMasivo(engine, progreso=reportar_progreso)
+        marcar_importacion(True)
+        try:
+            await run_in_threadpool(importador.procesar, registros_desde_json(data))
+            resumen = await run_in_threadpool(importador.finalizar)
+        finally:
+            marcar_importacion(False, {"total": importador.total})
+            cache_reportes.limpiar()
+            cache_catalogos.invalidar_todo(engine)
+            indice_cotizaciones.reiniciar()
+            indice_descripciones.reiniciar()
+            asignador_folios.sincronizar(engine)
+        
+        log.info("Importación terminada", extra={"filas": resumen['total'], "segundos": resumen['seconds']})
         return {
             "success": True,
-            "imported": imported,
-            "total": sum(imported.values()),
+            **resumen,
             "message": "Datos importados correctamente"
         }
         
@@ -2306,7 +2275,72 @@ async def import_data(data: Dict[str, Any]):
             "error": str(e),
             "traceback": traceback.format_exc()
         }
+
+
+@app.post("/admin/import-ndjson")
+async def import_ndjson(request: Request, lote: int = LOTE_DEFAULT):
+    """
+    Importar desde NDJSON ({"tabla": ..., "datos": {...}} por línea) leyendo
+    el cuerpo conforme llega. Acepta gzip (Content-Encoding: gzip), que es
+    el formato de /admin/export.
+    """
+    try:
+        from server.database import engine
+        
+        gzip = (
+            request.headers.get("content-encoding", "").lower() == "gzip"
+            or request.headers.get("content-type", "").lower() in ("application/gzip", "application/x-gzip")
+        )
+        lector = LectorNDJSON(gzip=gzip)
+        importador = ImportadorMasivo(engine, lote=max(1, min(lote, 10000)), progreso=reportar_progreso)
+        marcar_importacion(True)
+        try:
+            pendientes = []
+            async for fragmento in request.stream():
+                pendientes.extend(lector.alimentar(fragmento))
+                if len(pendientes) >= importador.lote:
+                    await run_in_threadpool(importador.procesar, pendientes)
+                    pendientes = []
+            pendientes.extend(lector.terminar())
+            await run_in_threadpool(importador.procesar, pendientes)
+            resumen = await run_in_threadpool(importador.finalizar)
+        finally:
+            marcar_importacion(False, {"total": importador.total})
+            cache_reportes.limpiar()
+            cache_catalogos.invalidar_todo(engine)
+            indice_cotizaciones.reiniciar()
+            indice_descripciones.reiniciar()
+            asignador_folios.sincronizar(engine)
+        
+        log.info("Importación NDJSON terminada", extra={"filas": resumen['total'], "segundos": resumen['seconds']})
+        return {"success": True, **resumen}
+        
+    except Exception as e:
+        import traceback
+        return {"success": False, "error": str(e), "traceback": traceback.format_exc()}
+
+
+@app.get("/admin/import-status")
+def import_status():
+    """Avance de la importación en curso (tabla actual y filas por segundo)"""
+    return dict(estado_importacion)
+
+
+@app.get("/admin/export")
+def export_data():
+    """
+    Respaldo completo como NDJSON + gzip, en el formato que acepta
+    /admin/import-ndjson (enviar con Content-Encoding: gzip).
+    """
+    from server.database import engine
     
+    nombre = f"taller-{datetime.now().strftime('%Y%m%d-%H%M%S')}.ndjson.gz"
+    return StreamingResponse(
+        exportar_gzip(engine),
+        media_type="application/gzip",
+        headers={"Content-Disposition": f'attachment; filename="{nombre}"'}
+    )
+
 @app.post("/admin/clear-data")
 async def clear_data():
     """Limpiar todas las tablas excepto usuarios"""
@@ -2331,6 +2365,8 @@ async def clear_data():
                 "ordenes_items",
                 "ordenes",
                 "movimientos_inventario",
+                "servicios",
+                "folios_secuencia",
                 "inventario",
                 "proveedores",
                 "clientes",
@@ -2341,12 +2377,18 @@ async def clear_data():
             for tabla in tablas:
                 result = conn.execute(text(f"DELETE FROM {tabla}"))
                 deleted[tabla] = result.rowcount
-                print(f"🗑️  {tabla}: {result.rowcount} registros eliminados")
+                log.info("Registros eliminados", extra={"tabla": tabla, "filas": result.rowcount})
             
             # Reactivar restricciones
             conn.execute(text("SET session_replication_role = 'origin'"))
             
             conn.commit()
+            crud.limpiar_cache_servicios()
+            asignador_folios.reiniciar()
+            cache_reportes.limpiar()
+            cache_catalogos.invalidar_todo(engine)
+            indice_cotizaciones.reiniciar()
+            indice_descripciones.reiniciar()
             
             return {
                 "success": True,
@@ -2412,49 +2454,74 @@ async def fix_cotizaciones_table():
         import traceback
         return {"success": False, "error": str(e), "traceback": traceback.format_exc()}
 
-@app.post("/admin/reimport")
-async def reimport_data(data: Dict[str, Any]):
-    """Re-importar solo cotizaciones"""
+@app.post("/admin/fix-servicios")
+async def fix_servicios_table():
+    """Crear catálogo de servicios y columnas servicio_id/producto_id en items"""
     try:
-        from server.database import SessionLocal
-        from server.models import Cotizacion, CotizacionItem
-        from datetime import datetime
+        from server.database import engine
+        from server.models import Servicio
+        from sqlalchemy import text
         
-        db = SessionLocal()
-        map_cotizaciones = {}
+        Servicio.__table__.create(bind=engine, checkfirst=True)
         
-        # Solo cotizaciones
-        for c_data in data.get("cotizaciones", []):
-            id_original = c_data.pop("id_original", None)
-            c_data.pop("cliente_id_original", None)  # Ya está mapeado
-            c_data.pop("fecha", None)  # Ignorar fechas problemáticas
-            c_data.pop("vigencia", None)
-            c_data.pop("proyecto", None)  # Ignorar proyecto
-            c_data.pop("nota_folio", None)
+        with engine.connect() as conn:
+            for tabla in ["notas_venta_items", "cotizaciones_items", "ordenes_items"]:
+                conn.execute(text(f"ALTER TABLE {tabla} ADD COLUMN IF NOT EXISTS servicio_id INTEGER REFERENCES servicios(id)"))
+                conn.execute(text(f"ALTER TABLE {tabla} ADD COLUMN IF NOT EXISTS producto_id INTEGER REFERENCES inventario(id)"))
+                conn.execute(text(f"CREATE INDEX IF NOT EXISTS ix_{tabla}_servicio_id ON {tabla} (servicio_id)"))
+                conn.execute(text(f"CREATE INDEX IF NOT EXISTS ix_{tabla}_producto_id ON {tabla} (producto_id)"))
+            conn.commit()
             
-            try:
-                cotizacion = Cotizacion(**c_data)
-                db.add(cotizacion)
-                db.flush()
-                if id_original:
-                    map_cotizaciones[id_original] = cotizacion.id
-            except Exception as e:
-                continue
+            return {"success": True, "message": "Catálogo de servicios listo"}
+    except Exception as e:
+        import traceback
+        return {"success": False, "error": str(e), "traceback": traceback.format_exc()}
+
+@app.post("/admin/fix-versiones")
+async def fix_versiones_columns():
+    """Agregar columna 'version' (concurrencia optimista) a notas, cotizaciones y órdenes"""
+    try:
+        from server.database import engine
+        from sqlalchemy import text
         
-        db.commit()
+        with engine.connect() as conn:
+            for tabla in ["notas_venta", "notas_proveedor", "cotizaciones", "ordenes"]:
+                conn.execute(text(f"ALTER TABLE {tabla} ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1"))
+            conn.commit()
+            
+            return {"success": True, "message": "Columnas de versión agregadas"}
+    except Exception as e:
+        import traceback
+        return {"success": False, "error": str(e), "traceback": traceback.format_exc()}
+
+@app.post("/admin/backfill-servicios")
+def backfill_servicios(db: Session = Depends(get_db)):
+    """Ligar items históricos al catálogo de servicios (agrupando descripciones)"""
+    try:
+        resumen = crud.backfill_servicios(db)
+        cache_reportes.limpiar()
+        return {"success": True, **resumen}
+    except Exception as e:
+        db.rollback()
+        import traceback
+        return {"success": False, "error": str(e), "traceback": traceback.format_exc()}
+
+@app.post("/admin/reimport")
+async def reimport_data(data: Dict[str, Any]):
+    """Re-importar solo cotizaciones"""
+    try:
+        from server.database import engine
         
-        # Items
-        for i_data in data.get("cotizaciones_items", []):
-            cotizacion_id_original = i_data.pop("cotizacion_id_original", None)
-            if cotizacion_id_original and cotizacion_id_original in map_cotizaciones:
-                i_data["cotizacion_id"] = map_cotizaciones[cotizacion_id_original]
-                item = CotizacionItem(**i_data)
-                db.add(item)
+        # El cliente ya viene mapeado en 'cliente_id'
+        for c_data in data.get("cotizaciones", []):
+            c_data.pop("cliente_id_original", None)
         
-        db.commit()
-        db.close()
+        importador = ImportadorMasivo(engine, tablas={"cotizaciones", "cotizaciones_items"})
+        await run_in_threadpool(importador.procesar, registros_desde_json(data))
+        await run_in_threadpool(importador.finalizar)
+        asignador_folios.sincronizar(engine, ['COT'])
         
-        return {"success": True, "cotizaciones": len(map_cotizaciones)}
+        return {"success": True, "cotizaciones": len(importador.mapas["cotizaciones"])}
     except Exception as e:
         import traceback
         return {"success": False, "error": str(e), "traceback": traceback.format_exc()}
@@ -2548,251 +2615,6 @@ async def check_all_users():
         import traceback
         return {"success": False, "error": str(e), "traceback": traceback.format_exc()}
     
-# ==================== CONVERSORES (Serializers) ====================
-def _cliente_to_dict(c):
-    if not c:
-        return None
-    return {
-        'id': c.id,
-        'nombre': c.nombre,
-        'tipo': c.tipo,
-        'email': c.email or '',
-        'telefono': c.telefono or '',
-        'rfc': c.rfc or '',
-        'calle': c.calle or '',
-        'colonia': c.colonia or '',
-        'ciudad': c.ciudad or '',
-        'estado': c.estado or '',
-        'cp': c.cp or '',
-        'pais': c.pais or 'México',
-    }
-
-def _proveedor_to_dict(p):
-    if not p:
-        return None
-    return {
-        'id': p.id,
-        'nombre': p.nombre,
-        'tipo': p.tipo,
-        'email': p.email or '',
-        'telefono': p.telefono or '',
-        'rfc': p.rfc or '',
-        'calle': p.calle or '',
-        'colonia': p.colonia or '',
-        'ciudad': p.ciudad or '',
-        'estado': p.estado or '',
-        'cp': p.cp or '',
-        'pais': p.pais or 'México',
-    }
-
-def _producto_to_dict(p):
-    if not p:
-        return None
-    return {
-        'id': p.id,
-        'codigo': p.codigo,
-        'nombre': p.nombre,
-        'categoria': p.categoria or '',
-        'ubicacion': p.ubicacion or '',
-        'proveedor_id': p.proveedor_id,
-        'proveedor_nombre': p.proveedor.nombre if p.proveedor else 'N/A',
-        'precio_compra': float(p.precio_compra or 0),
-        'precio_venta': float(p.precio_venta or 0),
-        'stock_actual': p.stock_actual or 0,
-        'stock_min': p.stock_min or 0,
-        'descripcion': p.descripcion or ''
-    }
-
-def _orden_to_dict(o):
-    if not o:
-        return None
-    return {
-        'id': o.id,
-        'folio': o.folio,
-        'cliente_id': o.cliente_id,
-        'cliente_nombre': o.cliente.nombre if o.cliente else 'N/A',
-        'vehiculo_marca': o.vehiculo_marca or '',
-        'vehiculo_modelo': o.vehiculo_modelo or '',
-        'vehiculo_ano': o.vehiculo_ano or '', 
-        'vehiculo_placas': o.vehiculo_placas or '', # Añadido
-        'vehiculo_vin': o.vehiculo_vin or '', # Añadido
-        'vehiculo_color': o.vehiculo_color or '', # Añadido
-        'vehiculo_kilometraje': o.vehiculo_kilometraje or '', # Añadido
-        'estado': o.estado,
-        'fecha_recepcion': o.fecha_recepcion.isoformat() if o.fecha_recepcion else '',
-        'fecha_promesa': o.fecha_promesa.isoformat() if o.fecha_promesa else '', # Añadido
-        'fecha_entrega': o.fecha_entrega.isoformat() if o.fecha_entrega else '', # Añadido
-        'mecanico_asignado': o.mecanico_asignado or '',
-        'observaciones': o.observaciones or '', # Añadido
-        'nota_folio': o.nota_folio or '',
-        'items': [{
-            'id': i.id,
-            'cantidad': i.cantidad,
-            'descripcion': i.descripcion
-        } for i in o.items] if hasattr(o, 'items') else []
-    }
-
-def _cotizacion_to_dict(c):
-    if not c:
-        return None
-    return {
-        'id': c.id,
-        'folio': c.folio,
-        'cliente_id': c.cliente_id,
-        'cliente_nombre': c.cliente.nombre if c.cliente else 'N/A',
-        'estado': c.estado,
-        'vigencia': c.vigencia or '30 días',
-        'subtotal': float(c.subtotal or 0),
-        'impuestos': float(c.impuestos or 0), 
-        'total': float(c.total or 0),
-        'observaciones': c.observaciones or '',
-        'fecha': c.created_at.isoformat() if c.created_at else '', # Cambiado a 'fecha' para consistencia
-        'created_at': c.created_at.isoformat() if c.created_at else '', # Mantenemos created_at
-
-        'nota_folio': c.nota_folio or '',
-        'items': [{
-            'id': i.id,
-            'cantidad': i.cantidad,
-            'descripcion': i.descripcion,
-            'precio_unitario': float(i.precio_unitario or 0),
-            'importe': float(i.importe or 0),
-            'impuesto': float(i.impuesto or 0)
-        } for i in c.items] if hasattr(c, 'items') else []
-    }
-
-def _nota_to_dict(n):
-    if not n:
-        return None
-    return {
-        'id': n.id,
-        'folio': n.folio,
-        'cliente_id': n.cliente_id,
-        'cliente_nombre': n.cliente.nombre if n.cliente else '',
-        'estado': n.estado,
-        'metodo_pago': n.metodo_pago or '',
-        'subtotal': float(n.subtotal or 0),
-        'impuestos': float(n.impuestos or 0),
-        'total': float(n.total or 0),
-        'total_pagado': float(n.total_pagado or 0),
-        'saldo': float(n.saldo or 0),
-        'fecha': n.fecha.isoformat() if n.fecha else '',
-        'observaciones': n.observaciones or '',
-        'cotizacion_folio': n.cotizacion_folio or '',
-        'orden_folio': n.orden_folio or '',
-        'items': [{
-            'id': i.id,
-            'cantidad': i.cantidad,
-            'descripcion': i.descripcion,
-            'precio_unitario': float(i.precio_unitario or 0),
-            'importe': float(i.importe or 0),
-            'impuesto': float(i.impuesto or 0)
-        } for i in n.items] if hasattr(n, 'items') else [],
-        'pagos': [{
-            'id': p.id,
-            'monto': float(p.monto),
-            'fecha_pago': p.fecha_pago.isoformat() if p.fecha_pago else '',
-            'metodo_pago': p.metodo_pago,
-            'memo': p.memo or ''
-        } for p in n.pagos] if hasattr(n, 'pagos') else []
-    }
-
-def _pago_proveedor_to_dict(pago):
-    if not pago: return {}
-    return {
-        'id': pago.id,
-        'nota_id': pago.nota_id,
-        'monto': float(pago.monto),
-        # Corregido a ISO para consistencia
-        'fecha_pago': pago.fecha_pago.isoformat() if pago.fecha_pago else '',
-        'metodo_pago': pago.metodo_pago,
-        'memo': pago.memo or ''
-    }
-
-def _nota_proveedor_to_dict(nota):
-    if not nota: return {}
-    return {
-        'id': nota.id,
-        'folio': nota.folio,
-        'proveedor_id': nota.proveedor_id,
-        'proveedor_nombre': nota.proveedor.nombre if nota.proveedor else '',
-        'estado': nota.estado or 'Registrado',
-        'metodo_pago': nota.metodo_pago or 'Efectivo',
-        'fecha': nota.fecha.isoformat() if nota.fecha else '', # Corregido a ISO
-        'observaciones': nota.observaciones or '',
-        'subtotal': float(nota.subtotal or 0),
-        'impuestos': float(nota.impuestos or 0),
-        'total': float(nota.total or 0),
-        'total_pagado': float(nota.total_pagado or 0),
-        'saldo': float(nota.saldo or 0),
-        'items': [{
-            'id': i.id, # Agregado ID de item
-            'cantidad': i.cantidad,
-            'descripcion': i.descripcion,
-            'precio_unitario': float(i.precio_unitario or 0),
-            'importe': float(i.importe or 0),
-            'impuesto': float(i.impuesto or 0)
-        } for i in nota.items],
-        'pagos': [_pago_proveedor_to_dict(p) for p in nota.pagos]
-    }
-
-def _movimiento_to_dict(m):
-    if not m:
-        return None
-    return {
-        'id': m.id,
-        'producto_id': m.producto_id,
-        'producto': m.producto.nombre if m.producto else 'N/A', 
-        'tipo': m.tipo,
-        'cantidad': m.cantidad,
-        'motivo': m.motivo or '',
-        'usuario': m.usuario or '',
-        'fecha': m.created_at.isoformat() if m.created_at else ''
-    }
-
-# --- NUEVO SERIALIZER ---
-def _config_to_dict(c: Optional[ConfigEmpresa]) -> Optional[Dict]:
-    """Convierte un objeto ConfigEmpresa ORM a dict, codificando el logo."""
-    if not c:
-        return None
-    
-    logo_b64 = None
-    if c.logo_data:
-        logo_b64 = base64.b64encode(c.logo_data).decode('utf-8')
-        
-    return {
-        'id': c.id,
-        'nombre_comercial': c.nombre_comercial,
-        'razon_social': c.razon_social or '',
-        'rfc': c.rfc or '',
-        'calle': c.calle or '',
-        'colonia': c.colonia or '',
-        'ciudad': c.ciudad or '',
-        'estado': c.estado or '',
-        'cp': c.cp or '',
-        'pais': c.pais or 'México',
-        'telefono1': c.telefono1 or '',
-        'telefono2': c.telefono2 or '',
-        'email': c.email or '',
-        'sitio_web': c.sitio_web or '',
-        'logo_data': logo_b64 # Enviar como string Base64
-    }
-
-# --- SERIALIZER ACTUALIZADO ---
-def _usuario_to_dict(usuario: Optional[Usuario]) -> Optional[Dict]:
-    """Convierte un objeto Usuario ORM a dict."""
-    if not usuario: 
-        return None
-    return {
-        'id': usuario.id,
-        'username': usuario.username,
-        'password_hash': usuario.password_hash, # Necesario para login
-        'nombre_completo': usuario.nombre_completo,
-        'email': usuario.email or '',
-        'rol': usuario.rol,
-        'activo': usuario.activo,
-        'ultimo_acceso': usuario.ultimo_acceso.isoformat() if usuario.ultimo_acceso else ''
-    }
-
 # ==================== RUTA RAÍZ ====================
 @app.get("/")
 def root():
@@ -2822,7 +2644,8 @@ if __name__ == "__main__":
             'ordenes', 'ordenes_items',
             'notas_venta', 'notas_venta_items', 'notas_venta_pagos',
             'notas_proveedor', 'notas_proveedor_items', 'notas_proveedor_pagos',
-            'movimientos_inventario', 'config_empresa'
+            'movimientos_inventario', 'config_empresa', 'servicios',
+            'folios_secuencia', 'catalogos_version'
         }
         
         tablas_faltantes = tablas_requeridas - tablas_existentes
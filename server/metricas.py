@@ -0,0 +1,251 @@
+"""
+Métricas de rendimiento del servidor en formato de texto de Prometheus.
+
+- MiddlewareMetricas (ASGI) mide cada petición HTTP: histograma de latencia
+  y de tamaño de respuesta por (método, ruta, status) y peticiones en curso.
+  La ruta es la plantilla del endpoint ('/notas/{nota_id}'), no la URL, para
+  no crear una serie por id.
+- instrumentar_engine() cuelga eventos de SQLAlchemy que cuentan las
+  sentencias y su tiempo por petición; las que pasan de CONSULTA_LENTA_MS se
+  reportan con su SQL y se guardan las últimas en memoria.
+- Cada respuesta lleva 'Server-Timing' (app = tiempo hasta enviar los
+  encabezados, bd = tiempo en la base de datos) para que el cliente de
+  escritorio separe el tiempo del servidor del de la red.
+
+Los contadores viven en el proceso; con varios workers cada uno reporta
+los suyos.
+"""
+
+import contextvars
+import os
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+
+from server.bitacora import obtener_logger
+
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_TAMANO = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+CONSULTA_LENTA_MS = float(os.getenv('CONSULTA_LENTA_MS', '200'))
+MAX_CONSULTAS_LENTAS = 50
+MAX_LARGO_SQL = 1000
+
+RUTA_SIN_ENDPOINT = '(sin ruta)'
+
+log = obtener_logger('metricas')
+
+
+class _Histograma:
+    __slots__ = ('limites', 'cubetas', 'suma', 'cuenta')
+
+    def __init__(self, limites: Tuple[float, ...]):
+        self.limites = limites
+        self.cubetas = [0] * len(limites)
+        self.suma = 0.0
+        self.cuenta = 0
+
+    def observar(self, valor: float):
+        self.suma += valor
+        self.cuenta += 1
+        for i, limite in enumerate(self.limites):
+            if valor <= limite:
+                self.cubetas[i] += 1
+                break
+
+    def lineas(self, nombre: str, etiquetas: str) -> List[str]:
+        lineas = []
+        acumulado = 0
+        for limite, cantidad in zip(self.limites, self.cubetas):
+            acumulado += cantidad
+            lineas.append(f'{nombre}_bucket{{{etiquetas},le="{limite}"}} {acumulado}')
+        lineas.append(f'{nombre}_bucket{{{etiquetas},le="+Inf"}} {self.cuenta}')
+        lineas.append(f'{nombre}_sum{{{etiquetas}}} {self.suma:.6f}')
+        lineas.append(f'{nombre}_count{{{etiquetas}}} {self.cuenta}')
+        return lineas
+
+
+class MedicionPeticion:
+    """Lo que se acumula durante una petición (sentencias SQL y su tiempo)"""
+
+    __slots__ = ('ruta', 'sentencias', 'tiempo_bd')
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        self.sentencias = 0
+        self.tiempo_bd = 0.0
+
+
+# Medición de la petición en curso; los endpoints síncronos corren en el
+# threadpool con una copia del contexto, que apunta al mismo objeto
+_medicion_actual = contextvars.ContextVar('medicion_actual', default=None)
+
+
+def _escapar(valor: str) -> str:
+    return valor.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class RegistroMetricas:
+    """Contadores de todo el proceso"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latencia: Dict[Tuple[str, str, str], _Histograma] = {}
+        self._tamano: Dict[Tuple[str, str, str], _Histograma] = {}
+        self._sentencias: Dict[str, int] = {}
+        self._tiempo_bd: Dict[str, float] = {}
+        self._lentas_total = 0
+        self._lentas: Deque[Dict] = deque(maxlen=MAX_CONSULTAS_LENTAS)
+        self.en_curso = 0
+        self.inicio = time.time()
+
+    def registrar_peticion(self, metodo: str, ruta: str, status: int,
+                           duracion: float, tamano: int, medicion: MedicionPeticion):
+        llave = (metodo, ruta, str(status))
+        with self._lock:
+            latencia = self._latencia.get(llave)
+            if latencia is None:
+                latencia = self._latencia[llave] = _Histograma(BUCKETS_LATENCIA)
+                self._tamano[llave] = _Histograma(BUCKETS_TAMANO)
+            latencia.observar(duracion)
+            self._tamano[llave].observar(tamano)
+            self._sentencias[ruta] = self._sentencias.get(ruta, 0) + medicion.sentencias
+            self._tiempo_bd[ruta] = self._tiempo_bd.get(ruta, 0.0) + medicion.tiempo_bd
+
+    def registrar_sentencia(self, duracion: float, sql: str):
+        medicion = _medicion_actual.get()
+        if medicion is not None:
+            medicion.sentencias += 1
+            medicion.tiempo_bd += duracion
+        if duracion * 1000 >= CONSULTA_LENTA_MS:
+            ruta = medicion.ruta if medicion else RUTA_SIN_ENDPOINT
+            sql = ' '.join(sql.split())[:MAX_LARGO_SQL]
+            with self._lock:
+                self._lentas_total += 1
+                self._lentas.append({
+                    "ruta": ruta,
+                    "ms": round(duracion * 1000, 1),
+                    "sql": sql,
+                    "fecha": time.strftime('%Y-%m-%dT%H:%M:%S'),
+                })
+            log.warning("Consulta lenta", extra={"ruta": ruta, "ms": round(duracion * 1000, 1), "sql": sql})
+
+    def consultas_lentas(self) -> List[Dict]:
+        """Las últimas consultas lentas, la más reciente primero"""
+        with self._lock:
+            return list(reversed(self._lentas))
+
+    def texto_prometheus(self, extra: Optional[Dict[str, float]] = None) -> str:
+        """Todas las métricas en formato de exposición de Prometheus"""
+        lineas = [
+            '# HELP http_request_duration_seconds Latencia de las peticiones HTTP',
+            '# TYPE http_request_duration_seconds histogram',
+        ]
+        with self._lock:
+            for (metodo, ruta, status), histograma in sorted(self._latencia.items()):
+                etiquetas = f'method="{metodo}",route="{_escapar(ruta)}",status="{status}"'
+                lineas += histograma.lineas('http_request_duration_seconds', etiquetas)
+
+            lineas += ['# HELP http_response_size_bytes Tamaño del cuerpo de la respuesta',
+                       '# TYPE http_response_size_bytes histogram']
+            for (metodo, ruta, status), histograma in sorted(self._tamano.items()):
+                etiquetas = f'method="{metodo}",route="{_escapar(ruta)}",status="{status}"'
+                lineas += histograma.lineas('http_response_size_bytes', etiquetas)
+
+            lineas += ['# HELP http_requests_in_flight Peticiones HTTP en curso',
+                       '# TYPE http_requests_in_flight gauge',
+                       f'http_requests_in_flight {self.en_curso}']
+
+            lineas += ['# HELP db_statements_total Sentencias SQL ejecutadas por ruta',
+                       '# TYPE db_statements_total counter']
+            for ruta, cantidad in sorted(self._sentencias.items()):
+                lineas.append(f'db_statements_total{{route="{_escapar(ruta)}"}} {cantidad}')
+
+            lineas += ['# HELP db_statement_seconds_total Tiempo en la base de datos por ruta',
+                       '# TYPE db_statement_seconds_total counter']
+            for ruta, segundos in sorted(self._tiempo_bd.items()):
+                lineas.append(f'db_statement_seconds_total{{route="{_escapar(ruta)}"}} {segundos:.6f}')
+
+            lineas += ['# HELP db_slow_statements_total Sentencias SQL que pasaron el umbral de lentitud',
+                       '# TYPE db_slow_statements_total counter',
+                       f'db_slow_statements_total {self._lentas_total}']
+
+        lineas += ['# HELP process_uptime_seconds Segundos desde que arrancó el proceso',
+                   '# TYPE process_uptime_seconds gauge',
+                   f'process_uptime_seconds {time.time() - self.inicio:.0f}']
+        for nombre, valor in (extra or {}).items():
+            lineas += [f'# TYPE {nombre} gauge', f'{nombre} {valor}']
+        return '\n'.join(lineas) + '\n'
+
+    def limpiar(self):
+        with self._lock:
+            self._latencia.clear()
+            self._tamano.clear()
+            self._sentencias.clear()
+            self._tiempo_bd.clear()
+            self._lentas.clear()
+            self._lentas_total = 0
+
+
+# Instancia global
+registro_metricas = RegistroMetricas()
+
+
+def instrumentar_engine(engine, registro: RegistroMetricas = None):
+    """Cuenta y cronometra cada sentencia que ejecuta el engine"""
+    registro = registro or registro_metricas
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _antes(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('metricas_inicio', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _despues(conn, cursor, statement, parameters, context, executemany):
+        inicios = conn.info.get('metricas_inicio')
+        if inicios:
+            registro.registrar_sentencia(time.perf_counter() - inicios.pop(), statement)
+
+
+class MiddlewareMetricas:
+    """Middleware ASGI: latencia, tamaño y Server-Timing de cada petición HTTP"""
+
+    def __init__(self, app, registro: RegistroMetricas = None):
+        self.app = app
+        self.registro = registro or registro_metricas
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+
+        medicion = MedicionPeticion(scope['path'])
+        token = _medicion_actual.set(medicion)
+        inicio = time.perf_counter()
+        respuesta = {"status": 500, "tamano": 0}
+
+        async def send_midiendo(mensaje):
+            if mensaje['type'] == 'http.response.start':
+                respuesta['status'] = mensaje['status']
+                app_ms = (time.perf_counter() - inicio) * 1000
+                timing = (f'app;dur={app_ms:.1f}, '
+                          f'bd;dur={medicion.tiempo_bd * 1000:.1f};desc="{medicion.sentencias} sentencias"')
+                mensaje = dict(mensaje)
+                mensaje['headers'] = list(mensaje.get('headers', [])) + [(b'server-timing', timing.encode())]
+            elif mensaje['type'] == 'http.response.body':
+                respuesta['tamano'] += len(mensaje.get('body', b''))
+            await send(mensaje)
+
+        self.registro.en_curso += 1
+        try:
+            await self.app(scope, receive, send_midiendo)
+        finally:
+            self.registro.en_curso -= 1
+            _medicion_actual.reset(token)
+            # El router deja en el scope la ruta que atendió la petición
+            ruta = getattr(scope.get('route'), 'path', None) or RUTA_SIN_ENDPOINT
+            medicion.ruta = ruta
+            self.registro.registrar_peticion(
+                scope['method'], ruta, respuesta['status'],
+                time.perf_counter() - inicio, respuesta['tamano'], medicion)
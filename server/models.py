@@ -132,6 +132,46 @@ class MovimientoInventario(Base):
         return f"<Movimiento(id={self.id}, tipo='{self.tipo}', cantidad={self.cantidad})>"
 
 
+# ==================== CATÁLOGO DE SERVICIOS ====================
+
+class Servicio(Base):
+    __tablename__ = "servicios"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    nombre = Column(String(200), nullable=False)
+    clave = Column(String(200), unique=True, nullable=False, index=True)  # Ver server.texto.clave_servicio
+    
+    # Metadata
+    activo = Column(Boolean, default=True)
+    created_at = Column(DateTime, default=datetime.now)
+
+    def __repr__(self):
+        return f"<Servicio(id={self.id}, nombre='{self.nombre}')>"
+
+
+class SecuenciaFolio(Base):
+    __tablename__ = "folios_secuencia"
+    
+    # Un contador por serie ('NV', 'ORD', 'COT', 'NP') y año
+    serie = Column(String(10), primary_key=True)
+    anio = Column(Integer, primary_key=True)
+    ultimo = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<SecuenciaFolio(serie='{self.serie}', anio={self.anio}, ultimo={self.ultimo})>"
+
+
+class VersionCatalogo(Base):
+    __tablename__ = "catalogos_version"
+
+    # Un contador por catálogo ('clientes', 'productos'...); sube con cada escritura
+    nombre = Column(String(50), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<VersionCatalogo(nombre='{self.nombre}', version={self.version})>"
+
+
 # ==================== ÓRDENES DE TRABAJO ====================
 
 class Orden(Base):
@@ -168,6 +208,10 @@ class Orden(Base):
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
     nota_folio = Column(String, nullable=True)
     
+    # Control de concurrencia optimista: cada UPDATE exige la versión leída
+    version = Column(Integer, nullable=False, default=1)
+    __mapper_args__ = {"version_id_col": version}
+    
     # Relaciones
     items = relationship("OrdenItem", back_populates="orden", cascade="all, delete-orphan")
 
@@ -182,6 +226,10 @@ class OrdenItem(Base):
     orden_id = Column(Integer, ForeignKey("ordenes.id"), nullable=False)
     orden = relationship("Orden", back_populates="items")
     
+    # Catálogo (opcional; se asigna al guardar y con el backfill)
+    servicio_id = Column(Integer, ForeignKey("servicios.id"), nullable=True, index=True)
+    producto_id = Column(Integer, ForeignKey("inventario.id"), nullable=True, index=True)
+    
     cantidad = Column(Integer, default=1)
     descripcion = Column(Text, nullable=False)
     
@@ -218,6 +266,10 @@ class Cotizacion(Base):
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
     nota_folio = Column(String, nullable=True)
     
+    # Control de concurrencia optimista: cada UPDATE exige la versión leída
+    version = Column(Integer, nullable=False, default=1)
+    __mapper_args__ = {"version_id_col": version}
+    
     # Relaciones
     items = relationship("CotizacionItem", back_populates="cotizacion", cascade="all, delete-orphan")
 
@@ -232,6 +284,10 @@ class CotizacionItem(Base):
     cotizacion_id = Column(Integer, ForeignKey("cotizaciones.id"), nullable=False)
     cotizacion = relationship("Cotizacion", back_populates="items")
     
+    # Catálogo (opcional; se asigna al guardar y con el backfill)
+    servicio_id = Column(Integer, ForeignKey("servicios.id"), nullable=True, index=True)
+    producto_id = Column(Integer, ForeignKey("inventario.id"), nullable=True, index=True)
+    
     cantidad = Column(Integer, default=1)
     descripcion = Column(Text, nullable=False)
     precio_unitario = Column(Float, default=0.0)
@@ -277,6 +333,10 @@ class NotaVenta(Base):
     cotizacion_folio = Column(String, nullable=True)
     orden_folio = Column(String, nullable=True)
     
+    # Control de concurrencia optimista: cada UPDATE exige la versión leída
+    version = Column(Integer, nullable=False, default=1)
+    __mapper_args__ = {"version_id_col": version}
+    
     # Relaciones
     items = relationship("NotaVentaItem", back_populates="nota", cascade="all, delete-orphan")
     pagos = relationship("NotaVentaPago", back_populates="nota", cascade="all, delete-orphan")
@@ -292,6 +352,10 @@ class NotaVentaItem(Base):
     nota_id = Column(Integer, ForeignKey("notas_venta.id"), nullable=False)
     nota = relationship("NotaVenta", back_populates="items")
     
+    # Catálogo (opcional; se asigna al guardar y con el backfill)
+    servicio_id = Column(Integer, ForeignKey("servicios.id"), nullable=True, index=True)
+    producto_id = Column(Integer, ForeignKey("inventario.id"), nullable=True, index=True)
+    
     cantidad = Column(Integer, default=1)
     descripcion = Column(Text, nullable=False)
     precio_unitario = Column(Float, default=0.0)
@@ -357,6 +421,10 @@ class NotaProveedor(Base):
     created_at = Column(DateTime, default=datetime.now)
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
     
+    # Control de concurrencia optimista: cada UPDATE exige la versión leída
+    version = Column(Integer, nullable=False, default=1)
+    __mapper_args__ = {"version_id_col": version}
+    
     # Relaciones
     items = relationship("NotaProveedorItem", back_populates="nota", cascade="all, delete-orphan")
     pagos = relationship("NotaProveedorPago", back_populates="nota", cascade="all, delete-orphan")
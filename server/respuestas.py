@@ -0,0 +1,198 @@
+"""
+Codificación JSON y compresión de las respuestas de la API.
+
+- codificar_json() usa orjson si está instalado: fechas, datetime y floats
+  se escriben en C, así que los dicts de server/esquemas.py llevan los
+  valores tal cual en lugar de llamar isoformat()/float() por campo.
+  Sin orjson se usa json con el mismo formato (compacto, UTF-8, ISO 8601).
+- RespuestaJSON es la clase de respuesta por default de la app. Las listas
+  grandes la regresan directamente para saltarse jsonable_encoder.
+- MiddlewareCompresion comprime con br (si está instalado Brotli) o gzip
+  según Accept-Encoding, a partir de COMPRESION_MINIMA bytes. No toca las
+  respuestas que ya traen Content-Encoding (/bootstrap) ni los tipos ya
+  comprimidos (el respaldo .ndjson.gz).
+
+Variables de entorno:
+- COMPRESION_MINIMA: bytes desde los que se comprime (1024).
+- COMPRESION_NIVEL_GZIP (5) y COMPRESION_NIVEL_BR (4): niveles rápidos,
+  pensados para respuestas dinámicas.
+"""
+
+import json
+import os
+import zlib
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Any, List, Optional, Tuple
+
+from starlette.responses import Response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson es opcional
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - Brotli es opcional
+    brotli = None
+
+COMPRESION_MINIMA = int(os.getenv('COMPRESION_MINIMA', '1024'))
+NIVEL_GZIP = int(os.getenv('COMPRESION_NIVEL_GZIP', '5'))
+NIVEL_BR = int(os.getenv('COMPRESION_NIVEL_BR', '4'))
+
+# Tipos que ya vienen comprimidos o que se envían poco a poco
+TIPOS_SIN_COMPRESION = ('application/gzip', 'application/x-gzip', 'application/zip',
+                        'image/', 'audio/', 'video/', 'text/event-stream')
+
+
+# ==================== JSON ====================
+
+def _por_defecto(valor: Any):
+    if isinstance(valor, (datetime, date, time)):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return float(valor)
+    if isinstance(valor, (set, frozenset, tuple)):
+        return list(valor)
+    raise TypeError(f"{type(valor).__name__} no se puede convertir a JSON")
+
+
+if orjson is not None:
+    _OPCIONES_ORJSON = orjson.OPT_NON_STR_KEYS
+
+    def codificar_json(contenido: Any) -> bytes:
+        return orjson.dumps(contenido, default=_por_defecto, option=_OPCIONES_ORJSON)
+else:
+    def codificar_json(contenido: Any) -> bytes:
+        return json.dumps(contenido, default=_por_defecto, ensure_ascii=False,
+                          separators=(',', ':')).encode('utf-8')
+
+
+class RespuestaJSON(Response):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return codificar_json(content)
+
+
+# ==================== COMPRESIÓN ====================
+
+def elegir_codificacion(accept_encoding: str) -> Optional[str]:
+    """'br' o 'gzip' según lo que acepte el cliente (respetando q=0), o None"""
+    aceptadas = {}
+    for parte in accept_encoding.lower().split(','):
+        nombre, _, parametros = parte.strip().partition(';')
+        calidad = 1.0
+        parametros = parametros.strip()
+        if parametros.startswith('q='):
+            try:
+                calidad = float(parametros[2:])
+            except ValueError:
+                calidad = 0.0
+        if nombre:
+            aceptadas[nombre] = calidad
+    comodin = aceptadas.get('*', 0.0)
+    if brotli is not None and aceptadas.get('br', comodin) > 0:
+        return 'br'
+    if aceptadas.get('gzip', comodin) > 0:
+        return 'gzip'
+    return None
+
+
+class _Compresor:
+    """Compresión incremental con la misma interfaz para gzip y br"""
+
+    def __init__(self, codificacion: str):
+        if codificacion == 'br':
+            self._obj = brotli.Compressor(quality=NIVEL_BR)
+            self._comprimir, self._terminar = self._obj.process, self._obj.finish
+        else:
+            # wbits=31: formato gzip (encabezado y CRC), no deflate crudo
+            self._obj = zlib.compressobj(NIVEL_GZIP, zlib.DEFLATED, 31)
+            self._comprimir, self._terminar = self._obj.compress, self._obj.flush
+
+    def comprimir(self, datos: bytes) -> bytes:
+        return self._comprimir(datos)
+
+    def terminar(self) -> bytes:
+        return self._terminar()
+
+
+def _encabezado(headers: List[Tuple[bytes, bytes]], nombre: bytes) -> Optional[bytes]:
+    for llave, valor in headers:
+        if llave.lower() == nombre:
+            return valor
+    return None
+
+
+class MiddlewareCompresion:
+    """Middleware ASGI: comprime el cuerpo de las respuestas HTTP con br o gzip"""
+
+    def __init__(self, app, minimo: int = None):
+        self.app = app
+        self.minimo = COMPRESION_MINIMA if minimo is None else minimo
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+        accept = _encabezado(scope.get('headers', []), b'accept-encoding')
+        codificacion = elegir_codificacion(accept.decode('latin-1')) if accept else None
+        if codificacion is None:
+            return await self.app(scope, receive, send)
+
+        inicio = None            # http.response.start retenido hasta ver el primer cuerpo
+        compresor = None
+        pasar = False            # la respuesta sale tal cual
+
+        async def send_comprimiendo(mensaje):
+            nonlocal inicio, compresor, pasar
+            if mensaje['type'] == 'http.response.start':
+                headers = list(mensaje.get('headers', []))
+                tipo = (_encabezado(headers, b'content-type') or b'').decode('latin-1').lower()
+                if (_encabezado(headers, b'content-encoding') is not None
+                        or tipo.startswith(TIPOS_SIN_COMPRESION)):
+                    pasar = True
+                    await send(mensaje)
+                else:
+                    inicio = mensaje
+                return
+
+            if mensaje['type'] != 'http.response.body' or pasar:
+                await send(mensaje)
+                return
+
+            cuerpo = mensaje.get('body', b'')
+            mas = mensaje.get('more_body', False)
+
+            if inicio is not None:
+                headers = [(k, v) for k, v in inicio.get('headers', []) if k.lower() != b'content-length']
+                if not mas and len(cuerpo) < self.minimo:
+                    # Chica: no vale la pena comprimir
+                    pasar = True
+                    await send(inicio)
+                    await send(mensaje)
+                    return
+                compresor = _Compresor(codificacion)
+                headers.append((b'content-encoding', codificacion.encode()))
+                vary = _encabezado(headers, b'vary')
+                if vary is None:
+                    headers.append((b'vary', b'Accept-Encoding'))
+                elif b'accept-encoding' not in vary.lower():
+                    headers = [(k, v + b', Accept-Encoding' if k.lower() == b'vary' else v) for k, v in headers]
+                if not mas:
+                    cuerpo = compresor.comprimir(cuerpo) + compresor.terminar()
+                    headers.append((b'content-length', str(len(cuerpo)).encode()))
+                    await send(dict(inicio, headers=headers))
+                    await send({'type': 'http.response.body', 'body': cuerpo})
+                    return
+                # En streaming no se conoce el largo final: sin Content-Length
+                await send(dict(inicio, headers=headers))
+                inicio = None
+
+            datos = compresor.comprimir(cuerpo)
+            if not mas:
+                datos += compresor.terminar()
+            await send({'type': 'http.response.body', 'body': datos, 'more_body': mas})
+
+        await self.app(scope, receive, send_comprimiendo)
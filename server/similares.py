@@ -0,0 +1,192 @@
+"""
+Índice de similitud de cotizaciones (TF-IDF + coseno sobre un índice invertido).
+
+Cada cotización se representa como una bolsa de tokens de sus descripciones
+más un token por servicio completo ('s:afinacion mayor'), de modo que dos
+cotizaciones con los mismos servicios pesan más que las que solo comparten
+palabras sueltas. La búsqueda solo recorre las listas de los tokens de la
+consulta, así que el costo depende de cuántas cotizaciones comparten
+términos con ella y no del total indexado.
+"""
+
+import heapq
+import math
+import threading
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from server.bitacora import obtener_logger
+from server.models import Cotizacion, CotizacionItem
+from server.texto import normalizar_texto, tokenizar
+
+log = obtener_logger('similares')
+
+
+def vectorizar(descripciones: Iterable[str]) -> Dict[str, float]:
+    """Convierte las descripciones de una cotización en {token: tf} (tf logarítmico)"""
+    conteo: Dict[str, int] = defaultdict(int)
+    for descripcion in descripciones:
+        tokens = tokenizar(descripcion)
+        if not tokens:
+            continue
+        for token in tokens:
+            conteo[token] += 1
+        conteo['s:' + normalizar_texto(descripcion)] += 1
+    return {t: 1.0 + math.log(c) for t, c in conteo.items()}
+
+
+class IndiceSimilitud:
+    """Índice invertido en memoria con actualización incremental"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.cargado = False
+        self._docs: Dict[int, Dict[str, float]] = {}
+        self._normas: Dict[int, float] = {}
+        self._postings: Dict[str, Dict[int, float]] = defaultdict(dict)
+
+    # ---------- pesos ----------
+
+    def _idf(self, token: str) -> float:
+        df = len(self._postings.get(token, ()))
+        return math.log((1 + len(self._docs)) / (1 + df)) + 1.0
+
+    def _norma(self, vector: Dict[str, float]) -> float:
+        return math.sqrt(sum((tf * self._idf(t)) ** 2 for t, tf in vector.items())) or 1.0
+
+    # ---------- mantenimiento ----------
+
+    def _quitar(self, doc_id: int):
+        vector = self._docs.pop(doc_id, None)
+        self._normas.pop(doc_id, None)
+        if not vector:
+            return
+        for token in vector:
+            posting = self._postings.get(token)
+            if posting is not None:
+                posting.pop(doc_id, None)
+                if not posting:
+                    del self._postings[token]
+
+    def _agregar(self, doc_id: int, vector: Dict[str, float]):
+        if not vector:
+            return
+        self._docs[doc_id] = vector
+        for token, tf in vector.items():
+            self._postings[token][doc_id] = tf
+        self._normas[doc_id] = self._norma(vector)
+
+    def actualizar(self, cotizacion_id: int, descripciones: Iterable[str]):
+        """Reindexa una cotización (alta o edición). No hace nada si aún no se cargó."""
+        if not self.cargado:
+            return
+        vector = vectorizar(descripciones)
+        with self._lock:
+            self._quitar(cotizacion_id)
+            self._agregar(cotizacion_id, vector)
+
+    def quitar(self, cotizacion_id: int):
+        """Deja de sugerir una cotización (p. ej. al cancelarla)"""
+        with self._lock:
+            self._quitar(cotizacion_id)
+
+    def reiniciar(self):
+        """Vacía el índice; se vuelve a construir en la siguiente búsqueda (limpieza, importación)"""
+        with self._lock:
+            self._docs.clear()
+            self._normas.clear()
+            self._postings.clear()
+            self.cargado = False
+
+    def asegurar_cargado(self, db: Session):
+        """Construye el índice desde la BD la primera vez que se necesita"""
+        if self.cargado:
+            return
+        with self._lock:
+            if self.cargado:
+                return
+            descripciones: Dict[int, List[str]] = defaultdict(list)
+            # Las canceladas no se sugieren
+            query = db.query(CotizacionItem.cotizacion_id, CotizacionItem.descripcion).join(
+                Cotizacion, Cotizacion.id == CotizacionItem.cotizacion_id
+            ).filter(Cotizacion.estado != 'Cancelada')
+            for cotizacion_id, descripcion in query.yield_per(5000):
+                descripciones[cotizacion_id].append(descripcion or '')
+
+            self._docs.clear()
+            self._normas.clear()
+            self._postings.clear()
+            for cotizacion_id, textos in descripciones.items():
+                vector = vectorizar(textos)
+                if vector:
+                    self._docs[cotizacion_id] = vector
+                    for token, tf in vector.items():
+                        self._postings[token][cotizacion_id] = tf
+            # Normas al final, con los df ya completos
+            for cotizacion_id, vector in self._docs.items():
+                self._normas[cotizacion_id] = self._norma(vector)
+            self.cargado = True
+            log.info("Índice de cotizaciones cargado",
+                     extra={"documentos": len(self._docs), "terminos": len(self._postings)})
+
+    # ---------- consulta ----------
+
+    def _buscar_vector(self, vector: Dict[str, float], k: int, excluir: Optional[int]) -> List[Tuple[int, float]]:
+        pesos = {t: tf * self._idf(t) for t, tf in vector.items() if t in self._postings}
+        if not pesos:
+            return []
+        norma_q = math.sqrt(sum(w * w for w in pesos.values())) or 1.0
+
+        # Los términos presentes en más de la mitad de los documentos solo
+        # suman a candidatos ya encontrados por términos más raros; así una
+        # palabra como 'cambio' no obliga a recorrer todo el índice.
+        limite_df = max(len(self._docs) // 2, 1)
+        raros = [t for t in pesos if len(self._postings[t]) <= limite_df]
+        frecuentes = [t for t in pesos if len(self._postings[t]) > limite_df]
+        if not raros:
+            raros, frecuentes = frecuentes, []
+
+        puntajes: Dict[int, float] = defaultdict(float)
+        for token in raros:
+            w = pesos[token] * self._idf(token)
+            for doc_id, tf in self._postings[token].items():
+                puntajes[doc_id] += w * tf
+        for token in frecuentes:
+            w = pesos[token] * self._idf(token)
+            posting = self._postings[token]
+            for doc_id in puntajes:
+                tf = posting.get(doc_id)
+                if tf:
+                    puntajes[doc_id] += w * tf
+        if excluir is not None:
+            puntajes.pop(excluir, None)
+
+        normas = self._normas
+        mejores = heapq.nlargest(
+            k, ((doc_id, p / normas.get(doc_id, 1.0)) for doc_id, p in puntajes.items()),
+            key=lambda par: par[1]
+        )
+        return [(doc_id, p / norma_q) for doc_id, p in mejores]
+
+    def buscar(self, descripciones: Iterable[str], k: int = 10, excluir: Optional[int] = None) -> List[Tuple[int, float]]:
+        """Top-k cotizaciones más parecidas a una lista de descripciones: [(id, similitud)]"""
+        vector = vectorizar(descripciones)
+        with self._lock:
+            return self._buscar_vector(vector, k, excluir)
+
+    def buscar_por_id(self, cotizacion_id: int, k: int = 10) -> Optional[List[Tuple[int, float]]]:
+        """Top-k parecidas a una cotización indexada (None si no está en el índice)"""
+        with self._lock:
+            vector = self._docs.get(cotizacion_id)
+            if vector is None:
+                return None
+            return self._buscar_vector(vector, k, cotizacion_id)
+
+    def __len__(self):
+        return len(self._docs)
+
+
+# Instancia global
+indice_cotizaciones = IndiceSimilitud()
@@ -0,0 +1,43 @@
+"""Utilidades de normalización de texto libre (descripciones de items)"""
+
+import re
+import unicodedata
+from typing import List
+
+_RE_NO_ALFANUM = re.compile(r"[^a-z0-9]+")
+
+# Palabras sin peso para comparar servicios
+STOPWORDS = frozenset({
+    'de', 'del', 'la', 'las', 'el', 'los', 'y', 'e', 'o', 'u', 'a', 'al',
+    'en', 'con', 'sin', 'por', 'para', 'un', 'una', 'unos', 'unas', 'se',
+    'que', 'su', 'sus', 'x', 'pza', 'pzas', 'pieza', 'piezas'
+})
+
+
+def normalizar_texto(texto: str) -> str:
+    """
+    Minúsculas, sin acentos y con espacios simples.
+    'Afinación  Mayor' -> 'afinacion mayor'
+    """
+    if not texto:
+        return ''
+    texto = unicodedata.normalize('NFKD', str(texto))
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return ' '.join(texto.lower().split())
+
+
+def tokenizar(texto: str) -> List[str]:
+    """Tokens alfanuméricos normalizados, sin stopwords ni tokens de 1 caracter"""
+    return [
+        t for t in _RE_NO_ALFANUM.split(normalizar_texto(texto))
+        if len(t) > 1 and t not in STOPWORDS
+    ]
+
+
+def clave_servicio(texto: str) -> str:
+    """
+    Clave de agrupación de un servicio: tokens únicos ordenados.
+    'Cambio de Aceite' y 'aceite, cambio' comparten la clave 'aceite cambio'.
+    """
+    tokens = sorted(set(tokenizar(texto)))
+    return ' '.join(tokens) if tokens else normalizar_texto(texto)